@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+Report hit and miss counts of the privilege cache
+
+Counts are summed over all processes sharing the cache backend.
+
+* Optional argument --reset sets the counts back to zero after reporting them.
+"""
+
+from django.core.management.base import BaseCommand
+
+from hs_access_control import privilege_cache
+
+
+class Command(BaseCommand):
+    help = "Report hit and miss counts of the privilege cache."
+
+    def add_arguments(self, parser):
+
+        # Named (optional) arguments
+        parser.add_argument(
+            '--reset',
+            action='store_true',  # True for presence, False for absence
+            dest='reset',
+            help='reset the counts after reporting them',
+        )
+
+    def handle(self, *args, **options):
+        stats = privilege_cache.stats()
+        print("request memo hits: {}".format(stats['memo_hits']))
+        print("shared cache hits: {}".format(stats['shared_hits']))
+        print("misses: {}".format(stats['misses']))
+        if stats['hit_rate'] is None:
+            print("hit rate: no lookups recorded")
+        else:
+            print("hit rate: {:.1%}".format(stats['hit_rate']))
+        if options['reset']:
+            privilege_cache.reset_stats()
@@ -0,0 +1,20 @@
+from hs_access_control import privilege_cache
+
+
+class PrivilegeCacheMiddleware(object):
+    """
+    Memoize effective privilege lookups for the duration of each request.
+
+    Add 'hs_access_control.middleware.PrivilegeCacheMiddleware' to MIDDLEWARE_CLASSES
+    to enable the request-scoped layer of hs_access_control.privilege_cache.
+    """
+
+    def process_request(self, request):
+        privilege_cache.begin_request()
+
+    def process_response(self, request, response):
+        privilege_cache.end_request()
+        return response
+
+    def process_exception(self, request, exception):
+        privilege_cache.end_request()
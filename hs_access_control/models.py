@@ -44,9 +44,13 @@ from django.contrib.auth.models import User, Group
 from django.db import models
 from django.db.models import Q, F, Max
 from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.core.exceptions import PermissionDenied
 
 from hs_core.models import BaseResource
+from hs_core.transaction_hooks import on_commit
+from hs_access_control import privilege_cache
 
 ######################################
 # Access control subsystem
@@ -93,6 +97,33 @@ class PrivilegeCodes(object):
     NAMES = ('Unspecified', 'Owner', 'Change', 'View', 'None')
 
 
+def invalidate_cached_privileges(user=None, group=None, resource=None):
+    """
+    Forget cached effective privileges affected by a change in privilege.
+
+    :param user: user whose privilege over resource or membership in group changed.
+    :param group: group whose privilege over resource or membership changed.
+    :param resource: resource over which privilege changed.
+
+    Any two of these identify the pairs (user, resource) whose effective privilege may have
+    changed: the user and the resource; every member of the group and the resource; or the
+    user and every resource held by the group.
+    """
+    if resource is not None and user is not None:
+        user_ids, resource_ids = [user.id], [resource.id]
+    elif resource is not None and group is not None:
+        user_ids = UserGroupPrivilege.objects.filter(group=group)\
+                                             .values_list('user_id', flat=True)
+        resource_ids = [resource.id]
+    elif user is not None and group is not None:
+        user_ids = [user.id]
+        resource_ids = GroupResourcePrivilege.objects.filter(group=group)\
+                                                     .values_list('resource_id', flat=True)
+    else:
+        raise PolymorphismError("Two of user, group and resource are required")
+    privilege_cache.invalidate(user_ids, resource_ids)
+
+
 class PrivilegeBase(models.Model):
     """
     Shared methods for Privilege handling
@@ -163,6 +194,9 @@ class PrivilegeBase(models.Model):
             cls.objects.filter(**kwargs) \
                .delete()
 
+        # concurrent requests may have cached the old privilege before this commits
+        on_commit(lambda: invalidate_cached_privileges(**kwargs), run_now=True)
+
     @classmethod
     def share(cls, **kwargs):
         """
@@ -2374,6 +2408,64 @@ class UserAccess(models.Model):
                 # nothing matches
                 return BaseResource.objects.none()
 
+    def get_effective_privileges(self, resources):
+        """
+        Compute effective privilege of user over many resources in a constant number of queries
+
+        :param resources: iterable of resources (or resource ids) to check.
+        :return: dict mapping resource id to integer privilege 1-4 (PrivilegeCodes)
+
+        This is the vectorized counterpart of ResourceAccess.get_effective_privilege and
+        applies the same rules:
+
+        * superusers hold OWNER privilege over every resource.
+        * privilege is the highest of user privilege and privilege via active groups.
+        * immutable resources reduce CHANGE to VIEW; OWNER is not affected.
+        * the public flag does not raise privilege; check it separately, as
+          can_view_resource does.
+
+        Resources over which the user holds no privilege map to PrivilegeCodes.NONE.
+        """
+        if not self.user.is_active:
+            raise PermissionDenied("Requesting user is not active")
+
+        resource_ids = [r.id if isinstance(r, BaseResource) else r for r in resources]
+        if self.user.is_superuser:
+            return dict.fromkeys(resource_ids, PrivilegeCodes.OWNER)
+
+        return privilege_cache.get_privileges(self.user.id, resource_ids,
+                                              self.__compute_effective_privileges)
+
+    def __compute_effective_privileges(self, resource_ids):
+        """ Compute effective privilege of user over many resources, bypassing the cache """
+        privileges = dict.fromkeys(resource_ids, PrivilegeCodes.NONE)
+        if not resource_ids:
+            return privileges
+
+        immutable = set(ResourceAccess.objects
+                        .filter(resource__in=resource_ids, immutable=True)
+                        .values_list('resource_id', flat=True))
+
+        user_privs = UserResourcePrivilege.objects\
+            .filter(resource__in=resource_ids, user=self.user)\
+            .values_list('resource_id', 'privilege')
+
+        # Group privileges must be aggregated
+        group_privs = GroupResourcePrivilege.objects\
+            .filter(resource__in=resource_ids,
+                    group__gaccess__active=True,
+                    group__g2ugp__user=self.user)\
+            .values('resource_id')\
+            .annotate(min_privilege=models.Min('privilege'))\
+            .values_list('resource_id', 'min_privilege')
+
+        for resource_id, privilege in list(user_privs) + list(group_privs):
+            if resource_id in immutable and privilege == PrivilegeCodes.CHANGE:
+                privilege = PrivilegeCodes.VIEW
+            privileges[resource_id] = min(privileges[resource_id], privilege)
+
+        return privileges
+
     #############################################
     # Check access permissions for self (user)
     #############################################
@@ -3973,6 +4065,14 @@ class ResourceAccess(models.Model):
         if not this_user.is_active:
             raise PermissionDenied("Grantee user is not active")
 
+        if this_user.is_superuser:
+            return PrivilegeCodes.OWNER
+
+        return privilege_cache.get_privilege(this_user.id, self.resource_id,
+                                             lambda: self.__compute_effective_privilege(this_user))
+
+    def __compute_effective_privilege(self, this_user):
+        """ Compute effective privilege of user over a resource, bypassing the cache """
         user_priv = self.get_effective_user_privilege(this_user)
         group_priv = self.get_effective_group_privilege(this_user)
         return min(user_priv, group_priv)
@@ -3988,3 +4088,28 @@ class ResourceAccess(models.Model):
             return "discoverable"
         else:
             return "private"
+
+
+@receiver(post_save, sender=ResourceAccess)
+def resource_access_flags_changed(sender, instance, created, **kwargs):
+    """ Forget cached privileges over a resource whose flags (e.g., immutable) changed """
+    if created:
+        return
+    user_ids = set(UserResourcePrivilege.objects.filter(resource_id=instance.resource_id)
+                   .values_list('user_id', flat=True))
+    user_ids.update(UserGroupPrivilege.objects
+                    .filter(group__g2grp__resource_id=instance.resource_id)
+                    .values_list('user_id', flat=True))
+    privilege_cache.invalidate(user_ids, [instance.resource_id])
+
+
+@receiver(post_save, sender=GroupAccess)
+def group_access_flags_changed(sender, instance, created, **kwargs):
+    """ Forget cached privileges conferred by a group that may have been (de)activated """
+    if created:
+        return
+    user_ids = UserGroupPrivilege.objects.filter(group_id=instance.group_id)\
+                                         .values_list('user_id', flat=True)
+    resource_ids = GroupResourcePrivilege.objects.filter(group_id=instance.group_id)\
+                                                 .values_list('resource_id', flat=True)
+    privilege_cache.invalidate(user_ids, resource_ids)
@@ -0,0 +1,204 @@
+"""
+Cache of the effective privilege of users over resources.
+
+Effective privilege (see ResourceAccess.get_effective_privilege) is looked up many times
+per page for the same (user, resource) pair, and each lookup costs several queries. This
+module caches it in two layers:
+
+* a request-scoped memo, a plain dict that lives while PrivilegeCacheMiddleware is
+  processing a request. Outside of a request (celery tasks, management commands, tests
+  without the middleware) the memo layer is inactive.
+* a shared layer in the Django cache named by settings.ACCESS_CONTROL_CACHE, e.g. 'shared'
+  (see hs_core.redis_cache). Entries expire after settings.ACCESS_CONTROL_CACHE_TIMEOUT
+  seconds (default 300). The cache must be shared by all processes, as invalidation only
+  reaches the cache of the process that changes privileges: with a per-process (locmem)
+  cache, other processes would grant revoked privileges until their entries expire. The
+  shared layer is off when ACCESS_CONTROL_CACHE is not set.
+
+Entries are invalidated precisely, by (user, resource) pair, by the privilege models when
+sharing changes and by receivers on ResourceAccess and GroupAccess when flags change; see
+hs_access_control.models. Superuser privilege is never cached as it costs no queries.
+
+Hit and miss counts are accumulated per process and added to shared counters every
+STATS_FLUSH_INTERVAL lookups, so that stats() reports the hit rate across all workers. Without
+the shared layer, stats() reports the counts of the current process.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'hs_access:privilege'
+STATS_KEYS = ('memo_hits', 'shared_hits', 'misses')
+STATS_FLUSH_INTERVAL = 100
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_pending_stats = dict.fromkeys(STATS_KEYS, 0)
+
+
+def _shared_cache():
+    """ Return the shared cache, or None if the shared layer is off """
+    alias = getattr(settings, 'ACCESS_CONTROL_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def _timeout():
+    return getattr(settings, 'ACCESS_CONTROL_CACHE_TIMEOUT', 300)
+
+
+def _key(user_id, resource_id):
+    return '{}:{}:{}'.format(KEY_PREFIX, user_id, resource_id)
+
+
+def _stats_key(name):
+    return '{}:stats:{}'.format(KEY_PREFIX, name)
+
+
+def _memo():
+    return getattr(_local, 'memo', None)
+
+
+def begin_request():
+    """ Activate the request-scoped memo for the current thread """
+    _local.memo = {}
+
+
+def end_request():
+    """ Discard the request-scoped memo of the current thread """
+    _local.memo = None
+
+
+def _count(name, n=1):
+    with _stats_lock:
+        _pending_stats[name] += n
+        if sum(_pending_stats.values()) < STATS_FLUSH_INTERVAL or _shared_cache() is None:
+            return
+        pending = dict(_pending_stats)
+        for k in STATS_KEYS:
+            _pending_stats[k] = 0
+    _flush_stats(pending)
+
+
+def _flush_stats(pending):
+    cache = _shared_cache()
+    for name, n in pending.items():
+        if n:
+            key = _stats_key(name)
+            cache.add(key, 0, None)
+            try:
+                cache.incr(key, n)
+            except ValueError:  # evicted between add and incr
+                cache.set(key, n, None)
+
+
+def stats():
+    """
+    Return the hit and miss counts of all processes, and the overall hit rate.
+
+    Counts of the current process that have not been flushed yet are included.
+    """
+    with _stats_lock:
+        pending = dict(_pending_stats)
+    cache = _shared_cache()
+    shared = cache.get_many([_stats_key(name) for name in STATS_KEYS]) if cache else {}
+    counts = {name: shared.get(_stats_key(name), 0) + pending[name] for name in STATS_KEYS}
+    lookups = sum(counts.values())
+    hits = counts['memo_hits'] + counts['shared_hits']
+    counts['hit_rate'] = float(hits) / lookups if lookups else None
+    return counts
+
+
+def reset_stats():
+    """ Reset the hit and miss counts of all processes """
+    with _stats_lock:
+        for k in STATS_KEYS:
+            _pending_stats[k] = 0
+    cache = _shared_cache()
+    if cache is not None:
+        cache.delete_many([_stats_key(name) for name in STATS_KEYS])
+
+
+def get_privilege(user_id, resource_id, compute):
+    """
+    Return the cached effective privilege of a user over a resource.
+
+    :param compute: callable returning the privilege, called on a miss.
+    """
+    memo = _memo()
+    if memo is not None and (user_id, resource_id) in memo:
+        _count('memo_hits')
+        return memo[(user_id, resource_id)]
+
+    cache = _shared_cache()
+    privilege = cache.get(_key(user_id, resource_id)) if cache is not None else None
+    if privilege is None:
+        _count('misses')
+        privilege = compute()
+        if cache is not None:
+            cache.set(_key(user_id, resource_id), privilege, _timeout())
+    else:
+        _count('shared_hits')
+
+    if memo is not None:
+        memo[(user_id, resource_id)] = privilege
+    return privilege
+
+
+def get_privileges(user_id, resource_ids, compute):
+    """
+    Return the cached effective privileges of a user over many resources.
+
+    :param compute: callable taking the list of resource ids that missed the cache and
+      returning a dict mapping them to privilege.
+    :return: dict mapping resource id to privilege
+    """
+    memo = _memo()
+    privileges = {}
+    missing = []
+    for resource_id in resource_ids:
+        if memo is not None and (user_id, resource_id) in memo:
+            privileges[resource_id] = memo[(user_id, resource_id)]
+        else:
+            missing.append(resource_id)
+    _count('memo_hits', len(privileges))
+
+    if missing:
+        cache = _shared_cache()
+        cached = cache.get_many([_key(user_id, r) for r in missing]) if cache is not None else {}
+        uncached = []
+        for resource_id in missing:
+            key = _key(user_id, resource_id)
+            if key in cached:
+                privileges[resource_id] = cached[key]
+            else:
+                uncached.append(resource_id)
+        _count('shared_hits', len(missing) - len(uncached))
+
+        if uncached:
+            _count('misses', len(uncached))
+            computed = compute(uncached)
+            if cache is not None:
+                cache.set_many({_key(user_id, r): p for r, p in computed.items()}, _timeout())
+            privileges.update(computed)
+
+        if memo is not None:
+            for resource_id in missing:
+                memo[(user_id, resource_id)] = privileges[resource_id]
+
+    return privileges
+
+
+def invalidate(user_ids, resource_ids):
+    """ Forget the cached privilege of every pair in user_ids x resource_ids """
+    pairs = [(u, r) for u in set(user_ids) for r in set(resource_ids)]
+    if not pairs:
+        return
+    memo = _memo()
+    if memo is not None:
+        for pair in pairs:
+            memo.pop(pair, None)
+    cache = _shared_cache()
+    if cache is not None:
+        cache.delete_many([_key(u, r) for u, r in pairs])
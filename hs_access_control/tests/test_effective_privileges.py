@@ -0,0 +1,142 @@
+from django.test import TestCase
+from django.contrib.auth.models import Group
+
+from hs_access_control.models import PrivilegeCodes
+
+from hs_core import hydroshare
+from hs_core.testing import MockIRODSTestCaseMixin
+
+from hs_access_control.tests.utilities import global_reset
+
+
+class T16EffectivePrivileges(MockIRODSTestCaseMixin, TestCase):
+
+    def setUp(self):
+        super(T16EffectivePrivileges, self).setUp()
+        global_reset()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        self.admin = hydroshare.create_account(
+            'admin@gmail.com',
+            username='admin',
+            first_name='administrator',
+            last_name='couch',
+            superuser=True,
+            groups=[]
+        )
+
+        self.cat = hydroshare.create_account(
+            'cat@gmail.com',
+            username='cat',
+            first_name='not a dog',
+            last_name='last_name_cat',
+            superuser=False,
+            groups=[]
+        )
+
+        self.dog = hydroshare.create_account(
+            'dog@gmail.com',
+            username='dog',
+            first_name='a little arfer',
+            last_name='last_name_dog',
+            superuser=False,
+            groups=[]
+        )
+
+        self.bones = hydroshare.create_resource(
+            resource_type='GenericResource',
+            owner=self.dog,
+            title='all about dog bones',
+            metadata=[],
+        )
+
+        self.chewies = hydroshare.create_resource(
+            resource_type='GenericResource',
+            owner=self.dog,
+            title='all about dog chewies',
+            metadata=[],
+        )
+
+        self.squirrels = hydroshare.create_resource(
+            resource_type='GenericResource',
+            owner=self.dog,
+            title='all about chasing squirrels',
+            metadata=[],
+        )
+
+        self.felines = self.dog.uaccess.create_group(
+            title='felines', description="We are the felines")
+
+    def assertPrivilegesMatch(self, user, resources):
+        """ the bulk privileges agree with the per-resource privilege """
+        privileges = user.uaccess.get_effective_privileges(resources)
+        self.assertEqual(set(privileges.keys()), set(r.id for r in resources))
+        for r in resources:
+            self.assertEqual(privileges[r.id], r.raccess.get_effective_privilege(user))
+
+    def test_01_user_privilege(self):
+        dog = self.dog
+        cat = self.cat
+        resources = [self.bones, self.chewies, self.squirrels]
+        dog.uaccess.share_resource_with_user(self.bones, cat, PrivilegeCodes.CHANGE)
+        dog.uaccess.share_resource_with_user(self.chewies, cat, PrivilegeCodes.VIEW)
+
+        privileges = cat.uaccess.get_effective_privileges(resources)
+        self.assertEqual(privileges[self.bones.id], PrivilegeCodes.CHANGE)
+        self.assertEqual(privileges[self.chewies.id], PrivilegeCodes.VIEW)
+        self.assertEqual(privileges[self.squirrels.id], PrivilegeCodes.NONE)
+        self.assertPrivilegesMatch(cat, resources)
+        self.assertPrivilegesMatch(dog, resources)
+
+    def test_02_group_privilege(self):
+        dog = self.dog
+        cat = self.cat
+        resources = [self.bones, self.chewies, self.squirrels]
+        dog.uaccess.share_group_with_user(self.felines, cat, PrivilegeCodes.VIEW)
+        dog.uaccess.share_resource_with_group(self.bones, self.felines, PrivilegeCodes.CHANGE)
+        dog.uaccess.share_resource_with_user(self.bones, cat, PrivilegeCodes.VIEW)
+        dog.uaccess.share_resource_with_group(self.chewies, self.felines, PrivilegeCodes.VIEW)
+
+        privileges = cat.uaccess.get_effective_privileges(resources)
+        # the higher of user and group privilege wins
+        self.assertEqual(privileges[self.bones.id], PrivilegeCodes.CHANGE)
+        self.assertEqual(privileges[self.chewies.id], PrivilegeCodes.VIEW)
+        self.assertPrivilegesMatch(cat, resources)
+
+        # inactive groups confer no privilege
+        self.felines.gaccess.active = False
+        self.felines.gaccess.save()
+        privileges = cat.uaccess.get_effective_privileges(resources)
+        self.assertEqual(privileges[self.bones.id], PrivilegeCodes.VIEW)
+        self.assertEqual(privileges[self.chewies.id], PrivilegeCodes.NONE)
+        self.assertPrivilegesMatch(cat, resources)
+
+    def test_03_flags(self):
+        dog = self.dog
+        cat = self.cat
+        resources = [self.bones, self.chewies, self.squirrels]
+        dog.uaccess.share_resource_with_user(self.bones, cat, PrivilegeCodes.CHANGE)
+        self.bones.raccess.immutable = True
+        self.bones.raccess.save()
+        self.chewies.raccess.public = True
+        self.chewies.raccess.save()
+
+        privileges = cat.uaccess.get_effective_privileges(resources)
+        # immutable reduces CHANGE to VIEW but not OWNER
+        self.assertEqual(privileges[self.bones.id], PrivilegeCodes.VIEW)
+        self.assertEqual(dog.uaccess.get_effective_privileges(resources)[self.bones.id],
+                         PrivilegeCodes.OWNER)
+        # public does not raise privilege
+        self.assertEqual(privileges[self.chewies.id], PrivilegeCodes.NONE)
+        self.assertPrivilegesMatch(cat, resources)
+        self.assertPrivilegesMatch(dog, resources)
+
+    def test_04_superuser(self):
+        resources = [self.bones, self.chewies, self.squirrels]
+        privileges = self.admin.uaccess.get_effective_privileges(resources)
+        self.assertEqual(set(privileges.values()), set([PrivilegeCodes.OWNER]))
+        self.assertPrivilegesMatch(self.admin, resources)
+
+    def test_05_constant_queries(self):
+        resources = [self.bones, self.chewies, self.squirrels]
+        with self.assertNumQueries(3):
+            self.cat.uaccess.get_effective_privileges(resources)
@@ -0,0 +1,109 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+from hs_access_control import privilege_cache
+from hs_access_control.models import PrivilegeCodes
+
+from hs_core import hydroshare
+from hs_core.testing import MockIRODSTestCaseMixin
+
+from hs_access_control.tests.utilities import global_reset
+
+
+@override_settings(ACCESS_CONTROL_CACHE='default')
+class T17PrivilegeCache(MockIRODSTestCaseMixin, TestCase):
+
+    def setUp(self):
+        super(T17PrivilegeCache, self).setUp()
+        global_reset()
+        cache.clear()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+
+        self.cat = hydroshare.create_account(
+            'cat@gmail.com',
+            username='cat',
+            first_name='not a dog',
+            last_name='last_name_cat',
+            superuser=False,
+            groups=[]
+        )
+
+        self.dog = hydroshare.create_account(
+            'dog@gmail.com',
+            username='dog',
+            first_name='a little arfer',
+            last_name='last_name_dog',
+            superuser=False,
+            groups=[]
+        )
+
+        self.bones = hydroshare.create_resource(
+            resource_type='GenericResource',
+            owner=self.dog,
+            title='all about dog bones',
+            metadata=[],
+        )
+
+        self.felines = self.dog.uaccess.create_group(
+            title='felines', description="We are the felines")
+
+    def tearDown(self):
+        privilege_cache.end_request()
+        super(T17PrivilegeCache, self).tearDown()
+
+    def test_01_cached_lookup(self):
+        raccess = self.bones.raccess
+        self.assertEqual(raccess.get_effective_privilege(self.dog), PrivilegeCodes.OWNER)
+        with self.assertNumQueries(0):
+            self.assertEqual(raccess.get_effective_privilege(self.dog), PrivilegeCodes.OWNER)
+
+    def test_02_request_memo(self):
+        privilege_cache.begin_request()
+        privilege_cache.reset_stats()
+        raccess = self.bones.raccess
+        raccess.get_effective_privilege(self.dog)
+        raccess.get_effective_privilege(self.dog)
+        raccess.get_effective_privilege(self.dog)
+        stats = privilege_cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['memo_hits'], 2)
+        self.assertEqual(stats['shared_hits'], 0)
+
+    def test_03_user_share_invalidates(self):
+        dog = self.dog
+        cat = self.cat
+        raccess = self.bones.raccess
+        self.assertEqual(raccess.get_effective_privilege(cat), PrivilegeCodes.NONE)
+        dog.uaccess.share_resource_with_user(self.bones, cat, PrivilegeCodes.CHANGE)
+        self.assertEqual(raccess.get_effective_privilege(cat), PrivilegeCodes.CHANGE)
+        dog.uaccess.unshare_resource_with_user(self.bones, cat)
+        self.assertEqual(raccess.get_effective_privilege(cat), PrivilegeCodes.NONE)
+
+    def test_04_group_share_invalidates(self):
+        dog = self.dog
+        cat = self.cat
+        raccess = self.bones.raccess
+        self.assertEqual(raccess.get_effective_privilege(cat), PrivilegeCodes.NONE)
+        dog.uaccess.share_resource_with_group(self.bones, self.felines, PrivilegeCodes.VIEW)
+        # cat is not yet a member
+        self.assertEqual(raccess.get_effective_privilege(cat), PrivilegeCodes.NONE)
+        dog.uaccess.share_group_with_user(self.felines, cat, PrivilegeCodes.VIEW)
+        self.assertEqual(raccess.get_effective_privilege(cat), PrivilegeCodes.VIEW)
+        dog.uaccess.unshare_resource_with_group(self.bones, self.felines)
+        self.assertEqual(raccess.get_effective_privilege(cat), PrivilegeCodes.NONE)
+
+    def test_05_flags_invalidate(self):
+        dog = self.dog
+        cat = self.cat
+        dog.uaccess.share_resource_with_user(self.bones, cat, PrivilegeCodes.CHANGE)
+        self.assertEqual(self.bones.raccess.get_effective_privilege(cat), PrivilegeCodes.CHANGE)
+        self.bones.raccess.immutable = True
+        self.bones.raccess.save()
+        self.assertEqual(self.bones.raccess.get_effective_privilege(cat), PrivilegeCodes.VIEW)
+
+    def test_06_shared_layer_off_without_shared_cache(self):
+        raccess = self.bones.raccess
+        with self.settings(ACCESS_CONTROL_CACHE=None):
+            self.assertEqual(raccess.get_effective_privilege(self.dog), PrivilegeCodes.OWNER)
+            self.assertEqual(cache.get(privilege_cache._key(self.dog.id, self.bones.id)), None)
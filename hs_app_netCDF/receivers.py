@@ -3,8 +3,6 @@ import os
 import shutil
 import logging
 
-import netCDF4
-
 from django.dispatch import receiver
 from django.core.files.uploadedfile import UploadedFile
 
@@ -16,8 +14,7 @@ from hs_core.hydroshare import utils
 
 from hs_app_netCDF.forms import VariableValidationForm, OriginalCoverageForm, VariableForm
 from hs_app_netCDF.models import NetcdfResource
-import hs_file_types.nc_functions.nc_utils as nc_utils
-import hs_file_types.nc_functions.nc_meta as nc_meta
+import hs_file_types.nc_functions.nc_extract as nc_extract
 from hs_file_types.models.netcdf import create_header_info_txt_file, add_metadata_to_list
 
 
@@ -30,12 +27,13 @@ def netcdf_post_create_resource(sender, **kwargs):
 
     if res_file:
         temp_file = utils.get_file_from_irods(res_file)
-        nc_dataset = nc_utils.get_nc_dataset(temp_file)
+        nc_extraction = nc_extract.extract_nc_file(temp_file)
         nc_file_name = res_file.file_name
 
-        if isinstance(nc_dataset, netCDF4.Dataset):
-            # Extract the metadata from netcdf file
-            res_dublin_core_meta, res_type_specific_meta = nc_meta.get_nc_meta_dict(temp_file)
+        if nc_extraction is not None:
+            # the metadata extracted from netcdf file
+            res_dublin_core_meta = nc_extraction['dublin_core_meta']
+            res_type_specific_meta = nc_extraction['type_specific_meta']
             # populate metadata list with extracted metadata
             metadata = []
             add_metadata_to_list(metadata, res_dublin_core_meta, res_type_specific_meta)
@@ -57,7 +55,8 @@ def netcdf_post_create_resource(sender, **kwargs):
                     resource.metadata.create_element(k, **v)
 
             # create the ncdump text file
-            dump_file = create_header_info_txt_file(temp_file, nc_file_name)
+            dump_file = create_header_info_txt_file(temp_file, nc_file_name,
+                                                    nc_extraction['header'])
             dump_file_name = nc_file_name + '_header_info.txt'
             uploaded_file = UploadedFile(file=open(dump_file), name=dump_file_name)
             utils.add_file_to_resource(resource, uploaded_file)
@@ -154,8 +153,8 @@ def netcdf_pre_add_files_to_resource(sender, **kwargs):
 
     if file_selected and in_file_name:
         # file type validation and existing metadata update and create new ncdump text file
-        nc_dataset = nc_utils.get_nc_dataset(in_file_name)
-        if isinstance(nc_dataset, netCDF4.Dataset):
+        nc_extraction = nc_extract.extract_nc_file(in_file_name)
+        if nc_extraction is not None:
             # delete all existing resource files and metadata related
             for f in ResourceFile.objects.filter(object_id=nc_res.id):
                 delete_resource_file_only(nc_res, f)
@@ -164,8 +163,9 @@ def netcdf_pre_add_files_to_resource(sender, **kwargs):
             user = kwargs['user']
             utils.resource_modified(nc_res, user, overwrite_bag=False)
 
-            # extract metadata
-            res_dublin_core_meta, res_type_specific_meta = nc_meta.get_nc_meta_dict(in_file_name)
+            # extracted metadata
+            res_dublin_core_meta = nc_extraction['dublin_core_meta']
+            res_type_specific_meta = nc_extraction['type_specific_meta']
 
             # update title info
             if res_dublin_core_meta.get('title'):
@@ -274,7 +274,8 @@ def netcdf_pre_add_files_to_resource(sender, **kwargs):
                                                    value=res_dublin_core_meta['original-box'])
 
             # create the ncdump text file
-            dump_file = create_header_info_txt_file(in_file_name, nc_file_name)
+            dump_file = create_header_info_txt_file(in_file_name, nc_file_name,
+                                                    nc_extraction['header'])
             dump_file_name = nc_file_name + '_header_info.txt'
             uploaded_file = UploadedFile(file=open(dump_file), name=dump_file_name)
             files.append(uploaded_file)
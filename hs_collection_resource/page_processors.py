@@ -23,7 +23,7 @@ def landing_page(request, page):
     # 2) OR, current user is a owner of it
     user_all_collectable_resource_list = []
     for res in user_all_accessible_resource_list:
-        if res.raccess.shareable or res.raccess.owners.filter(pk=user.pk).exists():
+        if res.raccess.shareable or res.owned:
             user_all_collectable_resource_list.append(res)
 
     # current contained resources list
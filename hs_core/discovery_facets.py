@@ -0,0 +1,111 @@
+"""
+Facet counts of the discovery page, cached in redis and shared by all users.
+
+Counts are cached per search state: the query text, the map, date and coverage type filters,
+and the selected facets, normalized so that equivalent requests share an entry. Sorting and
+paging don't change the counts, so they are not part of the state. Entries are also keyed by
+the index generation, which HydroRealtimeSignalProcessor and the Solr index queue increment
+whenever they change the index, so counts are never served from a previous index.
+
+The counts for the empty search, which most visitors of the discovery page see, are
+precomputed periodically by the update_discovery_facets task; they are served until the
+counts of the current generation are cached.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from haystack.query import SearchQuerySet
+
+from hs_core.hydro_realtime_signal_processor import get_index_generation
+
+FACET_FIELDS = ['creators', 'subjects', 'resource_type', 'public', 'owners_names',
+                'discoverable', 'published', 'variable_names', 'sample_mediums', 'units_names']
+
+# redis keys in settings.SOLR_INDEX_QUEUE_DB
+FACETS_KEY = 'discovery_facets:{generation}:{state}'
+EMPTY_SEARCH_FACETS_KEY = 'discovery_facets:empty_search'
+
+COORDINATE_FIELDS = ('NElat', 'NElng', 'SWlat', 'SWlng')
+DATE_FIELDS = ('start_date', 'end_date')
+
+
+def faceted_queryset():
+    """ Return a SearchQuerySet of all documents that counts FACET_FIELDS """
+    sqs = SearchQuerySet().all()
+    for field in FACET_FIELDS:
+        sqs = sqs.facet(field)
+    return sqs
+
+
+def normalize_search_state(cleaned_data, selected_facets):
+    """
+    Return the parameters of a valid DiscoveryForm that change the facet counts, as a dict in
+    which equivalent searches are equal.
+    """
+    state = {'q': (cleaned_data.get('q') or '').strip(),
+             'coverage_type': (cleaned_data.get('coverage_type') or '').strip(),
+             # the order of the selected facets doesn't matter
+             'selected_facets': sorted(set(facet for facet in selected_facets if ':' in facet))}
+    for name in COORDINATE_FIELDS:
+        value = (cleaned_data.get(name) or '').strip()
+        try:
+            # DiscoveryForm.search compares them as floats
+            value = repr(float(value)) if value else ''
+        except ValueError:
+            pass
+        state[name] = value
+    for name in DATE_FIELDS:
+        value = cleaned_data.get(name)
+        state[name] = value.isoformat() if value else ''
+    return state
+
+
+def is_empty_search(state):
+    """ Return True if a normalized search state has no query and no filter """
+    return not any(state.values())
+
+
+def search_state_digest(state):
+    return hashlib.sha1(json.dumps(state, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def cache_timeout():
+    return getattr(settings, 'DISCOVERY_FACETS_CACHE_TIMEOUT', 60 * 60)
+
+
+def get_facet_counts(queryset, state):
+    """
+    Return the facet counts of queryset, the search for the normalized search state, from the
+    cache if they are cached for the current index generation.
+    """
+    db = settings.SOLR_INDEX_QUEUE_DB
+    key = FACETS_KEY.format(generation=get_index_generation(),
+                            state=search_state_digest(state))
+    cached = db.get(key)
+    if cached is None and is_empty_search(state):
+        cached = db.get(EMPTY_SEARCH_FACETS_KEY)
+    if cached is not None:
+        return json.loads(cached)
+
+    facets = queryset.facet_counts()
+    db.set(key, json.dumps(facets), ex=cache_timeout())
+    return facets
+
+
+def update_empty_search_facets():
+    """ Compute the facet counts of the empty search and cache them for all users """
+    from hs_core.discovery_form import DiscoveryForm
+
+    generation = get_index_generation()
+    form = DiscoveryForm({}, searchqueryset=faceted_queryset())
+    form.is_valid()
+    state = normalize_search_state(form.cleaned_data, form.selected_facets)
+    facets = json.dumps(form.search().facet_counts())
+
+    db = settings.SOLR_INDEX_QUEUE_DB
+    db.set(FACETS_KEY.format(generation=generation, state=search_state_digest(state)),
+           facets, ex=cache_timeout())
+    # served after the index changes, until the next update
+    db.set(EMPTY_SEARCH_FACETS_KEY, facets)
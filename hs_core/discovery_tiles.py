@@ -0,0 +1,153 @@
+"""
+Map tiles of the discovery search results.
+
+A tile is a square of the web mercator map at a zoom level, numbered x/y as in web maps.
+The resources with a point coverage are counted per cell of a grid of
+2 ** TILE_GRID_LEVELS x 2 ** TILE_GRID_LEVELS cells over the tile, with one Solr facet query
+on the coverage_cells field of the index, which holds the quadkeys of the cells containing the
+point at every level (see point_cells). A tile with TILE_POINT_LIMIT points or fewer lists
+them instead. The resources with a box coverage that intersects the tile are counted.
+
+Tiles are cached per index generation and search state, as facet counts are (see
+hs_core.discovery_facets).
+"""
+
+import json
+import math
+
+from django.conf import settings
+
+from hs_core.discovery_facets import cache_timeout, search_state_digest
+from hs_core.hydro_realtime_signal_processor import get_index_generation
+
+MAX_CELL_LEVEL = 20
+TILE_GRID_LEVELS = 3
+TILE_POINT_LIMIT = 50
+MAX_LATITUDE = 85.0511287798
+
+# redis key in settings.SOLR_INDEX_QUEUE_DB
+TILE_KEY = 'discovery_tiles:{generation}:{state}:{z}/{x}/{y}'
+
+
+def point_tile(lon, lat, level):
+    """ Return the x and y of the tile at a zoom level that contains a point """
+    n = 1 << level
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    sin_lat = math.sin(math.radians(lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def quadkey(x, y, level):
+    """ Return the quadkey of a tile, whose prefixes are the quadkeys of the enclosing tiles """
+    digits = []
+    for i in range(level, 0, -1):
+        mask = 1 << (i - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return ''.join(digits)
+
+
+def quadkey_tile(key):
+    """ Return the zoom level, x and y of the tile with a quadkey """
+    x = y = 0
+    for digit in key:
+        x = x << 1 | int(digit) & 1
+        y = y << 1 | int(digit) >> 1
+    return len(key), x, y
+
+
+def tile_bounds(level, x, y):
+    """ Return the west, south, east and north limits of a tile in degrees """
+    n = float(1 << level)
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return [x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y)]
+
+
+def point_cells(lon, lat):
+    """ Return the coverage_cells values of a point: 'level:quadkey' for every level """
+    key = quadkey(*point_tile(lon, lat, MAX_CELL_LEVEL), level=MAX_CELL_LEVEL)
+    return ['{}:{}'.format(level, key[:level]) for level in range(MAX_CELL_LEVEL + 1)]
+
+
+def search_result_json(solr):
+    """ Return the map information of a search result from its stored fields """
+    json_obj = {'short_id': solr['short_id'],
+                'title': solr['title'],
+                'resource_type': solr['resource_type'],
+                'get_absolute_url': solr['absolute_url'],
+                'first_author': solr['author']}
+    # TODO: this is redundant. The value always exists but oft has value 'none'.
+    if solr['author_description']:
+        json_obj['first_author_description'] = solr['author_description']
+
+    for coverage in solr['coverages'] or []:
+        json_coverage = json.loads(coverage)
+        if 'east' in json_coverage:
+            json_obj['coverage_type'] = 'point'
+            json_obj['east'] = json_coverage['east']
+            json_obj['north'] = json_coverage['north']
+        elif 'northlimit' in json_coverage:
+            json_obj['coverage_type'] = 'box'
+            json_obj['northlimit'] = json_coverage['northlimit']
+            json_obj['eastlimit'] = json_coverage['eastlimit']
+            json_obj['southlimit'] = json_coverage['southlimit']
+            json_obj['westlimit'] = json_coverage['westlimit']
+    return json_obj
+
+
+def compute_tile(sqs, z, x, y):
+    """
+    Return the clustered points and the box count of a tile for the search sqs.
+
+    :return: a dict with the tile bounds, the numbers of points and boxes in the tile, and
+    either the resources with the points or the clusters of points, with their counts,
+    centers and bounds
+    """
+    west, south, east, north = bounds = tile_bounds(z, x, y)
+    tile_key = quadkey(x, y, z)
+    points = sqs.narrow(u'coverage_cells_exact:"{}:{}"'.format(z, tile_key))
+    cell_prefix = '{}:{}'.format(min(z + TILE_GRID_LEVELS, MAX_CELL_LEVEL), tile_key)
+    cells = points.facet('coverage_cells', prefix=cell_prefix, limit=-1, mincount=1) \
+        .facet_counts().get('fields', {}).get('coverage_cells', [])
+    boxes = sqs.narrow(u'coverage_northlimit:[{} TO *] AND coverage_southlimit:[* TO {}] AND '
+                       u'coverage_eastlimit:[{} TO *] AND coverage_westlimit:[* TO {}]'
+                       .format(south, north, west, east))
+
+    tile = {'tile': [z, x, y],
+            'bounds': bounds,
+            'points': sum(count for _, count in cells),
+            'boxes': boxes.count(),
+            'clusters': [],
+            'resources': []}
+    if tile['points'] <= TILE_POINT_LIMIT:
+        tile['resources'] = [search_result_json(result.get_stored_fields())
+                             for result in points[:TILE_POINT_LIMIT]]
+    else:
+        for cell, count in cells:
+            cell_bounds = tile_bounds(*quadkey_tile(cell.split(':', 1)[1]))
+            tile['clusters'].append({'count': count,
+                                     'east': (cell_bounds[0] + cell_bounds[2]) / 2,
+                                     'north': (cell_bounds[1] + cell_bounds[3]) / 2,
+                                     'bounds': cell_bounds})
+    return tile
+
+
+def get_tile(sqs, state, z, x, y):
+    """
+    Return the JSON of a tile for the search sqs with the normalized search state, from the
+    cache if it is cached for the current index generation.
+    """
+    db = settings.SOLR_INDEX_QUEUE_DB
+    key = TILE_KEY.format(generation=get_index_generation(), state=search_state_digest(state),
+                          z=z, x=x, y=y)
+    cached = db.get(key)
+    if cached is not None:
+        return cached
+
+    tile = json.dumps(compute_tile(sqs, z, x, y))
+    db.set(key, tile, ex=cache_timeout())
+    return tile
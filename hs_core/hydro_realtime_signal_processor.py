@@ -1,13 +1,38 @@
+from django.conf import settings
 from django.db import models
+from haystack import connections, connection_router
 from haystack.signals import RealtimeSignalProcessor
 from haystack.exceptions import NotHandled
 import logging
+import time
 import types
 from haystack.query import SearchQuerySet
 from haystack.utils import get_identifier
 
+from hs_core.signals import solr_index_queue_flushed
+from hs_core.transaction_hooks import on_commit
+
 logger = logging.getLogger(__name__)
 
+# redis keys in settings.SOLR_INDEX_QUEUE_DB: the set of ids of the resources to index, a
+# flag set while a flush of that set is scheduled, and a counter of the changes to the index
+INDEX_QUEUE_KEY = 'solr_index:queue'
+INDEX_FLUSH_PENDING_KEY = 'solr_index:flush_pending'
+INDEX_GENERATION_KEY = 'solr_index:generation'
+
+
+def get_index_generation():
+    """ Return the number of times the Solr index has changed, as counted by this module """
+    return int(settings.SOLR_INDEX_QUEUE_DB.get(INDEX_GENERATION_KEY) or 0)
+
+
+def bump_index_generation():
+    """
+    Count a change to the Solr index, which invalidates what was cached from it (see
+    hs_core.discovery_facets).
+    """
+    settings.SOLR_INDEX_QUEUE_DB.incr(INDEX_GENERATION_KEY)
+
 
 class HydroRealtimeSignalProcessor(RealtimeSignalProcessor):
 
@@ -50,6 +75,7 @@ class HydroRealtimeSignalProcessor(RealtimeSignalProcessor):
                             index.remove_object(newinstance, using=using)
                         except NotHandled:
                             logger.exception("Failure: delete of %s with short_id %s failed.", str(type(instance)), newinstance.short_id)
+                bump_index_generation()
 
         elif isinstance(instance, ResourceAccess):
             # automatically a BaseResource; just call the routine on it. 
@@ -82,3 +108,118 @@ class HydroRealtimeSignalProcessor(RealtimeSignalProcessor):
                     index.remove_object(newinstance, using=using)
                 except NotHandled:
                     logger.exception("Failure: delete of %s with short_id %s failed.", str(type(instance)), newinstance.short_id)
+            bump_index_generation()
+
+
+def queue_resource_for_indexing(resource_id):
+    """
+    Add a resource to the queue of resources to index in Solr, and schedule a flush of the
+    queue in SOLR_INDEX_MAX_LATENCY seconds unless one is scheduled already.
+
+    The queue is a set, so a resource saved several times before the flush is indexed once.
+    """
+    from hs_core.tasks import flush_solr_index_queue
+
+    db = settings.SOLR_INDEX_QUEUE_DB
+    latency = getattr(settings, 'SOLR_INDEX_MAX_LATENCY', 10)
+    db.sadd(INDEX_QUEUE_KEY, resource_id)
+    # the flag expires in case the flush task is lost
+    if db.set(INDEX_FLUSH_PENDING_KEY, 1, nx=True, ex=latency + 60):
+        flush_solr_index_queue.apply_async(countdown=latency)
+
+
+def index_resources(resource_ids):
+    """
+    Update the Solr index for a batch of resources, with one update for the public and
+    discoverable ones, and a removal for the others and the ones that no longer exist.
+
+    :return: the numbers of resources indexed and removed
+    """
+    from hs_core.models import BaseResource
+    from hs_core.search_indexes import ResourceIndexQuerySet
+
+    # fetched with their metadata prefetched, as in BaseResourceIndex.index_queryset
+    found = ResourceIndexQuerySet(model=BaseResource).filter(pk__in=resource_ids) \
+        .select_related('raccess')
+    indexed = [r for r in found if r.raccess.public or r.raccess.discoverable]
+    indexed_ids = set(r.pk for r in indexed)
+    removed_ids = [pk for pk in resource_ids if pk not in indexed_ids]
+    model_id = '{}.{}'.format(BaseResource._meta.app_label, BaseResource._meta.model_name)
+
+    for using in connection_router.for_write():
+        index = connections[using].get_unified_index().get_index(BaseResource)
+        backend = connections[using].get_backend()
+        if indexed:
+            backend.update(index, indexed)
+        for pk in removed_ids:
+            backend.remove('{}.{}'.format(model_id, pk), commit=False)
+        if removed_ids:
+            backend.conn.commit()
+    bump_index_generation()
+    return len(indexed), len(removed_ids)
+
+
+def flush_index_queue():
+    """
+    Index the resources in the queue, SOLR_INDEX_BATCH_SIZE at a time, and send the
+    solr_index_queue_flushed signal with the queue depth and the time taken.
+
+    If indexing fails, the resources not indexed yet are queued again.
+    """
+    db = settings.SOLR_INDEX_QUEUE_DB
+    batch_size = getattr(settings, 'SOLR_INDEX_BATCH_SIZE', 100)
+
+    # saves from now on schedule another flush
+    db.delete(INDEX_FLUSH_PENDING_KEY)
+    start = time.time()
+    pipe = db.pipeline()
+    pipe.smembers(INDEX_QUEUE_KEY)
+    pipe.delete(INDEX_QUEUE_KEY)
+    resource_ids = sorted(int(pk) for pk in pipe.execute()[0])
+
+    indexed = removed = 0
+    for offset in range(0, len(resource_ids), batch_size):
+        batch = resource_ids[offset:offset + batch_size]
+        try:
+            batch_indexed, batch_removed = index_resources(batch)
+        except Exception:
+            logger.exception("Failure: %d resources not updated in Solr index; queued again.",
+                             len(resource_ids) - offset)
+            for pk in resource_ids[offset:]:
+                queue_resource_for_indexing(pk)
+            break
+        indexed += batch_indexed
+        removed += batch_removed
+
+    flush_time = time.time() - start
+    logger.info("Solr index queue flushed: %d queued, %d indexed, %d removed in %.2fs",
+                len(resource_ids), indexed, removed, flush_time)
+    solr_index_queue_flushed.send(sender=HydroQueuedSignalProcessor,
+                                  queue_depth=len(resource_ids), indexed=indexed,
+                                  removed=removed, flush_time=flush_time)
+
+
+class HydroQueuedSignalProcessor(HydroRealtimeSignalProcessor):
+
+    """
+    Index resources in Solr from a Celery task rather than in the request that saves them.
+
+    Saves of a BaseResource or its ResourceAccess only queue the resource (once the
+    transaction commits); flush_solr_index_queue then indexes the queued resources in
+    batches, within SOLR_INDEX_MAX_LATENCY seconds. Deletes are still handled synchronously
+    by HydroRealtimeSignalProcessor, while the resource can still be unindexed.
+    """
+
+    def handle_save(self, sender, instance, **kwargs):
+        from hs_core.models import BaseResource
+        from hs_access_control.models import ResourceAccess
+
+        if isinstance(instance, BaseResource):
+            resource_id = instance.pk
+        elif isinstance(instance, ResourceAccess):
+            resource_id = instance.resource_id
+        else:
+            return
+
+        on_commit(lambda: queue_resource_for_indexing(resource_id))
+
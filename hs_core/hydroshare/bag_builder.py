@@ -0,0 +1,378 @@
+"""
+Build resource bags in Python, as an alternative to the iRODS bagit rule and ibun.
+
+The bagit rule computes the MD5 of every file one after the other on the iRODS server, and
+ibun then reads every file again to zip the bag, without any progress reported. Instead,
+build_bag():
+
+* lists the resource collection with its sizes and modification times in one `ils -L -r`;
+* fetches the files with a pool of threads (BAG_BUILDER_THREADS, default 4), computing their
+  MD5 as they stream in, unless the MD5 of a resource file is recorded (ResourceFile.checksum)
+  for its current size and modification time; computed MD5s of resource files are recorded,
+  so unchanged files are not hashed again by later builds;
+* writes them into the zip as they arrive, storing (not deflating) formats that are already
+  compressed, and then writes the bagit tag files and manifests;
+* reports progress through a callback, which the create_bag_by_irods task turns into Celery
+  task state.
+
+The resulting bag has the same layout as the one made by the rule:
+
+    <res_id>/bagit.txt, manifest-md5.txt, tagmanifest-md5.txt, readme.txt
+    <res_id>/data/resourcemetadata.xml, resourcemap.xml
+    <res_id>/data/contents/...
+
+Set BAG_BUILDER = 'python' to use it instead of the bagit rule.
+"""
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import datetime, timedelta
+from multiprocessing.pool import ThreadPool
+
+from mezzanine.conf import settings
+
+from django_irods.icommands import SessionException
+from hs_core.hydroshare.zipstream import ZipStream
+from hs_core.irods import parse_modified_time
+
+BAGIT_TXT = "BagIt-Version: 0.96\nTag-File-Character-Encoding: UTF-8\n"
+TAG_FILES = ('bagit.txt', 'manifest-md5.txt', 'tagmanifest-md5.txt')
+CHUNK_SIZE = 1024 * 1024
+# `ils -L` prints the checksum of a data object, if it has been computed, at the start of the
+# line following the object line: a SHA-256 prefixed with sha2: or an MD5 in hex
+CHECKSUM_RE = re.compile(r'^(sha2:\S+|[0-9a-fA-F]{32})$')
+# an object line of `ils -L`: owner, replica number, resource, size, modification time, replica
+# status and name. The status is '&' for an up to date replica and blank for a stale one, and
+# the name, which can contain spaces, is the rest of the line after it.
+OBJECT_LINE_RE = re.compile(r'^\s+\S+\s+\d+\s+\S+\s+(?P<size>\d+)\s+'
+                            r'(?P<modified>\d{4}-\d{2}-\d{2}\.\d{2}:\d{2}) [& ] (?P<name>.+)$')
+
+# File extensions of formats that are already compressed, which are stored in the zip as is
+COMPRESSED_EXTENSIONS = {
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.jar',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp3', '.mp4', '.m4a', '.mov', '.avi', '.mkv',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.kmz', '.pdf', '.jp2',
+}
+
+
+class BagFile(object):
+    """A data object in a resource collection, as listed by `ils -L`."""
+
+    def __init__(self, path, name, size, modified, checksum):
+        self.path = path  # the full iRODS path
+        self.name = name  # relative to the resource collection
+        self.size = size
+        self.modified = modified
+        self.checksum = checksum  # the iRODS checksum, if any (not necessarily MD5)
+
+    @property
+    def checksum_cacheable(self):
+        """
+        Modification times are listed to the minute, so a file rewritten with the same size
+        within a minute would look unchanged. Unless iRODS has a checksum of the file, its MD5
+        is only recorded once its modification time is a couple of minutes old.
+        """
+        if self.checksum:
+            return True
+        try:
+            modified = datetime.strptime(self.modified, '%Y-%m-%d.%H:%M')
+        except ValueError:
+            return False
+        return datetime.now() - modified > timedelta(minutes=2)
+
+
+def parse_recursive_listing(output):
+    """
+    Return the BagFiles in the output of `ils -L -r <collection>`, e.g.:
+
+        /zone/home/proxy/abc123:
+          proxy   0 resc   1234 2018-08-06.18:05 & readme.txt
+            sha2:Zm9v...    generic    /vault/home/proxy/abc123/readme.txt
+          C- /zone/home/proxy/abc123/data
+        /zone/home/proxy/abc123/data:
+          ...
+
+    A data object with several replicas is only listed once.
+    """
+    files = {}
+    root = collection = None
+    last = None
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        if not line.startswith(' '):
+            collection = line.rstrip().rstrip(':')
+            root = root or collection
+            last = None
+        elif line.strip().startswith('C- '):
+            last = None
+        elif not line.startswith('    '):
+            match = OBJECT_LINE_RE.match(line)
+            if match is None:
+                last = None
+                continue
+            path = collection + '/' + match.group('name')
+            last = files.get(path)
+            if last is None:
+                last = files[path] = BagFile(path, os.path.relpath(path, root),
+                                             int(match.group('size')), match.group('modified'),
+                                             None)
+        elif last is not None:
+            # the line following an object line: checksum (if computed), type, physical path,
+            # which can contain spaces
+            fields = line.split()
+            if fields and CHECKSUM_RE.match(fields[0]) and last.checksum is None:
+                last.checksum = fields[0]
+            last = None
+    return sorted(files.values(), key=lambda f: f.name)
+
+
+def list_resource_files(istorage, resource):
+    """Return the BagFiles of a resource collection, apart from the bagit tag files."""
+    stdout = istorage.session.run('ils', None, '-L', '-r', resource.root_path)[0]
+    return [f for f in parse_recursive_listing(stdout) if f.name not in TAG_FILES]
+
+
+def resource_files_by_name(resource):
+    """Return the ResourceFiles of a resource by their BagFile name (their path relative to the
+    resource collection)."""
+    res_files = {}
+    for res_file in resource.files.all():
+        path = res_file.fed_resource_file.name if resource.is_federated \
+            else res_file.resource_file.name
+        res_files[os.path.relpath(path, resource.root_path)] = res_file
+    return res_files
+
+
+def recorded_md5(bag_file, res_file):
+    """The MD5 recorded for a resource file, if it was recorded for the data object as it is
+    listed now, or None."""
+    if res_file is None or res_file._checksum is None:
+        return None
+    if res_file._size != bag_file.size or \
+            res_file._modified_time != parse_modified_time(bag_file.modified):
+        return None
+    return res_file._checksum
+
+
+def record_md5(bag_file, res_file, md5):
+    """Record the MD5 computed for a resource file, if the data object can't have changed
+    unnoticed (see BagFile.checksum_cacheable)."""
+    if res_file is not None and bag_file.checksum_cacheable:
+        res_file.record_system_metadata(bag_file.size, parse_modified_time(bag_file.modified),
+                                        md5)
+
+
+def fetch_file(istorage, bag_file, directory, md5=None):
+    """Copy a data object into a file in directory, and return its (path, MD5).
+    The MD5 is computed while copying, unless it is given."""
+    digest = hashlib.md5() if md5 is None else None
+    handle, local_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(handle, 'wb') as out:
+        proc = istorage.session.run_safe('iget', None, bag_file.path, '-')
+        for chunk in iter(lambda: proc.stdout.read(CHUNK_SIZE), b''):
+            if digest is not None:
+                digest.update(chunk)
+            out.write(chunk)
+        stdout, stderr = proc.communicate()
+        if proc.returncode:
+            raise SessionException(proc.returncode, stdout, stderr)
+    if digest is not None:
+        md5 = digest.hexdigest()
+    return local_path, md5
+
+
+def compress_type(name):
+    if os.path.splitext(name)[1].lower() in COMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def readme_path(files):
+    """The local readme.txt to add to a bag of the given BagFiles, if it has none."""
+    if any(f.name == 'readme.txt' for f in files):
+        return None
+    return getattr(settings, 'HS_BAGIT_README_FILE_WITH_PATH', 'docs/bagit/readme.txt')
+
+
+def closing_files(readme, manifest, tag_checksums):
+    """
+    Return the (name, content) of the files that end a bag: the local readme (if any),
+    bagit.txt and the manifests.
+
+    Parameters:
+    :param readme: the path of the local readme.txt, or None
+    :param manifest: the manifest lines of the payload files ("<md5>    data/...\n")
+    :param tag_checksums: the manifest lines of the tag files already in the bag
+    """
+    files = []
+    tag_checksums = list(tag_checksums)
+    if readme is not None:
+        with open(readme, 'rb') as readme_file:
+            content = readme_file.read()
+        files.append(('readme.txt', content))
+        tag_checksums.append(u'{}    readme.txt\n'.format(hashlib.md5(content).hexdigest()))
+
+    manifest_txt = u''.join(manifest).encode('utf-8')
+    files.append(('bagit.txt', BAGIT_TXT))
+    files.append(('manifest-md5.txt', manifest_txt))
+    tag_checksums.append(u'{}    bagit.txt\n'.format(hashlib.md5(BAGIT_TXT).hexdigest()))
+    tag_checksums.append(u'{}    manifest-md5.txt\n'.format(
+        hashlib.md5(manifest_txt).hexdigest()))
+    files.append(('tagmanifest-md5.txt', u''.join(
+        sorted(tag_checksums, key=lambda line: line.split()[1])).encode('utf-8')))
+    return files
+
+
+def write_bag(istorage, resource, out, progress=None, threads=None):
+    """
+    Write the bag of a resource as a zip to the file object out.
+
+    Parameters:
+    :param istorage: the IrodsStorage of the resource
+    :param resource: the resource to write the bag of; its metadata files must be up to date.
+    :param out: a file object open for writing, or a local path
+    :param progress: a callable called as progress(files_done, files_total, bytes_done,
+    bytes_total) as files are written
+    :param threads: the number of files fetched at once (default BAG_BUILDER_THREADS)
+    """
+    threads = threads or getattr(settings, 'BAG_BUILDER_THREADS', 4)
+    files = list_resource_files(istorage, resource)
+    res_files = resource_files_by_name(resource)
+    readme = readme_path(files)
+    payload = [f for f in files if f.name.startswith('data/')]
+    tags = [f for f in files if not f.name.startswith('data/')]
+    bytes_total = sum(f.size for f in files)
+    root = resource.short_id
+    manifest = []
+    tag_checksums = []
+    state = {'files': 0, 'bytes': 0}
+
+    def report(bag_file):
+        state['files'] += 1
+        state['bytes'] += bag_file.size
+        if progress is not None:
+            progress(state['files'], len(files), state['bytes'], bytes_total)
+
+    directory = tempfile.mkdtemp(dir=getattr(settings, 'IRODS_ROOT', '/tmp'))
+    # at most `slots` fetched files wait on disk to be written to the zip. Slots are taken in
+    # the order in which files are handed to the pool, so the file that the zip is waiting for
+    # always has one.
+    slots = threading.Semaphore(threads * 2)
+
+    def fetch(bag_file):
+        md5 = recorded_md5(bag_file, res_files.get(bag_file.name))
+        return bag_file, md5, fetch_file(istorage, bag_file, directory, md5)
+
+    def tasks():
+        for bag_file in payload + tags:
+            slots.acquire()
+            if state.get('aborted'):
+                return
+            yield bag_file
+
+    pool = ThreadPool(threads)
+    try:
+        with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as bag:
+            for bag_file, recorded, (local_path, md5) in pool.imap(fetch, tasks()):
+                if recorded is None:
+                    # recorded here rather than in the fetching threads, which would each
+                    # open a database connection of their own
+                    record_md5(bag_file, res_files.get(bag_file.name), md5)
+                try:
+                    bag.write(local_path, os.path.join(root, bag_file.name),
+                              compress_type(bag_file.name))
+                finally:
+                    os.remove(local_path)
+                    slots.release()
+                if bag_file.name.startswith('data/'):
+                    manifest.append(u'{}    {}\n'.format(md5, bag_file.name))
+                else:
+                    tag_checksums.append(u'{}    {}\n'.format(md5, bag_file.name))
+                report(bag_file)
+
+            for name, content in closing_files(readme, manifest, tag_checksums):
+                bag.writestr(os.path.join(root, name), content)
+    finally:
+        # let the generator of tasks finish, if it is waiting for a slot
+        state['aborted'] = True
+        slots.release()
+        pool.terminate()
+        pool.join()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def build_bag(resource, progress=None):
+    """
+    Build the bag of a resource and store it at resource.bag_path.
+
+    Parameters:
+    :param resource: the resource to build the bag of; its metadata files must be up to date.
+    :param progress: see write_bag()
+    :return: istorage, the IrodsStorage of the resource
+    """
+    istorage = resource.get_irods_storage()
+    directory = tempfile.mkdtemp(dir=getattr(settings, 'IRODS_ROOT', '/tmp'))
+    try:
+        local_path = os.path.join(directory, resource.short_id + '.zip')
+        write_bag(istorage, resource, local_path, progress=progress)
+        istorage.saveFile(local_path, resource.bag_path, True)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return istorage
+
+
+def stream_bag(istorage, resource, chunk_size=CHUNK_SIZE):
+    """
+    Yield the bag of a resource as a zip64 stream, reading the files from storage as it goes;
+    nothing is written to storage or to local disk. One file is read at a time, one chunk at a
+    time, so memory use is bounded by the chunk size (and the manifests).
+
+    Parameters:
+    :param istorage: the IrodsStorage of the resource
+    :param resource: the resource to stream the bag of; its metadata files must be up to date.
+    :param chunk_size: the size of the chunks read from storage
+    """
+    files = list_resource_files(istorage, resource)
+    readme = readme_path(files)
+    root = resource.short_id
+    stream = ZipStream()
+    manifest = []
+    tag_checksums = []
+
+    for bag_file in files:
+        digest = hashlib.md5()
+        proc = istorage.session.run_safe('iget', None, bag_file.path, '-')
+        completed = False
+        try:
+            def chunks():
+                for chunk in iter(lambda: proc.stdout.read(chunk_size), b''):
+                    digest.update(chunk)
+                    yield chunk
+
+            for data in stream.add(os.path.join(root, bag_file.name), chunks(),
+                                   compress_type=compress_type(bag_file.name)):
+                yield data
+            completed = True
+        finally:
+            if not completed:
+                proc.kill()  # e.g. the client went away
+            stdout, stderr = proc.communicate()
+        if proc.returncode:
+            # the response can't be undone; fail it rather than send an invalid bag
+            raise SessionException(proc.returncode, stdout, stderr)
+        line = u'{}    {}\n'.format(digest.hexdigest(), bag_file.name)
+        (manifest if bag_file.name.startswith('data/') else tag_checksums).append(line)
+
+    for name, content in closing_files(readme, manifest, tag_checksums):
+        for data in stream.add_bytes(os.path.join(root, name), content):
+            yield data
+    for data in stream.close():
+        yield data
@@ -1,12 +1,12 @@
 import os
 import shutil
-import errno
+import hashlib
 import tempfile
 import mimetypes
 import zipfile
 
-from uuid import uuid4
-
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache, caches
 from foresite import utils, Aggregation, AggregatedResource, RdfLibSerializer
 from rdflib import Namespace, URIRef
 
@@ -15,6 +15,10 @@ from mezzanine.conf import settings
 from hs_core.models import Bags, ResourceFile
 
 
+METADATA_FILES_KEY = 'hs_bagit:metadata_files:{res_id}:{version}'
+BAG_FILES_PENDING_KEY = 'hs_bagit:bag_files_pending:{res_id}'
+
+
 class HsBagitException(Exception):
     pass
 
@@ -42,56 +46,76 @@ def delete_files_and_bag(resource):
         bag.delete()
 
 
-def create_bag_files(resource):
+def _stable_repr(value):
+    """repr() of a field value that doesn't depend on the ordering of dictionaries."""
+    if isinstance(value, dict):
+        return repr(sorted((k, _stable_repr(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return repr([_stable_repr(v) for v in value])
+    return repr(value)
+
+
+def _row_values(obj):
+    """The values of all the concrete fields of a model instance."""
+    return [(field.attname, _stable_repr(getattr(obj, field.attname)))
+            for field in obj._meta.concrete_fields]
+
+
+def metadata_version(resource):
     """
-    create and update files needed by bagit operation that is conducted on iRODS server;
-    no bagit operation is performed, only files that will be included in the bag are created
-    or updated.
+    Return a hash of everything that goes into the metadata files of a resource: the rows of
+    its metadata and metadata elements, its extra metadata, the metadata of its logical files,
+    its files and (for collections) the resources it contains. The hash changes whenever the
+    metadata files would, so files generated for a version can be reused until it changes.
 
     Parameters:
-    :param resource: A resource whose files will be created or updated to be included in the
-    resource bag.
-    :return: istorage, an IrodsStorage object that will be used by subsequent operation to
-    create a bag on demand as needed.
+    :param resource: the resource to compute the metadata version of.
+    :return: a hex digest
     """
-    from hs_core.hydroshare.utils import current_site_url, get_file_mime_type
+    from hs_core.hydroshare.utils import current_site_url
+
+    metadata = resource.metadata
+    digest = hashlib.sha1()
+    digest.update(repr([resource.short_id, resource.resource_type,
+                        unicode(resource._meta.verbose_name), current_site_url()]))
+    digest.update(repr(_row_values(metadata)))
+    digest.update(_stable_repr(resource.extra_metadata))
+
+    metadata_type = ContentType.objects.get_for_model(metadata)
+    for element_name in metadata.get_supported_element_names():
+        element_model = metadata._get_metadata_element_model_type(element_name).model_class()
+        for element in element_model.objects.filter(content_type=metadata_type,
+                                                     object_id=metadata.id).order_by('pk'):
+            digest.update(repr((element_name, _row_values(element))))
+
+    if resource.supports_logical_file:
+        for logical_file in resource.logical_files:
+            digest.update(repr((type(logical_file).__name__, _row_values(logical_file),
+                                _row_values(logical_file.metadata))))
+            for element in logical_file.metadata.get_metadata_elements():
+                if element is not None:
+                    digest.update(repr((type(element).__name__, _row_values(element))))
+
+    files = ResourceFile.objects.filter(object_id=resource.id).order_by('pk').values_list(
+        'pk', 'resource_file', 'fed_resource_file', 'file_folder',
+        'logical_file_content_type_id', 'logical_file_object_id')
+    for row in files.iterator():
+        digest.update(repr(row))
 
-    istorage = resource.get_irods_storage()
+    if resource.resource_type == "CollectionResource" and resource.resources:
+        digest.update(repr(sorted(resource.resources.values_list('short_id', flat=True))))
 
-    # the temp_path is a temporary holding path to make the files available to iRODS
-    # we have to make temp_path unique even for the same resource with same update time
-    # to accommodate asynchronous multiple file move operations for the same resource
+    return digest.hexdigest()
 
-    # TODO: This is always in /tmp; otherwise code breaks because open() is called on the result!
-    temp_path = os.path.join(getattr(settings, 'IRODS_ROOT', '/tmp'), uuid4().hex)
 
-    try:
-        os.makedirs(temp_path)
-    except OSError as ex:
-        # TODO: there might be concurrent operations.
-        if ex.errno == errno.EEXIST:
-            shutil.rmtree(temp_path)
-            os.makedirs(temp_path)
-        else:
-            raise Exception(ex.message)
-
-    # an empty visualization directory will not be put into the zipped bag file by ibun command,
-    # so creating an empty visualization directory to be put into the zip file as done by the two
-    # statements below does not work. However, if visualization directory has content to be
-    # uploaded, it will work. This is to be implemented as part of the resource model in the future.
-    # The following two statements are placeholders serving as reminder
-    # to_file_name = '{res_id}/data/visualization/'.format(res_id=resource.short_id)
-    # istorage.saveFile('', to_file_name, create_directory=True)
-
-    # create resourcemetadata.xml in local directory and upload it to iRODS
-    from_file_name = os.path.join(temp_path, 'resourcemetadata.xml')
-    with open(from_file_name, 'w') as out:
-        # resources that don't support file types this would write only resource level metadata
-        # resource types that support file types this would write resource level metadata
-        # as well as file type metadata
-        out.write(resource.get_metadata_xml())
-    to_file_name = os.path.join(resource.root_path, 'data', 'resourcemetadata.xml')
-    istorage.saveFile(from_file_name, to_file_name, True)
+def create_resource_map_xml(resource):
+    """
+    Return the ORE resource map (resourcemap.xml) of a resource, as a string.
+
+    Parameters:
+    :param resource: the resource to create the resource map of.
+    """
+    from hs_core.hydroshare.utils import current_site_url, get_file_mime_type
 
     # URLs are found in the /data/ subdirectory to comply with bagit format assumptions
     current_site_url = current_site_url()
@@ -176,20 +200,134 @@ def create_bag_files(resource):
     # <ore:aggregates rdf:resource="[hydroshare domain]/terms/[Resource class name]"/>
     xml_string = xml_string.replace(
         '<ore:aggregates rdf:resource="%s"/>\n' % str(resource.metadata.type.url), '')
+    return xml_string
 
-    # create resourcemap.xml and upload it to iRODS
-    from_file_name = os.path.join(temp_path, 'resourcemap.xml')
-    with open(from_file_name, 'w') as out:
-        out.write(xml_string)
-    to_file_name = os.path.join(resource.root_path, 'data', 'resourcemap.xml')
-    istorage.saveFile(from_file_name, to_file_name, False)
 
+def get_metadata_files(resource, version=None):
+    """
+    Return the contents of the metadata files of a resource, (resourcemetadata.xml,
+    resourcemap.xml), from the cache if they have been generated for the same metadata version.
+
+    Parameters:
+    :param resource: the resource to get the metadata files of.
+    :param version: the metadata_version() of the resource, if already known.
+    """
+    version = version or metadata_version(resource)
+    key = METADATA_FILES_KEY.format(res_id=resource.short_id, version=version)
+    files = cache.get(key)
+    if files is None:
+        # resources that don't support file types this would write only resource level metadata
+        # resource types that support file types this would write resource level metadata
+        # as well as file type metadata
+        files = (resource.get_metadata_xml(), create_resource_map_xml(resource))
+        cache.set(key, files, getattr(settings, 'BAG_METADATA_CACHE_TIMEOUT', 24 * 60 * 60))
+    return files
+
+
+def create_bag_files(resource, force=False):
+    """
+    create and update files needed by bagit operation that is conducted on iRODS server;
+    no bagit operation is performed, only files that will be included in the bag are created
+    or updated.
+
+    The metadata version of the files is kept in the 'metadata_version' AVU of the resource
+    collection; if it has not changed since the files were last written, they are not written
+    again (unless force is True).
+
+    Parameters:
+    :param resource: A resource whose files will be created or updated to be included in the
+    resource bag.
+    :param force: write the files even if the metadata has not changed, e.g. after the files
+    have been deleted.
+    :return: istorage, an IrodsStorage object that will be used by subsequent operation to
+    create a bag on demand as needed.
+    """
+    istorage = resource.get_irods_storage()
     res_coll = resource.root_path
+
+    # metadata changes from now on will set metadata_dirty again
     istorage.setAVU(res_coll, 'metadata_dirty', "false")
-    shutil.rmtree(temp_path)
+
+    try:
+        version = metadata_version(resource)
+        if not force and istorage.getAVU(res_coll, 'metadata_version') == version:
+            return istorage
+        metadata_xml, resource_map_xml = get_metadata_files(resource, version)
+
+        # the temp_path is a temporary holding path to make the files available to iRODS
+        # TODO: This is always in /tmp; otherwise code breaks because open() is called on it!
+        temp_path = tempfile.mkdtemp(dir=getattr(settings, 'IRODS_ROOT', '/tmp'))
+        try:
+            # an empty visualization directory will not be put into the zipped bag file by ibun
+            # command, so creating an empty visualization directory to be put into the zip file
+            # does not work. However, if visualization directory has content to be uploaded, it
+            # will work. This is to be implemented as part of the resource model in the future.
+            # to_file_name = '{res_id}/data/visualization/'.format(res_id=resource.short_id)
+            # istorage.saveFile('', to_file_name, create_directory=True)
+
+            # create resourcemetadata.xml in local directory and upload it to iRODS
+            from_file_name = os.path.join(temp_path, 'resourcemetadata.xml')
+            with open(from_file_name, 'w') as out:
+                out.write(metadata_xml)
+            to_file_name = os.path.join(res_coll, 'data', 'resourcemetadata.xml')
+            istorage.saveFile(from_file_name, to_file_name, True)
+
+            # create resourcemap.xml and upload it to iRODS
+            from_file_name = os.path.join(temp_path, 'resourcemap.xml')
+            with open(from_file_name, 'w') as out:
+                out.write(resource_map_xml)
+            to_file_name = os.path.join(res_coll, 'data', 'resourcemap.xml')
+            istorage.saveFile(from_file_name, to_file_name, False)
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+        istorage.setAVU(res_coll, 'metadata_version', version)
+    except Exception:
+        istorage.setAVU(res_coll, 'metadata_dirty', "true")
+        raise
     return istorage
 
 
+def _pending_cache():
+    """ Return the cache of pending updates, or None if updates are not coalesced """
+    alias = getattr(settings, 'BAG_FILES_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def schedule_bag_files(resource):
+    """
+    Update the metadata files of a resource in the background, shortly.
+
+    Calls made while an update is pending are coalesced into it, so a burst of metadata edits
+    results in a single update, BAG_FILES_DEBOUNCE seconds (default 10) after the first of them.
+    Until then the metadata_dirty AVU is set, so the files are updated on demand if a bag is
+    requested before.
+
+    Pending updates are recorded in the Django cache named by settings.BAG_FILES_CACHE, which
+    must be shared by the web processes and the celery workers (e.g. 'shared', see
+    hs_core.redis_cache): the update task clears the record in its own process. When
+    BAG_FILES_CACHE is not set, every call schedules an update.
+
+    Parameters:
+    :param resource: the resource whose metadata files are updated.
+    """
+    from hs_core.tasks import update_bag_files
+
+    debounce = getattr(settings, 'BAG_FILES_DEBOUNCE', 10)
+    pending = _pending_cache()
+    key = BAG_FILES_PENDING_KEY.format(res_id=resource.short_id)
+    # the key expires in case the task is lost; the task deletes it when it starts
+    if pending is None or pending.add(key, True, debounce + 5 * 60):
+        update_bag_files.apply_async((resource.short_id,), countdown=debounce)
+
+
+def clear_bag_files_pending(resource_id):
+    """ Let the next call to schedule_bag_files for a resource schedule another update """
+    pending = _pending_cache()
+    if pending is not None:
+        pending.delete(BAG_FILES_PENDING_KEY.format(res_id=resource_id))
+
+
 def create_bag(resource):
     """
     Modified to implement the new bagit workflow. The previous workflow was to create a bag from
@@ -1,4 +1,5 @@
 import os
+import hashlib
 import zipfile
 import shutil
 import logging
@@ -196,8 +197,13 @@ def get_checksum(pk):
     Exceptions.NotAuthorized - The user is not authorized
     Exceptions.NotFound - The resource specified by pid does not exist
     Exception.ServiceFailure - The service is unable to process the request
+
+    The checksum is the MD5 of the sorted lines "<MD5 of file>    <path of file>" of the
+    content files of the resource, computed from the checksums recorded in ResourceFile.
     """
-    raise NotImplementedError()
+    res = utils.get_resource_by_shortkey(pk)
+    lines = sorted(u'{}    {}\n'.format(f.checksum, f.short_path) for f in res.files.all())
+    return hashlib.md5(u''.join(lines).encode('utf-8')).hexdigest()
 
 
 def check_resource_files(files=()):
@@ -346,25 +346,9 @@ def get_resource_list(creator=None, group=None, user=None, owner=None, from_date
         coverages = set()
         search_polygon = Polygon.from_bbox((east,south,west,north))
 
-        for coverage in Coverage.objects.filter(type="box"):
-            coverage_polygon = Polygon.from_bbox((
-                coverage.value.get('eastlimit', None),
-                coverage.value.get('southlimit', None),
-                coverage.value.get('westlimit', None),
-                coverage.value.get('northlimit', None)
-            ))
-
-            if search_polygon.intersects(coverage_polygon):
-                coverages.add(coverage.id)
-
-        for coverage in Coverage.objects.filter(type="point"):
+        for coverage in get_coverage_candidates(north, south, east, west):
             try:
-                coverage_shape = Point(
-                    coverage.value.get('east', None),
-                    coverage.value.get('north', None),
-                )
-
-                if search_polygon.intersects(coverage_shape):
+                if search_polygon.intersects(get_coverage_shape(coverage)):
                     coverages.add(coverage.id)
             except Exception as e:
                 log.error("Coverage value invalid for coverage id %d" % coverage.id)
@@ -431,26 +415,48 @@ def get_resource_list(creator=None, group=None, user=None, owner=None, from_date
                 # No matches on title or abstract, so treat as no results of search
                 flt = flt.none()
 
-    qcnt = 0
-    if flt:
-        qcnt = len(flt)
-
+    # slicing is pushed into the query as LIMIT/OFFSET; the queryset stays lazy so that
+    # callers can paginate it further without evaluating every matching resource
     if start is not None and count is not None:
-        if qcnt > start:
-            if qcnt >= start + count:
-                flt = flt[start:start+count]
-            else:
-                flt = flt[start:qcnt]
+        flt = flt[start:start+count]
     elif start is not None:
-        if qcnt >= start:
-            flt = flt[start:qcnt]
+        flt = flt[start:]
     elif count is not None:
-        if qcnt > count:
-            flt = flt[0:count]
+        flt = flt[:count]
 
     return flt
 
 
+def get_coverage_candidates(north, south, east, west):
+    """
+    Return the box and point coverages whose bounding box intersects the search box.
+
+    This is a range query against the indexed bounding box columns of Coverage; the exact
+    geometry test is left to the caller.
+    """
+    xs = (float(east), float(west))
+    ys = (float(south), float(north))
+    return Coverage.objects.filter(type__in=('box', 'point'),
+                                   bbox_xmin__lte=max(xs), bbox_xmax__gte=min(xs),
+                                   bbox_ymin__lte=max(ys), bbox_ymax__gte=min(ys))\
+        .only('id', 'type', '_value')
+
+
+def get_coverage_shape(coverage):
+    """ Return the GEOS geometry of a box or point coverage """
+    if coverage.type == 'box':
+        return Polygon.from_bbox((
+            coverage.value.get('eastlimit', None),
+            coverage.value.get('southlimit', None),
+            coverage.value.get('westlimit', None),
+            coverage.value.get('northlimit', None)
+        ))
+    return Point(
+        coverage.value.get('east', None),
+        coverage.value.get('north', None),
+    )
+
+
 def _filter_resources_for_user_and_owner(user, owner, is_editable, query):
     if user:
         user = user_from_id(user)
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import mimetypes
+import hashlib
 import os
 import tempfile
 import logging
@@ -25,8 +26,9 @@ from mezzanine.conf import settings
 
 from hs_core.signals import pre_create_resource, post_create_resource, pre_add_files_to_resource, \
     post_add_files_to_resource
+from hs_core import landing_page_cache
 from hs_core.models import AbstractResource, BaseResource, ResourceFile
-from hs_core.hydroshare.hs_bagit import create_bag_files
+from hs_core.hydroshare.hs_bagit import schedule_bag_files
 
 from django_irods.icommands import SessionException
 from django_irods.storage import IrodsStorage
@@ -303,6 +305,11 @@ def replace_resource_file_on_irods(new_file, original_resource_file, user):
 
     # Note: this doesn't update metadata at all.
     istorage.saveFile(new_file, ori_storage_path, True)
+    digest = hashlib.md5()
+    with open(new_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    original_resource_file.set_system_metadata(checksum=digest.hexdigest())
 
     # do this so that the bag will be regenerated prior to download of the bag
     resource_modified(ori_res, by_user=user, overwrite_bag=False)
@@ -465,6 +472,11 @@ def copy_resource_files_and_AVUs(src_res_id, dest_res_id):
     for n, f in enumerate(files):
         folder, base = os.path.split(f.short_path)  # strips object information.
         new_resource_file = ResourceFile.create(tgt_res, base, folder=folder)
+        if f._checksum is not None and new_resource_file._size == f._size:
+            # the copy has the same content
+            new_resource_file.record_system_metadata(new_resource_file._size,
+                                                     new_resource_file._modified_time,
+                                                     f._checksum)
 
         # if the original file is part of a logical file, then
         # add the corresponding new resource file to the copy of that logical file
@@ -537,13 +549,16 @@ def resource_modified(resource, by_user=None, overwrite_bag=True):
         res_modified_date = resource.metadata.dates.all().filter(type='modified')[0]
         resource.metadata.update_element('date', res_modified_date.id)
 
-    if overwrite_bag:
-        create_bag_files(resource)
-
     # set bag_modified-true AVU pair for the modified resource in iRODS to indicate
     # the resource is modified for on-demand bagging.
     set_dirty_bag_flag(resource)
 
+    landing_page_cache.invalidate([resource.id])
+
+    # the metadata files are regenerated in the background, once per burst of edits
+    if overwrite_bag:
+        schedule_bag_files(resource)
+
 
 # TODO: should be part of BaseResource
 def set_dirty_bag_flag(resource):
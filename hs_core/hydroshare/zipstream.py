@@ -0,0 +1,165 @@
+"""
+Write a zip archive as a stream of bytes, without seeking back in the output.
+
+zipfile.ZipFile needs a seekable file, since it writes the size and CRC of an entry into the
+header before the entry's data. Here, entries are followed by a data descriptor carrying
+them instead, so an archive can be sent in an HTTP response while it is being written.
+Entries and archives larger than 4 GB, or with more than 65535 entries, are written with the
+zip64 extensions.
+
+    stream = ZipStream()
+    for chunk in stream.add('dir/name.txt', iter_file_chunks()):
+        ...
+    for chunk in stream.add_bytes('other.txt', b'content'):
+        ...
+    for chunk in stream.close():
+        ...
+
+Only one entry is held in memory at a time, one chunk at a time.
+"""
+
+from __future__ import absolute_import
+
+import struct
+import time
+import zlib
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP32_COUNT_LIMIT = 0xFFFF
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+DATA_DESCRIPTOR = struct.Struct('<IIII')
+DATA_DESCRIPTOR64 = struct.Struct('<IIQQ')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_OF_CENTRAL_DIRECTORY = struct.Struct('<IHHHHIIH')
+END_OF_CENTRAL_DIRECTORY64 = struct.Struct('<IQHHIIQQQQ')
+END_OF_CENTRAL_DIRECTORY64_LOCATOR = struct.Struct('<IIQI')
+
+
+def dos_date_time(timestamp):
+    t = time.localtime(timestamp)
+    dos_date = (max(t.tm_year, 1980) - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+    dos_time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+    return dos_date, dos_time
+
+
+class ZipEntry(object):
+    def __init__(self, name, compress_type, offset, date_time):
+        self.name = name
+        self.compress_type = compress_type
+        self.offset = offset
+        self.date, self.time = date_time
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+
+    @property
+    def zip64(self):
+        return (self.size >= ZIP32_LIMIT or self.compressed_size >= ZIP32_LIMIT
+                or self.offset >= ZIP32_LIMIT)
+
+
+class ZipStream(object):
+    """A zip archive written as a stream; see the module documentation."""
+
+    def __init__(self, compress_type=ZIP_DEFLATED, compress_level=6):
+        self.compress_type = compress_type
+        self.compress_level = compress_level
+        self.entries = []
+        self.offset = 0
+
+    def _emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def add(self, name, chunks, compress_type=None, timestamp=None):
+        """Yield the bytes of an entry with the content of the iterable of byte strings
+        chunks."""
+        if compress_type is None:
+            compress_type = self.compress_type
+        if isinstance(name, unicode):
+            name = name.encode('utf-8')
+        entry = ZipEntry(name, compress_type, self.offset,
+                         dos_date_time(timestamp if timestamp is not None else time.time()))
+
+        # the CRC and sizes follow the data, in the data descriptor
+        yield self._emit(LOCAL_HEADER.pack(
+            0x04034b50, 45, FLAG_DATA_DESCRIPTOR | FLAG_UTF8, compress_type,
+            entry.time, entry.date, 0, 0, 0, len(name), 0) + name)
+
+        compressor = None
+        if compress_type == ZIP_DEFLATED:
+            compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -15)
+        for chunk in chunks:
+            if not chunk:
+                continue
+            entry.crc = zlib.crc32(chunk, entry.crc)
+            entry.size += len(chunk)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                entry.compressed_size += len(chunk)
+                yield self._emit(chunk)
+        if compressor is not None:
+            chunk = compressor.flush()
+            entry.compressed_size += len(chunk)
+            yield self._emit(chunk)
+
+        entry.crc &= 0xFFFFFFFF
+        if entry.size >= ZIP32_LIMIT or entry.compressed_size >= ZIP32_LIMIT:
+            descriptor = DATA_DESCRIPTOR64
+        else:
+            descriptor = DATA_DESCRIPTOR
+        yield self._emit(descriptor.pack(
+            0x08074b50, entry.crc, entry.compressed_size, entry.size))
+        self.entries.append(entry)
+
+    def add_bytes(self, name, data, compress_type=None, timestamp=None):
+        """Yield the bytes of an entry with the given content."""
+        return self.add(name, [data], compress_type=compress_type, timestamp=timestamp)
+
+    def close(self):
+        """Yield the central directory, which ends the archive."""
+        directory_offset = self.offset
+        for entry in self.entries:
+            extra = b''
+            size = entry.size
+            compressed_size = entry.compressed_size
+            offset = entry.offset
+            if entry.zip64:
+                # the zip64 extra field holds the values that don't fit, in this order
+                fields = []
+                if size >= ZIP32_LIMIT:
+                    fields.append(size)
+                    size = ZIP32_LIMIT
+                if compressed_size >= ZIP32_LIMIT:
+                    fields.append(compressed_size)
+                    compressed_size = ZIP32_LIMIT
+                if offset >= ZIP32_LIMIT:
+                    fields.append(offset)
+                    offset = ZIP32_LIMIT
+                extra = struct.pack('<HH' + 'Q' * len(fields), 0x0001, 8 * len(fields), *fields)
+            yield self._emit(CENTRAL_HEADER.pack(
+                0x02014b50, 45, 45 if entry.zip64 else 20, FLAG_DATA_DESCRIPTOR | FLAG_UTF8,
+                entry.compress_type, entry.time, entry.date, entry.crc, compressed_size, size,
+                len(entry.name), len(extra), 0, 0, 0, 0, offset) + entry.name + extra)
+
+        directory_size = self.offset - directory_offset
+        count = len(self.entries)
+        if (count >= ZIP32_COUNT_LIMIT or directory_size >= ZIP32_LIMIT
+                or directory_offset >= ZIP32_LIMIT):
+            end64_offset = self.offset
+            yield self._emit(END_OF_CENTRAL_DIRECTORY64.pack(
+                0x06064b50, 44, 45, 45, 0, 0, count, count, directory_size, directory_offset))
+            yield self._emit(END_OF_CENTRAL_DIRECTORY64_LOCATOR.pack(
+                0x07064b50, 0, end64_offset, 1))
+            count = min(count, ZIP32_COUNT_LIMIT)
+            directory_size = min(directory_size, ZIP32_LIMIT)
+            directory_offset = min(directory_offset, ZIP32_LIMIT)
+        yield self._emit(END_OF_CENTRAL_DIRECTORY.pack(
+            0x06054b50, 0, 0, count, count, directory_size, directory_offset, 0))
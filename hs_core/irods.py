@@ -1,13 +1,65 @@
+import hashlib
 import os
 
 from datetime import datetime, timedelta
 
 from django.db import models
 from django.core.exceptions import PermissionDenied, ValidationError
+from django.utils import timezone
 from mezzanine.conf import settings
 
+from django_irods.icommands import SessionException
 from hs_core.signals import pre_check_bag_flag
 
+CHUNK_SIZE = 1024 * 1024
+
+
+def parse_modified_time(value):
+    """
+    Return the modification time of a data object as listed by `ils -l` (e.g. 2018-08-06.18:05,
+    in the local time of the server running the icommands) as an aware datetime, or None.
+    """
+    try:
+        modified = datetime.strptime(value, '%Y-%m-%d.%H:%M')
+    except (TypeError, ValueError):
+        return None
+    if settings.USE_TZ:
+        modified = timezone.make_aware(modified, timezone.get_default_timezone())
+    return modified
+
+
+def list_data_objects(istorage, path, recursive=False):
+    """
+    Return the data objects listed by `ils -L` for a data object, or for the data objects in a
+    collection, as hs_core.hydroshare.bag_builder.BagFiles. Their names are relative to the
+    collection of the listed data object, or to the listed collection.
+
+    :raises SessionException: if the path does not exist in iRODS, or iRODS fails.
+    """
+    from hs_core.hydroshare.bag_builder import parse_recursive_listing
+
+    if recursive:
+        stdout = istorage.session.run('ils', None, '-L', '-r', path)[0]
+        return parse_recursive_listing(stdout)
+
+    # a single data object is listed without the header line of its collection
+    stdout = istorage.session.run('ils', None, '-L', path)[0]
+    if stdout.startswith(' '):
+        stdout = u'{}:\n{}'.format(os.path.dirname(path), stdout)
+    return parse_recursive_listing(stdout)
+
+
+def data_object_md5(istorage, path):
+    """Return the MD5 of a data object, read from iRODS one chunk at a time."""
+    digest = hashlib.md5()
+    proc = istorage.session.run_safe('iget', None, path, '-')
+    for chunk in iter(lambda: proc.stdout.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stdout, stderr = proc.communicate()
+    if proc.returncode:
+        raise SessionException(proc.returncode, stdout, stderr)
+    return digest.hexdigest()
+
 
 class ResourceIRODSMixin(models.Model):
     """ This contains iRODS methods to be included as options for resources """
@@ -49,6 +101,76 @@ class ResourceIRODSMixin(models.Model):
             create_bag_by_irods(self.short_id)
             self.setAVU('bag_modified', False)
 
+    def stream_bag(self):
+        """
+        Return an iterator over the bytes of the bag of this resource, zipped as it is read.
+
+        Unlike update_bag, this doesn't create the bag in iRODS; the metadata files are
+        updated if necessary, and the bag is then zipped on the fly from the resource files
+        (see hs_core.hydroshare.bag_builder.stream_bag).
+        """
+        from hs_core.hydroshare.resource import check_resource_type
+        from hs_core.hydroshare.bag_builder import stream_bag
+
+        # send signal for pre_check_bag_flag
+        resource_cls = check_resource_type(self.resource_type)
+        pre_check_bag_flag.send(sender=resource_cls, resource=self)
+
+        self.update_metadata_files()
+        return stream_bag(self.get_irods_storage(), self)
+
+    def verify_file_system_metadata(self, missing_only=False, verify_checksums=False):
+        """
+        Bring the stored size, modification time and checksum of the files of this resource
+        up to date with iRODS.
+
+        The sizes and modification times of all the files come from a single recursive listing
+        of the resource collection. The checksum of a file is only computed again if the file
+        changed, has no checksum yet, or if verify_checksums is True.
+
+        :param missing_only: only process files whose size or checksum is not recorded yet
+        :param verify_checksums: compute the checksums of all files, and report the ones that
+            differ from the recorded ones
+        :return: a list of messages about the files that changed or are missing in iRODS
+
+        :raises SessionException: if iRODS fails.
+        """
+        resource_files = list(self.files.all())
+        if missing_only:
+            resource_files = [f for f in resource_files
+                              if f._size < 0 or f._checksum is None]
+        if not resource_files:
+            return []
+
+        istorage = self.get_irods_storage()
+        try:
+            listing = list_data_objects(istorage, self.file_path, recursive=True)
+        except SessionException:
+            # no data/contents collection; all the files are missing
+            listing = []
+        listed = {os.path.join(self.file_path, f.name): f for f in listing}
+
+        messages = []
+        for resource_file in resource_files:
+            path = resource_file.storage_path
+            data_object = listed.get(path)
+            if data_object is None:
+                messages.append(u"{} is missing in iRODS".format(path))
+                continue
+            modified_time = parse_modified_time(data_object.modified)
+            checksum = resource_file._checksum
+            if resource_file._size >= 0 and (resource_file._size != data_object.size or
+                                             resource_file._modified_time != modified_time):
+                messages.append(u"{} changed in iRODS".format(path))
+                checksum = None
+            if checksum is None or verify_checksums:
+                checksum = data_object_md5(istorage, path)
+                if resource_file._checksum not in (None, checksum):
+                    messages.append(u"{} has checksum {} instead of {}".format(
+                        path, checksum, resource_file._checksum))
+            resource_file.record_system_metadata(data_object.size, modified_time, checksum)
+        return messages
+
     def update_metadata_files(self):
         """
         Make the metadata files resourcemetadata.xml and resourcemap.xml up to date.
@@ -245,3 +367,31 @@ class ResourceFileIRODSMixin(models.Model):
     def create_ticket(self, user, write=False):
         """ This creates a ticket to read or modify this file """
         return self.resource.create_ticket(user, path=self.storage_path, write=write)
+
+    def set_system_metadata(self, checksum=None):
+        """
+        Record the size and modification time of this file, as listed by iRODS.
+
+        :param checksum: the MD5 of the file, if known (e.g. computed while uploading it).
+            Otherwise, the recorded checksum is kept if the file has not changed, and is
+            computed again on demand if it has.
+
+        :raises SessionException: if the file does not exist in iRODS, or iRODS fails.
+        """
+        path = self.storage_path
+        data_object = list_data_objects(self.resource.get_irods_storage(), path)[0]
+        modified_time = parse_modified_time(data_object.modified)
+        if checksum is None and (data_object.size == self._size and
+                                 modified_time == self._modified_time):
+            checksum = self._checksum
+        self.record_system_metadata(data_object.size, modified_time, checksum)
+
+    def record_system_metadata(self, size, modified_time, checksum):
+        """ Store the size, modification time and checksum of this file """
+        self._size = size
+        self._modified_time = modified_time
+        self._checksum = checksum
+        if self.pk is not None:
+            # update() rather than save() so that no post_save receivers fire
+            type(self).objects.filter(pk=self.pk).update(
+                _size=size, _modified_time=modified_time, _checksum=checksum)
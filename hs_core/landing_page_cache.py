@@ -0,0 +1,64 @@
+"""
+Cache of the read-only part of resource landing pages.
+
+The landing page of a resource in view mode shows its metadata, coverages, citation,
+collections, quota holder and metadata status, which are the same for every user and cost
+dozens of queries and an iRODS call (get_quota_holder) to compute. This part of the context
+(see hs_core.page_processors.get_page_context) is cached per resource in the Django cache
+named by settings.LANDING_PAGE_CACHE, which must be shared by all web and celery processes so
+that an invalidation in one of them is seen by the others; without it, the context is
+computed for every request. Entries expire after settings.LANDING_PAGE_CACHE_TIMEOUT seconds
+(default 3600).
+
+Entries are invalidated by resource when the resource is modified (resource_modified), when
+one of its metadata elements is saved or deleted, when its sharing flags or privileges
+change, and when it is added to or removed from a collection; see hs_core.receivers. What
+depends on the user or the session is computed for every request.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+from hs_core.transaction_hooks import on_commit
+
+KEY_PREFIX = 'hs_core:landing_page'
+
+
+def _cache():
+    """ Return the cache of landing page contexts, or None if they are not cached """
+    alias = getattr(settings, 'LANDING_PAGE_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def _timeout():
+    return getattr(settings, 'LANDING_PAGE_CACHE_TIMEOUT', 60 * 60)
+
+
+def _key(resource_id):
+    return '{}:{}'.format(KEY_PREFIX, resource_id)
+
+
+def get_context(resource_id, compute):
+    """
+    Return the cached read-only landing page context of a resource.
+
+    :param compute: callable returning the context, a picklable dict, called on a miss.
+    """
+    cache = _cache()
+    if cache is None:
+        return compute()
+    context = cache.get(_key(resource_id))
+    if context is None:
+        context = compute()
+        cache.set(_key(resource_id), context, _timeout())
+    return context
+
+
+def invalidate(resource_ids):
+    """ Forget the cached landing page context of resources """
+    cache = _cache()
+    keys = [_key(resource_id) for resource_id in set(resource_ids)]
+    if cache is None or not keys:
+        return
+    # concurrent requests may have cached the old context before this commits
+    on_commit(lambda: cache.delete_many(keys), run_now=True)
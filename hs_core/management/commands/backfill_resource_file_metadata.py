@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+Backfill the recorded size, modification time and checksum of resource files
+
+ResourceFile.create records them for files that are added; this command fills them in for
+files that predate those columns, one recursive iRODS listing per resource, and computes the
+MD5 of the files that have none.
+
+* By default only resources with files whose size or checksum is not recorded are processed.
+* Optional argument --all verifies the files of every resource, reporting files that changed
+  or are missing in iRODS.
+* Optional argument --verify-checksums also computes the checksums of all their files again.
+* Optional arguments --workers and --batch-size set the number of resources processed in
+  parallel (default 4), in batches of the given size (default 100).
+"""
+
+from multiprocessing.pool import ThreadPool
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from django_irods.icommands import SessionException
+from hs_core.models import BaseResource, ResourceFile
+
+
+def backfill_batch(resource_ids, missing_only, verify_checksums):
+    """ Backfill the files of a batch of resources, and return the messages for them """
+    messages = []
+    try:
+        for resource in BaseResource.objects.filter(id__in=resource_ids):
+            try:
+                messages.extend(resource.verify_file_system_metadata(
+                    missing_only=missing_only, verify_checksums=verify_checksums))
+            except SessionException as ex:
+                messages.append("resource {}: {}".format(resource.short_id, ex.stderr))
+    finally:
+        # every worker thread has its own database connection
+        connection.close()
+    return len(resource_ids), messages
+
+
+class Command(BaseCommand):
+    help = "Record the size, modification time and checksum of resource files."
+
+    def add_arguments(self, parser):
+
+        # Named (optional) arguments
+        parser.add_argument(
+            '--all',
+            action='store_true',  # True for presence, False for absence
+            dest='all',
+            help='verify the files of all resources, not only the ones not recorded yet',
+        )
+        parser.add_argument(
+            '--verify-checksums',
+            action='store_true',  # True for presence, False for absence
+            dest='verify_checksums',
+            help='compute the checksums of all files again',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            dest='workers',
+            default=4,
+            help='number of resources processed in parallel',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            dest='batch_size',
+            default=100,
+            help='number of resources per batch',
+        )
+
+    def handle(self, *args, **options):
+        missing_only = not (options['all'] or options['verify_checksums'])
+        if missing_only:
+            files = ResourceFile.objects.filter(_size__lt=0) | \
+                ResourceFile.objects.filter(_checksum__isnull=True)
+            resource_ids = BaseResource.objects.filter(
+                id__in=files.values('object_id')).order_by('id').values_list('id', flat=True)
+        else:
+            resource_ids = BaseResource.objects.order_by('id').values_list('id', flat=True)
+        resource_ids = list(resource_ids)
+        print("RECORDING FILE METADATA FOR {} RESOURCES".format(len(resource_ids)))
+
+        batch_size = options['batch_size']
+        batches = [resource_ids[offset:offset + batch_size]
+                   for offset in range(0, len(resource_ids), batch_size)]
+        pool = ThreadPool(options['workers'])
+        done = 0
+        problems = 0
+        try:
+            for count, messages in pool.imap_unordered(
+                    lambda batch: backfill_batch(batch, missing_only,
+                                                 options['verify_checksums']),
+                    batches):
+                for message in messages:
+                    print("  " + message)
+                done += count
+                problems += len(messages)
+                print("  {} of {} done".format(done, len(resource_ids)))
+        finally:
+            pool.close()
+            pool.join()
+        if problems:
+            print("{} FILES CHANGED OR MISSING".format(problems))
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the generation of the bag metadata files (resourcemetadata.xml and resourcemap.xml)
+
+For an existing resource, with --files synthetic files added to it (default 5000), measure:
+
+* generating both files from scratch, as every metadata edit used to;
+* computing the metadata version, which is all that is done when nothing has changed;
+* getting the files for an unchanged version from the cache.
+
+The synthetic files are only rows in the database, added in a transaction that is rolled back
+when done; nothing is written to iRODS.
+
+"""
+
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hs_core.hydroshare import hs_bagit
+from hs_core.hydroshare.utils import get_resource_by_shortkey
+from hs_core.models import ResourceFile
+
+
+class Command(BaseCommand):
+    help = "Benchmark generating the metadata files of a resource bag."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('resource_id', type=str)
+
+        parser.add_argument(
+            '--files',
+            type=int,
+            dest='files',
+            default=5000,
+            help='number of synthetic files to add to the resource'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            dest='repeat',
+            default=3,
+            help='number of times each measurement is repeated'
+        )
+
+    def timed(self, label, repeat, function):
+        times = []
+        for i in range(repeat):
+            start = time.time()
+            function()
+            times.append(time.time() - start)
+        print("{:<28} best {:.3f}s of {}".format(label, min(times), repeat))
+        return min(times)
+
+    def handle(self, *args, **options):
+        resource = get_resource_by_shortkey(options['resource_id'])
+
+        with transaction.atomic():
+            ResourceFile.objects.bulk_create(
+                ResourceFile(content_object=resource,
+                             file_folder='benchmark',
+                             resource_file='{}/data/contents/benchmark/file-{:05d}.txt'.format(
+                                 resource.short_id, i))
+                for i in range(options['files']))
+            print("{} has {} files".format(resource.short_id, resource.files.count()))
+
+            def generate():
+                resource.get_metadata_xml()
+                hs_bagit.create_resource_map_xml(resource)
+
+            def cached():
+                hs_bagit.get_metadata_files(resource, version)
+
+            full = self.timed('generate metadata files', options['repeat'], generate)
+            check = self.timed('metadata version', options['repeat'],
+                               lambda: hs_bagit.metadata_version(resource))
+            version = hs_bagit.metadata_version(resource)
+            cache.delete(hs_bagit.METADATA_FILES_KEY.format(res_id=resource.short_id,
+                                                            version=version))
+            hs_bagit.get_metadata_files(resource, version)
+            self.timed('cached metadata files', options['repeat'], cached)
+            print("an unchanged version is checked {:.0f}x faster than it is generated".format(
+                full / check))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the spatial coverage filter of get_resource_list
+
+Compares the original filter, which builds a GEOS geometry for every box and point
+coverage in the catalog, with the indexed bounding box range query followed by the
+exact test on the candidates only. Both paths must find the same coverages.
+
+Run index_coverage_bounding_boxes first if the catalog predates the bounding box columns.
+"""
+
+import time
+
+from django.contrib.gis.geos import Polygon
+from django.core.management.base import BaseCommand
+
+from hs_core.hydroshare.users import get_coverage_candidates, get_coverage_shape
+from hs_core.models import Coverage
+
+
+def scan_all_coverages(search_polygon):
+    """ The original filter: test every box and point coverage in Python """
+    hits = set()
+    for coverage in Coverage.objects.filter(type__in=('box', 'point')):
+        try:
+            if search_polygon.intersects(get_coverage_shape(coverage)):
+                hits.add(coverage.id)
+        except Exception:
+            pass
+    return hits
+
+
+def scan_candidates(search_polygon, north, south, east, west):
+    """ The indexed filter: range query, then the exact test on candidates """
+    hits = set()
+    for coverage in get_coverage_candidates(north, south, east, west):
+        try:
+            if search_polygon.intersects(get_coverage_shape(coverage)):
+                hits.add(coverage.id)
+        except Exception:
+            pass
+    return hits
+
+
+class Command(BaseCommand):
+    help = "Compare the full-scan and indexed spatial coverage filters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('north', type=float)
+        parser.add_argument('south', type=float)
+        parser.add_argument('east', type=float)
+        parser.add_argument('west', type=float)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            dest='repeat',
+            default=5,
+            help='number of timed runs per filter',
+        )
+
+    def handle(self, *args, **options):
+        north, south = options['north'], options['south']
+        east, west = options['east'], options['west']
+        search_polygon = Polygon.from_bbox((east, south, west, north))
+        print("{} box and point coverages in catalog".format(
+            Coverage.objects.filter(type__in=('box', 'point')).count()))
+
+        results = {}
+        for label, run in (('full scan', lambda: scan_all_coverages(search_polygon)),
+                           ('indexed', lambda: scan_candidates(search_polygon, north, south,
+                                                               east, west))):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.time()
+                results[label] = run()
+                timings.append(time.time() - start)
+            print("{}: {} hits, best {:.3f}s, mean {:.3f}s".format(
+                label, len(results[label]), min(timings), sum(timings) / len(timings)))
+
+        if results['full scan'] != results['indexed']:
+            print("MISMATCH: {} coverages differ between the two filters".format(
+                len(results['full scan'] ^ results['indexed'])))
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark computing the coordinate extents of a large NetCDF file
+
+A synthetic file of about --size-gb gigabytes (default 2) is written, with curvilinear
+latitude and longitude auxiliary coordinate variables in chunks of --chunk x --chunk values
+(default 512) and a time coordinate variable. Then, in a separate process each so that the
+peak memory of one doesn't hide that of the other, measure:
+
+* reading each coordinate variable whole and reducing it with argmin/argmax, as
+  get_nc_variable_coordinate_meta used to (skipped with --skip-full);
+* computing the same extents with nc_utils.get_nc_variable_extent, in blocks aligned to
+  the chunks.
+
+The time taken and the peak resident memory of each process are printed. The file is
+written in --path (default: a temporary directory) and deleted when done unless --keep.
+"""
+
+import os
+import resource
+import shutil
+import tempfile
+import time
+from multiprocessing import Process, Queue
+
+import netCDF4
+import numpy
+from django.core.management.base import BaseCommand
+
+from hs_file_types.nc_functions import nc_utils
+
+COORDINATE_VARIABLES = ('lat', 'lon', 'time')
+
+
+def write_synthetic_file(path, size_gb, chunk):
+    """ Write the synthetic file, a band of rows at a time, and return its grid shape """
+    # lat and lon are 8 bytes per value each
+    side = int((size_gb * 1024 ** 3 / 16) ** 0.5)
+    dataset = netCDF4.Dataset(path, 'w')
+    try:
+        dataset.createDimension('time', 24)
+        dataset.createDimension('y', side)
+        dataset.createDimension('x', side)
+        time_var = dataset.createVariable('time', 'f8', ('time',))
+        time_var.units = 'hours since 2000-01-01 00:00:00'
+        time_var[:] = numpy.arange(24)
+        lat = dataset.createVariable('lat', 'f8', ('y', 'x'), chunksizes=(chunk, chunk))
+        lat.standard_name = 'latitude'
+        lat.units = 'degrees_north'
+        lon = dataset.createVariable('lon', 'f8', ('y', 'x'), chunksizes=(chunk, chunk))
+        lon.standard_name = 'longitude'
+        lon.units = 'degrees_east'
+        data = dataset.createVariable('data', 'f4', ('time', 'y', 'x'),
+                                      chunksizes=(1, chunk, chunk))
+        data.coordinates = 'lat lon'
+
+        columns = numpy.linspace(-120.0, -100.0, side)
+        for row in range(0, side, chunk):
+            rows = numpy.linspace(30.0, 45.0, side)[row:row + chunk]
+            # a slightly rotated grid, as curvilinear grids are
+            lat[row:row + chunk, :] = rows[:, numpy.newaxis] + 0.01 * columns[numpy.newaxis, :]
+            lon[row:row + chunk, :] = columns[numpy.newaxis, :] - 0.01 * rows[:, numpy.newaxis]
+    finally:
+        dataset.close()
+    return side, side
+
+
+def full_extent(nc_variable):
+    """ Compute the extent of a variable as get_nc_variable_coordinate_meta used to """
+    nc_variable_data = nc_variable[:]
+    return (nc_variable_data[numpy.unravel_index(nc_variable_data.argmin(),
+                                                 nc_variable_data.shape)],
+            nc_variable_data[numpy.unravel_index(nc_variable_data.argmax(),
+                                                 nc_variable_data.shape)])
+
+
+def chunked_extent(nc_variable):
+    return nc_utils.get_nc_variable_extent(nc_variable, monotonic=nc_variable.ndim == 1)
+
+
+def measure(path, extent, queue):
+    """ Compute the extents of the coordinate variables and report time and peak memory """
+    start = time.time()
+    dataset = netCDF4.Dataset(path, 'r')
+    try:
+        extents = [extent(dataset.variables[name]) for name in COORDINATE_VARIABLES]
+    finally:
+        dataset.close()
+    elapsed = time.time() - start
+    # kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, peak_rss, [(float(low), float(high)) for low, high in extents]))
+
+
+class Command(BaseCommand):
+    help = "Benchmark computing the coordinate extents of a large NetCDF file."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--size-gb',
+            type=float,
+            dest='size_gb',
+            default=2.0,
+            help='approximate size of the synthetic file in gigabytes'
+        )
+
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            dest='chunk',
+            default=512,
+            help='chunk size of the synthetic file along each dimension of the grid'
+        )
+
+        parser.add_argument(
+            '--path',
+            dest='path',
+            default=None,
+            help='directory in which to write the synthetic file'
+        )
+
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            dest='keep',
+            default=False,
+            help='keep the synthetic file when done'
+        )
+
+        parser.add_argument(
+            '--skip-full',
+            action='store_true',
+            dest='skip_full',
+            default=False,
+            help='skip reading the variables whole, which needs memory for all of them'
+        )
+
+    def run(self, label, path, extent):
+        queue = Queue()
+        process = Process(target=measure, args=(path, extent, queue))
+        process.start()
+        elapsed, peak_rss, extents = queue.get()
+        process.join()
+        print("{:<24} {:.2f}s, peak RSS {:.0f} MB".format(label, elapsed, peak_rss / 1024.0))
+        return extents
+
+    def handle(self, *args, **options):
+        directory = options['path'] or tempfile.mkdtemp()
+        path = os.path.join(directory, 'benchmark_netcdf_extents.nc')
+        try:
+            start = time.time()
+            shape = write_synthetic_file(path, options['size_gb'], options['chunk'])
+            print("wrote {} ({}x{} grid, {:.2f} GB) in {:.1f}s".format(
+                path, shape[0], shape[1], os.path.getsize(path) / 1024.0 ** 3,
+                time.time() - start))
+
+            chunked = self.run('chunked extents', path, chunked_extent)
+            if not options['skip_full']:
+                full = self.run('whole variable extents', path, full_extent)
+                if full != chunked:
+                    print("EXTENTS DIFFER: {} != {}".format(full, chunked))
+            for name, (low, high) in zip(COORDINATE_VARIABLES, chunked):
+                print("  {}: {} to {}".format(name, low, high))
+        finally:
+            if options['keep']:
+                print("kept {}".format(path))
+            elif options['path']:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                shutil.rmtree(directory)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark processing an uploaded zip file of raster tiles
+
+--tiles GeoTIFF tiles (default 200) of --tile-size x --tile-size cells (default 256) are
+written, with a .vrt mosaic of them built by gdal.BuildVRT, and zipped in a folder as users
+upload them. Then measure:
+
+* extracting the .tif and .vrt files of the zip file, by extracting all of it and walking
+  the extracted folders as _explode_raster_zip_file used to, then as it does now;
+* creating the .vrt file of each tile, as when tiles are uploaded one by one, with a
+  gdal_translate process as create_vrt_file used to (skipped with --skip-gdal-translate),
+  then in process as it does now.
+
+The time taken by each is printed. The files are written in --path (default: a temporary
+directory) and deleted when done unless --keep. Requires GDAL >= 2.1, for gdal.BuildVRT and
+gdal.Translate.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+
+import gdal
+import numpy
+from osgeo import osr
+from django.core.management.base import BaseCommand
+
+from hs_file_types.models import raster, GeoRasterLogicalFile
+
+# NAD83 / UTM zone 12N
+TILE_PROJECTION = 'EPSG:26912'
+CELL_SIZE = 30.0
+
+
+def write_tiles_zip(directory, tiles, tile_size):
+    """ Write the tiles and their .vrt mosaic, zip them and return the path of the zip file """
+    tiles_dir = os.path.join(directory, 'tiles')
+    os.makedirs(tiles_dir)
+    columns = int(numpy.ceil(tiles ** 0.5))
+    driver = gdal.GetDriverByName('GTiff')
+    srs = osr.SpatialReference()
+    srs.SetFromUserInput(TILE_PROJECTION)
+    tile_paths = []
+    for tile in range(tiles):
+        row, column = divmod(tile, columns)
+        tile_path = os.path.join(tiles_dir, 'tile_{:04d}.tif'.format(tile))
+        dataset = driver.Create(tile_path, tile_size, tile_size, 1, gdal.GDT_Float32)
+        dataset.SetGeoTransform((445000.0 + column * tile_size * CELL_SIZE, CELL_SIZE, 0.0,
+                                 4655000.0 - row * tile_size * CELL_SIZE, 0.0, -CELL_SIZE))
+        dataset.SetProjection(srs.ExportToWkt())
+        band = dataset.GetRasterBand(1)
+        band.SetNoDataValue(-9999.0)
+        band.WriteArray(numpy.random.uniform(1800.0, 2900.0, (tile_size, tile_size))
+                        .astype(numpy.float32))
+        dataset = None
+        tile_paths.append(tile_path)
+
+    # the dataset returned is closed, which writes the vrt file, once flushed
+    gdal.BuildVRT(os.path.join(tiles_dir, 'tiles.vrt'), tile_paths).FlushCache()
+
+    zip_path = os.path.join(directory, 'tiles.zip')
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name in sorted(os.listdir(tiles_dir)):
+            zf.write(os.path.join(tiles_dir, name), os.path.join('tiles', name))
+    shutil.rmtree(tiles_dir)
+    return zip_path
+
+
+def extract_all_and_walk(zip_file):
+    """ Extract the raster files of a zip file as _explode_raster_zip_file used to """
+    temp_dir = os.path.dirname(zip_file)
+    zf = zipfile.ZipFile(zip_file, 'r')
+    zf.extractall(temp_dir)
+    zf.close()
+
+    extract_file_paths = []
+    for dirpath, _, filenames in os.walk(temp_dir):
+        for name in filenames:
+            file_path = os.path.abspath(os.path.join(dirpath, name))
+            if os.path.splitext(os.path.basename(file_path))[1] in \
+                    GeoRasterLogicalFile.get_allowed_storage_file_types():
+                shutil.move(file_path, os.path.join(temp_dir, name))
+                extract_file_paths.append(os.path.join(temp_dir, os.path.basename(file_path)))
+    return extract_file_paths
+
+
+def create_vrt_file_with_gdal_translate(tif_file):
+    """ Create the .vrt file of a tif file as create_vrt_file used to """
+    temp_dir = os.path.dirname(tif_file)
+    tif_file_name = os.path.basename(tif_file)
+    vrt_file_path = os.path.join(temp_dir, os.path.splitext(tif_file_name)[0] + '.vrt')
+
+    with open(os.devnull, 'w') as fp:
+        subprocess.Popen(['gdal_translate', '-of', 'VRT', tif_file, vrt_file_path],
+                         stdout=fp,
+                         stderr=fp).wait()
+
+    tree = ET.parse(vrt_file_path)
+    for element in tree.getroot().iter('SourceFilename'):
+        element.text = tif_file_name
+        element.attrib['relativeToVRT'] = '1'
+    tree.write(vrt_file_path)
+    return vrt_file_path
+
+
+class Command(BaseCommand):
+    help = "Benchmark processing an uploaded zip file of raster tiles."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--tiles',
+            type=int,
+            dest='tiles',
+            default=200,
+            help='number of tiles in the zip file'
+        )
+
+        parser.add_argument(
+            '--tile-size',
+            type=int,
+            dest='tile_size',
+            default=256,
+            help='number of cells of the tiles along each side'
+        )
+
+        parser.add_argument(
+            '--path',
+            dest='path',
+            default=None,
+            help='directory in which to write the files'
+        )
+
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            dest='keep',
+            default=False,
+            help='keep the files when done'
+        )
+
+        parser.add_argument(
+            '--skip-gdal-translate',
+            action='store_true',
+            dest='skip_gdal_translate',
+            default=False,
+            help='skip creating the .vrt files with gdal_translate processes'
+        )
+
+    def extract(self, label, directory, zip_path, explode):
+        """ Extract the zip file in a directory of its own, as an upload is """
+        os.makedirs(directory)
+        upload_path = os.path.join(directory, os.path.basename(zip_path))
+        shutil.copy(zip_path, upload_path)
+        start = time.time()
+        extract_file_paths = explode(upload_path)
+        print("{:<36} {:.3f}s, {} files".format(label, time.time() - start,
+                                                len(extract_file_paths)))
+        return extract_file_paths
+
+    def create_vrt_files(self, label, tif_files, create_vrt):
+        start = time.time()
+        for tif_file in tif_files:
+            os.remove(create_vrt(tif_file))
+        elapsed = time.time() - start
+        print("{:<36} {:.3f}s, {:.1f}ms per tile".format(label, elapsed,
+                                                          1000.0 * elapsed / len(tif_files)))
+
+    def handle(self, *args, **options):
+        directory = options['path'] or tempfile.mkdtemp()
+        work_dir = os.path.join(directory, 'benchmark_raster_upload')
+        try:
+            start = time.time()
+            zip_path = write_tiles_zip(work_dir, options['tiles'], options['tile_size'])
+            print("wrote {} ({} tiles of {}x{} cells, {:.1f} MB) in {:.1f}s".format(
+                zip_path, options['tiles'], options['tile_size'], options['tile_size'],
+                os.path.getsize(zip_path) / 1024.0 ** 2, time.time() - start))
+
+            self.extract('extract zip (extractall and walk)', os.path.join(work_dir, 'before'),
+                         zip_path, extract_all_and_walk)
+            extract_file_paths = self.extract('extract zip (raster files only)',
+                                              os.path.join(work_dir, 'after'), zip_path,
+                                              raster._explode_raster_zip_file)
+
+            tif_files = [path for path in extract_file_paths if path.endswith('.tif')]
+            if not options['skip_gdal_translate']:
+                self.create_vrt_files('tile vrt files (gdal_translate)', tif_files,
+                                      create_vrt_file_with_gdal_translate)
+            self.create_vrt_files('tile vrt files (in process)', tif_files,
+                                  raster.create_vrt_file)
+        finally:
+            if options['keep']:
+                print("kept {}".format(work_dir))
+            else:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                if not options['path']:
+                    shutil.rmtree(directory)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the REST resource listing (/hsapi/resource/)
+
+This times the first page of the listing for a user who can view a large number of
+resources, for both page-number and cursor pagination. Missing fixture resources are
+created directly in Django (no iRODS collections, no bags) so that a 50k-resource
+fixture can be built in minutes.
+
+* --fixture-size sets the number of resources owned by the benchmark user (default 50000).
+* --cleanup deletes the fixture resources and the benchmark user afterwards.
+"""
+
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.test import APIClient
+
+from hs_access_control.models import ResourceAccess, UserResourcePrivilege, PrivilegeCodes
+from hs_core.hydroshare import users
+from hs_core.models import BaseResource, CoreMetaData, GenericResource
+
+BENCHMARK_USERNAME = 'benchmark_resource_list'
+FIXTURE_TITLE_PREFIX = 'Benchmark fixture resource'
+
+
+def get_benchmark_user():
+    try:
+        return User.objects.get(username=BENCHMARK_USERNAME)
+    except User.DoesNotExist:
+        return users.create_account('{}@example.com'.format(BENCHMARK_USERNAME),
+                                    username=BENCHMARK_USERNAME,
+                                    first_name='Benchmark',
+                                    last_name='User',
+                                    superuser=False)
+
+
+def create_fixture_resources(user, count, batch_size=500):
+    """ Create count Django-only generic resources owned by user """
+    created = 0
+    while created < count:
+        with transaction.atomic():
+            for _ in range(min(batch_size, count - created)):
+                title = '{} {}'.format(FIXTURE_TITLE_PREFIX, created)
+                res = GenericResource.objects.create(resource_type='GenericResource',
+                                                     user=user, creator=user, title=title,
+                                                     last_changed_by=user, in_menus=[])
+                metadata = CoreMetaData.objects.create()
+                res.content_object = metadata
+                res.save()
+                metadata.create_element('title', value=title)
+                metadata.create_element('creator', name=user.get_full_name(), order=1)
+                metadata.create_element('coverage', type='point',
+                                        value={'east': -111.0, 'north': 41.0,
+                                               'units': 'Decimal degrees',
+                                               'projection': 'WGS 84 EPSG:4326'})
+                ResourceAccess.objects.create(resource=res)
+                UserResourcePrivilege.share(resource=res, grantor=user, user=user,
+                                            privilege=PrivilegeCodes.OWNER)
+                created += 1
+    return created
+
+
+class Command(BaseCommand):
+    help = "Benchmark the REST resource listing against a large resource fixture."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--fixture-size',
+            type=int,
+            dest='fixture_size',
+            default=50000,
+            help='number of resources viewable by the benchmark user',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            dest='repeat',
+            default=5,
+            help='number of timed requests per pagination mode',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',  # True for presence, False for absence
+            dest='cleanup',
+            help='delete fixture resources and the benchmark user when done',
+        )
+
+    def handle(self, *args, **options):
+        user = get_benchmark_user()
+        fixture = BaseResource.objects.filter(title__startswith=FIXTURE_TITLE_PREFIX,
+                                              user=user)
+        missing = options['fixture_size'] - fixture.count()
+        if missing > 0:
+            print("CREATING {} FIXTURE RESOURCES".format(missing))
+            start = time.time()
+            create_fixture_resources(user, missing)
+            print("  created in {:.1f}s".format(time.time() - start))
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        for label, params in (('page number', {}),
+                              ('page number, deep page', {'page': 400}),
+                              ('cursor', {'pagination': 'cursor'})):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.time()
+                response = client.get('/hydroshare/hsapi/resource/', params, format='json')
+                timings.append(time.time() - start)
+                if response.status_code != 200:
+                    print("  {}: HTTP {}".format(label, response.status_code))
+                    break
+            print("{}: best {:.3f}s, mean {:.3f}s over {} requests".format(
+                label, min(timings), sum(timings) / len(timings), len(timings)))
+
+        if options['cleanup']:
+            print("DELETING FIXTURE RESOURCES")
+            # queryset delete bypasses BaseResource.delete(), which would look for iRODS files
+            fixture.delete()
+            user.delete()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark preparing the Solr documents of resources
+
+For the first --count discoverable and public resources (default 500), measure the resources
+prepared per second and the database queries per resource when they are fetched:
+
+* one by one from BaseResource.objects, as the realtime signal processor used to;
+* in one batch from BaseResourceIndex.index_queryset, which prefetches their metadata.
+
+Nothing is sent to Solr.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from haystack import connections as haystack_connections
+
+from hs_core.models import BaseResource
+
+
+class Command(BaseCommand):
+    help = "Benchmark preparing the Solr documents of resources."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--count',
+            type=int,
+            dest='count',
+            default=500,
+            help='number of resources prepared',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            dest='repeat',
+            default=3,
+            help='number of times each measurement is repeated',
+        )
+
+    def timed(self, label, count, repeat, function):
+        times = []
+        for i in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.time()
+                function()
+                times.append(time.time() - start)
+        best = min(times)
+        print("{:<28} {:8.1f} resources/sec {:8.1f} queries/resource".format(
+            label, count / best if best else 0, len(queries) / float(count)))
+        return best
+
+    def handle(self, *args, **options):
+        index = haystack_connections['default'].get_unified_index().get_index(BaseResource)
+        resource_ids = list(index.index_queryset().order_by('pk')
+                            .values_list('pk', flat=True)[:options['count']])
+        count = len(resource_ids)
+        if not count:
+            print("no discoverable or public resources")
+            return
+
+        def one_by_one():
+            for pk in resource_ids:
+                index.full_prepare(BaseResource.objects.get(pk=pk))
+
+        def prefetched():
+            for resource in index.index_queryset().filter(pk__in=resource_ids):
+                index.full_prepare(resource)
+
+        single = self.timed('one by one', count, options['repeat'], one_by_one)
+        batch = self.timed('prefetched', count, options['repeat'], prefetched)
+        print("prefetching is {:.1f}x faster".format(single / batch if batch else 0))
@@ -100,7 +100,7 @@ class Command(BaseCommand):
 
                     if options['generate']:  # generate usable bag
 
-                        create_bag_files(resource)
+                        create_bag_files(resource, force=True)
                         print("metadata generated for {} from Django".format(rid))
                         resource.setAVU('metadata_dirty', 'false')
                         print("metadata_dirty set to false for {}".format(rid))
@@ -112,7 +112,7 @@ class Command(BaseCommand):
 
                     elif options['generate_metadata']:
 
-                        create_bag_files(resource)
+                        create_bag_files(resource, force=True)
                         print("metadata generated for {} from Django".format(rid))
                         resource.setAVU('metadata_dirty', 'false')
                         print("metadata_dirty set to false for {}".format(rid))
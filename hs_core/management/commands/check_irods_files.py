@@ -9,8 +9,18 @@ This checks that:
 2. every iRODS file in {short_id}/data/contents corresponds to a ResourceFile
 3. every iRODS directory {short_id} corresponds to a Django resource
 
+Each resource is checked against one recursive listing of its iRODS collection. Resources are
+checked in parallel by --workers threads (default 4).
+
 * By default, prints errors on stdout.
 * Optional argument --log instead logs output to system log.
+* Optional argument --jsonl FILE appends one JSON line per checked resource to FILE:
+
+    {"errors": [...], "resource_id": "...", "resource_type": "...", "status": "ok|errors|failed"}
+
+  The lines carry no timestamps, so the output of two runs can be compared after sorting.
+  FILE is also the checkpoint of the run: resources that already have a line in it are skipped,
+  so an interrupted run resumes where it stopped. Use --restart to check them again.
 """
 
 from django.core.management.base import BaseCommand
@@ -18,7 +28,10 @@ from hs_core.models import BaseResource
 from hs_core.hydroshare.utils import get_resource_by_shortkey
 from django_irods.storage import IrodsStorage
 
+import json
 import logging
+import os
+from multiprocessing.pool import ThreadPool
 
 
 def check_for_dangling_irods(echo_errors=True, log_errors=False, return_errors=False):
@@ -43,6 +56,47 @@ def check_for_dangling_irods(echo_errors=True, log_errors=False, return_errors=F
     return errors
 
 
+def check_resource(resource_id, options):
+    """ Check one resource, and return the result as a dictionary for the JSON output """
+    result = {'resource_id': resource_id, 'resource_type': None, 'errors': []}
+    try:
+        resource = BaseResource.objects.get(short_id=resource_id)
+    except BaseResource.DoesNotExist:
+        result['status'] = 'failed'
+        result['errors'].append(
+            "Resource with id {} not found in Django Resources".format(resource_id))
+        return result
+
+    result['resource_type'] = resource.resource_type
+    try:
+        errors, ecount = resource.check_irods_files(stop_on_error=False,
+                                                    echo_errors=False,
+                                                    log_errors=options['log'],
+                                                    return_errors=True,
+                                                    clean_irods=options['clean_irods'],
+                                                    clean_django=options['clean_django'],
+                                                    sync_ispublic=options['sync_ispublic'])
+    except Exception as ex:
+        result['status'] = 'failed'
+        result['errors'].append("check of resource {} failed: {}".format(resource_id, ex))
+        return result
+    result['status'] = 'errors' if ecount else 'ok'
+    result['errors'] = errors
+    return result
+
+
+def read_checkpoint(path):
+    """ Return the ids of the resources that have a result in the JSON lines file at path """
+    done = set()
+    with open(path) as checkpoint:
+        for line in checkpoint:
+            try:
+                done.add(json.loads(line)['resource_id'])
+            except (ValueError, KeyError):
+                pass  # a line cut short by an interruption
+    return done
+
+
 class Command(BaseCommand):
     help = "Check synchronization between iRODS and Django."
 
@@ -85,6 +139,25 @@ class Command(BaseCommand):
             dest='unreferenced',
             help='check for unreferenced iRODS directories',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            dest='workers',
+            default=4,
+            help='number of resources checked in parallel',
+        )
+        parser.add_argument(
+            '--jsonl',
+            dest='jsonl',
+            default=None,
+            help='append results to this JSON lines file, skipping resources already in it',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',  # True for presence, False for absence
+            dest='restart',
+            help='empty the --jsonl file first, rather than resuming from it',
+        )
 
     def handle(self, *args, **options):
         if options['unreferenced']:
@@ -92,43 +165,49 @@ class Command(BaseCommand):
             check_for_dangling_irods(echo_errors=not options['log'],
                                      log_errors=options['log'],
                                      return_errors=False)
+            return
 
-        elif len(options['resource_ids']) > 0:  # an array of resource short_id to check.
-            for rid in options['resource_ids']:
-                try:
-                    resource = BaseResource.objects.get(short_id=rid)
-                except BaseResource.DoesNotExist:
-                    msg = "Resource with id {} not found in Django Resources".format(rid)
-                    print(msg)
-
-                print("LOOKING FOR FILE ERRORS FOR RESOURCE {}".format(rid))
-                if options['clean_irods']:
-                    print(' (deleting unreferenced iRODs files)')
-                if options['clean_django']:
-                    print(' (deleting Django file objects without files)')
-                if options['sync_ispublic']:
-                    print(' (correcting isPublic in iRODs)')
-                resource.check_irods_files(stop_on_error=False,
-                                           echo_errors=not options['log'],
-                                           log_errors=options['log'],
-                                           return_errors=False,
-                                           clean_irods=options['clean_irods'],
-                                           clean_django=options['clean_django'],
-                                           sync_ispublic=options['sync_ispublic'])
-
+        if len(options['resource_ids']) > 0:  # an array of resource short_id to check.
+            resource_ids = options['resource_ids']
+            print("LOOKING FOR FILE ERRORS FOR RESOURCES {}".format(' '.join(resource_ids)))
         else:  # check all resources
+            resource_ids = BaseResource.objects.order_by('id').values_list('short_id', flat=True)
             print("LOOKING FOR FILE ERRORS FOR ALL RESOURCES")
-            if options['clean_irods']:
-                print(' (deleting unreferenced iRODs files)')
-            if options['clean_django']:
-                print(' (deleting Django file objects without files)')
-            if options['sync_ispublic']:
-                print(' (correcting isPublic in iRODs)')
-            for r in BaseResource.objects.all():
-                r.check_irods_files(stop_on_error=False,
-                                    echo_errors=not options['log'],  # Don't both log and echo
-                                    log_errors=options['log'],
-                                    return_errors=False,
-                                    clean_irods=options['clean_irods'],
-                                    clean_django=options['clean_django'],
-                                    sync_ispublic=options['sync_ispublic'])
+        if options['clean_irods']:
+            print(' (deleting unreferenced iRODs files)')
+        if options['clean_django']:
+            print(' (deleting Django file objects without files)')
+        if options['sync_ispublic']:
+            print(' (correcting isPublic in iRODs)')
+
+        output = None
+        if options['jsonl']:
+            if options['restart'] or not os.path.exists(options['jsonl']):
+                open(options['jsonl'], 'w').close()
+            done = read_checkpoint(options['jsonl'])
+            if done:
+                print(" (skipping {} resources already in {})".format(len(done),
+                                                                      options['jsonl']))
+            resource_ids = [rid for rid in resource_ids if rid not in done]
+            output = open(options['jsonl'], 'a+')
+            output.seek(0, os.SEEK_END)
+            if output.tell() > 0:
+                output.seek(-1, os.SEEK_END)
+                if output.read(1) != '\n':
+                    output.write('\n')  # end a line cut short by an interruption
+
+        pool = ThreadPool(options['workers'])
+        try:
+            for result in pool.imap_unordered(lambda rid: check_resource(rid, options),
+                                              resource_ids):
+                if not options['log']:  # Don't both log and echo
+                    for msg in result['errors']:
+                        print(msg)
+                if output is not None:
+                    output.write(json.dumps(result, sort_keys=True) + '\n')
+                    output.flush()
+        finally:
+            pool.close()
+            pool.join()
+            if output is not None:
+                output.close()
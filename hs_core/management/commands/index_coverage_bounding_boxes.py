@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""
+Backfill the bounding box index of box and point coverages
+
+Coverage.save() keeps the bbox_* columns current for coverages that are created or
+updated; this command fills them in for coverages that predate those columns.
+
+* By default only coverages whose bounding box has not been computed are processed.
+* Optional argument --all recomputes the bounding box of every box and point coverage.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hs_core.models import Coverage
+
+
+class Command(BaseCommand):
+    help = "Compute the bounding box columns of box and point coverages."
+
+    def add_arguments(self, parser):
+
+        # Named (optional) arguments
+        parser.add_argument(
+            '--all',
+            action='store_true',  # True for presence, False for absence
+            dest='all',
+            help='recompute bounding boxes that are already set',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            dest='batch_size',
+            default=1000,
+            help='number of coverages updated per transaction',
+        )
+
+    def handle(self, *args, **options):
+        coverages = Coverage.objects.filter(type__in=('box', 'point'))
+        if not options['all']:
+            coverages = coverages.filter(bbox_xmin__isnull=True)
+        coverage_ids = list(coverages.order_by('id').values_list('id', flat=True))
+        print("INDEXING {} COVERAGES".format(len(coverage_ids)))
+
+        batch_size = options['batch_size']
+        invalid = 0
+        for offset in range(0, len(coverage_ids), batch_size):
+            batch = coverage_ids[offset:offset + batch_size]
+            with transaction.atomic():
+                # update() rather than save() so that no post_save receivers fire
+                for coverage in Coverage.objects.filter(id__in=batch).only('id', 'type',
+                                                                          '_value'):
+                    xmin, ymin, xmax, ymax = coverage.get_bounding_box()
+                    if xmin is None:
+                        invalid += 1
+                        print("coverage {} has an invalid value: {}".format(coverage.id,
+                                                                           coverage._value))
+                        continue
+                    Coverage.objects.filter(id=coverage.id).update(
+                        bbox_xmin=xmin, bbox_ymin=ymin, bbox_xmax=xmax, bbox_ymax=ymax)
+            print("  {} of {} done".format(min(offset + batch_size, len(coverage_ids)),
+                                          len(coverage_ids)))
+        if invalid:
+            print("{} COVERAGES COULD NOT BE INDEXED".format(invalid))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+Rebuild the Solr index of resources with several processes
+
+The ids of the discoverable and public resources are split into chunks that are indexed by
+a pool of worker processes, each with its own database and Solr connections. The resources of
+a chunk are fetched with their metadata prefetched (see BaseResourceIndex.index_queryset) and
+sent to Solr in one update.
+
+* Optional positional arguments are the short ids of the resources to index; by default all
+  discoverable and public resources are indexed.
+* Optional arguments --workers and --chunk-size set the number of processes (default 4) and
+  the number of resources in a chunk (default 200).
+
+The number of resources indexed per second is printed when done.
+"""
+
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections as db_connections
+from haystack import connections as haystack_connections
+
+from hs_core.hydro_realtime_signal_processor import bump_index_generation
+from hs_core.models import BaseResource
+
+
+def close_database_connections():
+    """ Close the database connections, which must not be shared with forked processes """
+    db_connections.close_all()
+
+
+def index_chunk(resource_ids):
+    """ Index a chunk of resources, and return the number indexed and the time taken """
+    start = time.time()
+    backend = haystack_connections['default'].get_backend()
+    index = haystack_connections['default'].get_unified_index().get_index(BaseResource)
+    resources = list(index.index_queryset().filter(pk__in=resource_ids))
+    if resources:
+        backend.update(index, resources)
+    return len(resources), time.time() - start
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Solr index of resources in parallel."
+
+    def add_arguments(self, parser):
+
+        # a list of resource id's: none does nothing.
+        parser.add_argument('resource_ids', nargs='*', type=str)
+
+        parser.add_argument(
+            '--workers',
+            type=int,
+            dest='workers',
+            default=4,
+            help='number of indexing processes',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            dest='chunk_size',
+            default=200,
+            help='number of resources indexed at a time by a process',
+        )
+
+    def handle(self, *args, **options):
+        index = haystack_connections['default'].get_unified_index().get_index(BaseResource)
+        queryset = index.index_queryset()
+        if options['resource_ids']:
+            queryset = queryset.filter(short_id__in=options['resource_ids'])
+        resource_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        chunk_size = options['chunk_size']
+        chunks = [resource_ids[offset:offset + chunk_size]
+                  for offset in range(0, len(resource_ids), chunk_size)]
+        print("INDEXING {} RESOURCES IN {} CHUNKS".format(len(resource_ids), len(chunks)))
+
+        close_database_connections()
+        pool = Pool(options['workers'], initializer=close_database_connections)
+        start = time.time()
+        done = 0
+        try:
+            for count, elapsed in pool.imap_unordered(index_chunk, chunks):
+                done += count
+                print("  {} of {} done ({:.1f}s for {})".format(
+                    done, len(resource_ids), elapsed, count))
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+        bump_index_generation()
+
+        elapsed = time.time() - start
+        print("{} RESOURCES INDEXED IN {:.1f}s ({:.1f} resources/sec)".format(
+            done, elapsed, done / elapsed if elapsed else 0))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hs_core', '0036_remove_baseresource_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coverage',
+            name='bbox_xmax',
+            field=models.FloatField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='coverage',
+            name='bbox_xmin',
+            field=models.FloatField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='coverage',
+            name='bbox_ymax',
+            field=models.FloatField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='coverage',
+            name='bbox_ymin',
+            field=models.FloatField(db_index=True, null=True, editable=False, blank=True),
+        ),
+    ]
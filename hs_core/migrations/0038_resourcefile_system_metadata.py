@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hs_core', '0037_coverage_bounding_box'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcefile',
+            name='_checksum',
+            field=models.CharField(max_length=32, null=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='resourcefile',
+            name='_modified_time',
+            field=models.DateTimeField(null=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='resourcefile',
+            name='_size',
+            field=models.BigIntegerField(default=-1),
+        ),
+    ]
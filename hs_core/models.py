@@ -2,6 +2,7 @@
 
 import os.path
 import json
+import hashlib
 import arrow
 import logging
 from uuid import uuid4
@@ -17,7 +18,7 @@ from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.auth.models import User, Group
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
-from django.db.models import Q
+from django.db.models import Q, Sum
 from django.db.models.signals import post_save
 from django.db import transaction
 from django.dispatch import receiver
@@ -38,7 +39,9 @@ from mezzanine.pages.managers import PageManager
 
 from dominate.tags import div, legend, table, tbody, tr, th, td, h4
 
-from hs_core.irods import ResourceIRODSMixin, ResourceFileIRODSMixin
+from hs_core import landing_page_cache
+from hs_core.irods import ResourceIRODSMixin, ResourceFileIRODSMixin, data_object_md5, \
+    list_data_objects
 
 
 class GroupOwnership(models.Model):
@@ -1013,10 +1016,42 @@ class Coverage(AbstractMetaDataElement):
     term = 'Coverage'
     type = models.CharField(max_length=20, choices=COVERAGE_TYPES)
 
+    # numeric bounding box of box and point coverages, derived from _value on save so that
+    # spatial queries can use indexed range predicates (null for period coverages and
+    # for coverages with unparseable coordinates)
+    bbox_xmin = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    bbox_xmax = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    bbox_ymin = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    bbox_ymax = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+
     def __unicode__(self):
         """Return {type} {value} for unicode representation."""
         return "{type} {value}".format(type=self.type, value=self._value)
 
+    def save(self, *args, **kwargs):
+        """Keep the bounding box columns in sync with the coverage value."""
+        self.bbox_xmin, self.bbox_ymin, self.bbox_xmax, self.bbox_ymax = self.get_bounding_box()
+        super(Coverage, self).save(*args, **kwargs)
+
+    def get_bounding_box(self):
+        """Return (xmin, ymin, xmax, ymax) of a box or point coverage.
+
+        All four are None for period coverages or if the coordinates are not numeric.
+        """
+        try:
+            value = json.loads(self._value)
+            if self.type == 'box':
+                xs = (float(value['eastlimit']), float(value['westlimit']))
+                ys = (float(value['southlimit']), float(value['northlimit']))
+            elif self.type == 'point':
+                xs = (float(value['east']),)
+                ys = (float(value['north']),)
+            else:
+                return None, None, None, None
+        except (ValueError, TypeError, KeyError):
+            return None, None, None, None
+        return min(xs), min(ys), max(xs), max(ys)
+
     class Meta:
         """Define meta properties for Coverage model."""
 
@@ -1806,6 +1841,7 @@ class AbstractResource(ResourcePermissionsMixin, ResourceIRODSMixin):
         # new resource, in which case, set_quota_holder to the new user fails
         validate_user_quota(new_holder, self.size)
         self.setAVU("quotaUserName", new_holder.username)
+        landing_page_cache.invalidate([self.id])
 
     def get_quota_holder(self):
         """Get quota holder of the resource.
@@ -2339,17 +2375,29 @@ class AbstractResource(ResourcePermissionsMixin, ResourceIRODSMixin):
                 print(msg)
             if log_errors:
                 logger.info(msg)
+            return errors, ecount
+
+        # one recursive listing of the resource collection, which is compared with Django in
+        # memory; None if the collection does not exist
+        def list_irods_paths():
+            try:
+                return set(os.path.join(self.root_path, f.name) for f in
+                           list_data_objects(istorage, self.root_path, recursive=True))
+            except SessionException:
+                return None
+
+        irods_paths = list_irods_paths()
 
         # skip resources that do not exist in iRODS
-        elif not istorage.exists(self.root_path):
-                msg = "root path {} does not exist in iRODS".format(self.root_path)
-                ecount += 1
-                if echo_errors:
-                    print(msg)
-                if log_errors:
-                    logger.error(msg)
-                if return_errors:
-                    errors.append(msg)
+        if irods_paths is None:
+            msg = "root path {} does not exist in iRODS".format(self.root_path)
+            ecount += 1
+            if echo_errors:
+                print(msg)
+            if log_errors:
+                logger.error(msg)
+            if return_errors:
+                errors.append(msg)
 
         else:
             # Step 1: repair irods user file paths if necessary
@@ -2361,10 +2409,14 @@ class AbstractResource(ResourcePermissionsMixin, ResourceIRODSMixin):
                                                                 return_actions=False)
                     errors.extend(error2)
                     ecount += ecount2
+                    if ecount2 > 0:
+                        irods_paths = list_irods_paths() or set()
 
             # Step 2: does every file here refer to an existing file in iRODS?
+            django_paths = set()
             for f in self.files.all():
-                if not istorage.exists(f.storage_path):
+                django_paths.add(f.storage_path)
+                if f.storage_path not in irods_paths:
                     ecount += 1
                     msg = "check_irods_files: django file {} does not exist in iRODS"\
                         .format(f.storage_path)
@@ -2382,14 +2434,27 @@ class AbstractResource(ResourcePermissionsMixin, ResourceIRODSMixin):
                         raise ValidationError(msg)
 
             # Step 3: does every iRODS file correspond to a record in files?
-            error2, ecount2 = self.__check_irods_directory(self.file_path, logger,
-                                                           stop_on_error=stop_on_error,
-                                                           log_errors=log_errors,
-                                                           echo_errors=echo_errors,
-                                                           return_errors=return_errors,
-                                                           clean=clean_irods)
-            errors.extend(error2)
-            ecount += ecount2
+            for fullpath in sorted(irods_paths):
+                if not fullpath.startswith(self.file_path + '/') or fullpath in django_paths:
+                    continue
+                ecount += 1
+                msg = "check_irods_files: file {} in iRODs does not exist in Django"\
+                    .format(fullpath)
+                if clean_irods:
+                    try:
+                        istorage.delete(fullpath)
+                        msg += " (DELETED FROM IRODS)"
+                    except SessionException as ex:
+                        msg += ": (CANNOT DELETE: {})"\
+                            .format(ex.stderr)
+                if echo_errors:
+                    print(msg)
+                if log_errors:
+                    logger.error(msg)
+                if return_errors:
+                    errors.append(msg)
+                if stop_on_error:
+                    raise ValidationError(msg)
 
             # Step 4: check whether the iRODS public flag agrees with Django
             django_public = self.raccess.public
@@ -2459,66 +2524,6 @@ class AbstractResource(ResourcePermissionsMixin, ResourceIRODSMixin):
 
         return errors, ecount  # empty unless return_errors=True
 
-    def __check_irods_directory(self, dir, logger,
-                                stop_on_error=False, log_errors=True,
-                                echo_errors=False, return_errors=False,
-                                clean=False):
-        """List a directory and check files there for conformance with django ResourceFiles.
-
-        :param stop_on_error: whether to raise a ValidationError exception on first error
-        :param log_errors: whether to log errors to Django log
-        :param echo_errors: whether to print errors on stdout
-        :param return_errors: whether to collect errors in an array and return them.
-
-        """
-        errors = []
-        ecount = 0
-        istorage = self.get_irods_storage()
-        try:
-            listing = istorage.listdir(dir)
-            for fname in listing[1]:  # files
-                fullpath = os.path.join(dir, fname)
-                found = False
-                for f in self.files.all():
-                    if f.storage_path == fullpath:
-                        found = True
-                        break
-                if not found:
-                    ecount += 1
-                    msg = "check_irods_files: file {} in iRODs does not exist in Django"\
-                        .format(fullpath)
-                    if clean:
-                        try:
-                            istorage.delete(fullpath)
-                            msg += " (DELETED FROM IRODS)"
-                        except SessionException as ex:
-                            msg += ": (CANNOT DELETE: {})"\
-                                .format(ex.stderr)
-                    if echo_errors:
-                        print(msg)
-                    if log_errors:
-                        logger.error(msg)
-                    if return_errors:
-                        errors.append(msg)
-                    if stop_on_error:
-                        raise ValidationError(msg)
-
-            for dname in listing[0]:  # directories
-                error2, ecount2 = self.__check_irods_directory(os.path.join(dir, dname), logger,
-                                                               stop_on_error=stop_on_error,
-                                                               echo_errors=echo_errors,
-                                                               log_errors=log_errors,
-                                                               return_errors=return_errors,
-                                                               clean=clean)
-                errors.extend(error2)
-                ecount += ecount2
-
-        except SessionException:
-            pass  # not an error not to have a file directory.
-            # Non-existence of files is checked elsewhere.
-
-        return errors, ecount  # empty unless return_errors=True
-
 
 def get_path(instance, filename, folder=None):
     """Get a path from a ResourceFile, filename, and folder.
@@ -2622,6 +2627,13 @@ class ResourceFile(ResourceFileIRODSMixin):
     # DEPRECATED: use native size routine
     # fed_resource_file_size = models.CharField(max_length=15, null=True, blank=True)
 
+    # The size, iRODS modification time and MD5 of the file, recorded when it is stored so that
+    # reading them doesn't need iRODS; see set_system_metadata and the size, modified_time and
+    # checksum properties. A size of -1 has not been recorded yet.
+    _size = models.BigIntegerField(default=-1)
+    _modified_time = models.DateTimeField(null=True, blank=True)
+    _checksum = models.CharField(max_length=32, null=True, blank=True)
+
     # we are using GenericForeignKey to allow resource file to be associated with any
     # HydroShare defined LogicalFile types (e.g., GeoRasterFile, NetCdfFile etc)
     logical_file_object_id = models.PositiveIntegerField(null=True, blank=True)
@@ -2682,9 +2694,15 @@ class ResourceFile(ResourceFileIRODSMixin):
         kwargs['content_object'] = resource
 
         kwargs['file_folder'] = folder
+        checksum = None
 
         # if file is an open file, use native copy by setting appropriate variables
         if isinstance(file, File):
+            # the file is local, so its MD5 is cheap to compute here
+            digest = hashlib.md5()
+            for chunk in file.chunks():
+                digest.update(chunk)
+            checksum = digest.hexdigest()
             if resource.is_federated:
                 kwargs['resource_file'] = None
                 kwargs['fed_resource_file'] = file
@@ -2734,7 +2752,15 @@ class ResourceFile(ResourceFileIRODSMixin):
         # Actually create the file record
         # when file is a File, the file is copied to storage in this step
         # otherwise, the copy must precede this step.
-        return ResourceFile.objects.create(**kwargs)
+        resource_file = ResourceFile.objects.create(**kwargs)
+        try:
+            resource_file.set_system_metadata(checksum=checksum)
+        except SessionException as ex:
+            # recorded later, on demand or by the verify_resource_files task
+            logger = logging.getLogger(__name__)
+            logger.warn("size of {} not recorded: {}".format(resource_file.storage_path,
+                                                             ex.stderr))
+        return resource_file
 
     # TODO: automagically handle orphaned logical files
     def delete(self):
@@ -2756,20 +2782,34 @@ class ResourceFile(ResourceFileIRODSMixin):
         """Return content_object representing the resource from a resource file."""
         return self.content_object
 
-    # TODO: write unit test
     @property
     def size(self):
-        """Retturn file size for federated or non-federated files."""
-        if self.resource.resource_federation_path:
-            if __debug__:
-                assert self.resource_file.name is None or \
-                    self.resource_file.name == ''
-            return self.fed_resource_file.size
-        else:
-            if __debug__:
-                assert self.fed_resource_file.name is None or \
-                    self.fed_resource_file.name == ''
-            return self.resource_file.size
+        """Return file size for federated or non-federated files.
+
+        This is the size recorded when the file was stored; it is only read from iRODS
+        if it has not been recorded yet.
+        """
+        if self._size < 0:
+            self.set_system_metadata()
+        return self._size
+
+    @property
+    def modified_time(self):
+        """Return the modification time of the file in iRODS, to the minute."""
+        if self._size < 0:
+            self.set_system_metadata()
+        return self._modified_time
+
+    @property
+    def checksum(self):
+        """Return the MD5 of the file, computing it from iRODS if it is not recorded yet."""
+        if self._checksum is None:
+            if self._size < 0:
+                self.set_system_metadata()
+            istorage = self.resource.get_irods_storage()
+            self.record_system_metadata(self._size, self._modified_time,
+                                        data_object_md5(istorage, self.storage_path))
+        return self._checksum
 
     # TODO: write unit test
     @property
@@ -3398,11 +3438,15 @@ class BaseResource(Page, AbstractResource):
         resourcemetadata.xml, systemmetadata.xml are not included in this
         size estimate.
 
+        The sizes are the ones recorded in ResourceFile; only the files whose size is not
+        recorded yet are looked up in iRODS.
+
         Raises SessionException if iRODS fails.
         """
+        for f in self.files.filter(_size__lt=0):
+            f.set_system_metadata()
         # compute the total file size for the resource
-        f_sizes = [f.size for f in self.files.all()]
-        return sum(f_sizes)
+        return self.files.aggregate(total=Sum('_size'))['total'] or 0
 
     @property
     def verbose_name(self):
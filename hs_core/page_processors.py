@@ -10,7 +10,7 @@ from django.forms.models import formset_factory
 from mezzanine.pages.page_processors import processor_for
 
 from hs_core.models import GenericResource, Relation
-from hs_core import languages_iso
+from hs_core import languages_iso, landing_page_cache
 from forms import CreatorForm, ContributorForm, SubjectsForm, AbstractForm, RelationForm, \
     SourceForm, FundingAgencyForm, BaseCreatorFormSet, BaseContributorFormSet, BaseFormSet, \
     MetaDataElementDeleteForm, CoverageTemporalForm, CoverageSpatialForm, ExtendedMetadataForm
@@ -72,27 +72,11 @@ def get_page_context(page, user, resource_edit=False, extended_metadata_layout=N
     if not can_view:
         raise PermissionDenied()
 
-    discoverable = content_model.raccess.discoverable
     validation_error = None
     resource_is_mine = False
     if user.is_authenticated():
         resource_is_mine = content_model.rlabels.is_mine(user)
 
-    metadata_status = _get_metadata_status(content_model)
-
-    belongs_to_collections = content_model.collections.all()
-
-    relevant_tools = None
-    tool_homepage_url = None
-    if not resource_edit:  # In view mode
-        landing_page_res_obj = content_model
-        landing_page_res_type_str = landing_page_res_obj.resource_type
-        if landing_page_res_type_str.lower() == "toolresource":
-            if landing_page_res_obj.metadata.app_home_page_url:
-                tool_homepage_url = content_model.metadata.app_home_page_url.value
-        else:
-            relevant_tools = resource_level_tool_urls(landing_page_res_obj, request)
-
     just_created = False
     just_copied = False
     create_resource_error = None
@@ -116,8 +100,6 @@ def get_page_context(page, user, resource_edit=False, extended_metadata_layout=N
         if 'just_published' in request.session:
             del request.session['just_published']
 
-    bag_url = content_model.bag_url
-
     if user.is_authenticated():
         show_content_files = user.uaccess.can_view_resource(content_model)
     else:
@@ -127,96 +109,32 @@ def get_page_context(page, user, resource_edit=False, extended_metadata_layout=N
 
     allow_copy = can_user_copy_resource(content_model, user)
 
-    qholder = content_model.get_quota_holder()
-
     # user requested the resource in READONLY mode
     if not resource_edit:
-        temporal_coverages = content_model.metadata.coverages.all().filter(type='period')
-        if len(temporal_coverages) > 0:
-            temporal_coverage_data_dict = {}
-            temporal_coverage = temporal_coverages[0]
-            start_date = parser.parse(temporal_coverage.value['start'])
-            end_date = parser.parse(temporal_coverage.value['end'])
-            temporal_coverage_data_dict['start_date'] = start_date.strftime('%Y-%m-%d')
-            temporal_coverage_data_dict['end_date'] = end_date.strftime('%Y-%m-%d')
-            temporal_coverage_data_dict['name'] = temporal_coverage.value.get('name', '')
-        else:
-            temporal_coverage_data_dict = None
-
-        spatial_coverages = content_model.metadata.coverages.all().exclude(type='period')
-
-        if len(spatial_coverages) > 0:
-            spatial_coverage_data_dict = {}
-            spatial_coverage = spatial_coverages[0]
-            spatial_coverage_data_dict['name'] = spatial_coverage.value.get('name', None)
-            spatial_coverage_data_dict['units'] = spatial_coverage.value['units']
-            spatial_coverage_data_dict['zunits'] = spatial_coverage.value.get('zunits', None)
-            spatial_coverage_data_dict['projection'] = spatial_coverage.value.get('projection',
-                                                                                  None)
-            spatial_coverage_data_dict['type'] = spatial_coverage.type
-            if spatial_coverage.type == 'point':
-                spatial_coverage_data_dict['east'] = spatial_coverage.value['east']
-                spatial_coverage_data_dict['north'] = spatial_coverage.value['north']
-                spatial_coverage_data_dict['elevation'] = spatial_coverage.value.get('elevation',
-                                                                                     None)
-            else:
-                spatial_coverage_data_dict['northlimit'] = spatial_coverage.value['northlimit']
-                spatial_coverage_data_dict['eastlimit'] = spatial_coverage.value['eastlimit']
-                spatial_coverage_data_dict['southlimit'] = spatial_coverage.value['southlimit']
-                spatial_coverage_data_dict['westlimit'] = spatial_coverage.value['westlimit']
-                spatial_coverage_data_dict['uplimit'] = spatial_coverage.value.get('uplimit', None)
-                spatial_coverage_data_dict['downlimit'] = spatial_coverage.value.get('downlimit',
-                                                                                     None)
-        else:
-            spatial_coverage_data_dict = None
+        # the part of the context that is the same for every user is cached per resource
+        context = dict(landing_page_cache.get_context(
+            content_model.id, partial(_get_readonly_page_context, content_model)))
 
-        keywords = ",".join([sub.value for sub in content_model.metadata.subjects.all()])
-        languages_dict = dict(languages_iso.languages)
-        language = languages_dict[content_model.metadata.language.code] if \
-            content_model.metadata.language else None
-        title = content_model.metadata.title.value if content_model.metadata.title else None
-        abstract = content_model.metadata.description.abstract if \
-            content_model.metadata.description else None
+        relevant_tools = None
+        if content_model.resource_type.lower() != "toolresource":
+            relevant_tools = resource_level_tool_urls(content_model, request)
 
-        missing_metadata_elements = content_model.metadata.get_required_missing_elements()
-
-        context = {
+        context.update({
                    'resource_edit_mode': resource_edit,
                    'metadata_form': None,
-                   'citation': content_model.get_citation(),
-                   'title': title,
-                   'abstract': abstract,
-                   'creators': content_model.metadata.creators.all(),
-                   'contributors': content_model.metadata.contributors.all(),
-                   'temporal_coverage': temporal_coverage_data_dict,
-                   'spatial_coverage': spatial_coverage_data_dict,
-                   'language': language,
-                   'keywords': keywords,
-                   'rights': content_model.metadata.rights,
-                   'sources': content_model.metadata.sources.all(),
-                   'relations': content_model.metadata.relations.all(),
-                   'show_relations_section': show_relations_section(content_model),
-                   'fundingagencies': content_model.metadata.funding_agencies.all(),
-                   'metadata_status': metadata_status,
-                   'missing_metadata_elements': missing_metadata_elements,
                    'validation_error': validation_error if validation_error else None,
                    'resource_creation_error': create_resource_error,
                    'relevant_tools': relevant_tools,
-                   'tool_homepage_url': tool_homepage_url,
                    'file_type_error': file_type_error,
                    'just_created': just_created,
                    'just_copied': just_copied,
                    'just_published': just_published,
-                   'bag_url': bag_url,
                    'show_content_files': show_content_files,
-                   'discoverable': discoverable,
                    'resource_is_mine': resource_is_mine,
                    'allow_resource_copy': allow_copy,
                    'is_resource_specific_tab_active': False,
-                   'quota_holder': qholder,
-                   'belongs_to_collections': belongs_to_collections,
                    'current_user': user
-        }
+        })
 
         if 'task_id' in request.session:
             task_id = request.session.get('task_id', None)
@@ -239,6 +157,12 @@ def get_page_context(page, user, resource_edit=False, extended_metadata_layout=N
     if not can_change:
         raise PermissionDenied()
 
+    discoverable = content_model.raccess.discoverable
+    metadata_status = _get_metadata_status(content_model)
+    belongs_to_collections = content_model.collections.all()
+    bag_url = content_model.bag_url
+    qholder = content_model.get_quota_holder()
+
     add_creator_modal_form = CreatorForm(allow_edit=can_change, res_short_id=content_model.short_id)
     add_contributor_modal_form = ContributorForm(allow_edit=can_change,
                                                  res_short_id=content_model.short_id)
@@ -462,3 +386,82 @@ def _get_metadata_status(resource):
         metadata_status = METADATA_STATUS_INSUFFICIENT
 
     return metadata_status
+
+
+def _get_readonly_page_context(content_model):
+    """Return the part of the READONLY mode context that is the same for every user.
+
+    Querysets are evaluated so that the context can be cached (see hs_core.landing_page_cache).
+    """
+    metadata = content_model.metadata
+
+    tool_homepage_url = None
+    if content_model.resource_type.lower() == "toolresource":
+        if metadata.app_home_page_url:
+            tool_homepage_url = metadata.app_home_page_url.value
+
+    temporal_coverages = metadata.coverages.all().filter(type='period')
+    if len(temporal_coverages) > 0:
+        temporal_coverage_data_dict = {}
+        temporal_coverage = temporal_coverages[0]
+        start_date = parser.parse(temporal_coverage.value['start'])
+        end_date = parser.parse(temporal_coverage.value['end'])
+        temporal_coverage_data_dict['start_date'] = start_date.strftime('%Y-%m-%d')
+        temporal_coverage_data_dict['end_date'] = end_date.strftime('%Y-%m-%d')
+        temporal_coverage_data_dict['name'] = temporal_coverage.value.get('name', '')
+    else:
+        temporal_coverage_data_dict = None
+
+    spatial_coverages = metadata.coverages.all().exclude(type='period')
+
+    if len(spatial_coverages) > 0:
+        spatial_coverage_data_dict = {}
+        spatial_coverage = spatial_coverages[0]
+        spatial_coverage_data_dict['name'] = spatial_coverage.value.get('name', None)
+        spatial_coverage_data_dict['units'] = spatial_coverage.value['units']
+        spatial_coverage_data_dict['zunits'] = spatial_coverage.value.get('zunits', None)
+        spatial_coverage_data_dict['projection'] = spatial_coverage.value.get('projection', None)
+        spatial_coverage_data_dict['type'] = spatial_coverage.type
+        if spatial_coverage.type == 'point':
+            spatial_coverage_data_dict['east'] = spatial_coverage.value['east']
+            spatial_coverage_data_dict['north'] = spatial_coverage.value['north']
+            spatial_coverage_data_dict['elevation'] = spatial_coverage.value.get('elevation', None)
+        else:
+            spatial_coverage_data_dict['northlimit'] = spatial_coverage.value['northlimit']
+            spatial_coverage_data_dict['eastlimit'] = spatial_coverage.value['eastlimit']
+            spatial_coverage_data_dict['southlimit'] = spatial_coverage.value['southlimit']
+            spatial_coverage_data_dict['westlimit'] = spatial_coverage.value['westlimit']
+            spatial_coverage_data_dict['uplimit'] = spatial_coverage.value.get('uplimit', None)
+            spatial_coverage_data_dict['downlimit'] = spatial_coverage.value.get('downlimit', None)
+    else:
+        spatial_coverage_data_dict = None
+
+    keywords = ",".join([sub.value for sub in metadata.subjects.all()])
+    languages_dict = dict(languages_iso.languages)
+    language = languages_dict[metadata.language.code] if metadata.language else None
+    title = metadata.title.value if metadata.title else None
+    abstract = metadata.description.abstract if metadata.description else None
+
+    return {
+               'citation': content_model.get_citation(),
+               'title': title,
+               'abstract': abstract,
+               'creators': list(metadata.creators.all()),
+               'contributors': list(metadata.contributors.all()),
+               'temporal_coverage': temporal_coverage_data_dict,
+               'spatial_coverage': spatial_coverage_data_dict,
+               'language': language,
+               'keywords': keywords,
+               'rights': metadata.rights,
+               'sources': list(metadata.sources.all()),
+               'relations': list(metadata.relations.all()),
+               'show_relations_section': show_relations_section(content_model),
+               'fundingagencies': list(metadata.funding_agencies.all()),
+               'metadata_status': _get_metadata_status(content_model),
+               'missing_metadata_elements': metadata.get_required_missing_elements(),
+               'tool_homepage_url': tool_homepage_url,
+               'bag_url': content_model.bag_url,
+               'discoverable': content_model.raccess.discoverable,
+               'quota_holder': content_model.get_quota_holder(),
+               'belongs_to_collections': list(content_model.collections.all())
+    }
@@ -1,8 +1,12 @@
 """Signal receivers for the hs_core app."""
 
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
+from hs_access_control.models import ResourceAccess, UserResourcePrivilege, \
+    GroupResourcePrivilege
+from hs_core import landing_page_cache
 from hs_core.signals import pre_metadata_element_create, pre_metadata_element_update
-from hs_core.models import GenericResource
+from hs_core.models import GenericResource, BaseResource, AbstractMetaDataElement
 from forms import SubjectsForm, AbstractValidationForm, CreatorValidationForm, \
     ContributorValidationForm, RelationValidationForm, SourceValidationForm, RightsValidationForm, \
     LanguageValidationForm, ValidDateValidationForm, FundingAgencyValidationForm, \
@@ -120,3 +124,36 @@ def metadata_element_pre_update_handler(sender, **kwargs):
     else:
         # TODO: need to return form errors
         return {'is_valid': False, 'element_data_dict': None}
+
+
+@receiver([post_save, post_delete])
+def metadata_element_changed(sender, instance, **kwargs):
+    """Forget the cached landing page of the resource described by a changed metadata element.
+
+    Elements of the metadata of logical files describe no resource and are ignored.
+    """
+    if not isinstance(instance, AbstractMetaDataElement):
+        return
+    resource_ids = BaseResource.objects.filter(content_type_id=instance.content_type_id,
+                                               object_id=instance.object_id)\
+                                       .values_list('id', flat=True)
+    landing_page_cache.invalidate(resource_ids)
+
+
+@receiver([post_save, post_delete], sender=ResourceAccess)
+@receiver([post_save, post_delete], sender=UserResourcePrivilege)
+@receiver([post_save, post_delete], sender=GroupResourcePrivilege)
+def resource_sharing_changed(sender, instance, **kwargs):
+    """Forget the cached landing page of a resource whose flags or privileges changed."""
+    landing_page_cache.invalidate([instance.resource_id])
+
+
+@receiver(m2m_changed, sender=BaseResource.collections.through)
+def collection_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Forget the cached landing pages of collections and the resources added or removed."""
+    if action == 'pre_clear':
+        related = instance.resources if reverse else instance.collections
+        pk_set = related.values_list('id', flat=True)
+    elif action not in ('post_add', 'post_remove'):
+        return
+    landing_page_cache.invalidate([instance.id] + list(pk_set))
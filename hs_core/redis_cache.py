@@ -0,0 +1,84 @@
+"""
+Django cache backend storing values in one of the redis connections of the settings, so that
+cached values, and their invalidation, are shared by all web and celery processes.
+
+LOCATION is the name of the setting holding the redis connection, e.g.
+
+    CACHES = {
+        'shared': {
+            'BACKEND': 'hs_core.redis_cache.RedisCache',
+            'LOCATION': 'SHARED_CACHE_DB',
+        },
+    }
+
+Values are pickled, as the other Django cache backends do.
+"""
+
+import math
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+
+class RedisCache(BaseCache):
+
+    def __init__(self, location, params):
+        super(RedisCache, self).__init__(params)
+        self._setting_name = location
+
+    @property
+    def _db(self):
+        # looked up on each use, so that tests can override the setting
+        return getattr(settings, self._setting_name)
+
+    def _seconds(self, timeout):
+        """ Return the seconds before a value expires, None for never """
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(int(math.ceil(timeout)), 0)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        seconds = self._seconds(timeout)
+        if seconds == 0:
+            return False
+        return bool(self._db.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                                 ex=seconds, nx=True))
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        value = self._db.get(key)
+        if value is None:
+            return default
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        seconds = self._seconds(timeout)
+        if seconds == 0:
+            self._db.delete(key)
+        else:
+            self._db.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=seconds)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.delete(key)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return bool(self._db.exists(key))
+
+    def clear(self):
+        self._db.flushdb()
@@ -1,20 +1,241 @@
 """Define search indexes for hs_core module."""
 
 from haystack import indexes
-from hs_core.models import BaseResource
+from hs_core.discovery_tiles import point_cells
+from hs_core.models import BaseResource, CoreMetaData
 from hs_geographic_feature_resource.models import GeographicFeatureMetaData
 from hs_app_netCDF.models import NetcdfMetaData
 from ref_ts.models import RefTSMetadata
 from hs_app_timeseries.models import TimeSeriesMetaData
 from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.template import loader
+from django.utils.functional import cached_property
 from datetime import datetime
 from nameparser import HumanName
 
+try:
+    from django.db.models import prefetch_related_objects
+except ImportError:  # Django < 1.10
+    from django.db.models.query import prefetch_related_objects as _prefetch_related_objects
+
+    def prefetch_related_objects(model_instances, *related_lookups):
+        """Prefetch related_lookups for model_instances, with the signature of Django 1.10."""
+        _prefetch_related_objects(model_instances, related_lookups)
+
+
+TEXT_TEMPLATE = 'search/indexes/hs_core/baseresource_text.txt'
+
+# the relations of each type of metadata that the index fields are prepared from
+METADATA_RELATIONS = (
+    (CoreMetaData, ('_title', '_description', 'creators', 'contributors', 'subjects',
+                    'coverages', 'formats', 'identifiers', '_language', 'sources',
+                    'relations', '_publisher')),
+    (GeographicFeatureMetaData, ('geometryinformations', 'fieldinformations')),
+    (NetcdfMetaData, ('variables',)),
+    (RefTSMetadata, ('sites', 'variables', 'methods', 'quality_levels', 'datasources')),
+    (TimeSeriesMetaData, ('_sites', '_variables', '_methods', '_time_series_results')),
+)
+
+
+def prefetch_index_data(resources):
+    """Prefetch the metadata of resources and the relations of the metadata.
+
+    The metadata of resources of different types are of different classes, so the relations
+    are prefetched for each class of metadata separately.
+    """
+    prefetch_related_objects(resources, 'content_object')
+    metadata_by_class = {}
+    for resource in resources:
+        if resource.content_object is not None:
+            metadata_by_class.setdefault(type(resource.content_object), []).append(
+                resource.content_object)
+    for metadata_class, metadata in metadata_by_class.items():
+        lookups = [lookup for cls, relations in METADATA_RELATIONS
+                   if issubclass(metadata_class, cls) for lookup in relations]
+        if lookups:
+            prefetch_related_objects(metadata, *lookups)
+
+
+class ResourceIndexQuerySet(QuerySet):
+    """Resources whose metadata are prefetched when they are fetched.
+
+    haystack slices the queryset of an index into batches, so the relations are prefetched
+    for each batch, with one query per relation.
+    """
+
+    def _fetch_all(self):
+        fetched = self._result_cache is not None
+        super(ResourceIndexQuerySet, self)._fetch_all()
+        # values() and values_list() return no resources
+        if not fetched and self._result_cache and \
+                isinstance(self._result_cache[0], self.model):
+            prefetch_index_data(self._result_cache)
+
+
+def first_element(elements):
+    """Return the element of a list of related objects that QuerySet.first() would."""
+    if not elements:
+        return None
+    if elements[0]._meta.ordering:
+        return elements[0]
+    return min(elements, key=lambda element: element.pk)
+
+
+_verbose_names = {}
+
+
+def resource_type_verbose_name(resource):
+    """Return the verbose name of the type of a resource, without fetching its content model."""
+    if not _verbose_names:
+        from hs_core.hydroshare.utils import get_resource_types
+        for model in get_resource_types():
+            _verbose_names[model.__name__] = model._meta.verbose_name
+    if resource.resource_type in _verbose_names:
+        return _verbose_names[resource.resource_type]
+    return resource.verbose_name
+
+
+class ResourceIndexData(object):
+    """The metadata and access lists of a resource, each read once for all index fields."""
+
+    def __init__(self, resource):
+        self.resource = resource
+
+    @cached_property
+    def metadata(self):
+        # resource.metadata fetches the resource again and creates missing metadata
+        return self.resource.content_object or self.resource.metadata
+
+    def _all(self, name):
+        """Return the elements of a relation of the metadata as a list."""
+        elements = getattr(self.metadata, name, None)
+        if elements is None:
+            return []
+        if not isinstance(elements, QuerySet):
+            elements = elements.all()
+        return list(elements)
+
+    def _users(self, name):
+        """Return the users with a privilege over the resource as a list."""
+        if hasattr(self.resource, 'raccess'):
+            return list(getattr(self.resource.raccess, name).all())
+        return []
+
+    @cached_property
+    def title(self):
+        return first_element(self._all('_title'))
+
+    @cached_property
+    def description(self):
+        return first_element(self._all('_description'))
+
+    @cached_property
+    def language(self):
+        return first_element(self._all('_language'))
+
+    @cached_property
+    def publisher(self):
+        return first_element(self._all('_publisher'))
+
+    @cached_property
+    def creators(self):
+        return self._all('creators')
+
+    @cached_property
+    def first_creator(self):
+        return first_element([creator for creator in self.creators if creator.order == 1])
+
+    @cached_property
+    def contributors(self):
+        return self._all('contributors')
+
+    @cached_property
+    def subjects(self):
+        return self._all('subjects')
+
+    @cached_property
+    def coverages(self):
+        return self._all('coverages')
+
+    @cached_property
+    def formats(self):
+        return self._all('formats')
+
+    @cached_property
+    def identifiers(self):
+        return self._all('identifiers')
+
+    @cached_property
+    def sources(self):
+        return self._all('sources')
+
+    @cached_property
+    def relations(self):
+        return self._all('relations')
+
+    @cached_property
+    def geometry_information(self):
+        return first_element(self._all('geometryinformations'))
+
+    @cached_property
+    def field_information(self):
+        return first_element(self._all('fieldinformations'))
+
+    @cached_property
+    def variables(self):
+        return self._all('variables')
+
+    @cached_property
+    def sites(self):
+        return self._all('sites')
+
+    @cached_property
+    def methods(self):
+        return self._all('methods')
+
+    @cached_property
+    def quality_levels(self):
+        return self._all('quality_levels')
+
+    @cached_property
+    def data_sources(self):
+        return self._all('datasources')
+
+    @cached_property
+    def time_series_results(self):
+        return self._all('time_series_results')
+
+    @cached_property
+    def owners(self):
+        return self._users('owners')
+
+    @cached_property
+    def viewers(self):
+        return self._users('view_users')
+
+    @cached_property
+    def editors(self):
+        return self._users('edit_users')
+
+    @cached_property
+    def verbose_name(self):
+        return resource_type_verbose_name(self.resource)
+
+
+def get_index_data(obj):
+    """Return the ResourceIndexData of the resource being prepared."""
+    data = getattr(obj, '_index_data', None)
+    if data is None:
+        data = ResourceIndexData(obj)
+    return data
+
 
 class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
     """Define base class for resource indexes."""
 
-    text = indexes.CharField(document=True, use_template=True)
+    # rendered from TEXT_TEMPLATE by prepare_text
+    text = indexes.CharField(document=True)
     short_id = indexes.CharField(model_attr='short_id')
     doi = indexes.CharField(model_attr='doi', null=True)
     author = indexes.CharField(faceted=True)
@@ -46,6 +267,8 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
     coverage_westlimit = indexes.FloatField()
     coverage_start_date = indexes.DateField()
     coverage_end_date = indexes.DateField()
+    # map cells of point coverages, faceted for the discovery map tiles
+    coverage_cells = indexes.MultiValueField(faceted=True, indexed=False)
     formats = indexes.MultiValueField()
     identifiers = indexes.MultiValueField()
     language = indexes.CharField(faceted=True)
@@ -86,126 +309,119 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
         return BaseResource
 
     def index_queryset(self, using=None):
-        """Return queryset including discoverable and public resources."""
-        return self.get_model().objects.filter(Q(raccess__discoverable=True) |
-                                               Q(raccess__public=True))
+        """Return queryset including discoverable and public resources.
+
+        The metadata of the resources are prefetched in bulk when the queryset is fetched.
+        """
+        return ResourceIndexQuerySet(model=BaseResource) \
+            .filter(Q(raccess__discoverable=True) | Q(raccess__public=True)) \
+            .select_related('raccess')
+
+    def prepare(self, obj):
+        """Prepare all fields of a resource, reading each of its relations once."""
+        obj._index_data = ResourceIndexData(obj)
+        try:
+            return super(BaseResourceIndex, self).prepare(obj)
+        finally:
+            del obj._index_data
+
+    def prepare_text(self, obj):
+        """Return the text of the resource rendered from TEXT_TEMPLATE."""
+        return loader.get_template(TEXT_TEMPLATE).render({'object': obj,
+                                                          'data': get_index_data(obj)})
 
     def prepare_title(self, obj):
         """Return metadata title if exists, otherwise return none."""
-        if hasattr(obj, 'metadata') and obj.metadata.title.value is not None:
-            return obj.metadata.title.value.lstrip()
+        title = get_index_data(obj).title
+        if title is not None and title.value is not None:
+            return title.value.lstrip()
         else:
             return 'none'
 
     def prepare_abstract(self, obj):
         """Return metadata abstract if exists, otherwise return none."""
-        if hasattr(obj, 'metadata') and obj.metadata.description is not None and \
-                obj.metadata.description.abstract is not None:
-            return obj.metadata.description.abstract
+        description = get_index_data(obj).description
+        if description is not None and description.abstract is not None:
+            return description.abstract
         else:
             return 'none'
 
     def prepare_author(self, obj):
         """Return metadata author if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            first_creator = obj.metadata.creators.filter(order=1).first()
-            if first_creator.name is not None:
-                return first_creator.name.lstrip()
-            else:
-                return 'none'
+        first_creator = get_index_data(obj).first_creator
+        if first_creator is not None and first_creator.name is not None:
+            return first_creator.name.lstrip()
         else:
             return 'none'
 
     def prepare_author_normalized(self, obj):
         """Return metadata author if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            first_creator = obj.metadata.creators.filter(order=1).first()
-            if first_creator.name is not None:
-                nameparts = HumanName(first_creator.name.lstrip())
-                normalized = nameparts.last
-                if nameparts.suffix:
-                    normalized = normalized + ' ' + nameparts.suffix
-                normalized = normalized + ','
-                if nameparts.title:
-                    normalized = normalized + ' ' + nameparts.title
-                if nameparts.first:
-                    normalized = normalized + ' ' + nameparts.first
-                if nameparts.middle:
-                    normalized = ' ' + normalized + ' ' + nameparts.middle
-                return normalized
-            else:
-                return 'none'
+        first_creator = get_index_data(obj).first_creator
+        if first_creator is not None and first_creator.name is not None:
+            nameparts = HumanName(first_creator.name.lstrip())
+            normalized = nameparts.last
+            if nameparts.suffix:
+                normalized = normalized + ' ' + nameparts.suffix
+            normalized = normalized + ','
+            if nameparts.title:
+                normalized = normalized + ' ' + nameparts.title
+            if nameparts.first:
+                normalized = normalized + ' ' + nameparts.first
+            if nameparts.middle:
+                normalized = ' ' + normalized + ' ' + nameparts.middle
+            return normalized
         else:
             return 'none'
 
     # stored, unindexed field
     def prepare_author_description(self, obj):
         """Return metadata author description if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            first_creator = obj.metadata.creators.filter(order=1).first()
-            if first_creator.description is not None:
-                return first_creator.description
-            else:
-                return 'none'
+        first_creator = get_index_data(obj).first_creator
+        if first_creator is not None and first_creator.description is not None:
+            return first_creator.description
         else:
             return 'none'
 
     def prepare_creators(self, obj):
         """Return metadata creators if exists, otherwise return empty array."""
-        if hasattr(obj, 'metadata'):
-            return [creator.name for creator in obj.metadata.creators.all()
-                    .exclude(name__isnull=True)]
-        else:
-            return []
+        return [creator.name for creator in get_index_data(obj).creators
+                if creator.name is not None]
 
     def prepare_contributors(self, obj):
         """Return metadata contributors if exists, otherwise return empty array."""
-        if hasattr(obj, 'metadata'):
-            return [contributor.name for contributor in obj.metadata.contributors.all()
-                    .exclude(name__isnull=True)]
-        else:
-            return []
+        return [contributor.name for contributor in get_index_data(obj).contributors
+                if contributor.name is not None]
 
     def prepare_subjects(self, obj):
         """Return metadata subjects if exists, otherwise return empty array."""
-        if hasattr(obj, 'metadata'):
-            return [subject.value for subject in obj.metadata.subjects.all()
-                    .exclude(value__isnull=True)]
-        else:
-            return []
+        return [subject.value for subject in get_index_data(obj).subjects
+                if subject.value is not None]
 
     def prepare_organizations(self, obj):
         """Return metadata organizations if exists, otherwise return empty array."""
         organizations = []
         none = False  # only enter one value "none"
-        if hasattr(obj, 'metadata'):
-            for creator in obj.metadata.creators.all():
-                if(creator.organization is not None):
-                    organizations.append(creator.organization)
-                else:
-                    if not none:
-                        none = True
-                        organizations.append('none')
+        for creator in get_index_data(obj).creators:
+            if(creator.organization is not None):
+                organizations.append(creator.organization)
+            else:
+                if not none:
+                    none = True
+                    organizations.append('none')
         return organizations
 
     def prepare_publisher(self, obj):
         """Return metadata publisher if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            publisher = obj.metadata.publisher
-            if publisher is not None:
-                return publisher
-            else:
-                return 'none'
+        publisher = get_index_data(obj).publisher
+        if publisher is not None:
+            return publisher
         else:
             return 'none'
 
     def prepare_author_emails(self, obj):
         """Return metadata emails if exists, otherwise return empty array."""
-        if hasattr(obj, 'metadata'):
-            return [creator.email for creator in obj.metadata.creators.all()
-                    .exclude(email__isnull=True)]
-        else:
-            return []
+        return [creator.email for creator in get_index_data(obj).creators
+                if creator.email is not None]
 
     def prepare_discoverable(self, obj):
         """Return resource discoverability if exists, otherwise return False."""
@@ -239,430 +455,317 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
 
     def prepare_is_replaced_by(self, obj):
         """Return 'isReplacedBy' attribute if exists, otherwise return False."""
-        if hasattr(obj, 'metadata'):
-            return obj.metadata.relations.all().filter(type='isReplacedBy').exists()
-        else:
-            return False
+        return any(relation.type == 'isReplacedBy'
+                   for relation in get_index_data(obj).relations)
 
     def prepare_coverages(self, obj):
         """Return resource coverage if exists, otherwise return empty array."""
         # TODO: reject empty coverages
-        if hasattr(obj, 'metadata'):
-            return [coverage._value for coverage in obj.metadata.coverages.all()]
-        else:
-            return []
+        return [coverage._value for coverage in get_index_data(obj).coverages]
 
     def prepare_coverage_types(self, obj):
         """Return resource coverage types if exists, otherwise return empty array."""
-        if hasattr(obj, 'metadata'):
-            return [coverage.type for coverage in obj.metadata.coverages.all()]
-        else:
-            return []
+        return [coverage.type for coverage in get_index_data(obj).coverages]
 
     def prepare_coverage_east(self, obj):
         """Return resource coverage east bound if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
-                if coverage.type == 'point':
-                    return float(coverage.value["east"])
-                # TODO: this returns the box center, not the extent
-                elif coverage.type == 'box':
-                    return (float(coverage.value["eastlimit"]) +
-                            float(coverage.value["westlimit"])) / 2
-        else:
-            return 'none'
+        for coverage in get_index_data(obj).coverages:
+            if coverage.type == 'point':
+                return float(coverage.value["east"])
+            # TODO: this returns the box center, not the extent
+            elif coverage.type == 'box':
+                return (float(coverage.value["eastlimit"]) +
+                        float(coverage.value["westlimit"])) / 2
 
     def prepare_coverage_north(self, obj):
         """Return resource coverage north bound if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
-                if coverage.type == 'point':
-                    return float(coverage.value["north"])
-                # TODO: This returns the box center, not the extent
-                elif coverage.type == 'box':
-                    return (float(coverage.value["northlimit"]) +
-                            float(coverage.value["southlimit"])) / 2
-        else:
-            return 'none'
+        for coverage in get_index_data(obj).coverages:
+            if coverage.type == 'point':
+                return float(coverage.value["north"])
+            # TODO: This returns the box center, not the extent
+            elif coverage.type == 'box':
+                return (float(coverage.value["northlimit"]) +
+                        float(coverage.value["southlimit"])) / 2
 
     def prepare_coverage_northlimit(self, obj):
         """Return resource coverage north limit if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            # TODO: does not index properly if there are multiple coverages of the same type.
-            for coverage in obj.metadata.coverages.all():
-                if coverage.type == 'box':
-                    return coverage.value["northlimit"]
-        else:
-            return 'none'
+        # TODO: does not index properly if there are multiple coverages of the same type.
+        for coverage in get_index_data(obj).coverages:
+            if coverage.type == 'box':
+                return coverage.value["northlimit"]
 
     def prepare_coverage_eastlimit(self, obj):
         """Return resource coverage east limit if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            # TODO: does not index properly if there are multiple coverages of the same type.
-            for coverage in obj.metadata.coverages.all():
-                if coverage.type == 'box':
-                    return coverage.value["eastlimit"]
-        else:
-            return 'none'
+        # TODO: does not index properly if there are multiple coverages of the same type.
+        for coverage in get_index_data(obj).coverages:
+            if coverage.type == 'box':
+                return coverage.value["eastlimit"]
 
     def prepare_coverage_southlimit(self, obj):
         """Return resource coverage south limit if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            # TODO: does not index properly if there are multiple coverages of the same type.
-            for coverage in obj.metadata.coverages.all():
-                if coverage.type == 'box':
-                    return coverage.value["southlimit"]
-        else:
-            return 'none'
+        # TODO: does not index properly if there are multiple coverages of the same type.
+        for coverage in get_index_data(obj).coverages:
+            if coverage.type == 'box':
+                return coverage.value["southlimit"]
 
     def prepare_coverage_westlimit(self, obj):
         """Return resource coverage west limit if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            # TODO: does not index properly if there are multiple coverages of the same type.
-            for coverage in obj.metadata.coverages.all():
-                if coverage.type == 'box':
-                    return coverage.value["westlimit"]
-        else:
-            return 'none'
+        # TODO: does not index properly if there are multiple coverages of the same type.
+        for coverage in get_index_data(obj).coverages:
+            if coverage.type == 'box':
+                return coverage.value["westlimit"]
+
+    def prepare_coverage_cells(self, obj):
+        """Return the map cells of the point coverages of a resource (see discovery_tiles)."""
+        cells = set()
+        for coverage in get_index_data(obj).coverages:
+            if coverage.type == 'point':
+                cells.update(point_cells(float(coverage.value["east"]),
+                                         float(coverage.value["north"])))
+        return sorted(cells)
 
     # TODO: time coverages do not specify timezone, and timezone support is active.
 
     def prepare_coverage_start_date(self, obj):
         """Return resource coverage start date if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
-                if coverage.type == 'period':
-                    clean_date = coverage.value["start"][:10]
-                    if "/" in clean_date:
-                        parsed_date = clean_date.split("/")
-                        start_date = parsed_date[2] + '-' + parsed_date[0] + '-' + parsed_date[1]
-                    else:
-                        parsed_date = clean_date.split("-")
-                        start_date = parsed_date[0] + '-' + parsed_date[1] + '-' + parsed_date[2]
-                    start_date_object = datetime.strptime(start_date, '%Y-%m-%d')
-                    return start_date_object
-        else:
-            return 'none'
+        for coverage in get_index_data(obj).coverages:
+            if coverage.type == 'period':
+                clean_date = coverage.value["start"][:10]
+                if "/" in clean_date:
+                    parsed_date = clean_date.split("/")
+                    start_date = parsed_date[2] + '-' + parsed_date[0] + '-' + parsed_date[1]
+                else:
+                    parsed_date = clean_date.split("-")
+                    start_date = parsed_date[0] + '-' + parsed_date[1] + '-' + parsed_date[2]
+                start_date_object = datetime.strptime(start_date, '%Y-%m-%d')
+                return start_date_object
 
     def prepare_coverage_end_date(self, obj):
         """Return resource coverage end date if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
-                if coverage.type == 'period' and 'end' in coverage.value:
-                    clean_date = coverage.value["end"][:10]
-                    if "/" in clean_date:
-                        parsed_date = clean_date.split("/")
-                        end_date = parsed_date[2] + '-' + parsed_date[0] + '-' + parsed_date[1]
-                    else:
-                        parsed_date = clean_date.split("-")
-                        end_date = parsed_date[0] + '-' + parsed_date[1] + '-' + parsed_date[2]
-                    end_date_object = datetime.strptime(end_date, '%Y-%m-%d')
-                    return end_date_object
-        else:
-            return 'none'
+        for coverage in get_index_data(obj).coverages:
+            if coverage.type == 'period' and 'end' in coverage.value:
+                clean_date = coverage.value["end"][:10]
+                if "/" in clean_date:
+                    parsed_date = clean_date.split("/")
+                    end_date = parsed_date[2] + '-' + parsed_date[0] + '-' + parsed_date[1]
+                else:
+                    parsed_date = clean_date.split("-")
+                    end_date = parsed_date[0] + '-' + parsed_date[1] + '-' + parsed_date[2]
+                end_date_object = datetime.strptime(end_date, '%Y-%m-%d')
+                return end_date_object
 
     def prepare_formats(self, obj):
         """Return metadata formats if metadata exists, otherwise return empty array."""
-        if hasattr(obj, 'metadata'):
-            return [format.value for format in obj.metadata.formats.all()]
-        else:
-            return []
+        return [format.value for format in get_index_data(obj).formats]
 
     def prepare_identifiers(self, obj):
         """Return metadata identifiers if metadata exists, otherwise return empty array."""
-        if hasattr(obj, 'metadata'):
-            return [identifier.name for identifier in obj.metadata.identifiers.all()]
-        else:
-            return []
+        return [identifier.name for identifier in get_index_data(obj).identifiers]
 
     def prepare_language(self, obj):
         """Return resource language if exists, otherwise return none."""
-        if hasattr(obj, 'metadata'):
-            return obj.metadata.language.code
+        language = get_index_data(obj).language
+        if language is not None:
+            return language.code
         else:
             return 'none'
 
     def prepare_sources(self, obj):
         """Return resource sources if exists, otherwise return empty array."""
-        if hasattr(obj, 'metadata'):
-            return [source.derived_from for source in obj.metadata.sources.all()]
-        else:
-            return []
+        return [source.derived_from for source in get_index_data(obj).sources]
 
     def prepare_relations(self, obj):
         """Return resource relations if exists, otherwise return empty array."""
-        if hasattr(obj, 'metadata'):
-            return [relation.value for relation in obj.metadata.relations.all()]
-        else:
-            return []
+        return [relation.value for relation in get_index_data(obj).relations]
 
     def prepare_resource_type(self, obj):
         """Return verbose_name attribute of obj argument."""
-        return obj.verbose_name
-
+        return get_index_data(obj).verbose_name
 
     def prepare_owners_logins(self, obj):
         """Return list of usernames that have ownership access to resource."""
-        if hasattr(obj, 'raccess'):
-            return [owner.username for owner in obj.raccess.owners.all()]
-        else:
-            return []
+        return [owner.username for owner in get_index_data(obj).owners]
 
     def prepare_owners_names(self, obj):
         """Return list of names of resource owners."""
-        names = []
-        if hasattr(obj, 'raccess'):
-            for owner in obj.raccess.owners.all():
-                name = owner.first_name + ' ' + owner.last_name
-                names.append(name)
-        return names
+        return [owner.first_name + ' ' + owner.last_name
+                for owner in get_index_data(obj).owners]
 
     def prepare_owners_count(self, obj):
         """Return count of resource owners if 'raccess' attribute exists, othrerwise return 0."""
-        if hasattr(obj, 'raccess'):
-            return obj.raccess.owners.all().count()
-        else:
-            return 0
+        return len(get_index_data(obj).owners)
 
     def prepare_viewers_logins(self, obj):
         """Return usernames of users that can view resource, otherwise return empty array."""
-        if hasattr(obj, 'raccess'):
-            return [viewer.username for viewer in obj.raccess.view_users.all()]
-        else:
-            return []
+        return [viewer.username for viewer in get_index_data(obj).viewers]
 
     def prepare_viewers_names(self, obj):
         """Return full names of users that can view resource, otherwise return empty array."""
-        names = []
-        if hasattr(obj, 'raccess'):
-            for viewer in obj.raccess.view_users.all():
-                name = viewer.first_name + ' ' + viewer.last_name
-                names.append(name)
-        return names
+        return [viewer.first_name + ' ' + viewer.last_name
+                for viewer in get_index_data(obj).viewers]
 
     def prepare_viewers_count(self, obj):
         """Return count of users who can view resource, otherwise return 0."""
-        if hasattr(obj, 'raccess'):
-            return obj.raccess.view_users.all().count()
-        else:
-            return 0
+        return len(get_index_data(obj).viewers)
 
     def prepare_editors_logins(self, obj):
         """Return usernames of editors of a resource, otherwise return 0."""
         if hasattr(obj, 'raccess'):
-            return [editor.username for editor in obj.raccess.edit_users.all()]
+            return [editor.username for editor in get_index_data(obj).editors]
         else:
             return 0
 
     def prepare_editors_names(self, obj):
         """Return full names of editors of a resource, otherwise return empty array."""
-        names = []
-        if hasattr(obj, 'raccess'):
-            for editor in obj.raccess.edit_users.all():
-                name = editor.first_name + ' ' + editor.last_name
-                names.append(name)
-        return names
+        return [editor.first_name + ' ' + editor.last_name
+                for editor in get_index_data(obj).editors]
 
     def prepare_editors_count(self, obj):
         """Return count of editors of a resource, otherwise return 0."""
-        if hasattr(obj, 'raccess'):
-            return obj.raccess.edit_users.all().count()
-        else:
-            return 0
+        return len(get_index_data(obj).editors)
 
     def prepare_geometry_type(self, obj):
         """Return geometry type if metadata exists, otherwise return 'none'."""
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, GeographicFeatureMetaData):
-                geometry_info = obj.metadata.geometryinformation
-                if geometry_info is not None:
-                    return geometry_info.geometryType
-                else:
-                    return 'none'
-            else:
-                return 'none'
+        data = get_index_data(obj)
+        if isinstance(data.metadata, GeographicFeatureMetaData) and \
+                data.geometry_information is not None:
+            return data.geometry_information.geometryType
         else:
             return 'none'
 
     def prepare_field_name(self, obj):
         """Return metadata field name if exists, otherwise return 'none'."""
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, GeographicFeatureMetaData):
-                field_info = obj.metadata.fieldinformations.all().first()
-                if field_info is not None:
-                    return field_info.fieldName
-                else:
-                    return 'none'
-            else:
-                return 'none'
+        data = get_index_data(obj)
+        if isinstance(data.metadata, GeographicFeatureMetaData) and \
+                data.field_information is not None:
+            return data.field_information.fieldName
         else:
             return 'none'
 
     def prepare_field_type(self, obj):
         """Return metadata field type if exists, otherwise return 'none'."""
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, GeographicFeatureMetaData):
-                field_info = obj.metadata.fieldinformations.all().first()
-                if field_info is not None:
-                    return field_info.fieldType
-                else:
-                    return 'none'
-            else:
-                return 'none'
+        data = get_index_data(obj)
+        if isinstance(data.metadata, GeographicFeatureMetaData) and \
+                data.field_information is not None:
+            return data.field_information.fieldType
         else:
             return 'none'
 
     def prepare_field_type_code(self, obj):
         """Return metadata field type code if exists, otherwise return 'none'."""
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, GeographicFeatureMetaData):
-                field_info = obj.metadata.fieldinformations.all().first()
-                if field_info is not None:
-                    return field_info.fieldTypeCode
-                else:
-                    return 'none'
-            else:
-                return 'none'
+        data = get_index_data(obj)
+        if isinstance(data.metadata, GeographicFeatureMetaData) and \
+                data.field_information is not None:
+            return data.field_information.fieldTypeCode
         else:
             return 'none'
 
     def prepare_variable_names(self, obj):
         """Return metadata variable names if exists, otherwise return empty array."""
-        variable_names = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, NetcdfMetaData):
-                for variable in obj.metadata.variables.all():
-                    variable_names.append(variable.name)
-            elif isinstance(obj.metadata, RefTSMetadata):
-                for variable in obj.metadata.variables.all():
-                    variable_names.append(variable.name)
-            elif isinstance(obj.metadata, TimeSeriesMetaData):
-                for variable in obj.metadata.variables:
-                    variable_names.append(variable.variable_name)
-        return variable_names
+        data = get_index_data(obj)
+        if isinstance(data.metadata, (NetcdfMetaData, RefTSMetadata)):
+            return [variable.name for variable in data.variables]
+        elif isinstance(data.metadata, TimeSeriesMetaData):
+            return [variable.variable_name for variable in data.variables]
+        return []
 
     def prepare_variable_types(self, obj):
         """Return metadata variable types if exists, otherwise return empty array."""
-        variable_types = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, NetcdfMetaData):
-                for variable in obj.metadata.variables.all():
-                    variable_types.append(variable.type)
-            elif isinstance(obj.metadata, RefTSMetadata):
-                for variable in obj.metadata.variables.all():
-                    variable_types.append(variable.data_type)
-            elif isinstance(obj.metadata, TimeSeriesMetaData):
-                for variable in obj.metadata.variables:
-                    variable_types.append(variable.variable_type)
-        return variable_types
+        data = get_index_data(obj)
+        if isinstance(data.metadata, NetcdfMetaData):
+            return [variable.type for variable in data.variables]
+        elif isinstance(data.metadata, RefTSMetadata):
+            return [variable.data_type for variable in data.variables]
+        elif isinstance(data.metadata, TimeSeriesMetaData):
+            return [variable.variable_type for variable in data.variables]
+        return []
 
     def prepare_variable_shapes(self, obj):
         """Return metadata variable shapes if exists, otherwise return empty array."""
-        variable_shapes = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, NetcdfMetaData):
-                for variable in obj.metadata.variables.all():
-                    variable_shapes.append(variable.shape)
-        return variable_shapes
+        data = get_index_data(obj)
+        if isinstance(data.metadata, NetcdfMetaData):
+            return [variable.shape for variable in data.variables]
+        return []
 
     def prepare_variable_descriptive_names(self, obj):
         """Return metadata variable descriptive names if exists, otherwise return empty array."""
-        variable_descriptive_names = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, NetcdfMetaData):
-                for variable in obj.metadata.variables.all():
-                    variable_descriptive_names.append(variable.descriptive_name)
-        return variable_descriptive_names
+        data = get_index_data(obj)
+        if isinstance(data.metadata, NetcdfMetaData):
+            return [variable.descriptive_name for variable in data.variables]
+        return []
 
     def prepare_variable_speciations(self, obj):
         """Return metadata variable speciations if exists, otherwise return empty array."""
-        variable_speciations = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for variable in obj.metadata.variables:
-                    variable_speciations.append(variable.speciation)
-        return variable_speciations
+        data = get_index_data(obj)
+        if isinstance(data.metadata, TimeSeriesMetaData):
+            return [variable.speciation for variable in data.variables]
+        return []
 
     def prepare_sites(self, obj):
         """Return metadata sites if exists, otherwise return empty array."""
-        sites = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, RefTSMetadata):
-                for site in obj.metadata.sites.all():
-                    sites.append(site.name)
-            elif isinstance(obj.metadata, TimeSeriesMetaData):
-                for site in obj.metadata.sites:
-                    sites.append(site.site_name)
-        return sites
+        data = get_index_data(obj)
+        if isinstance(data.metadata, RefTSMetadata):
+            return [site.name for site in data.sites]
+        elif isinstance(data.metadata, TimeSeriesMetaData):
+            return [site.site_name for site in data.sites]
+        return []
 
     def prepare_methods(self, obj):
         """Return metadata methods if exists, otherwise return empty array."""
-        methods = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, RefTSMetadata):
-                for method in obj.metadata.methods.all():
-                    methods.append(method.description)
-            elif isinstance(obj.metadata, TimeSeriesMetaData):
-                for method in obj.metadata.methods:
-                    methods.append(method.method_description)
-        return methods
+        data = get_index_data(obj)
+        if isinstance(data.metadata, RefTSMetadata):
+            return [method.description for method in data.methods]
+        elif isinstance(data.metadata, TimeSeriesMetaData):
+            return [method.method_description for method in data.methods]
+        return []
 
     def prepare_quality_levels(self, obj):
         """Return metadata quality levels if exists, otherwise return empty array."""
-        quality_levels = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, RefTSMetadata):
-                for quality_level in obj.metadata.quality_levels.all():
-                    quality_levels.append(quality_level.code)
-        return quality_levels
+        data = get_index_data(obj)
+        if isinstance(data.metadata, RefTSMetadata):
+            return [quality_level.code for quality_level in data.quality_levels]
+        return []
 
     def prepare_data_sources(self, obj):
         """Return metadata datasources if exists, otherwise return empty array."""
-        data_sources = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, RefTSMetadata):
-                for data_source in obj.metadata.datasources.all():
-                    data_sources.append(data_source.code)
-        return data_sources
+        data = get_index_data(obj)
+        if isinstance(data.metadata, RefTSMetadata):
+            return [data_source.code for data_source in data.data_sources]
+        return []
 
     def prepare_sample_mediums(self, obj):
         """Return metadata sample mediums if exists, otherwise return empty array."""
-        sample_mediums = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for time_series_result in obj.metadata.time_series_results:
-                    sample_mediums.append(time_series_result.sample_medium)
-            elif isinstance(obj.metadata, RefTSMetadata):
-                for variable in obj.metadata.variables.all():
-                    sample_mediums.append(variable.sample_medium)
-        return sample_mediums
+        data = get_index_data(obj)
+        if isinstance(data.metadata, TimeSeriesMetaData):
+            return [time_series_result.sample_medium
+                    for time_series_result in data.time_series_results]
+        elif isinstance(data.metadata, RefTSMetadata):
+            return [variable.sample_medium for variable in data.variables]
+        return []
 
     def prepare_units_names(self, obj):
         """Return metadata units names if exists, otherwise return empty array."""
-        units_names = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for time_series_result in obj.metadata.time_series_results:
-                    units_names.append(time_series_result.units_name)
-        return units_names
+        data = get_index_data(obj)
+        if isinstance(data.metadata, TimeSeriesMetaData):
+            return [time_series_result.units_name
+                    for time_series_result in data.time_series_results]
+        return []
 
     def prepare_units_types(self, obj):
         """Return metadata units types if exists, otherwise return empty array."""
-        units_types = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for time_series_result in obj.metadata.time_series_results:
-                    units_types.append(time_series_result.units_type)
-        return units_types
+        data = get_index_data(obj)
+        if isinstance(data.metadata, TimeSeriesMetaData):
+            return [time_series_result.units_type
+                    for time_series_result in data.time_series_results]
+        return []
 
     def prepare_aggregation_statistics(self, obj):
         """Return metadata aggregation statistics if exists, otherwise return empty array."""
-        aggregation_statistics = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for time_series_result in obj.metadata.time_series_results:
-                    aggregation_statistics.append(time_series_result.aggregation_statistics)
-        return aggregation_statistics
+        data = get_index_data(obj)
+        if isinstance(data.metadata, TimeSeriesMetaData):
+            return [time_series_result.aggregation_statistics
+                    for time_series_result in data.time_series_results]
+        return []
 
     def prepare_absolute_url(self, obj):
         """Return absolute URL of object."""
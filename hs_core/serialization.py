@@ -175,7 +175,7 @@ def create_resource_from_bag(bag_content_path, preserve_uuid=True):
                                       update_creation_date=True,
                                       update_modification_date=True)
         # Force bag files to be re-written
-        create_bag_files(resource)
+        create_bag_files(resource, force=True)
     except HsDeserializationDependencyException as e:
         return e.dependency_resource_id, rm, resource
 
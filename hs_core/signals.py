@@ -22,4 +22,9 @@ post_delete_resource = django.dispatch.Signal(providing_args=['request', 'user',
 
 pre_move_or_rename_file_or_folder = django.dispatch.Signal(providing_args=['resource',
                                                                            'src_full_path',
-                                                                           'tgt_full_path'])
\ No newline at end of file
+                                                                           'tgt_full_path'])
+
+# sent by hs_core.hydro_realtime_signal_processor.flush_index_queue after every flush of the
+# queue of resources to index; queue_depth is the number of resources that were queued
+solr_index_queue_flushed = django.dispatch.Signal(providing_args=['queue_depth', 'indexed',
+                                                                  'removed', 'flush_time'])
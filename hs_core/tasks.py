@@ -4,6 +4,7 @@ from __future__ import absolute_import
 
 import os
 import sys
+import time
 import traceback
 import zipfile
 import logging
@@ -160,12 +161,17 @@ def add_zip_file_contents_to_resource(pk, zip_file_path):
         os.unlink(zip_file_path)
 
 
-@shared_task
-def create_bag_by_irods(resource_id):
+@shared_task(bind=True)
+def create_bag_by_irods(self, resource_id):
     """Create a resource bag on iRODS side by running the bagit rule and ibun zip.
 
     This function runs as a celery task, invoked asynchronously so that it does not
     block the main web thread when it creates bags for very large files which will take some time.
+
+    With settings.BAG_BUILDER = 'python', the bag is built by hs_core.hydroshare.bag_builder
+    instead, and the progress of the task is reported in its state, which the hsapi/taskstatus
+    view (CheckTaskStatus) returns:
+    PROGRESS, {'files_done', 'files_total', 'bytes_done', 'bytes_total'}
     :param
     resource_id: the resource uuid that is used to look for the resource to create the bag for.
 
@@ -186,6 +192,9 @@ def create_bag_by_irods(resource_id):
             logger.error('Failed to create bag files. Error:{}'.format(ex.message))
             return False
 
+    if getattr(settings, 'BAG_BUILDER', 'irods') == 'python':
+        return create_bag_in_python(self, res)
+
     bag_full_name = 'bags/{res_id}.zip'.format(res_id=resource_id)
     if res.resource_federation_path:
         irods_bagit_input_path = os.path.join(res.resource_federation_path, resource_id)
@@ -259,3 +268,114 @@ def create_bag_by_irods(resource_id):
     else:
         logger.error('Resource does not exist.')
         return False
+
+
+def create_bag_in_python(task, res):
+    """Build the bag of a resource with bag_builder, reporting progress in the task state."""
+    from hs_core.hydroshare.bag_builder import build_bag
+
+    istorage = res.get_irods_storage()
+    if not istorage.exists(res.root_path):
+        logger.error('Resource does not exist.')
+        return False
+
+    last_update = [0]
+
+    def progress(files_done, files_total, bytes_done, bytes_total):
+        # the result backend is updated at most once a second
+        if task.request.id and (time.time() - last_update[0] >= 1 or files_done == files_total):
+            last_update[0] = time.time()
+            task.update_state(state='PROGRESS', meta={
+                'files_done': files_done, 'files_total': files_total,
+                'bytes_done': bytes_done, 'bytes_total': bytes_total,
+            })
+
+    try:
+        build_bag(res, progress=progress)
+    except SessionException as ex:
+        logger.error(ex.stderr)
+        return False
+    istorage.setAVU(res.root_path, 'bag_modified', "false")
+    return True
+
+
+@shared_task
+def update_bag_files(resource_id):
+    """Update the metadata files of a resource (see hs_bagit.schedule_bag_files).
+
+    :param
+    resource_id: the resource uuid that is used to look for the resource.
+
+    :return: True if the files are up to date; False if the resource no longer exists or
+             the files could not be created.
+    """
+    from hs_core.hydroshare.utils import get_resource_by_shortkey
+    from hs_core.hydroshare.hs_bagit import clear_bag_files_pending
+
+    # edits made from now on schedule another update
+    clear_bag_files_pending(resource_id)
+    try:
+        res = get_resource_by_shortkey(resource_id, or_404=False)
+    except BaseResource.DoesNotExist:
+        return False
+
+    try:
+        create_bag_files(res)
+    except Exception as ex:
+        logger.error('Failed to create bag files. Error:{}'.format(ex.message))
+        return False
+    return True
+
+
+@periodic_task(ignore_result=True, run_every=crontab(minute=30, hour=2))
+def verify_resource_files():
+    """Check the recorded sizes and checksums of all resource files against iRODS.
+
+    The resources are verified in batches of RESOURCE_FILE_VERIFY_BATCH_SIZE by
+    verify_resource_file_batch tasks, which run in parallel on the available workers.
+    """
+    batch_size = getattr(settings, 'RESOURCE_FILE_VERIFY_BATCH_SIZE', 100)
+    resource_ids = list(BaseResource.objects.order_by('id').values_list('short_id', flat=True))
+    for offset in range(0, len(resource_ids), batch_size):
+        verify_resource_file_batch.apply_async((resource_ids[offset:offset + batch_size],))
+
+
+@shared_task
+def verify_resource_file_batch(resource_ids, verify_checksums=False):
+    """Bring the recorded size, modification time and checksum of the files of resources up to
+    date with iRODS (see BaseResource.verify_file_system_metadata), logging the differences.
+
+    :param
+    resource_ids: the uuids of the resources to verify.
+    verify_checksums: if True, compute the checksums of all the files again.
+
+    :return: the number of differences found
+    """
+    differences = 0
+    for res in BaseResource.objects.filter(short_id__in=resource_ids):
+        try:
+            messages = res.verify_file_system_metadata(verify_checksums=verify_checksums)
+        except SessionException as ex:
+            logger.error('Failed to verify the files of {}. Error:{}'.format(res.short_id,
+                                                                             ex.stderr))
+            continue
+        for message in messages:
+            logger.warning(message)
+        differences += len(messages)
+    return differences
+
+
+@shared_task
+def flush_solr_index_queue():
+    """Index the resources queued by HydroQueuedSignalProcessor in Solr."""
+    from hs_core.hydro_realtime_signal_processor import flush_index_queue
+
+    flush_index_queue()
+
+
+@periodic_task(ignore_result=True, run_every=crontab(minute='*/15'))
+def update_discovery_facets():
+    """Precompute the facet counts of the discovery page for the empty search."""
+    from hs_core.discovery_facets import update_empty_search_facets
+
+    update_empty_search_facets()
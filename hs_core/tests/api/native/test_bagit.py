@@ -1,8 +1,19 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+
+import bagit
 from django.contrib.auth.models import Group, User
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from mock import patch
 
 from hs_core import hydroshare
-from hs_core.hydroshare import hs_bagit
+from hs_core.hydroshare import bag_builder, hs_bagit
 from hs_core.tasks import create_bag_by_irods
 from hs_core.models import GenericResource
 from django_irods.storage import IrodsStorage
@@ -52,6 +63,56 @@ class TestBagIt(TestCase):
         irods_storage_obj = hs_bagit.create_bag_files(self.test_res)
         self.assertTrue(isinstance(irods_storage_obj, IrodsStorage))
 
+    def test_create_bag_files_for_unchanged_metadata(self):
+        hs_bagit.create_bag_files(self.test_res)
+        version = hs_bagit.metadata_version(self.test_res)
+        self.assertEquals(version, self.test_res.getAVU('metadata_version'))
+        self.assertFalse(self.test_res.getAVU('metadata_dirty'))
+
+        # the files are not written again until the metadata changes
+        with patch.object(IrodsStorage, 'saveFile') as save_file:
+            hs_bagit.create_bag_files(self.test_res)
+        self.assertFalse(save_file.called)
+
+        self.test_res.metadata.create_element('subject', value='sub-1')
+        self.assertNotEquals(version, hs_bagit.metadata_version(self.test_res))
+        with patch.object(IrodsStorage, 'saveFile') as save_file:
+            hs_bagit.create_bag_files(self.test_res)
+        self.assertEquals(save_file.call_count, 2)
+
+        with patch.object(IrodsStorage, 'saveFile') as save_file:
+            hs_bagit.create_bag_files(self.test_res, force=True)
+        self.assertEquals(save_file.call_count, 2)
+
+    @override_settings(BAG_FILES_CACHE='default')
+    def test_schedule_bag_files(self):
+        cache.clear()
+        # a burst of edits schedules a single update
+        with patch('hs_core.tasks.update_bag_files.apply_async') as apply_async:
+            for i in range(3):
+                hs_bagit.schedule_bag_files(self.test_res)
+        apply_async.assert_called_once_with((self.test_res.short_id,), countdown=10)
+
+        # once the update has started, edits schedule another one
+        hs_bagit.clear_bag_files_pending(self.test_res.short_id)
+        with patch('hs_core.tasks.update_bag_files.apply_async') as apply_async:
+            hs_bagit.schedule_bag_files(self.test_res)
+        self.assertEqual(1, apply_async.call_count)
+
+    @override_settings(BAG_FILES_CACHE=None)
+    def test_schedule_bag_files_without_cache(self):
+        # without a shared cache, edits are not coalesced
+        with patch('hs_core.tasks.update_bag_files.apply_async') as apply_async:
+            for i in range(3):
+                hs_bagit.schedule_bag_files(self.test_res)
+        self.assertEqual(3, apply_async.call_count)
+
+    def test_metadata_version_includes_extra_metadata(self):
+        version = hs_bagit.metadata_version(self.test_res)
+        self.test_res.extra_metadata = {'key': 'value'}
+        self.test_res.save()
+        self.assertNotEquals(version, hs_bagit.metadata_version(self.test_res))
+
     def test_create_bag_by_irods(self):
         try:
             # this is the api call we testing
@@ -59,6 +120,73 @@ class TestBagIt(TestCase):
         except Exception as ex:
             self.fail("create_bag_by_irods() raised exception.{}".format(ex.message))
 
+    def test_parse_recursive_listing(self):
+        listing = (
+            "/zone/home/proxy/abc:\n"
+            "  proxy    0 resc     3 2018-08-06.18:05 & readme.txt\n"
+            "    sha2:Zm9v    generic    /vault/abc/readme.txt\n"
+            "  C- /zone/home/proxy/abc/data\n"
+            "/zone/home/proxy/abc/data/contents:\n"
+            "  proxy    0 resc     7 2018-08-06.18:06 & my file.png\n"
+            "        generic    /vault/abc/data/contents/my file.png\n"
+            "  proxy    1 resc2    7 2018-08-06.18:06 & my file.png\n"
+            "        generic    /vault2/abc/data/contents/my file.png\n"
+            "  proxy    0 resc     9 2018-08-06.18:07   stale copy.txt\n"
+            "        generic    /vault/abc/data/contents/stale copy.txt\n"
+        )
+        files = bag_builder.parse_recursive_listing(listing)
+        self.assertEquals(['data/contents/my file.png', 'data/contents/stale copy.txt',
+                           'readme.txt'], [f.name for f in files])
+        self.assertEquals('/zone/home/proxy/abc/data/contents/my file.png', files[0].path)
+        self.assertEquals((7, '2018-08-06.18:06', None),
+                          (files[0].size, files[0].modified, files[0].checksum))
+        # a stale replica has a blank status
+        self.assertEquals((9, '2018-08-06.18:07'), (files[1].size, files[1].modified))
+        self.assertEquals('sha2:Zm9v', files[2].checksum)
+
+    def test_write_bag(self):
+        istorage = hs_bagit.create_bag_files(self.test_res, force=True)
+        progress = []
+        out = BytesIO()
+        bag_builder.write_bag(istorage, self.test_res, out,
+                              progress=lambda *args: progress.append(args))
+
+        self.assertEquals(progress[-1][0], progress[-1][1])  # all files done
+        tmpdir = tempfile.mkdtemp()
+        try:
+            zipfile.ZipFile(out).extractall(tmpdir)
+            bag = bagit.Bag(os.path.join(tmpdir, self.test_res.short_id))
+            self.assertTrue(bag.is_valid())
+            self.assertIn('data/resourcemetadata.xml', bag.entries)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_write_bag_uses_recorded_checksums(self):
+        res_file = hydroshare.add_resource_files(
+            self.test_res.short_id, SimpleUploadedFile('test.txt', b'some text'))[0]
+        istorage = hs_bagit.create_bag_files(self.test_res, force=True)
+
+        # the MD5 recorded for the file is used as long as the file is unchanged
+        res_file.record_system_metadata(res_file.size, res_file.modified_time, 'f' * 32)
+        out = BytesIO()
+        bag_builder.write_bag(istorage, self.test_res, out)
+        manifest = zipfile.ZipFile(out).read(
+            os.path.join(self.test_res.short_id, 'manifest-md5.txt'))
+        self.assertIn('f' * 32 + '    data/contents/test.txt', manifest)
+
+        # otherwise it is computed, and recorded
+        res_file.record_system_metadata(res_file.size + 1, res_file.modified_time, 'f' * 32)
+        with patch('hs_core.hydroshare.bag_builder.BagFile.checksum_cacheable', True):
+            bag_builder.write_bag(istorage, self.test_res, BytesIO())
+        res_file.refresh_from_db()
+        self.assertEquals(hashlib.md5(b'some text').hexdigest(), res_file._checksum)
+
+    @override_settings(BAG_BUILDER='python')
+    def test_create_bag_in_python(self):
+        self.assertTrue(create_bag_by_irods(self.test_res.short_id))
+        self.assertTrue(self.test_res.get_irods_storage().exists(self.test_res.bag_path))
+        self.assertFalse(self.test_res.getAVU('bag_modified'))
+
     def test_delete_files_and_bag(self):
         # check we have one bag at this point
         self.assertEquals(self.test_res.bags.count(), 1)
@@ -572,6 +572,31 @@ class TestCoreMetadata(MockIRODSTestCaseMixin, TestCase):
 
         self.assertEqual(self.res.metadata.coverages.filter(type='box').count(), 1)
 
+    def test_coverage_bounding_box(self):
+        # the bounding box columns are kept in sync with the coverage value
+        value_dict = {'east': '56.45678', 'north': '12.6789', 'units': 'decimal deg'}
+        resource.create_metadata_element(self.res.short_id, 'coverage', type='point',
+                                         value=value_dict)
+        cov = self.res.metadata.coverages.get(type='point')
+        self.assertEqual((cov.bbox_xmin, cov.bbox_ymin, cov.bbox_xmax, cov.bbox_ymax),
+                         (56.45678, 12.6789, 56.45678, 12.6789))
+
+        # changing the point coverage to a box updates the bounding box
+        value_dict = {'northlimit': '56.45678', 'eastlimit': '120.6789', 'southlimit': '16.45678',
+                      'westlimit': '16.6789', 'units': 'decimal deg'}
+        resource.update_metadata_element(self.res.short_id, 'coverage', cov.id, type='box',
+                                         value=value_dict)
+        cov = self.res.metadata.coverages.get(type='box')
+        self.assertEqual((cov.bbox_xmin, cov.bbox_ymin, cov.bbox_xmax, cov.bbox_ymax),
+                         (16.6789, 16.45678, 120.6789, 56.45678))
+
+        # period coverages have no bounding box
+        value_dict = {'name': 'Name for period coverage', 'start': '1/1/2000', 'end': '12/12/2012'}
+        resource.create_metadata_element(self.res.short_id, 'coverage', type='period',
+                                         value=value_dict)
+        cov = self.res.metadata.coverages.get(type='period')
+        self.assertIsNone(cov.bbox_xmin)
+
     def test_date(self):
         # test that when a resource is created it already generates the 'created' and 'modified' date elements
         self.assertEqual(self.res.metadata.dates.all().count(), 2, msg="Number of date elements not equal to 2.")
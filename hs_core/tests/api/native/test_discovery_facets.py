@@ -0,0 +1,66 @@
+from datetime import date
+
+from django.test import TestCase, override_settings
+from mock import MagicMock
+
+from hs_core.discovery_facets import normalize_search_state, get_facet_counts, \
+    EMPTY_SEARCH_FACETS_KEY
+from hs_core.hydro_realtime_signal_processor import bump_index_generation
+from hs_core.tests.api.native.test_solr_index_queue import FakeRedis
+
+EMPTY_FORM = {'q': '', 'NElat': '', 'NElng': '', 'SWlat': '', 'SWlng': '',
+              'start_date': None, 'end_date': None, 'coverage_type': '',
+              'sort_order': '', 'sort_direction': ''}
+
+
+class TestDiscoveryFacets(TestCase):
+
+    def setUp(self):
+        super(TestDiscoveryFacets, self).setUp()
+        self.redis = FakeRedis()
+        self.settings = override_settings(SOLR_INDEX_QUEUE_DB=self.redis)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        super(TestDiscoveryFacets, self).tearDown()
+
+    def state(self, selected_facets=(), **cleaned_data):
+        data = dict(EMPTY_FORM)
+        data.update(cleaned_data)
+        return normalize_search_state(data, selected_facets)
+
+    def queryset(self, facets):
+        queryset = MagicMock()
+        queryset.facet_counts.return_value = facets
+        return queryset
+
+    def test_equivalent_searches_have_the_same_state(self):
+        self.assertEqual(
+            self.state(['subjects:water', 'creators:Smith', 'subjects:water'], q='rain ',
+                       NElat='41', SWlat='40.5', start_date=date(2010, 1, 1),
+                       sort_order='title'),
+            self.state(['creators:Smith', 'subjects:water'], q='rain', NElat='41.0',
+                       SWlat='40.50', start_date=date(2010, 1, 1), sort_direction='-'))
+        self.assertNotEqual(self.state(q='rain'), self.state(q='snow'))
+        self.assertNotEqual(self.state(), self.state(['creators:Smith']))
+
+    def test_counts_are_cached_until_the_index_changes(self):
+        state = self.state(q='rain')
+        facets = {'fields': {'subjects': [['water', 2]]}, 'dates': {}, 'queries': {}}
+        queryset = self.queryset(facets)
+        self.assertEqual(get_facet_counts(queryset, state), facets)
+        self.assertEqual(get_facet_counts(self.queryset({}), state), facets)
+        queryset.facet_counts.assert_called_once_with()
+
+        bump_index_generation()
+        updated = {'fields': {'subjects': [['water', 3]]}, 'dates': {}, 'queries': {}}
+        self.assertEqual(get_facet_counts(self.queryset(updated), state), updated)
+
+    def test_empty_search_uses_precomputed_counts(self):
+        self.redis.set(EMPTY_SEARCH_FACETS_KEY, '{"fields": {"public": [["true", 5]]}}')
+        bump_index_generation()
+        queryset = self.queryset({})
+        self.assertEqual(get_facet_counts(queryset, self.state()),
+                         {'fields': {'public': [['true', 5]]}})
+        self.assertFalse(queryset.facet_counts.called)
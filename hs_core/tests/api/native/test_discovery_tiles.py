@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+from mock import MagicMock
+
+from hs_core.discovery_tiles import point_cells, point_tile, quadkey, quadkey_tile, \
+    tile_bounds, compute_tile, TILE_POINT_LIMIT, MAX_CELL_LEVEL
+
+
+class TestDiscoveryTiles(SimpleTestCase):
+
+    def test_point_cells_are_the_tiles_containing_the_point(self):
+        cells = point_cells(-111.8, 41.7)
+        self.assertEqual(len(cells), MAX_CELL_LEVEL + 1)
+        self.assertEqual(cells[0], '0:')
+        for cell in cells:
+            level, x, y = quadkey_tile(cell.split(':', 1)[1])
+            self.assertEqual(cell, '{}:{}'.format(level, quadkey(x, y, level)))
+            self.assertEqual(point_tile(-111.8, 41.7, level), (x, y))
+            west, south, east, north = tile_bounds(level, x, y)
+            self.assertTrue(west <= -111.8 <= east)
+            self.assertTrue(south <= 41.7 <= north)
+
+    def test_tile_bounds(self):
+        west, south, east, north = tile_bounds(1, 0, 0)
+        self.assertEqual((west, east), (-180, 0))
+        self.assertAlmostEqual(south, 0)
+        self.assertAlmostEqual(north, 85.0511, places=4)
+
+    def search(self, cells, boxes):
+        sqs = MagicMock()
+        points = sqs.narrow.return_value
+        points.facet.return_value.facet_counts.return_value = {
+            'fields': {'coverage_cells': cells}}
+        sqs.narrow.return_value.count.return_value = boxes
+        return sqs
+
+    def test_tile_with_many_points_is_clustered(self):
+        sqs = self.search([('4:0213', TILE_POINT_LIMIT), ('4:0212', 1)], 2)
+        tile = compute_tile(sqs, 1, 0, 0)
+        points = sqs.narrow.return_value
+        points.facet.assert_called_once_with('coverage_cells', prefix='4:0', limit=-1,
+                                             mincount=1)
+        self.assertEqual(tile['points'], TILE_POINT_LIMIT + 1)
+        self.assertEqual(tile['boxes'], 2)
+        self.assertEqual(tile['resources'], [])
+        self.assertEqual([cluster['count'] for cluster in tile['clusters']],
+                         [TILE_POINT_LIMIT, 1])
+        cluster = tile['clusters'][0]
+        west, south, east, north = cluster['bounds']
+        self.assertEqual(cluster['bounds'], tile_bounds(*quadkey_tile('0213')))
+        self.assertTrue(west < cluster['east'] < east and south < cluster['north'] < north)
@@ -1,9 +1,11 @@
 
 # unit test for get_checksum() from resource.py
+import hashlib
 
 from django.contrib.auth.models import User, Group
 from django.test import TestCase
 from hs_core import hydroshare
+from hs_core.models import ResourceFile
 from hs_core.testing import MockIRODSTestCaseMixin
 
 
@@ -28,7 +30,40 @@ class TestGetChecksum(MockIRODSTestCaseMixin, TestCase):
             'Test Resource',
         )
 
+    def add_file(self, resource, name, content):
+        # a file record with recorded system metadata, which doesn't need iRODS
+        return ResourceFile.objects.create(
+            content_object=resource,
+            resource_file='{}/data/contents/{}'.format(resource.short_id, name),
+            _size=len(content),
+            _checksum=hashlib.md5(content).hexdigest())
+
     def test_get_checksum(self):
-        with self.assertRaises(NotImplementedError):
-            hydroshare.get_checksum(self.res.short_id)
+        # a resource without files
+        self.assertEqual(hydroshare.get_checksum(self.res.short_id),
+                         hashlib.md5(b'').hexdigest())
+
+        other = hydroshare.create_resource('GenericResource', self.user1, 'Other Resource')
+        for resource in (self.res, other):
+            self.add_file(resource, 'a.txt', b'aaa')
+            self.add_file(resource, 'b.txt', b'bb')
+        checksum = hydroshare.get_checksum(self.res.short_id)
+        self.assertEqual(len(checksum), 32)
+        self.assertEqual(checksum, hydroshare.get_checksum(other.short_id))
+
+        # a change of file content or name changes the checksum
+        ResourceFile.objects.filter(object_id=other.id, _size=2).update(
+            _checksum=hashlib.md5(b'bc').hexdigest())
+        self.assertNotEqual(checksum, hydroshare.get_checksum(other.short_id))
+        ResourceFile.objects.filter(object_id=other.id, _size=2).update(
+            _checksum=hashlib.md5(b'bb').hexdigest(),
+            resource_file='{}/data/contents/c.txt'.format(other.short_id))
+        self.assertNotEqual(checksum, hydroshare.get_checksum(other.short_id))
+
+    def test_recorded_size(self):
+        self.add_file(self.res, 'a.txt', b'aaa')
+        self.add_file(self.res, 'b.txt', b'bb')
+        # read from the recorded sizes, without iRODS
+        self.assertEqual(self.res.size, 5)
+        self.assertEqual(sorted(f.size for f in self.res.files.all()), [2, 3])
 
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory, override_settings
+from mock import patch
+
+from hs_core import hydroshare, page_processors
+from hs_core.page_processors import get_page_context
+from hs_core.testing import MockIRODSTestCaseMixin
+
+
+@override_settings(LANDING_PAGE_CACHE='default')
+class TestLandingPageCache(MockIRODSTestCaseMixin, TestCase):
+    def setUp(self):
+        super(TestLandingPageCache, self).setUp()
+        cache.clear()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        self.user = hydroshare.create_account(
+            'creator@usu.edu',
+            username='creator',
+            first_name='Creator_FirstName',
+            last_name='Creator_LastName',
+            superuser=False,
+            groups=[]
+        )
+        self.res = hydroshare.create_resource('GenericResource', self.user, 'My Resource')
+
+    def _view(self):
+        request = RequestFactory().get(self.res.get_absolute_url())
+        request.user = self.user
+        request.session = {}
+        with patch.object(page_processors, '_get_readonly_page_context',
+                          wraps=page_processors._get_readonly_page_context) as compute:
+            context = get_page_context(self.res, self.user, request=request)
+        return context, compute.call_count
+
+    def test_read_only_context_is_cached(self):
+        context, computed = self._view()
+        self.assertEqual(computed, 1)
+        self.assertEqual(context['title'], 'My Resource')
+        self.assertEqual(context['current_user'], self.user)
+
+        cached_context, computed = self._view()
+        self.assertEqual(computed, 0)
+        self.assertEqual(cached_context['title'], 'My Resource')
+        self.assertEqual(cached_context['creators'], context['creators'])
+
+    def test_metadata_change_invalidates(self):
+        self._view()
+        self.res.metadata.create_element('subject', value='water')
+        self.res.metadata.update_element('title', self.res.metadata.title.id, value='New Title')
+
+        context, computed = self._view()
+        self.assertEqual(computed, 1)
+        self.assertEqual(context['title'], 'New Title')
+        self.assertEqual(context['keywords'], 'water')
+
+    def test_sharing_change_invalidates(self):
+        context, _ = self._view()
+        self.assertFalse(context['discoverable'])
+        self.res.raccess.discoverable = True
+        self.res.raccess.save()
+
+        context, computed = self._view()
+        self.assertEqual(computed, 1)
+        self.assertTrue(context['discoverable'])
+
+    def test_not_cached_without_cache(self):
+        with self.settings(LANDING_PAGE_CACHE=None):
+            self._view()
+            context, computed = self._view()
+        self.assertEqual(computed, 1)
+        self.assertEqual(context['title'], 'My Resource')
@@ -0,0 +1,44 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from hs_core.tests.api.native.test_solr_index_queue import FakeRedis
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'hs_core.redis_cache.RedisCache', 'LOCATION': 'SHARED_CACHE_DB'},
+}
+
+
+class TestRedisCache(SimpleTestCase):
+
+    def setUp(self):
+        super(TestRedisCache, self).setUp()
+        self.redis = FakeRedis()
+        self.settings = override_settings(CACHES=CACHES, SHARED_CACHE_DB=self.redis)
+        self.settings.enable()
+        self.cache = caches['shared']
+
+    def tearDown(self):
+        self.settings.disable()
+        super(TestRedisCache, self).tearDown()
+
+    def test_values_are_stored_in_redis(self):
+        self.assertIsNone(self.cache.get('context'))
+        self.cache.set('context', {'title': 'My Resource', 'keywords': ['water']}, 60)
+        self.assertEqual(self.cache.get('context'),
+                         {'title': 'My Resource', 'keywords': ['water']})
+        self.assertEqual(len(self.redis.data), 1)
+        self.assertTrue(self.cache.has_key('context'))
+
+        self.cache.delete('context')
+        self.assertIsNone(self.cache.get('context'))
+        self.assertEqual(self.redis.data, {})
+
+    def test_add_only_sets_missing_keys(self):
+        self.assertTrue(self.cache.add('pending', True, 60))
+        self.assertFalse(self.cache.add('pending', False, 60))
+        self.assertTrue(self.cache.get('pending'))
+        # a timeout of 0 expires the value at once
+        self.assertFalse(self.cache.add('expired', True, 0))
+        self.cache.set('pending', True, 0)
+        self.assertIsNone(self.cache.get('pending'))
@@ -0,0 +1,78 @@
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from haystack import connections
+
+from hs_access_control.models import PrivilegeCodes
+from hs_core import hydroshare
+from hs_core.models import BaseResource
+from hs_core.testing import MockIRODSTestCaseMixin
+
+
+class TestSearchIndex(MockIRODSTestCaseMixin, TestCase):
+    def setUp(self):
+        super(TestSearchIndex, self).setUp()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        self.user = hydroshare.create_account(
+            'creator@usu.edu',
+            username='creator',
+            first_name='Creator_FirstName',
+            last_name='Creator_LastName',
+            superuser=False,
+            groups=[]
+        )
+        self.resources = []
+        for title in ('First Resource', 'Second Resource'):
+            res = hydroshare.create_resource('GenericResource', self.user, title)
+            res.metadata.create_element('creator', name='Second Creator', order=2)
+            res.metadata.create_element('subject', value='water')
+            res.metadata.create_element('relation', type='isReplacedBy', value='newer')
+            res.raccess.discoverable = True
+            res.raccess.save()
+            self.resources.append(res)
+        self.index = connections['default'].get_unified_index().get_index(BaseResource)
+
+    def test_prefetched_resources_are_prepared_the_same(self):
+        ids = [res.pk for res in self.resources]
+        expected = [self.index.full_prepare(BaseResource.objects.get(pk=pk)) for pk in ids]
+        prepared = [self.index.full_prepare(res) for res in
+                    self.index.index_queryset().filter(pk__in=ids).order_by('pk')]
+        self.assertEqual(prepared, expected)
+
+        data = prepared[0]
+        self.assertEqual(data['title'], 'First Resource')
+        self.assertEqual(data['author'], 'Creator_FirstName Creator_LastName')
+        self.assertEqual(data['creators'], ['Creator_FirstName Creator_LastName',
+                                            'Second Creator'])
+        self.assertEqual(data['subjects'], ['water'])
+        self.assertTrue(data['is_replaced_by'])
+        self.assertTrue(data['discoverable'])
+        self.assertEqual(data['owners_logins'], ['creator'])
+        self.assertEqual(data['resource_type'], 'Generic')
+        self.assertIn('Second Creator', data['text'])
+
+    def test_relations_are_prefetched(self):
+        resources = list(self.index.index_queryset().filter(
+            pk__in=[res.pk for res in self.resources]))
+        with CaptureQueriesContext(connection) as queries:
+            for res in resources:
+                self.index.full_prepare(res)
+        # the access lists and comments, but none of the metadata, are read per resource
+        self.assertLessEqual(len(queries), 4 * len(resources))
+
+    def test_text_is_unchanged(self):
+        # the text of the index holds the names, but not the logins, of viewers
+        viewer = hydroshare.create_account(
+            'viewer@usu.edu',
+            username='viewer_login',
+            first_name='Viewer_FirstName',
+            last_name='Viewer_LastName',
+            superuser=False,
+            groups=[]
+        )
+        self.user.uaccess.share_resource_with_user(self.resources[0], viewer,
+                                                   PrivilegeCodes.VIEW)
+        text = self.index.full_prepare(self.resources[0])['text']
+        self.assertIn('Viewer_FirstName Viewer_LastName', text)
+        self.assertNotIn('viewer_login', text)
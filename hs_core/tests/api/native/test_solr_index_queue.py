@@ -0,0 +1,112 @@
+from django.test import TestCase, override_settings
+from mock import patch
+
+from hs_core.hydro_realtime_signal_processor import queue_resource_for_indexing, \
+    flush_index_queue, INDEX_QUEUE_KEY
+from hs_core.signals import solr_index_queue_flushed
+
+
+class FakeRedis(object):
+    """The redis commands used by the Solr index queue and the caches, in memory."""
+
+    def __init__(self):
+        self.data = {}
+
+    def sadd(self, key, *values):
+        self.data.setdefault(key, set()).update(str(v) for v in values)
+
+    def smembers(self, key):
+        return set(self.data.get(key, ()))
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def exists(self, key):
+        return key in self.data
+
+    def flushdb(self):
+        self.data.clear()
+
+    def pipeline(self):
+        redis = self
+
+        class Pipeline(object):
+            def __init__(self):
+                self.commands = []
+
+            def __getattr__(self, name):
+                return lambda *args: self.commands.append((name, args))
+
+            def execute(self):
+                return [getattr(redis, name)(*args) for name, args in self.commands]
+
+        return Pipeline()
+
+
+class TestSolrIndexQueue(TestCase):
+
+    def setUp(self):
+        super(TestSolrIndexQueue, self).setUp()
+        self.redis = FakeRedis()
+        self.settings = override_settings(SOLR_INDEX_QUEUE_DB=self.redis,
+                                          SOLR_INDEX_MAX_LATENCY=5,
+                                          SOLR_INDEX_BATCH_SIZE=2)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        super(TestSolrIndexQueue, self).tearDown()
+
+    def test_queue_is_deduplicated_and_flushed_once(self):
+        with patch('hs_core.tasks.flush_solr_index_queue.apply_async') as apply_async:
+            for resource_id in (3, 1, 3, 2, 1):
+                queue_resource_for_indexing(resource_id)
+        self.assertEqual(self.redis.smembers(INDEX_QUEUE_KEY), {'1', '2', '3'})
+        apply_async.assert_called_once_with(countdown=5)
+
+        flushes = []
+
+        def flushed(sender, **kwargs):
+            flushes.append(kwargs)
+
+        solr_index_queue_flushed.connect(flushed)
+        try:
+            with patch('hs_core.hydro_realtime_signal_processor.index_resources',
+                       side_effect=lambda ids: (len(ids), 0)) as index_resources:
+                flush_index_queue()
+        finally:
+            solr_index_queue_flushed.disconnect(flushed)
+
+        # batches of SOLR_INDEX_BATCH_SIZE resources
+        self.assertEqual([c[0][0] for c in index_resources.call_args_list], [[1, 2], [3]])
+        self.assertEqual(self.redis.smembers(INDEX_QUEUE_KEY), set())
+        self.assertEqual(len(flushes), 1)
+        self.assertEqual(flushes[0]['queue_depth'], 3)
+        self.assertEqual(flushes[0]['indexed'], 3)
+
+        # the next save schedules another flush
+        with patch('hs_core.tasks.flush_solr_index_queue.apply_async') as apply_async:
+            queue_resource_for_indexing(4)
+        apply_async.assert_called_once_with(countdown=5)
+
+    def test_failed_flush_queues_resources_again(self):
+        self.redis.sadd(INDEX_QUEUE_KEY, 1, 2, 3)
+        with patch('hs_core.hydro_realtime_signal_processor.index_resources',
+                   side_effect=[(2, 0), IOError('Solr is down')]):
+            with patch('hs_core.tasks.flush_solr_index_queue.apply_async') as apply_async:
+                flush_index_queue()
+        self.assertEqual(self.redis.smembers(INDEX_QUEUE_KEY), {'3'})
+        apply_async.assert_called_once_with(countdown=5)
@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase
+from mock import MagicMock, patch
+
+from hs_core.transaction_hooks import on_commit
+
+
+class TestTransactionHooks(SimpleTestCase):
+
+    def test_on_commit_without_hooks(self):
+        # without commit hooks, func is called once, immediately
+        func = MagicMock()
+        with patch('hs_core.transaction_hooks.transaction', spec=[]):
+            on_commit(func)
+            on_commit(func, run_now=True)
+        self.assertEqual(2, func.call_count)
+
+    def test_on_commit_with_hooks(self):
+        func = MagicMock()
+        with patch('hs_core.transaction_hooks.transaction') as transaction:
+            on_commit(func)
+            self.assertFalse(func.called)
+            on_commit(func, run_now=True)
+            self.assertEqual(1, func.call_count)
+        self.assertEqual([((func,), {})] * 2, transaction.on_commit.call_args_list)
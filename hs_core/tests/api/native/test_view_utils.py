@@ -1,9 +1,11 @@
 from django.contrib.auth.models import Group
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 
 from hs_core.testing import MockIRODSTestCaseMixin
 from hs_core import hydroshare
-from hs_core.views.utils import create_folder, move_to_folder, list_folder, rename_file_or_folder
+from hs_core.views.utils import create_folder, move_to_folder, list_folder, \
+    rename_file_or_folder, get_my_resources_list
+from hs_access_control.models import PrivilegeCodes
 
 
 class TestViewUtils(MockIRODSTestCaseMixin, TestCase):
@@ -85,4 +87,81 @@ class TestViewUtils(MockIRODSTestCaseMixin, TestCase):
 
         resource.delete()
 
+
+    def test_get_my_resources_list(self):
+        group, _ = Group.objects.get_or_create(name='Resource Author')
+
+        user = hydroshare.create_account(
+            'user1@nowhere.com',
+            username='user1',
+            first_name='Creator_FirstName',
+            last_name='Creator_LastName',
+            superuser=False,
+            groups=[]
+        )
+        other = hydroshare.create_account(
+            'user2@nowhere.com',
+            username='user2',
+            first_name='Other_FirstName',
+            last_name='Other_LastName',
+            superuser=False,
+            groups=[]
+        )
+
+        owned = hydroshare.create_resource('GenericResource', user, 'owned resource')
+        shared = hydroshare.create_resource('GenericResource', other, 'shared resource')
+        claimed = hydroshare.create_resource('GenericResource', other, 'claimed resource')
+        hydroshare.create_resource('GenericResource', other, 'unrelated resource')
+
+        # CHANGE via a group and VIEW directly: the higher privilege wins
+        cats = other.uaccess.create_group(title='Cats', description='We are the cats')
+        other.uaccess.share_group_with_user(cats, user, PrivilegeCodes.VIEW)
+        other.uaccess.share_resource_with_group(shared, cats, PrivilegeCodes.CHANGE)
+        other.uaccess.share_resource_with_user(shared, user, PrivilegeCodes.VIEW)
+
+        claimed.raccess.discoverable = True
+        claimed.raccess.save()
+        user.ulabels.claim_resource(claimed)
+        user.ulabels.favorite_resource(claimed)
+        user.ulabels.label_resource(claimed, 'zebra')
+        user.ulabels.label_resource(claimed, 'aardvark')
+
+        request = RequestFactory().get('/my-resources/')
+        request.user = user
+        resources = {res.short_id: res for res in get_my_resources_list(request)}
+
+        self.assertEqual(set(resources), {owned.short_id, shared.short_id, claimed.short_id})
+        res = resources[owned.short_id]
+        self.assertEqual((res.owned, res.editable, res.viewable), (True, False, False))
+        self.assertFalse(res.discovered)
+        self.assertFalse(res.is_favorite)
+        self.assertEqual(res.labels, [])
+        res = resources[shared.short_id]
+        self.assertEqual((res.owned, res.editable, res.viewable), (False, True, False))
+        res = resources[claimed.short_id]
+        self.assertEqual((res.owned, res.editable, res.viewable), (False, False, False))
+        self.assertTrue(res.discovered)
+        self.assertTrue(res.is_favorite)
+        self.assertEqual(res.labels, ['aardvark', 'zebra'])
+
+        # immutable resources are listed as viewable rather than editable
+        shared.raccess.immutable = True
+        shared.raccess.save()
+        page = get_my_resources_list(request, order_by=['title'], start=1, count=1)
+        self.assertEqual([resource.short_id for resource in page], [owned.short_id])
+        res = get_my_resources_list(request, order_by=['title'], start=2)[0]
+        self.assertEqual(res.short_id, shared.short_id)
+        self.assertEqual((res.owned, res.editable, res.viewable), (False, False, True))
+
+        # privileges via a deactivated group don't count
+        shared.raccess.immutable = False
+        shared.raccess.save()
+        cats.gaccess.active = False
+        cats.gaccess.save()
+        res = {res.short_id: res for res in get_my_resources_list(request)}[shared.short_id]
+        self.assertEqual((res.owned, res.editable, res.viewable), (False, False, True))
+        other.uaccess.unshare_resource_with_user(shared, user)
+        resources = {res.short_id: res for res in get_my_resources_list(request)}
+        self.assertEqual(set(resources), {owned.short_id, claimed.short_id})
+
     # TODO: test_irods_path_is_directory(self):
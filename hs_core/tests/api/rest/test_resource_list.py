@@ -313,3 +313,23 @@ class TestResourceList(HSRESTTestCase):
                                                         'nonsensical': '90',
                                                         'params': '140'}, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_resource_list_cursor_pagination(self):
+
+        pids = []
+        for title in ('My Test Resource 1', 'My Test Resource 2', 'My Test Resource 3'):
+            new_res = resource.create_resource('GenericResource', self.user, title)
+            pids.append(new_res.short_id)
+            self.resources_to_delete.append(new_res.short_id)
+
+        response = self.client.get('/hydroshare/hsapi/resource/', {'pagination': 'cursor'},
+                                   format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = json.loads(response.content)
+        self.assertEqual(content['count'], 3)
+        self.assertIsNone(content['previous'])
+        self.assertIsNone(content['next'])
+        # newest resources are listed first
+        self.assertEqual([r['resource_id'] for r in content['results']], pids[::-1])
+        self.assertEqual(content['results'][0]['resource_title'], 'My Test Resource 3')
+        self.assertEqual(content['results'][0]['creator'], self.user.get_full_name())
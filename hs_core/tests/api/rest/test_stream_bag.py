@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+
+import bagit
+from rest_framework import status
+
+from hs_core.hydroshare import resource
+from .base import HSRESTTestCase
+
+
+class TestStreamBag(HSRESTTestCase):
+
+    def setUp(self):
+        super(TestStreamBag, self).setUp()
+
+        self.res = resource.create_resource('GenericResource',
+                                            self.user,
+                                            'My Test resource')
+        self.pid = self.res.short_id
+        self.resources_to_delete.append(self.pid)
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super(TestStreamBag, self).tearDown()
+
+    def test_stream_bag(self):
+        response = self.client.get("/hydroshare/hsapi/resource/{pid}/".format(pid=self.pid),
+                                   {'stream': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        content = b''.join(response.streaming_content)
+
+        zipfile.ZipFile(BytesIO(content)).extractall(self.tmp_dir)
+        bag = bagit.Bag(os.path.join(self.tmp_dir, self.pid))
+        self.assertTrue(bag.is_valid())
+        self.assertIn('data/resourcemetadata.xml', bag.entries)
+        self.assertIn('data/resourcemap.xml', bag.entries)
+
+        # the bag has not been created in iRODS
+        self.assertFalse(self.res.get_irods_storage().exists(self.res.bag_path))
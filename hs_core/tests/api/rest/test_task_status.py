@@ -0,0 +1,34 @@
+import json
+
+from django.core.urlresolvers import reverse
+from mock import patch
+from rest_framework import status
+
+from .base import HSRESTTestCase
+
+
+class TestTaskStatus(HSRESTTestCase):
+
+    def get_task_status(self, state, result=None):
+        with patch('hs_core.views.resource_rest_api.AsyncResult') as async_result:
+            async_result.return_value.state = state
+            async_result.return_value.result = result
+            async_result.return_value.info = result
+            async_result.return_value.successful.return_value = state == 'SUCCESS'
+            response = self.client.get(reverse('get_task_status', kwargs={'task_id': 'abc-123'}))
+        async_result.assert_called_once_with('abc-123')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_task_in_progress(self):
+        progress = {'files_done': 1, 'files_total': 3, 'bytes_done': 10, 'bytes_total': 30}
+        self.assertEqual({'status': None, 'state': 'PROGRESS', 'progress': progress},
+                         self.get_task_status('PROGRESS', progress))
+
+    def test_task_done(self):
+        self.assertEqual({'status': True, 'state': 'SUCCESS', 'progress': None},
+                         self.get_task_status('SUCCESS', True))
+
+    def test_task_failed(self):
+        self.assertEqual({'status': None, 'state': 'FAILURE', 'progress': None},
+                         self.get_task_status('FAILURE', ValueError('failed')))
@@ -0,0 +1,29 @@
+"""
+Run code once the current database transaction commits.
+
+Django 1.9 added transaction.on_commit; this tree still runs on earlier versions, which have
+no commit hooks. There, on_commit() calls func immediately: inside an atomic block that is
+BEFORE the block's changes are committed, so other processes (celery workers, other web
+workers) don't see them yet. Callers whose func needs the changes to be visible elsewhere,
+e.g. to queue a celery task that reads them, must call on_commit() after their atomic block
+returns, not inside it.
+"""
+
+from django.db import transaction
+
+
+def on_commit(func, run_now=False):
+    """
+    Call func once the current transaction commits, or immediately outside of a transaction
+    or without commit hooks (see above).
+
+    :param run_now: also call func immediately, e.g. to invalidate a cache both before the
+      commit, for the current transaction, and after it, in case concurrent requests cached
+      the old values meanwhile. func is called only once without commit hooks.
+    """
+    if hasattr(transaction, 'on_commit'):
+        if run_now:
+            func()
+        transaction.on_commit(func)
+    else:
+        func()
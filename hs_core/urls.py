@@ -1,5 +1,6 @@
 from django.conf.urls import patterns, url
 from hs_core import views
+from hs_core.views.discovery_json_view import DiscoveryTileView
 
 urlpatterns = patterns('',
     # internal API
@@ -88,4 +89,6 @@ urlpatterns = patterns('',
         views.resource_folder_hierarchy.data_store_rename_file_or_folder),
     url(r'^_internal/data-store-delete-folder/$',
         views.resource_folder_hierarchy.data_store_remove_folder),
+    url(r'^searchjson/tiles/(?P<z>[0-9]+)/(?P<x>[0-9]+)/(?P<y>[0-9]+)/$',
+        DiscoveryTileView.as_view(), name='discovery_tile'),
 )
@@ -1054,8 +1054,11 @@ class GroupUpdateForm(GroupForm):
 @processor_for('my-documents')
 @login_required
 def my_resources(request, page):
+    """ List all the resources of the user, most recently modified first
 
-    resource_collection = get_my_resources_list(request)
+    All of them are listed: the page filters them and counts them by facet in the browser.
+    """
+    resource_collection = get_my_resources_list(request, order_by=['-updated', '-pk'])
     context = {'collection': resource_collection}
 
     return context
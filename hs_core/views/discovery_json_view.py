@@ -1,7 +1,13 @@
 import json
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, Http404
+from django.utils.cache import patch_cache_control
 from haystack.generic_views import FacetedSearchView
+from hs_core.discovery_facets import COORDINATE_FIELDS, normalize_search_state
 from hs_core.discovery_form import DiscoveryForm
+from hs_core.discovery_tiles import MAX_CELL_LEVEL, get_tile, search_result_json
+
+# seconds for which browsers and proxies may reuse a map tile
+TILE_MAX_AGE = 60
 
 
 # View class for generating JSON data format from Haystack
@@ -27,45 +33,9 @@ class DiscoveryJsonView(FacetedSearchView):
 
             # iterate all the search results
             for result in self.get_queryset():
-                # initialize a null JSON object
-                json_obj = {}
-
-                # fetch as much information as possible from stored fields
-                solr = result.get_stored_fields()
-
-                # assign title and url values to the object
-                json_obj['short_id'] = solr['short_id']
-                json_obj['title'] = solr['title']
-                json_obj['resource_type'] = solr['resource_type']
-
-                json_obj['get_absolute_url'] = solr['absolute_url']
-                json_obj['first_author'] = solr['author']
-                # TODO: this is redundant. The value always exists but oft has value 'none'.
-                if solr['author_description']:
-                    json_obj['first_author_description'] = solr['author_description']
-
-                # iterate over all the coverage values
-                if solr['coverages'] is not None:
-                    for coverage in solr['coverages']:
-                        json_coverage = json.loads(coverage)
-                        if 'east' in json_coverage:
-                            json_obj['coverage_type'] = 'point'
-                            json_obj['east'] = json_coverage['east']
-                            json_obj['north'] = json_coverage['north']
-                        elif 'northlimit' in json_coverage:
-                            json_obj['coverage_type'] = 'box'
-                            json_obj['northlimit'] = json_coverage['northlimit']
-                            json_obj['eastlimit'] = json_coverage['eastlimit']
-                            json_obj['southlimit'] = json_coverage['southlimit']
-                            json_obj['westlimit'] = json_coverage['westlimit']
-                        # else, skip
-                        else:
-                            continue
-
-                # encode object to JSON string format
-                coor_obj = json.dumps(json_obj)
-                # add JSON object the results array
-                coor_values.append(coor_obj)
+                # encode the map information of the result to JSON string format, and add
+                # it to the results array
+                coor_values.append(json.dumps(search_result_json(result.get_stored_fields())))
 
             # encode the results results array to JSON array
             the_data = json.dumps(coor_values)
@@ -74,3 +44,27 @@ class DiscoveryJsonView(FacetedSearchView):
             return HttpResponse(the_data, content_type='application/json')
         else:
             return HttpResponse(json.dumps('[]'), content_type='application/json')
+
+
+# View class for the map tiles of the search results: clusters of points and counts of boxes
+# per tile (see hs_core.discovery_tiles), for maps with more results than can be drawn
+class DiscoveryTileView(FacetedSearchView):
+    # the tiles count no facets
+    facet_fields = []
+    form_class = DiscoveryForm
+
+    def form_valid(self, form):
+        z, x, y = (int(self.kwargs[name]) for name in ('z', 'x', 'y'))
+        if z > MAX_CELL_LEVEL or x >= 1 << z or y >= 1 << z:
+            raise Http404("No such tile")
+
+        # the tile is the bounding box
+        form.cleaned_data.update(dict.fromkeys(COORDINATE_FIELDS, ''))
+        state = normalize_search_state(form.cleaned_data, form.selected_facets)
+        response = HttpResponse(get_tile(form.search(), state, z, x, y),
+                                content_type='application/json')
+        patch_cache_control(response, public=True, max_age=TILE_MAX_AGE)
+        return response
+
+    def form_invalid(self, form):
+        return HttpResponseBadRequest(json.dumps(form.errors), content_type='application/json')
@@ -1,7 +1,61 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.db import connections
+
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.response import Response
+
 
 class SmallDatumPagination(PageNumberPagination):
     """ Only use for requests whose resulting datum elements are small and where
         one wants to force all results to be on one page
     """
     page_size = None
+
+
+def estimated_count(queryset, exact_below=1000):
+    """ Return an estimate of the number of rows in queryset without counting them
+
+    On PostgreSQL the row estimate of the query planner is used. Estimates below
+    exact_below are replaced with an exact count, which is cheap at that size and
+    avoids reporting an obviously wrong count for small result sets. On other
+    database backends an exact count is returned.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, basestring):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+    if estimate < exact_below:
+        return queryset.count()
+    return estimate
+
+
+class ResourceCursorPagination(CursorPagination):
+    """ Keyset pagination for resource listings
+
+        The page boundaries are pushed into the resource queryset as a range predicate on
+        the creation date, so serving a page costs the same regardless of how deep into
+        the listing it is. The total count is reported as an estimate.
+    """
+    page_size = 100
+    ordering = ('-created', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = estimated_count(queryset)
+        return super(ResourceCursorPagination, self).paginate_queryset(queryset, request,
+                                                                       view=view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
@@ -5,13 +5,16 @@ import tempfile
 import shutil
 import logging
 import json
+from collections import defaultdict
 
 from django.core.urlresolvers import reverse
 from django.core.exceptions import ObjectDoesNotExist, SuspiciousFileOperation
-from django.http import HttpResponseRedirect
+from django.conf import settings
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import redirect
 from django.contrib.sites.models import Site
 
+from celery.result import AsyncResult
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -20,7 +23,7 @@ from rest_framework.request import Request
 from rest_framework.exceptions import ValidationError, NotAuthenticated, PermissionDenied, NotFound
 
 from hs_core import hydroshare
-from hs_core.models import AbstractResource
+from hs_core.models import AbstractResource, Coverage, Creator, Title
 from hs_core.hydroshare.utils import get_resource_by_shortkey, get_resource_types
 from hs_core.views import utils as view_utils
 from hs_core.views.utils import ACTION_TO_AUTHORIZE
@@ -63,6 +66,114 @@ class ResourceToListItemMixin(object):
                                                           resource_url=resource_url)
         return resource_list_item
 
+    def resourcesToResourceListItems(self, resources):
+        """ Convert a page of resources to list items
+
+        The title, first creator and coverages of all resources in the page are fetched
+        with one query each rather than with several queries per resource. Resources whose
+        metadata can't be found this way fall back to resourceToResourceListItem.
+        """
+        resources = list(resources)
+        metadata_ids = [r.object_id for r in resources if r.object_id is not None]
+
+        titles = {}
+        for title in Title.objects.filter(object_id__in=metadata_ids):
+            titles[(title.content_type_id, title.object_id)] = title.value
+        creators = {}
+        for creator in Creator.objects.filter(object_id__in=metadata_ids, order=1):
+            creators[(creator.content_type_id, creator.object_id)] = creator.name
+        coverages = defaultdict(list)
+        for v in Coverage.objects.filter(object_id__in=metadata_ids).values(
+                'content_type_id', 'object_id', 'type', '_value'):
+            coverages[(v['content_type_id'], v['object_id'])].append(
+                {"type": v['type'], "value": json.loads(v['_value'])})
+
+        site_url = hydroshare.utils.current_site_url()
+        resource_list_items = []
+        for r in resources:
+            key = (r.content_type_id, r.object_id)
+            if key not in titles or key not in creators:
+                resource_list_items.append(self.resourceToResourceListItem(r))
+                continue
+            resource_list_item = serializers.ResourceListItem(
+                resource_type=r.resource_type,
+                resource_id=r.short_id,
+                resource_title=titles[key],
+                creator=creators[key],
+                public=r.raccess.public,
+                discoverable=r.raccess.discoverable,
+                shareable=r.raccess.shareable,
+                immutable=r.raccess.immutable,
+                published=r.raccess.published,
+                date_created=r.created,
+                date_last_updated=r.updated,
+                bag_url=site_url + r.bag_url,
+                coverages=coverages[key],
+                science_metadata_url=site_url + reverse('get_update_science_metadata',
+                                                        args=[r.short_id]),
+                resource_map_url=site_url + reverse('get_resource_map', args=[r.short_id]),
+                resource_url=site_url + r.get_absolute_url())
+            resource_list_items.append(resource_list_item)
+        return resource_list_items
+
+
+class ResourceListPaginationMixin(ResourceToListItemMixin):
+    """ List resources by paginating the resource queryset before serializing it
+
+    Only the resources of the page being returned are converted to list items. Passing
+    ``pagination=cursor`` (or a ``cursor`` returned in a previous response) selects keyset
+    pagination, which pushes the page boundary into the query and reports an estimated count;
+    in that mode the ``start`` and ``count`` parameters are ignored.
+    """
+    cursor_pagination_class = pagination.ResourceCursorPagination
+
+    @property
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return params.get('pagination') == 'cursor' or 'cursor' in params
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.use_cursor_pagination:
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        resource_list_request_validator = serializers.ResourceListRequestValidator(
+            data=self.request.query_params)
+        if not resource_list_request_validator.is_valid():
+            raise ValidationError(detail=resource_list_request_validator.errors)
+
+        filter_parms = resource_list_request_validator.validated_data
+        filter_parms['user'] = (self.request.user if self.request.user.is_authenticated() else None)
+        if len(filter_parms['type']) == 0:
+            filter_parms['type'] = None
+        else:
+            filter_parms['type'] = list(filter_parms['type'])
+
+        filter_parms['public'] = not self.request.user.is_authenticated()
+
+        if self.use_cursor_pagination:
+            filter_parms['start'] = None
+            filter_parms['count'] = None
+
+        return hydroshare.get_resource_list(**filter_parms).select_related('raccess')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(self.resourcesToResourceListItems(page), many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(self.resourcesToResourceListItems(queryset), many=True)
+        return Response(serializer.data)
+
 
 class ResourceFileToListItemMixin(object):
     def resourceFileToListItem(self, f):
@@ -134,7 +245,7 @@ class ResourceTypes(generics.ListAPIView):
         return serializers.ResourceTypesSerializer
 
 
-class ResourceList(ResourceToListItemMixin, generics.ListAPIView):
+class ResourceList(ResourceListPaginationMixin, generics.ListAPIView):
     """
     Get a list of resources based on the following filter query parameters
     DEPRECATED: See GET /resource/ in CreateResource
@@ -159,6 +270,9 @@ class ResourceList(ResourceToListItemMixin, generics.ListAPIView):
     :param  to_date: (optional) - to get a list of resources created on or before this date
     :param  edit_permission: (optional) - to get a list of resources for which the authorised user
     has edit permission
+    :param  pagination: (optional) - 'cursor' to page through the results with keyset pagination;
+    follow the returned next/previous links, which carry a *cursor* parameter. The count reported
+    in this mode is an estimate
     :rtype:  json string
     :return:  a paginated list of resources with data for resource id, title, resource type,
     creator, public, date created, date last updated, resource bag url path, and science
@@ -197,38 +311,30 @@ class ResourceList(ResourceToListItemMixin, generics.ListAPIView):
     def get(self, request):
         return self.list(request)
 
-    # needed for list of resources
-    def get_queryset(self):
-        resource_list_request_validator = serializers.ResourceListRequestValidator(
-            data=self.request.query_params)
-        if not resource_list_request_validator.is_valid():
-            raise ValidationError(detail=resource_list_request_validator.errors)
-
-        filter_parms = resource_list_request_validator.validated_data
-        filter_parms['user'] = (self.request.user if self.request.user.is_authenticated() else None)
-        if len(filter_parms['type']) == 0:
-            filter_parms['type'] = None
-        else:
-            filter_parms['type'] = list(filter_parms['type'])
-
-        filter_parms['public'] = not self.request.user.is_authenticated()
-
-        filtered_res_list = []
-
-        for r in hydroshare.get_resource_list(**filter_parms):
-            resource_list_item = self.resourceToResourceListItem(r)
-            filtered_res_list.append(resource_list_item)
-
-        return filtered_res_list
-
     def get_serializer_class(self):
         return serializers.ResourceListItemSerializer
 
 
 class CheckTaskStatus(generics.RetrieveAPIView):
+    """
+    Check the status of a celery task, such as one creating a resource bag
+
+    REST URL: hsapi/taskstatus/{task_id}
+    HTTP method: GET
+
+    :param task_id: id of the task
+    :return: {"status": the result of the task if it succeeded, otherwise null,
+              "state": the celery state of the task, e.g. PENDING, PROGRESS or SUCCESS,
+              "progress": the meta data of a task in the PROGRESS state, otherwise null; for
+              the create_bag_by_irods task: files_done, files_total, bytes_done, bytes_total}
+    """
     def get(self, request, task_id):
-        url = reverse('rest_check_task_status', kwargs={'task_id': task_id})
-        return HttpResponseRedirect(url)
+        result = AsyncResult(task_id)
+        return Response({
+            'status': result.result if result.successful() else None,
+            'state': result.state,
+            'progress': result.info if result.state == 'PROGRESS' else None,
+        })
 
 
 class ResourceReadUpdateDelete(ResourceToListItemMixin, generics.RetrieveUpdateDestroyAPIView):
@@ -268,11 +374,21 @@ class ResourceReadUpdateDelete(ResourceToListItemMixin, generics.RetrieveUpdateD
 
     def get(self, request, pk):
         """ Get resource in zipped BagIt format
+
+        With ?stream=true (the default when settings.BAG_DOWNLOAD_STREAMING is True), the bag
+        is zipped while it is sent, from the resource files, rather than created in iRODS and
+        then downloaded. Use ?stream=false to get the bag created in iRODS.
         """
         res, _, _ = view_utils.authorize(request, pk,
                                          needed_permission=ACTION_TO_AUTHORIZE.VIEW_RESOURCE)
         site_url = hydroshare.utils.current_site_url()
-        if res.resource_type.lower() == "reftimeseriesresource":
+        stream = request.query_params.get(
+            'stream', str(getattr(settings, 'BAG_DOWNLOAD_STREAMING', False))).lower() == 'true'
+        if stream and res.resource_type.lower() != "reftimeseriesresource":
+            response = StreamingHttpResponse(res.stream_bag(), content_type='application/zip')
+            response['Content-Disposition'] = 'attachment; filename="{}.zip"'.format(pk)
+            return response
+        elif res.resource_type.lower() == "reftimeseriesresource":
 
             # if res is RefTimeSeriesResource
             bag_url = site_url + reverse('rest_download_refts_resource_bag',
@@ -298,7 +414,7 @@ class ResourceReadUpdateDelete(ResourceToListItemMixin, generics.RetrieveUpdateD
         return serializers.ResourceListItemSerializer
 
 
-class ResourceListCreate(ResourceToListItemMixin, generics.ListCreateAPIView):
+class ResourceListCreate(ResourceListPaginationMixin, generics.ListCreateAPIView):
     """
     Create a new resource or list existing resources
 
@@ -360,6 +476,9 @@ class ResourceListCreate(ResourceToListItemMixin, generics.ListCreateAPIView):
     does not include obsoleted resource; if set to True, obsoleted resource will be included
     :param  edit_permission: (optional) - to get a list of resources for which the authorised user
     has edit permission
+    :param  pagination: (optional) - 'cursor' to page through the results with keyset pagination;
+    follow the returned next/previous links, which carry a *cursor* parameter. The count reported
+    in this mode is an estimate
     :param  coverage_type: (optional) - to get a list of resources that fall within the specified
     spatial coverage boundary (must be either 'box' or 'point')
     :param  north:  (optional) - north coordinate of spatial coverage. This parameter is required
@@ -525,30 +644,6 @@ class ResourceListCreate(ResourceToListItemMixin, generics.ListCreateAPIView):
     def get(self, request):
         return self.list(request)
 
-    # needed for list of resources
-    # copied from ResourceList
-    def get_queryset(self):
-        resource_list_request_validator = serializers.ResourceListRequestValidator(
-            data=self.request.query_params)
-        if not resource_list_request_validator.is_valid():
-            raise ValidationError(detail=resource_list_request_validator.errors)
-
-        filter_parms = resource_list_request_validator.validated_data
-        filter_parms['user'] = (self.request.user if self.request.user.is_authenticated() else None)
-        if len(filter_parms['type']) == 0:
-            filter_parms['type'] = None
-        else:
-            filter_parms['type'] = list(filter_parms['type'])
-
-        filter_parms['public'] = not self.request.user.is_authenticated()
-        filtered_res_list = []
-
-        for r in hydroshare.get_resource_list(**filter_parms):
-            resource_list_item = self.resourceToResourceListItem(r)
-            filtered_res_list.append(resource_list_item)
-
-        return filtered_res_list
-
     # covers serialization of output from GET request
     def get_serializer_class(self):
         return serializers.ResourceListItemSerializer
@@ -740,7 +835,7 @@ class ScienceMetadataRetrieveUpdate(APIView):
                                                                          hydroshare_host=domain)
                 # Update resource metadata
                 rm.write_metadata_to_resource(resource, update_title=True, update_keywords=True)
-                create_bag_files(resource)
+                create_bag_files(resource, force=True)
             except HsDeserializationDependencyException as e:
                 msg = ("HsDeserializationDependencyException encountered when updating "
                        "science metadata for resource {pk}; depedent resource was {dep}.")
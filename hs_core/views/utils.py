@@ -3,7 +3,7 @@ from __future__ import absolute_import
 import json
 import os
 import string
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 import paramiko
 import logging
 from dateutil import parser
@@ -14,6 +14,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.exceptions import SuspiciousFileOperation
 from django.core.files.base import File
+from django.db.models import Q
 from django.utils.http import int_to_base36
 from django.http import HttpResponse
 
@@ -30,7 +31,9 @@ from hs_core.models import AbstractMetaDataElement, BaseResource, GenericResourc
 from hs_core.signals import pre_metadata_element_create, post_delete_file_from_resource
 from hs_core.hydroshare.utils import get_file_mime_type
 from django_irods.storage import IrodsStorage
-from hs_access_control.models import PrivilegeCodes
+from hs_access_control.models import PrivilegeCodes, UserResourcePrivilege, \
+    GroupResourcePrivilege, UserGroupPrivilege, GroupAccess
+from hs_labels.models import FlagCodes, UserResourceFlags, UserResourceLabels
 
 ActionToAuthorize = namedtuple('ActionToAuthorize',
                                'VIEW_METADATA, '
@@ -157,7 +160,7 @@ def can_user_copy_resource(res, user):
 
 
 def authorize(request, res_id, needed_permission=ACTION_TO_AUTHORIZE.VIEW_RESOURCE,
-              raises_exception=True):
+              raises_exception=True, privileges=None):
     """
     This function checks if a user has authorization for resource related actions as outlined
     below. This function doesn't check authorization for user sharing resource with another user.
@@ -187,8 +190,11 @@ def authorize(request, res_id, needed_permission=ACTION_TO_AUTHORIZE.VIEW_RESOUR
        needed_permission=ACTION_TO_AUTHORIZE.CREATE_RESOURCE_VERSION)
 
     Note: resource 'shareable' status has no effect on authorization
+
+    :param privileges: (optional) a dict of effective privileges of the requesting user as
+    returned by UserAccess.get_effective_privileges. If it covers the resource, view, edit,
+    delete and flag permissions are decided from it without further privilege queries.
     """
-    authorized = False
     user = get_user(request)
 
     try:
@@ -196,6 +202,50 @@ def authorize(request, res_id, needed_permission=ACTION_TO_AUTHORIZE.VIEW_RESOUR
     except ObjectDoesNotExist:
         raise NotFound(detail="No resource was found for resource id:%s" % res_id)
 
+    authorized = _authorize_resource(user, res, needed_permission, privileges=privileges)
+
+    if raises_exception and not authorized:
+        raise PermissionDenied()
+    else:
+        return res, authorized, user
+
+
+def authorize_resources(request, res_ids, needed_permission=ACTION_TO_AUTHORIZE.VIEW_RESOURCE):
+    """
+    Check authorization for the same action over many resources at once.
+
+    The resources and the effective privileges of the requesting user over them are fetched
+    with a constant number of queries rather than a few queries per resource as repeated calls
+    to authorize() would need.
+
+    :param request: request whose user is to be authorized
+    :param res_ids: short ids of the resources to check
+    :param needed_permission: one of ACTION_TO_AUTHORIZE as for authorize()
+    :return: dict mapping each resource short id to True or False. Ids of resources that
+    do not exist map to False.
+    """
+    user = get_user(request)
+    resources = BaseResource.objects.filter(short_id__in=res_ids).select_related('raccess')
+    privileges = None
+    if user.is_authenticated() and user.is_active:
+        privileges = user.uaccess.get_effective_privileges(resources)
+
+    authorized = dict.fromkeys(res_ids, False)
+    for res in resources:
+        authorized[res.short_id] = _authorize_resource(user, res, needed_permission,
+                                                       privileges=privileges)
+    return authorized
+
+
+def _authorize_resource(user, res, needed_permission, privileges=None):
+    """ Return whether user is authorized for needed_permission over res; see authorize() """
+    if privileges is not None and res.id in privileges and \
+            user.is_authenticated() and user.is_active:
+        authorized = _authorize_by_privilege(user, res, privileges[res.id], needed_permission)
+        if authorized is not None:
+            return authorized
+
+    authorized = False
     if needed_permission == ACTION_TO_AUTHORIZE.VIEW_METADATA:
         if res.raccess.discoverable or res.raccess.public:
             authorized = True
@@ -219,10 +269,30 @@ def authorize(request, res_id, needed_permission=ACTION_TO_AUTHORIZE.VIEW_RESOUR
     elif needed_permission == ACTION_TO_AUTHORIZE.VIEW_RESOURCE:
         authorized = res.raccess.public
 
-    if raises_exception and not authorized:
-        raise PermissionDenied()
-    else:
-        return res, authorized, user
+    return authorized
+
+
+def _authorize_by_privilege(user, res, privilege, needed_permission):
+    """
+    Decide needed_permission from a precomputed effective privilege of an active user.
+
+    Mirrors the UserAccess.can_* checks that authorize() uses. Returns None for permissions
+    that can't be decided from the privilege alone.
+    """
+    if needed_permission == ACTION_TO_AUTHORIZE.VIEW_METADATA:
+        return res.raccess.discoverable or res.raccess.public or \
+            privilege <= PrivilegeCodes.VIEW
+    elif needed_permission in (ACTION_TO_AUTHORIZE.VIEW_RESOURCE,
+                               ACTION_TO_AUTHORIZE.VIEW_RESOURCE_ACCESS):
+        return res.raccess.public or privilege <= PrivilegeCodes.VIEW
+    elif needed_permission == ACTION_TO_AUTHORIZE.EDIT_RESOURCE:
+        return user.is_superuser or \
+            (not res.raccess.immutable and privilege <= PrivilegeCodes.CHANGE)
+    elif needed_permission in (ACTION_TO_AUTHORIZE.DELETE_RESOURCE,
+                               ACTION_TO_AUTHORIZE.SET_RESOURCE_FLAG):
+        return user.is_superuser or \
+            (privilege == PrivilegeCodes.OWNER and not res.raccess.published)
+    return None
 
 
 def validate_json(js):
@@ -346,60 +416,106 @@ def create_form(formclass, request):
     return params
 
 
-def get_my_resources_list(request):
+# correlated subqueries annotating each resource with the privilege and flags of a user;
+# formatted with the table and column names of the models and the user id.
+MY_RESOURCES_SELECT = {
+    'user_privilege': "SELECT MIN(urp.privilege) FROM {urp} urp "
+                      "WHERE urp.resource_id = {res}.{pk} AND urp.user_id = {user_id}",
+    'group_privilege': "SELECT MIN(grp.privilege) FROM {grp} grp "
+                       "JOIN {ugp} ugp ON ugp.group_id = grp.group_id "
+                       "JOIN {ga} ga ON ga.{ga_group} = grp.group_id AND ga.active "
+                       "WHERE grp.resource_id = {res}.{pk} AND ugp.user_id = {user_id}",
+    'is_favorite': "EXISTS (SELECT 1 FROM {urf} urf WHERE urf.resource_id = {res}.{pk} "
+                   "AND urf.user_id = {user_id} AND urf.kind = {favorite})",
+    'discovered': "EXISTS (SELECT 1 FROM {urf} urf WHERE urf.resource_id = {res}.{pk} "
+                  "AND urf.user_id = {user_id} AND urf.kind = {mine})",
+}
+
+
+def get_my_resources_queryset(user):
+    """
+    Return a QuerySet of the resources listed on the "My Resources" page of a user
+
+    These are the resources the user has privilege over, directly or via an active group, and
+    the resources the user has added to "My Resources", excluding obsoleted resources.
+    Each resource is listed once and is annotated with user_privilege and group_privilege
+    (lowest privilege code, or None), and is_favorite and discovered flags, in a single
+    query, so that the QuerySet can be sorted and sliced in the database.
+    """
+    privileged = Q(pk__in=UserResourcePrivilege.objects
+                   .filter(user=user, privilege__lte=PrivilegeCodes.VIEW)
+                   .values('resource_id'))
+    via_group = Q(pk__in=GroupResourcePrivilege.objects
+                  .filter(group__g2ugp__user=user, group__gaccess__active=True,
+                          privilege__lte=PrivilegeCodes.VIEW)
+                  .values('resource_id'))
+    discovered = Q(pk__in=UserResourceFlags.objects
+                   .filter(user=user, kind=FlagCodes.MINE)
+                   .values('resource_id'))
+    obsoleted = Relation.objects.filter(type='isReplacedBy').values('object_id')
+
+    names = {'res': BaseResource._meta.db_table,
+             'pk': BaseResource._meta.pk.column,
+             'urp': UserResourcePrivilege._meta.db_table,
+             'grp': GroupResourcePrivilege._meta.db_table,
+             'ugp': UserGroupPrivilege._meta.db_table,
+             'ga': GroupAccess._meta.db_table,
+             'ga_group': GroupAccess._meta.get_field('group').column,
+             'urf': UserResourceFlags._meta.db_table,
+             'user_id': int(user.pk),
+             'favorite': FlagCodes.FAVORITE,
+             'mine': FlagCodes.MINE}
+    select = {name: sql.format(**names) for name, sql in MY_RESOURCES_SELECT.items()}
+
+    return BaseResource.objects\
+        .filter(privileged | via_group | discovered)\
+        .exclude(object_id__in=obsoleted)\
+        .select_related('raccess')\
+        .extra(select=select)
+
+
+def get_my_resources_list(request, order_by=None, start=None, count=None):
+    """
+    Return the resources listed on the "My Resources" page of the requesting user
+
+    :param order_by: optional list of fields or annotations to sort by in the database
+    :param start: optional index of the first resource to return
+    :param count: optional number of resources to return
+
+    Every resource gets owned, editable, viewable, discovered and is_favorite flags and a
+    list of the labels the user assigned to it. Owned, editable and viewable follow
+    get_resources_with_explicit_access: immutable resources are viewable rather than
+    editable, and each resource has at most one of the three. Two queries are made
+    regardless of the number of resources: one for the resources and one for labels.
+    """
     user = request.user
-    # get a list of resources with effective OWNER privilege
-    owned_resources = user.uaccess.get_resources_with_explicit_access(PrivilegeCodes.OWNER)
-    # remove obsoleted resources from the owned_resources
-    owned_resources = owned_resources.exclude(object_id__in=Relation.objects.filter(
-        type='isReplacedBy').values('object_id'))
-
-    # get a list of resources with effective CHANGE privilege (should include resources that the
-    # user has access to via group
-    editable_resources = user.uaccess.get_resources_with_explicit_access(PrivilegeCodes.CHANGE,
-                                                                         via_group=True)
-    # remove obsoleted resources from the editable_resources
-    editable_resources = editable_resources.exclude(object_id__in=Relation.objects.filter(
-        type='isReplacedBy').values('object_id'))
-
-    # get a list of resources with effective VIEW privilege (should include resources that the
-    # user has access via group
-    viewable_resources = user.uaccess.get_resources_with_explicit_access(PrivilegeCodes.VIEW,
-                                                                         via_group=True)
-    # remove obsoleted resources from the viewable_resources
-    viewable_resources = viewable_resources.exclude(object_id__in=Relation.objects.filter(
-        type='isReplacedBy').values('object_id'))
-
-    owned_resources = list(owned_resources)
-    editable_resources = list(editable_resources)
-    viewable_resources = list(viewable_resources)
-    favorite_resources = list(user.ulabels.favorited_resources)
-    labeled_resources = list(user.ulabels.labeled_resources)
-    discovered_resources = list(user.ulabels.my_resources)
-
-    for res in owned_resources:
-        res.owned = True
-
-    for res in editable_resources:
-        res.editable = True
-
-    for res in viewable_resources:
-        res.viewable = True
-
-    for res in discovered_resources:
-        res.discovered = True
-
-    for res in (owned_resources + editable_resources + viewable_resources + discovered_resources):
-        res.is_favorite = False
-        if res in favorite_resources:
-            res.is_favorite = True
-        if res in labeled_resources:
-            res.labels = res.rlabels.get_labels(user)
-
-    resource_collection = (owned_resources + editable_resources + viewable_resources +
-                           discovered_resources)
-
-    return resource_collection
+    resources = get_my_resources_queryset(user)
+    if order_by:
+        resources = resources.order_by(*order_by)
+    if start is not None or count is not None:
+        start = start or 0
+        resources = resources[start:start + count] if count is not None else resources[start:]
+    resources = list(resources)
+
+    labels = defaultdict(list)
+    for resource_id, label in UserResourceLabels.objects\
+            .filter(user=user, resource__in=[res.pk for res in resources])\
+            .order_by('label').values_list('resource_id', 'label'):
+        labels[resource_id].append(label)
+
+    for res in resources:
+        privileges = [p for p in (res.user_privilege, res.group_privilege) if p is not None]
+        privilege = min(privileges) if privileges else PrivilegeCodes.NONE
+        if privilege == PrivilegeCodes.CHANGE and res.raccess.immutable:
+            privilege = PrivilegeCodes.VIEW
+        res.owned = privilege == PrivilegeCodes.OWNER
+        res.editable = privilege == PrivilegeCodes.CHANGE
+        res.viewable = privilege == PrivilegeCodes.VIEW
+        res.discovered = bool(res.discovered)
+        res.is_favorite = bool(res.is_favorite)
+        res.labels = labels[res.pk]
+
+    return resources
 
 
 def send_action_to_take_email(request, user, action_type, **kwargs):
@@ -24,9 +24,8 @@ from hs_app_netCDF.models import NetCDFMetaDataMixin, OriginalCoverage, Variable
 from hs_app_netCDF.forms import VariableForm, VariableValidationForm, OriginalCoverageForm
 
 from base import AbstractFileMetaData, AbstractLogicalFile
-import hs_file_types.nc_functions.nc_utils as nc_utils
 import hs_file_types.nc_functions.nc_dump as nc_dump
-import hs_file_types.nc_functions.nc_meta as nc_meta
+import hs_file_types.nc_functions.nc_extract as nc_extract
 
 
 class NetCDFFileMetaData(NetCDFMetaDataMixin, AbstractFileMetaData):
@@ -378,16 +377,18 @@ class NetCDFLogicalFile(AbstractLogicalFile):
             temp_dir = os.path.dirname(temp_file)
             files_to_add_to_resource.append(temp_file)
             # file validation and metadata extraction
-            nc_dataset = nc_utils.get_nc_dataset(temp_file)
-            if isinstance(nc_dataset, netCDF4.Dataset):
-                # Extract the metadata from netcdf file
-                res_dublin_core_meta, res_type_specific_meta = nc_meta.get_nc_meta_dict(temp_file)
+            nc_extraction = nc_extract.extract_nc_file(temp_file)
+            if nc_extraction is not None:
+                # the metadata extracted from netcdf file
+                res_dublin_core_meta = nc_extraction['dublin_core_meta']
+                res_type_specific_meta = nc_extraction['type_specific_meta']
                 # populate resource_metadata and file_type_metadata lists with extracted metadata
                 add_metadata_to_list(resource_metadata, res_dublin_core_meta,
                                      res_type_specific_meta, file_type_metadata, resource)
 
                 # create the ncdump text file
-                dump_file = create_header_info_txt_file(temp_file, nc_file_name)
+                dump_file = create_header_info_txt_file(temp_file, nc_file_name,
+                                                        nc_extraction['header'])
                 files_to_add_to_resource.append(dump_file)
                 file_folder = res_file.file_folder
                 with transaction.atomic():
@@ -766,18 +767,18 @@ def add_keywords_metadata(metadata_list, extracted_metadata, file_type=True):
                 metadata_list.append({'subject': {'value': keyword}})
 
 
-def create_header_info_txt_file(nc_temp_file, nc_file_name):
+def create_header_info_txt_file(nc_temp_file, nc_file_name, dump_str=None):
     """
     Creates the header text file using the *nc_temp_file*
     :param nc_temp_file: the netcdf file copied from irods to django
     for metadata extraction
+    :param dump_str: the header string of the file if already extracted (see
+    nc_extract.extract_nc_file)
     :return:
     """
 
-    if nc_dump.get_nc_dump_string_by_ncdump(nc_temp_file):
-        dump_str = nc_dump.get_nc_dump_string_by_ncdump(nc_temp_file)
-    else:
-        dump_str = nc_dump.get_nc_dump_string(nc_temp_file)
+    if dump_str is None:
+        dump_str = nc_dump.get_nc_header_string(nc_temp_file)
 
     # file name without the extension
     temp_dir = os.path.dirname(nc_temp_file)
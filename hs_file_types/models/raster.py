@@ -1,7 +1,6 @@
 import os
 import logging
 import shutil
-import subprocess
 import zipfile
 
 import xml.etree.ElementTree as ET
@@ -10,6 +9,7 @@ from gdalconst import GA_ReadOnly
 
 from functools import partial, wraps
 
+from django.conf import settings
 from django.db import models, transaction
 from django.core.files.uploadedfile import UploadedFile
 from django.core.exceptions import ValidationError
@@ -21,6 +21,7 @@ from dominate.tags import div, legend, form, button
 from hs_core.hydroshare import utils
 from hs_core.hydroshare.resource import delete_resource_file
 from hs_core.forms import CoverageTemporalForm, CoverageSpatialForm
+from hs_core.transaction_hooks import on_commit
 
 from hs_geo_raster_resource.models import CellInformation, BandInformation, OriginalCoverage, \
     GeoRasterMetaDataMixin
@@ -282,7 +283,7 @@ class GeoRasterLogicalFile(AbstractLogicalFile):
                 temp_dir = os.path.dirname(temp_file)
                 temp_vrt_file_path = [os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if
                                       '.vrt' == os.path.splitext(f)[1]].pop()
-                metadata = extract_metadata(temp_vrt_file_path)
+                metadata, approximate_statistics = extract_metadata(temp_vrt_file_path)
                 log.info("Geo raster file type metadata extraction was successful.")
                 with transaction.atomic():
                     # create a geo raster logical file object to be associated with resource files
@@ -353,6 +354,9 @@ class GeoRasterLogicalFile(AbstractLogicalFile):
                         # remove temp dir
                         if os.path.isdir(temp_dir):
                             shutil.rmtree(temp_dir)
+                # once committed, so that the task finds the logical file and its metadata
+                if approximate_statistics:
+                    schedule_exact_band_statistics(resource, logical_file)
             else:
                 err_msg = "Geo raster file type file validation failed.{}".format(
                     ' '.join(error_info))
@@ -459,8 +463,18 @@ def raster_file_validation(raster_file):
 
 
 def extract_metadata(temp_vrt_file_path):
+    """
+    Return the metadata elements extracted from the vrt file, and whether the band statistics
+    were approximated, in which case the exact ones are to be computed in the background with
+    schedule_exact_band_statistics()
+    """
     metadata = []
-    res_md_dict = raster_meta_extract.get_raster_meta_dict(temp_vrt_file_path)
+    if getattr(settings, 'RASTER_BAND_STATISTICS', 'approximate') == 'approximate':
+        approximate_above = getattr(settings, 'RASTER_EXACT_STATISTICS_MAX_CELLS', 25000000)
+    else:
+        approximate_above = None
+    res_md_dict = raster_meta_extract.get_raster_meta_dict(temp_vrt_file_path,
+                                                           approximate_above=approximate_above)
     wgs_cov_info = res_md_dict['spatial_coverage_info']['wgs84_coverage_info']
     # add core metadata coverage - box
     if wgs_cov_info:
@@ -483,7 +497,24 @@ def extract_metadata(temp_vrt_file_path):
     # Save extended meta band info
     for band_info in res_md_dict['band_info'].values():
         metadata.append({'BandInformation': band_info})
-    return metadata
+    return metadata, res_md_dict['approximate_statistics']
+
+
+def schedule_exact_band_statistics(resource, logical_file=None):
+    """
+    Compute the exact band statistics of a raster resource, or of a raster logical file of a
+    composite resource, in the background once the current transaction is committed.
+
+    Without commit hooks (see hs_core.transaction_hooks) the task is queued immediately, so
+    this is to be called after the atomic block creating the raster. The task also starts
+    settings.RASTER_BAND_STATISTICS_DELAY seconds later (default 10), and retries if the
+    raster is not committed yet.
+    """
+    # had to import it here to avoid import loop
+    from hs_geo_raster_resource.tasks import band_statistics_delay, update_band_statistics
+
+    args = (resource.short_id, logical_file.id if logical_file is not None else None)
+    on_commit(lambda: update_band_statistics.apply_async(args, countdown=band_statistics_delay()))
 
 
 def create_vrt_file(tif_file):
@@ -496,13 +527,16 @@ def create_vrt_file(tif_file):
     tif_file_name = os.path.basename(tif_file)
     vrt_file_path = os.path.join(temp_dir, os.path.splitext(tif_file_name)[0] + '.vrt')
 
-    with open(os.devnull, 'w') as fp:
-        subprocess.Popen(['gdal_translate', '-of', 'VRT', tif_file, vrt_file_path],
-                         stdout=fp,
-                         stderr=fp).wait()  # need to wait
-
-    # edit VRT contents
     try:
+        # in process rather than with gdal_translate (gdal.Translate requires GDAL >= 2.1);
+        # the vrt file is written next to the tif file, which is referenced relative to it
+        vrt_dataset = gdal.Translate(vrt_file_path, tif_file, format='VRT')
+        if vrt_dataset is None:
+            raise Exception(gdal.GetLastErrorMsg())
+        # closing the dataset writes the vrt file
+        del vrt_dataset
+
+        # edit VRT contents
         tree = ET.parse(vrt_file_path)
         root = tree.getroot()
         for element in root.iter('SourceFilename'):
@@ -519,24 +553,26 @@ def create_vrt_file(tif_file):
 
 
 def _explode_raster_zip_file(zip_file):
-    """ zip_file exists in temp directory - retrieved from irods """
+    """ zip_file exists in temp directory - retrieved from irods
+
+    Only the .tif and .vrt files are extracted, each straight to the temp directory whatever its
+    folder in the zip file.
+    """
 
     log = logging.getLogger()
     temp_dir = os.path.dirname(zip_file)
     try:
-        zf = zipfile.ZipFile(zip_file, 'r')
-        zf.extractall(temp_dir)
-        zf.close()
-
-        # get all the file abs names in temp_dir
         extract_file_paths = []
-        for dirpath, _, filenames in os.walk(temp_dir):
-            for name in filenames:
-                file_path = os.path.abspath(os.path.join(dirpath, name))
-                if os.path.splitext(os.path.basename(file_path))[1] in \
+        with zipfile.ZipFile(zip_file, 'r') as zf:
+            for member in zf.infolist():
+                name = os.path.basename(member.filename)
+                if os.path.splitext(name)[1] not in \
                         GeoRasterLogicalFile.get_allowed_storage_file_types():
-                    shutil.move(file_path, os.path.join(temp_dir, name))
-                    extract_file_paths.append(os.path.join(temp_dir, os.path.basename(file_path)))
+                    continue
+                file_path = os.path.join(temp_dir, name)
+                with zf.open(member) as member_file, open(file_path, 'wb') as extract_file:
+                    shutil.copyfileobj(member_file, extract_file)
+                extract_file_paths.append(file_path)
 
     except Exception as ex:
         log.exception("Failed to unzip. Error:{}".format(ex.message))
@@ -0,0 +1,73 @@
+"""
+Module extracts everything needed from a NetCDF file when it is uploaded or set as a file type,
+in a single pass over the file
+
+WORKFLOW:
+The file is opened once, then from the same dataset are extracted:
+1) the Dublin Core metadata from the global attributes: extract_nc_global_meta()
+2) the original and WGS84 coverage: extract_nc_coverage_meta()
+3) the variable metadata specific to the NetCDF types: get_type_specific_meta()
+4) the header text, from "ncdump -h", or from the dataset if ncdump fails: get_nc_header_string()
+
+The time taken by each stage is logged and returned with the results.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+
+from nc_utils import get_nc_dataset
+from nc_meta import extract_nc_global_meta, extract_nc_coverage_meta, get_type_specific_meta
+from nc_dump import get_nc_header_string
+
+
+def extract_nc_file(nc_file_name):
+    """
+    (string) -> dict
+
+    Return: None if the file is not a valid netcdf file, otherwise a dict of
+            'dublin_core_meta': the same as the first of get_nc_meta_dict(),
+            'type_specific_meta': the same as the second of get_nc_meta_dict(),
+            'header': the same string as get_nc_header_string(),
+            'timings': an OrderedDict of the seconds taken by each stage
+    """
+    log = logging.getLogger()
+    timings = OrderedDict()
+    start = time.time()
+
+    def stage(name):
+        # time since the end of the previous stage
+        now = time.time()
+        timings[name] = now - start - sum(timings.values())
+
+    nc_dataset = get_nc_dataset(nc_file_name)
+    stage('open')
+    if nc_dataset is None:
+        return None
+
+    try:
+        nc_global_meta = extract_nc_global_meta(nc_dataset)
+        stage('global_meta')
+
+        try:
+            nc_coverage_meta = extract_nc_coverage_meta(nc_dataset)
+        except Exception:
+            nc_coverage_meta = {}
+        stage('coverage_meta')
+
+        type_specific_meta = get_type_specific_meta(nc_dataset)
+        stage('variables_meta')
+
+        header = get_nc_header_string(nc_file_name, nc_dataset)
+        stage('header')
+    finally:
+        nc_dataset.close()
+
+    log.info("NetCDF extraction of {0}: {1}".format(
+        nc_file_name, ', '.join('{0} {1:.3f}s'.format(name, seconds)
+                                for name, seconds in timings.items())))
+
+    return {'dublin_core_meta': dict(nc_global_meta.items() + nc_coverage_meta.items()),
+            'type_specific_meta': type_specific_meta,
+            'header': header,
+            'timings': timings}
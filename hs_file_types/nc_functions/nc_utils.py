@@ -3,6 +3,7 @@ Module provides utility functions to manipulate netCDF dataset.
 - classify variable types of coordinate, coordinate bounds, grid mapping, scientific data,
     auxiliary coordinate
 - show original metadata of a variable
+- compute the extents of coordinate variables in bounded memory
 
 Reference code
 http://netcdf4-python.googlecode.com/svn/trunk/docs/netCDF4-module.html
@@ -10,12 +11,21 @@ http://netcdf4-python.googlecode.com/svn/trunk/docs/netCDF4-module.html
 
 
 import re
+import itertools
+import weakref
 from collections import OrderedDict
 
 import osr
 import netCDF4
 import numpy
 
+# largest number of bytes of a variable read at once to compute its extent
+MAX_EXTENT_READ_BYTES = 64 * 1024 * 1024
+
+# what is derived from the coordinate variables of an open dataset, as it doesn't change:
+# {nc_dataset: {'coordinate_type_mapping': dict, 'coordinate_meta': {var_name: dict}}}
+_dataset_memos = weakref.WeakKeyDictionary()
+
 
 # Functions for General Purpose
 def get_nc_dataset(nc_file_name):
@@ -71,6 +81,19 @@ def get_nc_variable_original_meta(nc_dataset, nc_variable_name):
     return nc_variable_original_meta
 
 
+def _get_dataset_memo(nc_dataset):
+    """
+    (object)-> dict
+
+    Return: the memo of what has been derived from the coordinate variables of the dataset
+    """
+    memo = _dataset_memos.get(nc_dataset)
+    if memo is None:
+        memo = {'coordinate_type_mapping': None, 'coordinate_meta': {}}
+        _dataset_memos[nc_dataset] = memo
+    return memo
+
+
 # Functions for coordinate information of the dataset
 # The functions below will call functions defined for auxiliary, coordinate and bounds variables.
 def get_nc_variables_coordinate_type_mapping(nc_dataset):
@@ -81,7 +104,17 @@ def get_nc_variables_coordinate_type_mapping(nc_dataset):
             XA, YA, ZA, TA Unknown_A for auxiliary variable
             XC_bnd, YC_bnd, ZC_bnd, TC_bnd, Unknown_bnd for coordinate bounds variable
             XA_bnd, YA_bnd, ZA_bnd, TA_bnd, Unknown_A_bnd for auxiliary coordinate bounds variable
+
+    The mapping is computed once per dataset.
     """
+    memo = _get_dataset_memo(nc_dataset)
+    if memo['coordinate_type_mapping'] is None:
+        memo['coordinate_type_mapping'] = _compute_nc_variables_coordinate_type_mapping(
+            nc_dataset)
+    return dict(memo['coordinate_type_mapping'])
+
+
+def _compute_nc_variables_coordinate_type_mapping(nc_dataset):
     nc_variables_dict = {
         "C": get_nc_coordinate_variables(nc_dataset),
         "A": get_nc_auxiliary_coordinate_variables(nc_dataset)
@@ -148,20 +181,26 @@ def get_nc_variable_coordinate_meta(nc_dataset, nc_variable_name):
 
     Return: coordinate meta data if the variable is related to a coordinate type:
             coordinate or auxiliary coordinate variable or bounds variable
+
+    The meta data is computed once per dataset and variable.
     """
+    memo = _get_dataset_memo(nc_dataset)['coordinate_meta']
+    if nc_variable_name not in memo:
+        memo[nc_variable_name] = _compute_nc_variable_coordinate_meta(nc_dataset,
+                                                                      nc_variable_name)
+    return dict(memo[nc_variable_name])
+
+
+def _compute_nc_variable_coordinate_meta(nc_dataset, nc_variable_name):
     nc_variables_coordinate_type_mapping = get_nc_variables_coordinate_type_mapping(nc_dataset)
     nc_variable_coordinate_meta = {}
     if nc_variable_name in nc_variables_coordinate_type_mapping.keys():
         nc_variable = nc_dataset.variables[nc_variable_name]
-        nc_variable_data = nc_variable[:]
         nc_variable_coordinate_type = nc_variables_coordinate_type_mapping[nc_variable_name]
-        coordinate_max = None
-        coordinate_min = None
-        if nc_variable_data.size:
-            coordinate_min = nc_variable_data[numpy.unravel_index(nc_variable_data.argmin(),
-                                                                  nc_variable_data.shape)]
-            coordinate_max = nc_variable_data[numpy.unravel_index(nc_variable_data.argmax(),
-                                                                  nc_variable_data.shape)]
+        # coordinate variables and their bounds are monotonic (CF conventions 4, 7.1)
+        coordinate_min, coordinate_max = get_nc_variable_extent(
+            nc_variable, monotonic=nc_variable_coordinate_type.endswith(('C', 'C_bnd')))
+        if coordinate_min is not None:
             coordinate_units = nc_variable.units if hasattr(nc_variable, 'units') else ''
 
             if nc_variable_coordinate_type in ['TC', 'TA', 'TC_bnd', 'TA_bnd']:
@@ -192,6 +231,73 @@ def get_nc_variable_coordinate_meta(nc_dataset, nc_variable_name):
     return nc_variable_coordinate_meta
 
 
+def get_nc_variable_extent(nc_variable, monotonic=False):
+    """
+    (object, bool)-> (value, value)
+
+    Return: the minimum and maximum values of the variable, ignoring masked values, or
+            (None, None) if it has no value.
+            The variable is read in blocks aligned to its chunks of MAX_EXTENT_READ_BYTES at
+            most, so that the memory used doesn't depend on its size. The extent of a
+            variable monotonic along its first dimension is that of its first and last
+            elements along that dimension.
+    """
+    if not nc_variable.size or not nc_variable.shape:
+        return None, None
+
+    if monotonic:
+        last = nc_variable.shape[0] - 1
+        ends = numpy.ma.concatenate([numpy.ma.ravel(nc_variable[0]),
+                                     numpy.ma.ravel(nc_variable[last])])
+        if not numpy.ma.count_masked(ends):
+            return ends.min(), ends.max()
+        # missing values at the ends: look at every value
+
+    coordinate_min = None
+    coordinate_max = None
+    for block in _get_nc_variable_blocks(nc_variable):
+        data = numpy.ma.ravel(nc_variable[block])
+        if not data.count():
+            continue
+        block_min = data.min()
+        block_max = data.max()
+        if coordinate_min is None or block_min < coordinate_min:
+            coordinate_min = block_min
+        if coordinate_max is None or block_max > coordinate_max:
+            coordinate_max = block_max
+
+    return coordinate_min, coordinate_max
+
+
+def _get_nc_variable_blocks(nc_variable):
+    """
+    (object)-> iterator
+
+    Return: the tuples of slices that split the variable into blocks of whole chunks of
+            MAX_EXTENT_READ_BYTES at most (or of a single chunk if it is larger)
+    """
+    shape = nc_variable.shape
+    chunking = nc_variable.chunking() if hasattr(nc_variable, 'chunking') else 'contiguous'
+    if chunking == 'contiguous' or not chunking:
+        # rows of the last dimension are contiguous
+        chunks = [1] * (len(shape) - 1) + [shape[-1]]
+    else:
+        chunks = [min(chunk, size) for chunk, size in zip(chunking, shape)]
+
+    # grow the blocks by whole chunks from the last dimension to the first
+    max_items = max(MAX_EXTENT_READ_BYTES // nc_variable.dtype.itemsize, 1) \
+        if isinstance(nc_variable.dtype, numpy.dtype) else 1
+    block = list(chunks)
+    for dim in reversed(range(len(shape))):
+        others = int(numpy.prod(block[:dim] + block[dim + 1:]))
+        block[dim] = max(min(shape[dim], max_items // others // chunks[dim] * chunks[dim]),
+                         chunks[dim])
+
+    starts = [range(0, size, step) for size, step in zip(shape, block)]
+    for start in itertools.product(*starts):
+        yield tuple(slice(begin, begin + step) for begin, step in zip(start, block))
+
+
 # Functions for Coordinate Variable
 # coordinate variable has the following attributes:
 # 1) it has 1 dimension
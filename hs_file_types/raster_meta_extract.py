@@ -10,8 +10,13 @@ using-python-gdal-bindings
 
 Update Notes
 This is used to process the vrt raster and to extract max, min value of each raster band.
+The band statistics are exact, or approximate when the raster has more cells than the
+approximate_above argument of get_raster_meta_dict(): computed by GDAL from overviews or a
+sample of the blocks of the raster.
 """
 
+import os
+import xml.etree.ElementTree as ET
 
 import gdal
 from gdalconst import GA_ReadOnly
@@ -23,23 +28,28 @@ import pycrs
 import numpy
 
 
-def get_raster_meta_dict(raster_file_name):
+def get_raster_meta_dict(raster_file_name, approximate_above=None):
     """
-    (string)-> dict
+    (string, int)-> dict
 
-    Return: the raster science metadata extracted from the raster file
+    Return: the raster science metadata extracted from the raster file, with
+            'approximate_statistics' True if the band statistics were approximated, which they
+            are when the raster has more than approximate_above cells (never if None)
     """
 
     # get the metadata info from raster files
     spatial_coverage_info = get_spatial_coverage_info(raster_file_name)
     cell_info = get_cell_info(raster_file_name)
-    band_info = get_band_info(raster_file_name)
+    approximate = approximate_above is not None and cell_info['rows'] is not None and \
+        cell_info['rows'] * cell_info['columns'] > approximate_above
+    band_info = get_band_info(raster_file_name, approximate=approximate)
 
     # write meta as dictionary
     raster_meta_dict = {
         'spatial_coverage_info': spatial_coverage_info,
         'cell_info': cell_info,
         'band_info': band_info,
+        'approximate_statistics': approximate,
     }
 
     return raster_meta_dict
@@ -274,13 +284,43 @@ def get_cell_info(raster_file_name):
     return cell_info
 
 
-def get_band_info(raster_file_name):
+def open_raster_dataset(raster_file_name):
+    """
+    (string) --> object
 
-    raster_dataset = gdal.Open(raster_file_name, GA_ReadOnly)
+    Return: the raster dataset opened read only, or None. The source files of a .vrt file that
+    are given relative to the working directory (relativeToVRT="0") are looked for in the
+    folder of the .vrt file, where they are uploaded, without changing the working directory.
+    """
+    if os.path.splitext(raster_file_name)[1] == '.vrt':
+        try:
+            root = ET.parse(raster_file_name).getroot()
+        except (IOError, ET.ParseError):
+            root = None
+        if root is not None:
+            vrt_dir = os.path.dirname(os.path.abspath(raster_file_name))
+            cwd_relative = [element for element in root.iter('SourceFilename')
+                            if element.get('relativeToVRT', '0') != '1' and element.text and
+                            not os.path.isabs(element.text) and
+                            not element.text.startswith('/vsi')]
+            if cwd_relative:
+                for element in cwd_relative:
+                    element.text = os.path.normpath(os.path.join(vrt_dir, element.text))
+                # the vrt file itself is left as uploaded: gdal opens the xml in memory
+                return gdal.Open(ET.tostring(root), GA_ReadOnly)
+
+    return gdal.Open(raster_file_name, GA_ReadOnly)
+
+
+def get_band_info(raster_file_name, approximate=False):
+    """
+    (string, bool) --> dict
+
+    Return: meta info of the bands of the raster, by band number. The minimum and maximum
+    values are computed from overviews or sampled blocks if approximate, else from all cells.
+    """
 
-    import os
-    ori_dir = os.getcwd()
-    os.chdir(os.path.dirname(raster_file_name))
+    raster_dataset = open_raster_dataset(raster_file_name)
 
     # get raster band count
     if raster_dataset:
@@ -289,7 +329,7 @@ def get_band_info(raster_file_name):
 
         for i in range(0, band_count):
             band = raster_dataset.GetRasterBand(i+1)
-            minimum, maximum, _, _ = band.ComputeStatistics(False)
+            minimum, maximum, _, _ = band.ComputeStatistics(approximate)
             no_data = band.GetNoDataValue()
             new_no_data = None
 
@@ -300,7 +340,7 @@ def get_band_info(raster_file_name):
 
             if new_no_data is not None:
                 band.SetNoDataValue(new_no_data)
-                minimum, maximum, _, _ = band.ComputeStatistics(False)
+                minimum, maximum, _, _ = band.ComputeStatistics(approximate)
 
             band_info[i+1] = {
                 'name': 'Band_'+str(i+1),
@@ -321,5 +361,4 @@ def get_band_info(raster_file_name):
         }
 
     raster_dataset = None
-    os.chdir(ori_dir)
     return band_info
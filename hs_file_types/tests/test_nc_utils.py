@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+
+import netCDF4
+import numpy
+from django.test import SimpleTestCase
+from mock import patch
+
+from hs_file_types.nc_functions import nc_utils, nc_meta, nc_dump, nc_extract
+
+
+class TestNetCDFFunctions(SimpleTestCase):
+    def setUp(self):
+        super(TestNetCDFFunctions, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = path = os.path.join(self.directory, 'extents.nc')
+        dataset = netCDF4.Dataset(path, 'w')
+        dataset.createDimension('time', None)
+        dataset.createDimension('y', 30)
+        dataset.createDimension('x', 40)
+        time_var = dataset.createVariable('time', 'f8', ('time',))
+        time_var.units = 'days since 2000-01-01'
+        time_var[:] = numpy.arange(10, 20)
+        lat = dataset.createVariable('lat', 'f4', ('y', 'x'), chunksizes=(7, 9),
+                                     fill_value=-999.0)
+        lat.standard_name = 'latitude'
+        lat.units = 'degrees_north'
+        values = numpy.ma.masked_array(numpy.linspace(30, 40, 30 * 40).reshape(30, 40),
+                                       mask=False)
+        # a missing value smaller than all others, and a maximum in the middle of the grid
+        values[0, 0] = numpy.ma.masked
+        values[13, 17] = 55.5
+        lat[:] = values
+        data = dataset.createVariable('temperature', 'f4', ('time', 'y', 'x'))
+        data.coordinates = 'lat'
+        dataset.close()
+        self.dataset = netCDF4.Dataset(path, 'r')
+
+    def tearDown(self):
+        self.dataset.close()
+        shutil.rmtree(self.directory)
+        super(TestNetCDFFunctions, self).tearDown()
+
+    def test_extent_is_reduced_over_blocks(self):
+        lat = self.dataset.variables['lat']
+        # several blocks of whole chunks
+        with patch.object(nc_utils, 'MAX_EXTENT_READ_BYTES', 4 * 7 * 18):
+            blocks = list(nc_utils._get_nc_variable_blocks(lat))
+            self.assertEqual(blocks[0], (slice(0, 7), slice(0, 18)))
+            self.assertEqual(len(blocks), 5 * 3)
+            low, high = nc_utils.get_nc_variable_extent(lat)
+        self.assertAlmostEqual(low, 30 + 10.0 / (30 * 40 - 1), places=4)
+        self.assertEqual(high, 55.5)
+
+    def test_coordinate_meta(self):
+        meta = nc_utils.get_nc_variable_coordinate_meta(self.dataset, 'time')
+        self.assertEqual(meta['coordinate_type'], 'TC')
+        self.assertEqual(meta['coordinate_start'].day, 11)
+        self.assertEqual(meta['coordinate_end'].day, 20)
+
+        meta = nc_utils.get_nc_variable_coordinate_meta(self.dataset, 'lat')
+        self.assertEqual(meta['coordinate_type'], 'YA')
+        self.assertEqual(meta['coordinate_end'], 55.5)
+        self.assertEqual(nc_utils.get_nc_variable_coordinate_meta(self.dataset, 'temperature'),
+                         {})
+
+    def test_single_pass_extraction(self):
+        with patch.object(nc_extract, 'get_nc_dataset', wraps=nc_utils.get_nc_dataset) as open_, \
+                patch.object(nc_dump, 'get_nc_dump_string_by_ncdump',
+                             wraps=nc_dump.get_nc_dump_string_by_ncdump) as ncdump:
+            extraction = nc_extract.extract_nc_file(self.path)
+        self.assertEqual(open_.call_count, 1)
+        self.assertEqual(ncdump.call_count, 1)
+
+        dublin_core_meta, type_specific_meta = nc_meta.get_nc_meta_dict(self.path)
+        self.assertEqual(extraction['dublin_core_meta'], dublin_core_meta)
+        self.assertEqual(extraction['type_specific_meta'], type_specific_meta)
+        self.assertEqual(extraction['dublin_core_meta']['period'],
+                         {'start': '2000-01-11 00:00:00', 'end': '2000-01-20 00:00:00'})
+        self.assertIn('lat', extraction['header'])
+        self.assertEqual(list(extraction['timings']),
+                         ['open', 'global_meta', 'coverage_meta', 'variables_meta', 'header'])
+
+        self.assertIsNone(nc_extract.extract_nc_file(os.path.join(self.directory, 'none.nc')))
@@ -2,12 +2,13 @@ import os
 import tempfile
 import shutil
 
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from django.db import IntegrityError
 from django.contrib.auth.models import Group
 from django.core.files.uploadedfile import UploadedFile
 from django.core.exceptions import ValidationError
 
+from mock import patch
 from rest_framework.exceptions import ValidationError as DRF_ValidationError
 
 from hs_core.testing import MockIRODSTestCaseMixin
@@ -17,9 +18,11 @@ from hs_core.hydroshare.utils import resource_post_create_actions, \
     get_resource_file_name_and_extension
 from hs_core.views.utils import remove_folder, move_or_rename_file_or_folder
 
+from hs_file_types import raster_meta_extract
 from hs_file_types.models import GeoRasterLogicalFile, GeoRasterFileMetaData, GenericLogicalFile
 from utils import assert_raster_file_type_metadata
 from hs_geo_raster_resource.models import OriginalCoverage, CellInformation, BandInformation
+from hs_geo_raster_resource.tasks import update_band_statistics
 
 
 class RasterFileTypeMetaData(MockIRODSTestCaseMixin, TransactionTestCase):
@@ -202,6 +205,43 @@ class RasterFileTypeMetaData(MockIRODSTestCaseMixin, TransactionTestCase):
 
         self.composite_resource.delete()
 
+    @override_settings(RASTER_BAND_STATISTICS='approximate', RASTER_EXACT_STATISTICS_MAX_CELLS=0)
+    def test_set_file_type_to_geo_raster_approximate_statistics(self):
+        # here the band statistics of the vrt file are approximated when the file type is set,
+        # then the exact ones are computed by a celery task once the transaction commits
+
+        self.raster_file_obj = open(self.raster_zip_file, 'r')
+        self._create_composite_resource()
+        res_file = self.composite_resource.files.first()
+        cwd = os.getcwd()
+
+        with patch.object(raster_meta_extract, 'get_band_info',
+                          wraps=raster_meta_extract.get_band_info) as get_band_info:
+            with patch.object(update_band_statistics, 'apply_async') as apply_async:
+                GeoRasterLogicalFile.set_file_type(self.composite_resource, res_file.id,
+                                                   self.user)
+            # the task is queued, and is run here without a broker
+            logical_file = self.composite_resource.files.first().logical_file
+            self.assertEqual(1, apply_async.call_count)
+            args = apply_async.call_args[0][0]
+            self.assertEqual((self.composite_resource.short_id, logical_file.id), args)
+            self.assertTrue(update_band_statistics.apply(args).successful())
+        self.assertEqual([call[1].get('approximate', False)
+                          for call in get_band_info.call_args_list], [True, False])
+
+        # the working directory is unchanged
+        self.assertEqual(os.getcwd(), cwd)
+
+        # the band information has the exact statistics
+        logical_file = self.composite_resource.files.first().logical_file
+        self.assertEqual(logical_file.metadata.bandInformations.count(), 1)
+        band_info = logical_file.metadata.bandInformations.first()
+        self.assertEqual(band_info.noDataValue, '-3.40282346639e+38')
+        self.assertEqual(band_info.maximumValue, '2880.00708008')
+        self.assertEqual(band_info.minimumValue, '2274.95898438')
+
+        self.composite_resource.delete()
+
     def test_set_file_type_to_geo_raster_invalid_file_1(self):
         # here we are using an invalid raster tif file for setting it
         # to Geo Raster file type which should fail
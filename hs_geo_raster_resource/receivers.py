@@ -118,7 +118,7 @@ def _process_uploaded_file(resource, validate_files_dict):
             temp_dir = os.path.dirname(temp_file)
             temp_vrt_file_path = [os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if
                                   '.vrt' == os.path.splitext(f)[1]].pop()
-            metadata = raster.extract_metadata(temp_vrt_file_path)
+            metadata, approximate_statistics = raster.extract_metadata(temp_vrt_file_path)
             # delete the original resource file
             file_name = delete_resource_file_only(resource, res_file)
             delete_format_metadata_after_delete_file(resource, file_name)
@@ -137,6 +137,8 @@ def _process_uploaded_file(resource, validate_files_dict):
             log_msg = "Geo raster resource (ID:{}) - extracted metadata was saved to DB"
             log_msg = log_msg.format(resource.short_id)
             log.info(log_msg)
+            if approximate_statistics:
+                raster.schedule_exact_band_statistics(resource)
         else:
             # delete the invalid file just uploaded
             delete_resource_file_only(resource, res_file)
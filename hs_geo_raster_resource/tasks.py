@@ -0,0 +1,104 @@
+"""Define celery tasks for hs_geo_raster_resource app."""
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import logging
+from uuid import uuid4
+
+from django.conf import settings
+
+from celery import shared_task
+
+from hs_core.models import BaseResource
+from hs_core.hydroshare import utils
+from hs_file_types import raster_meta_extract
+
+
+# Pass 'django' into getLogger instead of __name__
+# for celery tasks (as this seems to be the
+# only way to successfully log in code executed
+# by celery, despite our catch-all handler).
+logger = logging.getLogger('django')
+
+
+def band_statistics_delay():
+    """ Return the seconds to wait before computing band statistics, or retrying to """
+    return getattr(settings, 'RASTER_BAND_STATISTICS_DELAY', 10)
+
+
+def _retry_band_statistics(task, resource_id, missing):
+    """
+    Retry the task later, as the raster it was queued for may not be committed yet, or give up
+    once it was retried max_retries times, as the raster was then deleted meanwhile
+    """
+    try:
+        raise task.retry(countdown=band_statistics_delay())
+    except task.MaxRetriesExceededError:
+        logger.info("Gave up computing the band statistics of resource {}: its {} is "
+                    "missing".format(resource_id, missing))
+
+
+@shared_task(bind=True, max_retries=5)
+def update_band_statistics(self, resource_id, logical_file_id=None):
+    """
+    Compute the exact band statistics of a raster whose statistics were approximated when it
+    was uploaded, and update its BandInformation elements with them.
+
+    The task is retried if the raster is missing; see _retry_band_statistics.
+
+    :param resource_id: short id of the raster resource, or of the composite resource
+    :param logical_file_id: id of the GeoRasterLogicalFile of the composite resource, or None
+    """
+    # had to import it here to avoid import loop
+    from hs_file_types.models import GeoRasterLogicalFile
+
+    try:
+        resource = utils.get_resource_by_shortkey(resource_id, or_404=False)
+    except BaseResource.DoesNotExist:
+        return _retry_band_statistics(self, resource_id, 'resource')
+
+    if logical_file_id is None:
+        metadata = resource.metadata
+        res_files = resource.files.all()
+    else:
+        logical_file = GeoRasterLogicalFile.objects.filter(id=logical_file_id).first()
+        if logical_file is None:
+            return _retry_band_statistics(self, resource_id, 'raster logical file')
+        metadata = logical_file.metadata
+        res_files = logical_file.files.all()
+    if not metadata.bandInformations.exists():
+        return _retry_band_statistics(self, resource_id, 'band information')
+
+    # the tif files referenced by the vrt file are copied next to it
+    istorage = resource.get_irods_storage()
+    temp_dir = os.path.join(settings.TEMP_FILE_DIR, uuid4().hex)
+    os.makedirs(temp_dir)
+    try:
+        vrt_file_path = None
+        for res_file in res_files:
+            temp_file = os.path.join(temp_dir, os.path.basename(res_file.storage_path))
+            istorage.getFile(res_file.storage_path, temp_file)
+            if res_file.extension == '.vrt':
+                vrt_file_path = temp_file
+        if vrt_file_path is None:
+            return _retry_band_statistics(self, resource_id, 'vrt file')
+
+        band_info = raster_meta_extract.get_band_info(vrt_file_path)
+    finally:
+        shutil.rmtree(temp_dir)
+
+    if 'name' in band_info:
+        # the raster could not be opened
+        logger.error("Failed to compute the band statistics of resource {}".format(resource_id))
+        return
+
+    # the band elements were created in the order of the band numbers
+    band_elements = metadata.bandInformations.order_by('id')
+    for band_element, band_number in zip(band_elements, sorted(band_info)):
+        metadata.update_element('bandinformation', band_element.id,
+                                noDataValue=band_info[band_number]['noDataValue'],
+                                maximumValue=band_info[band_number]['maximumValue'],
+                                minimumValue=band_info[band_number]['minimumValue'])
+    utils.set_dirty_bag_flag(resource)
@@ -1,9 +1,14 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
 from hs_core.signals import pre_metadata_element_create, pre_metadata_element_update, \
                             pre_create_resource
 
-from hs_tools_resource.models import ToolResource
+from hs_core.models import AbstractMetaDataElement
+from hs_tools_resource import tool_index
+from hs_tools_resource.models import ToolResource, ToolMetaData, SupportedResTypes, \
+    SupportedSharingStatus
 from hs_tools_resource.forms import SupportedResTypesValidationForm,  VersionForm, \
                                     UrlValidationForm, \
                                     SupportedSharingStatusValidationForm, RoadmapForm, \
@@ -74,3 +79,19 @@ def validate_form(request, element_name):
         return {'is_valid': True, 'element_data_dict': element_form.cleaned_data}
     else:
         return {'is_valid': False, 'element_data_dict': None, "errors": element_form.errors}
+
+
+@receiver([post_save, post_delete])
+def webapp_metadata_element_changed(sender, instance, **kwargs):
+    """Delete the index of web apps when a metadata element of a web app changes"""
+    if isinstance(instance, AbstractMetaDataElement) and \
+            instance.content_type_id == ContentType.objects.get_for_model(ToolMetaData).id:
+        tool_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=ToolMetaData)
+@receiver(m2m_changed, sender=SupportedResTypes.supported_res_types.through)
+@receiver(m2m_changed, sender=SupportedSharingStatus.sharing_status.through)
+def webapp_metadata_changed(sender, **kwargs):
+    """Delete the index of web apps when a web app is approved or its supported types change"""
+    tool_index.invalidate()
@@ -1,7 +1,7 @@
 
 from urlparse import urlparse, parse_qs
 
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from django.contrib.auth.models import Group
 from django.http import HttpRequest
 
@@ -13,6 +13,7 @@ from hs_tools_resource.models import RequestUrlBase, ToolVersion, SupportedResTy
 from hs_tools_resource.receivers import metadata_element_pre_create_handler, \
                                         metadata_element_pre_update_handler
 from hs_tools_resource.utils import parse_app_url_template
+from hs_tools_resource.app_launch_helper import resource_level_tool_urls
 
 
 class TestWebAppFeature(TransactionTestCase):
@@ -333,3 +334,28 @@ class TestWebAppFeature(TransactionTestCase):
                                                 [self.resGeneric.get_hs_term_dict(),
                                                  term_dict_user])
         self.assertEqual(new_url_string, None)
+
+    @override_settings(TOOL_INDEX_CACHE='default')
+    def test_resource_level_tool_urls(self):
+        request = HttpRequest()
+        request.user = self.user
+        # the web app has no url and supports no resource type yet
+        self.assertEqual(resource_level_tool_urls(self.resGeneric, request), None)
+
+        resource.create_metadata_element(self.resWebApp.short_id, 'RequestUrlBase',
+                                         value='https://www.google.com?res=${HS_RES_ID}')
+        resource.create_metadata_element(self.resWebApp.short_id, 'SupportedResTypes',
+                                         supported_res_types=['GenericResource'])
+        tools = resource_level_tool_urls(self.resGeneric, request)
+        self.assertEqual(len(tools['tool_list']), 1)
+        tool = tools['tool_list'][0]
+        self.assertEqual(tool['res_id'], self.resWebApp.short_id)
+        self.assertEqual(tool['title'], 'Test Web App Resource')
+        self.assertEqual(tool['url'], 'https://www.google.com?res=' + self.resGeneric.short_id)
+        self.assertFalse(tool['openwithlist'])
+
+        # the index is rebuilt when the web app metadata changes
+        resource.update_metadata_element(self.resWebApp.short_id, 'SupportedSharingStatus',
+                                         self.resWebApp.metadata.supported_sharing_status.id,
+                                         sharing_status=['Public'])
+        self.assertEqual(resource_level_tool_urls(self.resGeneric, request), None)
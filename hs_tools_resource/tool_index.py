@@ -0,0 +1,111 @@
+"""
+Index of the web apps that can open resources, for the "Open with" menu of landing pages.
+
+The index maps a resource type (lowercase) and a sharing status (see
+ResourceAccess.sharing_status) to the web apps that support them. For each app it keeps what
+the menu shows: the app's title and icon, its url template and whether it is approved. The
+index is built with a constant number of queries and cached in the Django cache named by
+settings.TOOL_INDEX_CACHE, for settings.TOOL_INDEX_CACHE_TIMEOUT seconds (default 86400). The
+index is deleted when the metadata of any web app changes (see hs_tools_resource.receivers)
+and rebuilt on the next lookup, so the cache must be shared by all web and celery processes;
+without it, the index is built for every lookup.
+
+Permissions and user "open with" flags are not part of the index; they are checked per
+request by resource_level_tool_urls.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+from hs_core.transaction_hooks import on_commit
+from hs_tools_resource.models import ToolResource, ToolMetaData, SupportedResTypes
+
+TOOL_INDEX_KEY = 'hs_tools_resource:tool_index'
+SHARING_STATUSES = ('published', 'public', 'discoverable', 'private')
+DEFAULT_ICON_URL = "raise-img-error"
+
+
+def _cache():
+    """ Return the cache of the index, or None if it is not cached """
+    alias = getattr(settings, 'TOOL_INDEX_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def _timeout():
+    return getattr(settings, 'TOOL_INDEX_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def _first(elements):
+    """ Return the first of prefetched metadata elements, as the .first() properties do """
+    elements = sorted(elements, key=lambda element: element.pk)
+    return elements[0] if elements else None
+
+
+def _supported_sharing_statuses(metadata):
+    supported_sharing_status = _first(metadata._supported_sharing_status.all())
+    if supported_sharing_status is None:
+        # backward compatible: webapp without supported_sharing_status metadata
+        # is considered to support all sharing status
+        return SHARING_STATUSES
+    sharing_status_str = ', '.join(choice.description for choice in
+                                   supported_sharing_status.sharing_status.all()).lower()
+    return [status for status in SHARING_STATUSES if status in sharing_status_str]
+
+
+def _tool_entry(tool, metadata):
+    """ Return what the "Open with" menu shows of a web app, or None if it has no url """
+    url_base = _first(metadata._url_base.all())
+    if url_base is None:
+        return None
+    title = _first(metadata._title.all())
+    app_icon = _first(metadata._tool_icon.all())
+    return {'res_id': tool.short_id,
+            'title': str(title.value) if title else '',
+            'icon_url': app_icon.data_url if app_icon else DEFAULT_ICON_URL,
+            'url_template': url_base.value,
+            'approved': metadata.approved}
+
+
+def build_tool_index():
+    """ Return the index of web apps by (resource type, sharing status) """
+    tools = {tool.object_id: tool for tool in ToolResource.objects.all()}
+    metadata = {md.id: md for md in ToolMetaData.objects.filter(id__in=list(tools))
+                .prefetch_related('_title', '_url_base', '_tool_icon',
+                                  '_supported_sharing_status__sharing_status')}
+
+    index = {}
+    # in the order the apps were associated with resource types
+    for supported in SupportedResTypes.objects.filter(object_id__in=list(metadata))\
+                                              .prefetch_related('supported_res_types')\
+                                              .order_by('pk'):
+        tool, tool_metadata = tools[supported.object_id], metadata[supported.object_id]
+        entry = _tool_entry(tool, tool_metadata)
+        if entry is None:
+            continue
+        for status in _supported_sharing_statuses(tool_metadata):
+            for choice in supported.supported_res_types.all():
+                index.setdefault((choice.description.lower(), status), []).append(entry)
+    return index
+
+
+def get_tools(resource_type, sharing_status):
+    """
+    Return the web apps that support a resource type and sharing status, from the cached
+    index.
+    """
+    cache = _cache()
+    index = cache.get(TOOL_INDEX_KEY) if cache is not None else None
+    if index is None:
+        index = build_tool_index()
+        if cache is not None:
+            cache.set(TOOL_INDEX_KEY, index, _timeout())
+    return index.get((resource_type.lower(), sharing_status.lower()), [])
+
+
+def invalidate():
+    """ Delete the index, to be rebuilt on the next lookup """
+    cache = _cache()
+    if cache is None:
+        return
+    # concurrent requests may have cached the old index before this commits
+    on_commit(lambda: cache.delete(TOOL_INDEX_KEY), run_now=True)
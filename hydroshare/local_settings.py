@@ -47,6 +47,44 @@ PERMISSIONS_DB= redis.Redis(
     host=REDIS_HOST,
     port=REDIS_PORT,
     db=6)
+SOLR_INDEX_QUEUE_DB = redis.Redis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=7)
+SHARED_CACHE_DB = redis.Redis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=8)
+# 'shared' is seen by all web and celery processes, so that invalidating a cached value in one
+# of them invalidates it in all; caches that must stay consistent across processes use it
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'hs_core.redis_cache.RedisCache',
+        'LOCATION': 'SHARED_CACHE_DB',
+    },
+}
+# cache of effective privileges across requests (see hs_access_control.privilege_cache);
+# must be a cache shared by all processes, or unset to turn the cross-request layer off
+ACCESS_CONTROL_CACHE = 'shared'
+# resources saved are indexed in Solr by a task at most SOLR_INDEX_MAX_LATENCY seconds later,
+# SOLR_INDEX_BATCH_SIZE resources per update (see HydroQueuedSignalProcessor)
+SOLR_INDEX_MAX_LATENCY = int(os.environ.get('SOLR_INDEX_MAX_LATENCY', '10'))
+SOLR_INDEX_BATCH_SIZE = int(os.environ.get('SOLR_INDEX_BATCH_SIZE', '100'))
+# seconds for which the facet counts of a discovery search are cached in SOLR_INDEX_QUEUE_DB
+DISCOVERY_FACETS_CACHE_TIMEOUT = int(os.environ.get('DISCOVERY_FACETS_CACHE_TIMEOUT', '3600'))
+# cache of the read-only part of resource landing pages (see hs_core.landing_page_cache);
+# must be shared by all processes, or unset to not cache landing pages
+LANDING_PAGE_CACHE = 'shared'
+# seconds for which the read-only part of a resource landing page is cached
+LANDING_PAGE_CACHE_TIMEOUT = int(os.environ.get('LANDING_PAGE_CACHE_TIMEOUT', '3600'))
+# cache of the index of web apps by resource type and sharing status (see
+# hs_tools_resource.tool_index); must be shared by all processes, or unset to not cache it
+TOOL_INDEX_CACHE = 'shared'
+# seconds for which the index is cached; it is also rebuilt whenever web app metadata changes
+TOOL_INDEX_CACHE_TIMEOUT = int(os.environ.get('TOOL_INDEX_CACHE_TIMEOUT', '86400'))
 
 
 IPYTHON_SETTINGS=[]
@@ -131,6 +169,29 @@ REMOTE_USE_IRODS = os.environ.get('REMOTE_USE_IRODS', 'false') == 'true'
 IRODS_BAGIT_RULE = os.environ.get('IRODS_BAGIT_RULE', 'hydroshare/irods/ruleGenerateBagIt_HS.r')
 IRODS_BAGIT_PATH = os.environ.get('IRODS_BAGIT_PATH', 'bags')
 IRODS_BAGIT_POSTFIX = os.environ.get('IRODS_BAGIT_POSTFIX', 'zip')
+# seconds to wait for more metadata edits before regenerating the bag metadata files,
+# and seconds for which generated metadata files are cached
+BAG_FILES_DEBOUNCE = int(os.environ.get('BAG_FILES_DEBOUNCE', '10'))
+# cache in which pending bag metadata updates are recorded to coalesce them (see
+# hs_bagit.schedule_bag_files); must be shared by all processes, or unset to not coalesce
+BAG_FILES_CACHE = 'shared'
+BAG_METADATA_CACHE_TIMEOUT = int(os.environ.get('BAG_METADATA_CACHE_TIMEOUT', '86400'))
+# 'approximate' to compute the statistics of the bands of uploaded rasters of more than
+# RASTER_EXACT_STATISTICS_MAX_CELLS cells from overviews or sampled blocks, and the exact ones
+# later in a celery task; 'exact' to compute them from all cells during the upload
+RASTER_BAND_STATISTICS = os.environ.get('RASTER_BAND_STATISTICS', 'approximate')
+RASTER_EXACT_STATISTICS_MAX_CELLS = int(os.environ.get('RASTER_EXACT_STATISTICS_MAX_CELLS',
+                                                       '25000000'))
+# seconds after which the exact statistics are computed, and the task retried if the raster
+# is not committed yet
+RASTER_BAND_STATISTICS_DELAY = int(os.environ.get('RASTER_BAND_STATISTICS_DELAY', '10'))
+# 'irods' to create bags with the iRODS bagit rule and ibun, 'python' to build them with
+# hs_core.hydroshare.bag_builder, fetching BAG_BUILDER_THREADS files at once
+BAG_BUILDER = os.environ.get('BAG_BUILDER', 'irods')
+BAG_BUILDER_THREADS = int(os.environ.get('BAG_BUILDER_THREADS', '4'))
+# True to zip bags while they are downloaded from the REST API (GET hsapi/resource/<id>/)
+# instead of creating them in iRODS first; ?stream=true/false overrides it per request
+BAG_DOWNLOAD_STREAMING = os.environ.get('BAG_DOWNLOAD_STREAMING', 'false') == 'true'
 
 HS_BAGIT_README_FILE_WITH_PATH = os.environ.get('HS_BAGIT_README_FILE_WITH_PATH', 'docs/bagit/readme.txt')
 
@@ -216,6 +216,7 @@ MIDDLEWARE_CLASSES = (
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "hs_access_control.middleware.PrivilegeCacheMiddleware",
 )
 
 # security settings
@@ -244,6 +245,10 @@ DEBUG_TOOLBAR_CONFIG = {"INTERCEPT_REDIRECTS": False}
 # Maximum size of file uploads in bytes:
 MAX_AD_SIZE = 25 * 1024 * 1024
 
+# Directory in which AD documents are rendered to images (None = the system temp directory).
+# Each rendering uses its own subdirectory, which is removed when rendering is done.
+AD_RENDER_SCRATCH_DIR = None
+
 # Where users are directed to send contacts in MYHPOM:
 CONTACT_EMAIL = 'contact@example.com'
 
@@ -253,6 +258,24 @@ EMAIL_SUBJECT_PREFIX = '[MMH] '
 # When provided, a gtags.js block is included on all pages.
 GOOGLE_ANALYTICS_ID = None
 
+# -- DOWNLOAD SETTINGS --
+# (myhpom.downloads, used by the irods_download and document_url views)
+
+# To let the front-end server send files, set to 'X-Accel-Redirect' (nginx) or 'X-Sendfile'
+# (apache); files are then found at DOWNLOAD_OFFLOAD_LOCATION + their storage name. Only
+# files stored on the local file system are offloaded, not iRODS data objects.
+DOWNLOAD_OFFLOAD = None
+DOWNLOAD_OFFLOAD_LOCATION = '/protected/'
+# Seconds for which the size and checksum of downloaded files are cached.
+DOWNLOAD_INFO_CACHE_TIMEOUT = 60
+
+# -- IRODS CLIENT SETTINGS --
+# (myhpom.irods_pool, used when DEFAULT_FILE_STORAGE = 'myhpom.storage.PooledMyhpomStorage')
+
+# Maximum number of iRODS sessions kept open by each process, and their socket timeout.
+IRODS_CLIENT_POOL_SIZE = 4
+IRODS_CLIENT_TIMEOUT = 30
+
 # -- DOCUMENT URL SETTINGS --
 
 # Amount of time after creation that a Document URL expires, as a datetime.timedelta (easy to use!)
@@ -301,6 +324,13 @@ CLOUDFACTORY_CALLBACK_AUTH = ''
 # (if False and CLOUDFACTORY_CALLBACK_AUTH is set, it won't be checked -
 # probably because nginx is enforcing the value.)
 CLOUDFACTORY_CALLBACK_ENFORCE_AUTH = False
+# HTTP client to CloudFactory (see myhpom.cloudfactory): (connect, read) timeout in seconds,
+# retries of failed connections and 502/503/504 responses, and the connection pool size,
+# which is also the number of concurrent requests made when reconciling runs.
+CLOUDFACTORY_TIMEOUT = (5, 30)
+CLOUDFACTORY_RETRIES = 3
+CLOUDFACTORY_BACKOFF_FACTOR = 0.5
+CLOUDFACTORY_MAX_CONNECTIONS = 10
 
 ##################
 # LOCAL SETTINGS #
@@ -323,7 +353,7 @@ HAYSTACK_CONNECTIONS = {
         # 'URL': 'http://127.0.0.1:8983/solr/mysite',
     },
 }
-HAYSTACK_SIGNAL_PROCESSOR = 'haystack.signals.RealtimeSignalProcessor'
+HAYSTACK_SIGNAL_PROCESSOR = 'hs_core.hydro_realtime_signal_processor.HydroQueuedSignalProcessor'
 
 
 # customized value for password reset token and email verification link token to expire in 1 day
@@ -2,7 +2,7 @@ from __future__ import unicode_literals
 
 from django.contrib import admin
 from django.core.urlresolvers import reverse
-from myhpom.tasks import CloudFactoryAbortDocumentRun, CloudFactoryUpdateDocumentRun
+from myhpom.tasks import CloudFactoryAbortDocumentRun, reconcile_document_runs
 from django.utils.safestring import mark_safe
 
 from myhpom.models import (
@@ -117,8 +117,17 @@ class CloudFactoryDocumentRunAdmin(admin.ModelAdmin):
     abort_runs.short_description = "Abort the selected document runs at CloudFactory."
 
     def update_runs(self, request, queryset):
-        for cf_run in queryset:
-            CloudFactoryUpdateDocumentRun(cf_run.id)
+        # the same runs as CloudFactoryUpdateDocumentRun would update, fetched concurrently
+        queryset = queryset.filter(status__in=[
+            CloudFactoryDocumentRun.STATUS_PROCESSING,
+            CloudFactoryDocumentRun.STATUS_REQ_ERROR,
+            CloudFactoryDocumentRun.STATUS_ABORTED,
+        ]).exclude(run_id=None)
+        counts = reconcile_document_runs(queryset)
+        self.message_user(
+            request,
+            "%(updated)d runs updated (%(processed)d newly processed), %(errors)d errors." % counts
+        )
 
     update_runs.short_description = "Update the selected document runs by querying CloudFactory."
 
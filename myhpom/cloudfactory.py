@@ -0,0 +1,81 @@
+"""
+HTTP client for the CloudFactory API.
+
+All requests to CloudFactory go through one requests.Session per process, so that
+connections are kept alive and reused across tasks and across the threads of the batch
+reconciler (see myhpom.tasks.reconcile_document_runs). Every request has a timeout.
+Failed connections, and 502/503/504 responses to GET requests, are retried with exponential
+backoff. Failed reads are not retried, since CloudFactory may have acted on the request (for
+instance created a run) before the response was lost.
+
+Settings (all optional):
+* CLOUDFACTORY_TIMEOUT = (connect, read) timeout in seconds, default (5, 30)
+* CLOUDFACTORY_RETRIES = the maximum number of retries of a request, default 3
+* CLOUDFACTORY_BACKOFF_FACTOR = seconds of backoff before the second retry, doubling after
+  that, default 0.5
+* CLOUDFACTORY_MAX_CONNECTIONS = the number of connections kept alive, default 10
+"""
+
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def max_connections():
+    return getattr(settings, 'CLOUDFACTORY_MAX_CONNECTIONS', 10)
+
+
+def create_session():
+    """Return a new requests.Session configured for CloudFactory."""
+    retries = Retry(
+        total=getattr(settings, 'CLOUDFACTORY_RETRIES', 3),
+        read=0,
+        backoff_factor=getattr(settings, 'CLOUDFACTORY_BACKOFF_FACTOR', 0.5),
+        status_forcelist=[502, 503, 504],
+        raise_on_redirect=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections(),
+                          max_retries=retries)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Return the session shared by all CloudFactory requests in this process."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def reset_session():
+    """Close the shared session; the next request creates a new one."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def request(method, path, **kwargs):
+    """Make a request to the CloudFactory API at the given path (e.g. '/runs')."""
+    kwargs.setdefault('timeout', getattr(settings, 'CLOUDFACTORY_TIMEOUT', (5, 30)))
+    return get_session().request(method, settings.CLOUDFACTORY_API_URL + path, **kwargs)
+
+
+def get(path, **kwargs):
+    return request('GET', path, **kwargs)
+
+
+def post(path, **kwargs):
+    return request('POST', path, **kwargs)
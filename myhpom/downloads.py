@@ -0,0 +1,178 @@
+"""
+Streaming file downloads, with support for HTTP Range requests and conditional GETs.
+
+* Range: a single byte range (bytes=start-end, bytes=start- or bytes=-suffix) is served
+  as 206 Partial Content; If-Range is honored. Requests for several ranges are served in
+  full, as HTTP allows.
+* ETag / If-None-Match: when the ETag of a file is known, a matching If-None-Match is
+  answered with 304 Not Modified without opening the file.
+* Offloading: with settings.DOWNLOAD_OFFLOAD set to 'X-Accel-Redirect' (nginx) or
+  'X-Sendfile' (apache, lighttpd), the response carries no content but a header telling
+  the front-end server to send the file found at settings.DOWNLOAD_OFFLOAD_LOCATION + the
+  storage name of the file. The front-end server then handles ranges itself. Only files
+  of a local FileSystemStorage can be offloaded (see is_local_storage): the front-end
+  server can't read iRODS data objects.
+
+The size and other metadata of files is looked up once and cached (see cached_file_info),
+so that repeated and resumed downloads don't look them up in storage again.
+"""
+
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import urlquote
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^\s*bytes=(\d*)-(\d*)\s*$')
+FILE_INFO_KEY_PREFIX = 'myhpom:download:info'
+
+
+def _file_info_key(key):
+    return '%s:%s' % (FILE_INFO_KEY_PREFIX, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def cached_file_info(key, lookup):
+    """Return the info dictionary of a file, calling lookup() only if it isn't cached.
+
+    * key = a string identifying the file in its storage
+    * lookup = a callable returning a dictionary with at least 'size'; exceptions propagate
+      and nothing is cached.
+    Entries are kept for settings.DOWNLOAD_INFO_CACHE_TIMEOUT seconds (default 60).
+    """
+    info = cache.get(_file_info_key(key))
+    if info is None:
+        info = lookup()
+        cache.set(_file_info_key(key), info, getattr(settings, 'DOWNLOAD_INFO_CACHE_TIMEOUT', 60))
+    return info
+
+
+def forget_file_info(key):
+    """Remove the cached info of a file, e.g. when it is deleted."""
+    cache.delete(_file_info_key(key))
+
+
+def parse_range(header, size):
+    """Return the (start, end) of the byte range requested in a Range header, inclusive.
+
+    Returns None if the whole file should be sent (no header, or a header that isn't a single
+    byte range), and raises ValueError if the range is not satisfiable.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end:
+            raise ValueError('range not satisfiable')
+    elif last:
+        # the last n bytes
+        if int(last) == 0:
+            raise ValueError('range not satisfiable')
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+    return start, end
+
+
+def stream_file(fileobj, start=0, length=None, chunk_size=CHUNK_SIZE):
+    """Yield length bytes of fileobj from the start offset, and close it when done.
+    Files that can't seek (such as pipes) are read up to the start offset.
+    """
+    try:
+        if start:
+            try:
+                fileobj.seek(start)
+            except (AttributeError, IOError):
+                remaining = start
+                while remaining > 0:
+                    skipped = fileobj.read(min(chunk_size, remaining))
+                    if not skipped:
+                        return
+                    remaining -= len(skipped)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = fileobj.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def _opaque_tag(etag):
+    etag = etag.strip()
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(etag, header):
+    """True if the quoted etag is listed in an If-None-Match or If-Range header value."""
+    if not etag or not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return _opaque_tag(etag) in [_opaque_tag(tag) for tag in header.split(',')]
+
+
+def is_local_storage(storage):
+    """Return True if the files of storage are on the local file system, where the front-end
+    server can find them to send them itself."""
+    return isinstance(storage, FileSystemStorage)
+
+
+def download_response(request, open_file, size, content_type, filename,
+                      etag=None, storage_name=None):
+    """Return a response sending a file, honoring Range and If-None-Match headers.
+
+    * open_file = a callable returning the file object; it is only called when content is sent
+    * size = the size of the file in bytes
+    * etag = the quoted ETag of the file (strong, or weak with a W/ prefix), if known
+    * storage_name = the name of the file in a local storage (see is_local_storage), which is
+      offloaded to the front-end server when settings.DOWNLOAD_OFFLOAD is set
+    """
+    if etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    offload = getattr(settings, 'DOWNLOAD_OFFLOAD', None)
+    if offload and storage_name:
+        response = HttpResponse(content_type=content_type)
+        location = getattr(settings, 'DOWNLOAD_OFFLOAD_LOCATION', '/protected/')
+        response[offload] = urlquote(location + storage_name.lstrip('/'))
+    else:
+        byte_range = None
+        if_range = request.META.get('HTTP_IF_RANGE')
+        # a range is only served for the version of the file that the client has
+        if not if_range or (etag and not etag.startswith('W/') and etag_matches(etag, if_range)):
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = 'bytes */%d' % size
+                return response
+
+        if byte_range is None:
+            response = StreamingHttpResponse(stream_file(open_file()), content_type=content_type)
+            response['Content-Length'] = size
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                stream_file(open_file(), start, length), content_type=content_type, status=206)
+            response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+            response['Content-Length'] = length
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = 'inline; filename="%s"' % filename
+    if etag:
+        response['ETag'] = etag
+    return response
@@ -1,9 +1,9 @@
 from django import forms
 from django.conf import settings
-from django.core.files.uploadedfile import SimpleUploadedFile
 from myhpom.models import AdvanceDirective
 
 import os
+import subprocess
 import uuid
 
 
@@ -12,7 +12,7 @@ class UploadRequirementsForm(forms.ModelForm):
 
     class Meta:
         model = AdvanceDirective
-        fields = ['valid_date', 'document', 'thumbnail', 'original_filename']
+        fields = ['valid_date', 'document', 'original_filename']
 
     def clean_document(self):
         if 'document' in self.cleaned_data:
@@ -38,18 +38,12 @@ class UploadRequirementsForm(forms.ModelForm):
             name, extension = os.path.splitext(data['document'].name)
             data['document'].name = "%s-%s%s" % (name, str(uuid.uuid4())[:6], extension)
 
-            # (try to) generate a thumbnail of the document
-            # NOTE: We do this here at present because we don't want to keep the PDF
-            # if the thumbnail can't be created (= corrupt PDF = invalid form). This
-            # assumes that processing is done in-request. In future, we will want to
-            # move the thumbnail processing into an asynchronous queue, which means
-            # that this simple validation setup will need to be refactored into
-            # storing the document followed by tracking its state through processing.
+            # The thumbnail is rendered asynchronously once the document is stored (see
+            # RenderAdvanceDirectiveImages), so only check here that ghostscript can interpret
+            # the first page: we don't want to keep the PDF if it is corrupt (= invalid form).
             try:
-                thumbnail_name = os.path.splitext(data['document'].name)[0] + '.jpg'
-                thumbnail_data = AdvanceDirective(document=data['document']).render_thumbnail_data()
-                data['thumbnail'] = SimpleUploadedFile(thumbnail_name, thumbnail_data)
-            except:
+                AdvanceDirective(document=data['document']).check_document()
+            except (ValueError, subprocess.CalledProcessError):
                 data['document'] = ''
                 self.add_error(
                     'document',
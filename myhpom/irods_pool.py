@@ -0,0 +1,150 @@
+"""
+A bounded pool of persistent iRODS protocol sessions (python-irodsclient).
+
+Each icommand run by django_irods forks a process that connects and authenticates to iRODS
+from scratch. The sessions in this pool stay connected and are reused by every storage call in
+the worker process, and at most IRODS_CLIENT_POOL_SIZE of them are open at once: callers
+beyond that wait for a session to be returned.
+
+    with get_pool().session() as session:
+        session.data_objects.get(path)
+
+A session that fails with a network error is closed instead of being returned to the pool.
+The pool is created lazily, and again in a forked child process (e.g. a Celery worker), since
+connections can't be shared across processes.
+
+If python-irodsclient is not installed, get_pool() returns None and callers fall back to the
+icommands (see myhpom.storage.PooledMyhpomStorage).
+
+Settings (all optional, apart from the IRODS_* connection settings used by django_irods):
+* IRODS_CLIENT_POOL_SIZE = the maximum number of open sessions per process, default 4
+* IRODS_CLIENT_TIMEOUT = the socket timeout of the sessions in seconds, default 30
+"""
+
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from Queue import Empty, LifoQueue
+
+from django.conf import settings
+
+try:
+    from irods.session import iRODSSession
+    from irods.exception import CollectionDoesNotExist, DataObjectDoesNotExist, NetworkException
+except ImportError:
+    iRODSSession = None
+
+    class DataObjectDoesNotExist(Exception):
+        pass
+
+    class CollectionDoesNotExist(Exception):
+        pass
+
+    class NetworkException(Exception):
+        pass
+
+# Errors after which a session can't be trusted to be connected any more
+CONNECTION_ERRORS = (NetworkException, socket.error, EOFError)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def create_session():
+    """Return a new iRODSSession connected with the IRODS_* settings."""
+    session = iRODSSession(
+        host=settings.IRODS_HOST,
+        port=int(settings.IRODS_PORT),
+        user=settings.IRODS_USERNAME,
+        password=settings.IRODS_AUTH,
+        zone=settings.IRODS_ZONE,
+    )
+    session.connection_timeout = getattr(settings, 'IRODS_CLIENT_TIMEOUT', 30)
+    return session
+
+
+class IrodsSessionPool(object):
+    """A pool of at most `size` sessions created by calling `factory()`."""
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = size
+        self._idle = LifoQueue()  # the most recently used session is the least likely stale
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def session(self):
+        session = self.acquire()
+        try:
+            yield session
+        except CONNECTION_ERRORS:
+            self.release(session, broken=True)
+            raise
+        except BaseException:
+            self.release(session)
+            raise
+        else:
+            self.release(session)
+
+    def acquire(self):
+        """Take a session out of the pool, for callers that can't use session() because they
+        hold it beyond a block (e.g. an open file). It must be given back with release()."""
+        self._slots.acquire()
+        try:
+            try:
+                return self._idle.get_nowait()
+            except Empty:
+                return self.factory()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, session, broken=False):
+        """Return a session taken with acquire() to the pool, or close it if it is broken."""
+        try:
+            if broken:
+                self._discard(session)
+            else:
+                self._idle.put(session)
+        finally:
+            self._slots.release()
+
+    def _discard(self, session):
+        try:
+            session.cleanup()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close the idle sessions; sessions in use are returned to the pool as usual."""
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except Empty:
+                return
+
+
+def get_pool():
+    """Return the session pool of this process, or None if python-irodsclient isn't installed."""
+    global _pool, _pool_pid
+    if iRODSSession is None:
+        return None
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                # a pool inherited through fork() is dropped without closing the parent's sockets
+                _pool = IrodsSessionPool(
+                    create_session, getattr(settings, 'IRODS_CLIENT_POOL_SIZE', 4))
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def reset_pool():
+    """Close the pool of this process; the next call to get_pool() creates a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
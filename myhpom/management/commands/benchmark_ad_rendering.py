@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the rendering of Advance Directive documents to images
+
+This times, over a corpus of PDF documents:
+
+* the synchronous thumbnail rendering that used to run in the upload request;
+* update_rendered_images() on documents that have not been rendered yet (cold);
+* update_rendered_images() again on the same documents (warm), which only hashes the
+  content and reuses the stored images.
+
+No database rows are created; rendered images are stored in a temporary directory.
+
+* corpus: a directory of PDF files. If not given, a corpus of multi-page PDFs is generated
+  with ghostscript (see --documents and --pages-per-document).
+* --pages also renders an image of every page, not only the thumbnail.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from glob import glob
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+
+from myhpom.models import AdvanceDirective
+
+# PostScript program writing pages of text, formatted with the number of pages
+CORPUS_PAGE_PROGRAM = (
+    "/Helvetica findfont 24 scalefont setfont "
+    "1 1 %d { 72 720 moveto (Advance Directive page ) show 8 string cvs show "
+    "72 72 468 600 rectstroke showpage } for"
+)
+
+
+def generate_corpus(directory, documents, pages_per_document):
+    """ Write documents PDF files of pages_per_document pages each into directory """
+    for i in range(documents):
+        filename = os.path.join(directory, 'document-%03d.pdf' % i)
+        subprocess.check_call([
+            'gs', '-q', '-dSAFER', '-dBATCH', '-dNOPAUSE', '-sDEVICE=pdfwrite',
+            '-sOutputFile=%s' % filename, '-c', CORPUS_PAGE_PROGRAM % pages_per_document,
+        ])
+
+
+class Command(BaseCommand):
+    help = "Benchmark Advance Directive thumbnail and page image rendering."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('corpus', nargs='?', help='directory of PDF documents')
+
+        parser.add_argument(
+            '--documents',
+            type=int,
+            dest='documents',
+            default=20,
+            help='number of documents in a generated corpus',
+        )
+        parser.add_argument(
+            '--pages-per-document',
+            type=int,
+            dest='pages_per_document',
+            default=10,
+            help='number of pages of each document in a generated corpus',
+        )
+        parser.add_argument(
+            '--pages',
+            action='store_true',  # True for presence, False for absence
+            dest='pages',
+            help='also render an image of every page',
+        )
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='ad-benchmark-')
+        try:
+            corpus = options['corpus']
+            if not corpus:
+                corpus = os.path.join(workdir, 'corpus')
+                os.makedirs(corpus)
+                print("GENERATING CORPUS: {} documents of {} pages".format(
+                    options['documents'], options['pages_per_document']))
+                generate_corpus(corpus, options['documents'], options['pages_per_document'])
+            filenames = sorted(glob(os.path.join(corpus, '*.pdf')))
+            if not filenames:
+                print("No PDF documents in {}".format(corpus))
+                return
+
+            storage = FileSystemStorage(location=os.path.join(workdir, 'storage'))
+            files = [open(filename, 'rb') for filename in filenames]
+            try:
+                directives = []
+                for f in files:
+                    directive = AdvanceDirective(document=File(f, name=os.path.basename(f.name)))
+                    directive.thumbnail.storage = storage
+                    directives.append(directive)
+
+                def render_synchronously(directive):
+                    directive.render_thumbnail_data()
+
+                def render_cached(directive):
+                    directive.update_rendered_images(pages=options['pages'])
+
+                for label, render in (('synchronous thumbnail', render_synchronously),
+                                      ('cold', render_cached),
+                                      ('warm', render_cached)):
+                    start = time.time()
+                    for directive in directives:
+                        render(directive)
+                    elapsed = time.time() - start
+                    print("{}: {} documents in {:.2f}s, {:.2f} documents/s".format(
+                        label, len(directives), elapsed, len(directives) / elapsed))
+
+                if options['pages']:
+                    pages = sum(directive.page_count or 0 for directive in directives)
+                    print("{} page images rendered".format(pages))
+            finally:
+                for f in files:
+                    f.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the reconciliation of in-flight CloudFactory document runs
+
+Runs are created in the Processing status and served by a local fake CloudFactory (see
+myhpom.tests.fake_cloudfactory) with a configurable latency per request. Then:
+
+* a sample of the runs is updated one at a time with a new connection per request, as
+  CloudFactoryUpdateDocumentRun used to; the time for all runs is extrapolated;
+* all runs are updated by reconcile_document_runs() through the pooled session.
+
+The benchmark runs are deleted when done.
+
+* --runs sets the number of in-flight runs (default 10000).
+* --latency sets the latency of the fake CloudFactory in seconds (default 0.02).
+* --parallelism sets the number of concurrent requests (default CLOUDFACTORY_MAX_CONNECTIONS).
+"""
+
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from myhpom.models import CloudFactoryDocumentRun
+from myhpom.tasks import reconcile_document_runs, update_document_run_from_response
+from myhpom.tests.fake_cloudfactory import FakeCloudFactory
+
+RUN_ID_PREFIX = 'benchmark-'
+
+
+class Command(BaseCommand):
+    help = "Benchmark reconciling in-flight CloudFactory runs against a fake CloudFactory."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--runs',
+            type=int,
+            dest='runs',
+            default=10000,
+            help='number of in-flight runs',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            dest='latency',
+            default=0.02,
+            help='latency of the fake CloudFactory per request, in seconds',
+        )
+        parser.add_argument(
+            '--parallelism',
+            type=int,
+            dest='parallelism',
+            default=None,
+            help='number of concurrent requests to CloudFactory',
+        )
+        parser.add_argument(
+            '--sequential-sample',
+            type=int,
+            dest='sample',
+            default=200,
+            help='number of runs updated sequentially for the baseline',
+        )
+        parser.add_argument(
+            '--processed-fraction',
+            type=float,
+            dest='processed_fraction',
+            default=0.1,
+            help='fraction of the runs that CloudFactory has finished processing',
+        )
+
+    def handle(self, *args, **options):
+        runs = CloudFactoryDocumentRun.objects.filter(run_id__startswith=RUN_ID_PREFIX)
+        runs.delete()  # left over from an interrupted benchmark
+
+        with FakeCloudFactory(latency=options['latency']) as fake, \
+                override_settings(CLOUDFACTORY_API_URL=fake.url):
+            try:
+                print("CREATING {} RUNS".format(options['runs']))
+                CloudFactoryDocumentRun.objects.bulk_create(
+                    CloudFactoryDocumentRun(run_id='%s%05d' % (RUN_ID_PREFIX, i),
+                                            status=CloudFactoryDocumentRun.STATUS_PROCESSING)
+                    for i in range(options['runs']))
+                processed = int(options['runs'] * options['processed_fraction'])
+                for i in range(options['runs']):
+                    fake.add_run('%s%05d' % (RUN_ID_PREFIX, i))
+                    if i < processed:
+                        fake.process_run('%s%05d' % (RUN_ID_PREFIX, i))
+
+                sample = list(runs.order_by('?')[:options['sample']])
+                start = time.time()
+                for cf_run in sample:
+                    response = requests.get('%s/runs/%s' % (fake.url, cf_run.run_id))
+                    update_document_run_from_response(cf_run, response)
+                elapsed = time.time() - start
+                print("sequential: {} runs in {:.2f}s, {:.1f} runs/s, ~{:.0f}s for all runs"
+                      .format(len(sample), elapsed, len(sample) / elapsed,
+                              elapsed * options['runs'] / len(sample)))
+                runs.update(status=CloudFactoryDocumentRun.STATUS_PROCESSING)
+
+                start = time.time()
+                counts = reconcile_document_runs(runs, parallelism=options['parallelism'])
+                elapsed = time.time() - start
+                print("reconciled: {} runs in {:.2f}s, {:.1f} runs/s ({})".format(
+                    options['runs'], elapsed, options['runs'] / elapsed, counts))
+            finally:
+                runs.delete()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the throughput of exists(), size() and listdir() of the iRODS storage backends
+
+* MyhpomStorage, which runs an icommand (a new process and iRODS connection) per call;
+* PooledMyhpomStorage, which reuses the connections of a bounded session pool.
+
+By default both run against the in-memory fake iRODS of myhpom.tests.fake_irods, with
+--latency seconds per round trip to the server. The icommands are then approximated by
+forking a process and connecting a new fake session (--connect-round-trips round trips for
+the connection and authentication) for every call.
+
+With --live COLLECTION, both backends run against the configured iRODS zone, on the data
+objects in COLLECTION (relative to IRODS_CWD); this requires the icommands and
+python-irodsclient.
+
+* --files sets the number of files created in the fake zone (default 200).
+* --threads sets the number of concurrent callers, and the pool size (default 4).
+"""
+
+import subprocess
+import time
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from myhpom.irods_pool import IrodsSessionPool, get_pool
+from myhpom.storage import MyhpomStorage, PooledMyhpomStorage
+from myhpom.tests.fake_irods import FakeIrods
+
+FAKE_HOME = '/benchmarkZone/home/rods'
+
+
+class ForkPerCallPool(object):
+    """Approximates the icommands: every call forks a process and opens a new session."""
+
+    def __init__(self, fake, connect_round_trips):
+        self.fake = fake
+        self.connect_round_trips = connect_round_trips
+
+    @contextmanager
+    def session(self):
+        subprocess.call(['true'])
+        for i in range(self.connect_round_trips):
+            self.fake.wait()
+        session = self.fake.session()
+        try:
+            yield session
+        finally:
+            session.cleanup()
+
+
+class Command(BaseCommand):
+    help = "Benchmark exists/size/listdir of the icommand and pooled iRODS storage backends."
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--files',
+            type=int,
+            dest='files',
+            default=200,
+            help='number of files in the fake zone',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            dest='latency',
+            default=0.001,
+            help='latency of the fake iRODS per round trip, in seconds',
+        )
+        parser.add_argument(
+            '--connect-round-trips',
+            type=int,
+            dest='connect_round_trips',
+            default=4,
+            help='round trips to connect and authenticate a new fake session',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            dest='threads',
+            default=4,
+            help='number of concurrent callers (and pooled sessions)',
+        )
+        parser.add_argument(
+            '--live',
+            dest='live',
+            default=None,
+            help='benchmark the configured iRODS zone, on the files in this collection',
+        )
+
+    def handle(self, *args, **options):
+        if options['live']:
+            if get_pool() is None:
+                raise CommandError('python-irodsclient is not installed')
+            names = [
+                options['live'].rstrip('/') + '/' + name
+                for name in PooledMyhpomStorage().listdir(options['live'])[1]
+            ]
+            backends = [('icommands', MyhpomStorage()), ('pooled', PooledMyhpomStorage())]
+            self.run_benchmarks(backends, options['live'], names, options['threads'])
+            return
+
+        fake = FakeIrods(FAKE_HOME, latency=options['latency'])
+        names = ['benchmark/file-%05d.txt' % i for i in range(options['files'])]
+        for name in names:
+            fake.add_file(FAKE_HOME + '/' + name, b'x' * 1024)
+        backends = [
+            ('icommands (approximated)', PooledMyhpomStorage(
+                pool=ForkPerCallPool(fake, options['connect_round_trips']))),
+            ('pooled', PooledMyhpomStorage(
+                pool=IrodsSessionPool(fake.session, options['threads']))),
+        ]
+        with override_settings(IRODS_CWD=FAKE_HOME):
+            self.run_benchmarks(backends, 'benchmark', names, options['threads'])
+        print("fake iRODS sessions opened: {}".format(fake.sessions))
+
+    def run_benchmarks(self, backends, collection, names, threads):
+        pool = ThreadPool(threads)
+        try:
+            for label, storage in backends:
+                for operation, call, args in [
+                    ('exists', storage.exists, names),
+                    ('size', storage.size, names),
+                    ('listdir', storage.listdir, [collection] * max(len(names) // 10, 1)),
+                ]:
+                    start = time.time()
+                    pool.map(call, args)
+                    elapsed = time.time() - start
+                    print("{:<26} {:<8} {:>6} calls in {:.2f}s, {:.0f} calls/s".format(
+                        label, operation, len(args), elapsed, len(args) / elapsed))
+                start = time.time()
+                storage_sizes = getattr(storage, 'sizes', None)
+                if storage_sizes is not None:
+                    storage_sizes(names)
+                    print("{:<26} {:<8} {:>6} names in {:.2f}s (batched)".format(
+                        label, 'sizes', len(names), time.time() - start))
+        finally:
+            pool.close()
+            pool.join()
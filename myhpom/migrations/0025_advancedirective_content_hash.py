@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myhpom', '0024_cloudfactorydocumentrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advancedirective',
+            name='content_hash',
+            field=models.CharField(default=b'', help_text=b'The SHA-256 of the document content from which the images were rendered.', max_length=64, blank=True),
+        ),
+        migrations.AddField(
+            model_name='advancedirective',
+            name='page_count',
+            field=models.PositiveIntegerField(help_text=b'The number of rendered page images, if page images have been rendered.', null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+# CloudFactoryDocumentRun statuses, as of this migration
+STATUS_PROCESSING = 'Processing'
+STATUS_PROCESSED = 'Processed'
+STATUS_FAILED = ['NEW', 'DELETED', 'REQ_ERROR', 'NOTFOUND', 'UNPROCESSABLE', 'ERROR', 'Aborted']
+REQUIRED_OUTPUT_KEYS = set([
+    'owner_name_matches', 'witness_signature_1', 'witness_signature_2',
+    'notarized', 'signed_by_owner'])
+YES_OR_NA = set(['true', 'not applicable'])
+
+
+def processed_output(response_content):
+    """The output of a processed run, or None if its response is not a valid processed one
+    (as CloudFactoryDocumentRun.output() does)."""
+    try:
+        data = json.loads(response_content)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get('status', STATUS_PROCESSED) != STATUS_PROCESSED:
+        return None
+    for key in ('created_at', 'processed_at'):
+        if key in data and parse_datetime(data[key]) is None:
+            return None
+    units = data.get('units')
+    if not units or 'output' not in units[0]:
+        return None
+    output = units[0]['output']
+    if not REQUIRED_OUTPUT_KEYS <= set(output.keys()):
+        return None
+    return output
+
+
+def update_verification_state(apps, schema_editor):
+    AdvanceDirective = apps.get_model('myhpom', 'AdvanceDirective')
+    CloudFactoryDocumentRun = apps.get_model('myhpom', 'CloudFactoryDocumentRun')
+    for directive in AdvanceDirective.objects.filter(documenturl__isnull=False).distinct():
+        runs = CloudFactoryDocumentRun.objects.filter(document_url__advancedirective=directive)
+        statuses = set(runs.values_list('status', flat=True))
+        processed_run = runs.filter(status=STATUS_PROCESSED).order_by('pk').last()
+        output = processed_output(processed_run.response_content) if processed_run else None
+
+        directive._verification_in_progress = STATUS_PROCESSING in statuses
+        directive._verification_failed = bool(statuses & set(STATUS_FAILED))
+        directive._verification_passed = output is not None and set(output.values()) <= YES_OR_NA
+        directive._verification_output = json.dumps(output) if output is not None else ''
+        directive.save(update_fields=[
+            '_verification_in_progress', '_verification_failed', '_verification_passed',
+            '_verification_output'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myhpom', '0025_advancedirective_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advancedirective',
+            name='_verification_failed',
+            field=models.BooleanField(default=False, help_text=b'True when a CloudFactory run for this AD failed.', editable=False),
+        ),
+        migrations.AddField(
+            model_name='advancedirective',
+            name='_verification_in_progress',
+            field=models.BooleanField(default=False, help_text=b'True when a CloudFactory run for this AD is in progress.', editable=False),
+        ),
+        migrations.AddField(
+            model_name='advancedirective',
+            name='_verification_output',
+            field=models.TextField(default=b'', help_text=b'The output of the latest processed CloudFactory run for this AD, as JSON.', editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='advancedirective',
+            name='_verification_passed',
+            field=models.BooleanField(default=False, help_text=b'True when the latest processed CloudFactory run for this AD passed.', editable=False),
+        ),
+        migrations.RunPython(
+            update_verification_state, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -1,23 +1,46 @@
 import base64
+import hashlib
 import json
 import os
+import shutil
+import subprocess
 import tempfile
 import uuid
 import importlib
+from contextlib import contextmanager
 
 from django.conf import settings
+from django.core.files.base import ContentFile
 from django.core.urlresolvers import reverse
 from django.db import models
 from django.utils.dateparse import parse_datetime
 from django.utils.timezone import now
 
 from bgs import GS
+from myhpom.downloads import forget_file_info
 from myhpom.validators import validate_date_in_past
 
 from .user import User
 
 PDF_RESOLUTION = 150  # this is the resolution at which to render the PDF to images.
 THUMBNAIL_WIDTH = 508  # this is the exact maximum width of the thumbnail in the layout
+RENDERED_IMAGES_PATH = 'myhpom/advance_directives/rendered'  # images keyed by content hash
+
+
+@contextmanager
+def rendering_workspace():
+    """Yield a fresh directory for rendering a document, and remove it with all its contents
+    when done, whether or not rendering succeeded.
+    The directory is created in settings.AD_RENDER_SCRATCH_DIR (default: the system temp dir).
+    """
+    scratch_dir = getattr(settings, 'AD_RENDER_SCRATCH_DIR', None)
+    if scratch_dir and not os.path.isdir(scratch_dir):
+        os.makedirs(scratch_dir)
+    workdir = tempfile.mkdtemp(prefix='ad-render-', dir=scratch_dir)
+    try:
+        yield workdir
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
 
 
 class AdvanceDirective(models.Model):
@@ -42,6 +65,42 @@ class AdvanceDirective(models.Model):
         upload_to='myhpom/advance_directives',
         help_text='The first-page thumbnail image of the user\'s Advance Directive.',
     )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text='The SHA-256 of the document content from which the images were rendered.',
+    )
+    page_count = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='The number of rendered page images, if page images have been rendered.',
+    )
+
+    # The verification state is denormalized from the CloudFactoryDocumentRuns of this AD by
+    # update_verification_state() whenever a run is saved, so that it can be displayed without
+    # querying the runs or parsing their responses.
+    _verification_in_progress = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text='True when a CloudFactory run for this AD is in progress.',
+    )
+    _verification_failed = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text='True when a CloudFactory run for this AD failed.',
+    )
+    _verification_passed = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text='True when the latest processed CloudFactory run for this AD passed.',
+    )
+    _verification_output = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        help_text='The output of the latest processed CloudFactory run for this AD, as JSON.',
+    )
 
     @property
     def filename(self):
@@ -49,16 +108,69 @@ class AdvanceDirective(models.Model):
 
     def render_thumbnail_data(self, res=PDF_RESOLUTION, **gsargs):
         """return the thumbnail binary file data for the given AdvanceDirective instance"""
-        mogrify = {'resize': "%dx>" % THUMBNAIL_WIDTH}
-        filenames = self.render_images(allpages=False, res=res, mogrify=mogrify, **gsargs)
-        if len(filenames) > 0:
-            with open(filenames[0], 'rb') as f:
-                return f.read()
-
-    def render_images(self, allpages=True, res=PDF_RESOLUTION, **gsargs):
-        """create one or more images of pages of the current document.
-        Requires that the AD has a document in storage
-        Returns a list of (temporary) filenames (deleted after the AD object goes out of scope).
+        pages = self.render_page_data(allpages=False, res=res, **gsargs)
+        if len(pages) > 0:
+            return pages[0]
+
+    def render_page_data(self, allpages=True, res=PDF_RESOLUTION, thumbnail=True, **gsargs):
+        """return a list of the binary image data of pages of the current document.
+        * allpages=True: if False, renders only the first page.
+        * thumbnail=True: if True, resizes the images to THUMBNAIL_WIDTH
+        (see render_images for the other arguments)
+        """
+        if thumbnail:
+            gsargs.setdefault('mogrify', {'resize': "%dx>" % THUMBNAIL_WIDTH})
+        with rendering_workspace() as workdir:
+            pdf_filename = os.path.join(workdir, 'document.pdf')
+            self.write_document(pdf_filename)
+            filenames = self.render_images(pdf_filename, allpages=allpages, res=res, **gsargs)
+            pages = []
+            for filename in filenames:
+                with open(filename, 'rb') as f:
+                    pages.append(f.read())
+        return pages
+
+    def write_document(self, filename):
+        """stream the document from storage to the given filename, in chunks.
+        Returns the SHA-256 hex digest of the document content.
+        """
+        sha256 = hashlib.sha256()
+        # a file that is already open, e.g. an uploaded file still to be saved, stays open
+        was_closed = self.document.closed
+        self.document.open('rb')
+        try:
+            with open(filename, 'wb') as f:
+                for chunk in self.document.chunks():
+                    sha256.update(chunk)
+                    f.write(chunk)
+        finally:
+            if was_closed:
+                self.document.close()
+        return sha256.hexdigest()
+
+    def check_document(self):
+        """Check that the first page of the document can be interpreted as a PDF, without
+        rendering it: much cheaper than rendering the thumbnail, which is done in the background
+        once the document is stored (see update_rendered_images).
+        Raises ValueError if the document doesn't start as a PDF, and
+        subprocess.CalledProcessError if ghostscript can't interpret its first page.
+        """
+        with rendering_workspace() as workdir:
+            pdf_filename = os.path.join(workdir, 'document.pdf')
+            self.write_document(pdf_filename)
+            with open(pdf_filename, 'rb') as f:
+                # the PDF header must be within the first 1024 bytes of the file
+                if b'%PDF-' not in f.read(1024):
+                    raise ValueError('%s is not a PDF' % self.document.name)
+            subprocess.check_output([
+                GS().gs, '-q', '-dSAFER', '-dBATCH', '-dNOPAUSE', '-sDEVICE=nullpage',
+                '-dFirstPage=1', '-dLastPage=1', pdf_filename,
+            ], stderr=subprocess.STDOUT)
+
+    def render_images(self, pdf_filename, allpages=True, res=PDF_RESOLUTION, **gsargs):
+        """create one or more images of pages of the given local copy of the document.
+        Returns a list of filenames, next to pdf_filename; removing them is up to the caller
+        (use the rendering_workspace() context manager).
         * allpages=False: if true, creates all pages. if False, creates only the first page.
             (if all you want is a thumbnail, creating only the first page is MUCH faster)
         * res=150: the resolution of the output images based on the pdf page size
@@ -69,23 +181,114 @@ class AdvanceDirective(models.Model):
             * quality=90: the jpeg quality: 100 = highest.
             * mogrify=None: if given, these are post-processing arguments to mogrify (ImageMagick)
         """
-        # first write the document to a temporary file in the filesystem
-        # then use ghostscript (gs) to render it
         gs = GS()
-        tempdir = tempfile.mkdtemp()
-        pdf_filename = os.path.join(tempdir, self.filename)
-        with open(pdf_filename, 'wb') as f:
-            f.write(self.document.file.read())
-        image_filenames = gs.render(pdf_filename, res=res, allpages=allpages, **gsargs)
-        return image_filenames
+        return gs.render(pdf_filename, res=res, allpages=allpages, **gsargs)
+
+    @staticmethod
+    def thumbnail_name(content_hash):
+        return '%s/%s/thumbnail.jpg' % (RENDERED_IMAGES_PATH, content_hash)
+
+    @staticmethod
+    def page_image_name(content_hash, page):
+        return '%s/%s/page-%03d.jpg' % (RENDERED_IMAGES_PATH, content_hash, page)
+
+    @property
+    def page_image_names(self):
+        """The storage names of the rendered page images, empty if they have not been rendered."""
+        if not self.content_hash or not self.page_count:
+            return []
+        return [self.page_image_name(self.content_hash, page)
+                for page in range(1, self.page_count + 1)]
+
+    def delete_rendered_images(self, content_hash, page_count):
+        """Delete the images rendered for the given content, unless another AD has the same
+        content.
+        """
+        if AdvanceDirective.objects.filter(content_hash=content_hash) \
+                .exclude(pk=self.pk).exists():
+            return
+        storage = self.thumbnail.storage
+        storage.delete(self.thumbnail_name(content_hash))
+        for page in range(1, (page_count or 0) + 1):
+            storage.delete(self.page_image_name(content_hash, page))
+
+    def update_rendered_images(self, pages=False, res=PDF_RESOLUTION):
+        """Render the thumbnail (and with pages=True, all page images) of the document and store
+        them under the SHA-256 of the document content. Images already in storage for the same
+        content are reused rather than rendered again, and those of the previous content are
+        deleted. The document is streamed into a scratch directory that is removed when done.
+        Returns True if anything was rendered; raises ValueError if ghostscript rendered nothing.
+        """
+        storage = self.thumbnail.storage
+        previous_hash, previous_page_count = self.content_hash, self.page_count
+        with rendering_workspace() as workdir:
+            pdf_filename = os.path.join(workdir, 'document.pdf')
+            content_hash = self.write_document(pdf_filename)
+            if content_hash != self.content_hash:
+                self.page_count = None
+            self.content_hash = content_hash
+
+            rendered = False
+            thumbnail_name = self.thumbnail_name(content_hash)
+            if self.thumbnail and not self.thumbnail.name.startswith(RENDERED_IMAGES_PATH):
+                storage.delete(self.thumbnail.name)  # rendered before images were keyed by hash
+            if not storage.exists(thumbnail_name):
+                filenames = self.render_images(
+                    pdf_filename, allpages=False, res=res,
+                    outfn=os.path.join(workdir, 'thumbnail.jpg'),
+                    mogrify={'resize': "%dx>" % THUMBNAIL_WIDTH})
+                if not filenames:
+                    raise ValueError('No thumbnail was rendered from %s' % self.document.name)
+                with open(filenames[0], 'rb') as f:
+                    storage.save(thumbnail_name, ContentFile(f.read()))
+                rendered = True
+            self.thumbnail.name = thumbnail_name
+
+            if pages and self.page_count is None:
+                filenames = self.render_images(
+                    pdf_filename, allpages=True, res=res,
+                    outfn=os.path.join(workdir, 'page.jpg'))
+                if not filenames:
+                    raise ValueError('No page images were rendered from %s' % self.document.name)
+                for page, filename in enumerate(filenames, 1):
+                    name = self.page_image_name(content_hash, page)
+                    if not storage.exists(name):
+                        with open(filename, 'rb') as f:
+                            storage.save(name, ContentFile(f.read()))
+                self.page_count = len(filenames)
+                rendered = True
+
+        if self.pk:
+            self.save(update_fields=['thumbnail', 'content_hash', 'page_count'])
+        if previous_hash and previous_hash != content_hash:
+            self.delete_rendered_images(previous_hash, previous_page_count)
+        return rendered
+
+    def update_verification_state(self, save=True):
+        """Recompute the verification state from the CloudFactoryDocumentRuns of this AD.
+        Called whenever one of the runs is saved.
+        """
+        runs = CloudFactoryDocumentRun.objects.filter(document_url__advancedirective=self)
+        statuses = set(runs.values_list('status', flat=True))
+        # The last run that processed (there should be only one)
+        processed_run = runs.filter(status=CloudFactoryDocumentRun.STATUS_PROCESSED).last()
+        output = processed_run.output() if processed_run else None
+
+        self._verification_in_progress = CloudFactoryDocumentRun.STATUS_PROCESSING in statuses
+        self._verification_failed = bool(statuses & (
+            set(CloudFactoryDocumentRun.STATUS_FINAL_STATES)
+            - set([CloudFactoryDocumentRun.STATUS_PROCESSED])))
+        self._verification_passed = bool(processed_run and processed_run.passed())
+        self._verification_output = json.dumps(output) if output is not None else ''
+        if save:
+            self.save(update_fields=[
+                '_verification_in_progress', '_verification_failed', '_verification_passed',
+                '_verification_output'])
 
     @property
     def verification_in_progress(self):
         """ Returns True when the CF for this AD is still in progress. """
-        # Search for any run that is in progress
-        return CloudFactoryDocumentRun.objects.filter(
-            status=CloudFactoryDocumentRun.STATUS_PROCESSING,
-            document_url__advancedirective=self).exists()
+        return self._verification_in_progress
 
     @property
     def verification_failed(self):
@@ -95,13 +298,7 @@ class AdvanceDirective(models.Model):
         protocol level, etc) -- the verification process did not happen at this
         stage (it failed before it could)
         """
-        # Search for any run that is in progress
-        return CloudFactoryDocumentRun.objects \
-            .filter(
-                status__in=CloudFactoryDocumentRun.STATUS_FINAL_STATES,
-                document_url__advancedirective=self) \
-            .exclude(status=CloudFactoryDocumentRun.STATUS_PROCESSED) \
-            .exists()
+        return self._verification_failed
 
     @property
     def verification_result(self):
@@ -111,15 +308,14 @@ class AdvanceDirective(models.Model):
 
         If the CF verification is not finished or failed, returns None.
         """
-        # Select all finished runs - for the first one that processed (there
-        # should be only one), return its output
-        processed_run = CloudFactoryDocumentRun.objects.filter(
-            status=CloudFactoryDocumentRun.STATUS_PROCESSED,
-            document_url__advancedirective=self).last()
-        if processed_run:
-            return processed_run.output()
-
-        return None
+        if not self._verification_output:
+            return None
+        # parsed once per instance, as long as the output doesn't change
+        cached = self.__dict__.get('_verification_result')
+        if cached is None or cached[0] != self._verification_output:
+            cached = (self._verification_output, json.loads(self._verification_output))
+            self.__dict__['_verification_result'] = cached
+        return cached[1]
 
     @property
     def verification_passed(self):
@@ -129,21 +325,27 @@ class AdvanceDirective(models.Model):
         Notes: if the CF-run finished successfully, and all the outputs checked
         by the run are true (or not applicable).
         """
-        processed_run = CloudFactoryDocumentRun.objects.filter(
-            status=CloudFactoryDocumentRun.STATUS_PROCESSED,
-            document_url__advancedirective=self).last()
-
-        return processed_run and processed_run.passed()
+        return self._verification_passed
 
     def __unicode__(self):
         return unicode(self.document.name)
 
 
 def remove_documents_on_delete(sender, instance, using, **kwargs):
-    if instance.thumbnail:
+    # rendered images are keyed by content, so other directives may share them.
+    shared = instance.content_hash and AdvanceDirective.objects \
+        .filter(content_hash=instance.content_hash) \
+        .exclude(pk=instance.pk) \
+        .exists()
+    if instance.thumbnail and not shared:
         instance.thumbnail.storage.delete(instance.thumbnail.name)
+    if not shared:
+        for name in instance.page_image_names:
+            instance.thumbnail.storage.delete(name)
     if instance.document:
         instance.document.storage.delete(instance.document.name)
+        forget_file_info('storage:' + instance.document.name)
+        forget_file_info('irods:' + instance.document.name)
 
 
 models.signals.post_delete.connect(remove_documents_on_delete, sender=AdvanceDirective)
@@ -411,6 +613,18 @@ class CloudFactoryDocumentRun(models.Model):
         if save:
             self.save()
 
+    def update_advancedirective_verification_state(self):
+        """Update the verification state of the AdvanceDirective of this run, if any.
+        (Needed after the status was changed without saving the run.)
+        """
+        if not self.document_url_id:
+            return
+        try:
+            directive = self.document_url.advancedirective
+        except (DocumentUrl.DoesNotExist, AdvanceDirective.DoesNotExist):
+            return
+        directive.update_verification_state()
+
     def output(self):
         """
         Returns dictionary of 'output' from run if is processed.
@@ -465,3 +679,12 @@ def abort_document_runs_on_delete(sender, instance, using, **kwargs):
 
 
 models.signals.pre_delete.connect(abort_document_runs_on_delete, sender=DocumentUrl)
+
+
+def update_verification_state_on_save(sender, instance, raw=False, **kwargs):
+    """Keep the verification state of the AdvanceDirective of a run up to date."""
+    if not raw:
+        instance.update_advancedirective_verification_state()
+
+
+models.signals.post_save.connect(update_verification_state_on_save, sender=CloudFactoryDocumentRun)
@@ -1,8 +1,20 @@
+import errno
+import posixpath
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files import File
 from django.core.files.storage import Storage
 from django.core.urlresolvers import reverse
 
+from django_irods.icommands import SessionException
 from django_irods.storage import IrodsStorage
 
+from myhpom.irods_pool import (
+    CONNECTION_ERRORS, CollectionDoesNotExist, DataObjectDoesNotExist, get_pool)
+
+CHUNK_SIZE = 1024 * 1024
+
 
 class MyhpomStorage(IrodsStorage):
     """
@@ -20,3 +32,234 @@ class MyhpomStorage(IrodsStorage):
         # The IrodsStorage implementation will prevent files with the same
         # 'name' from being stored:
         return Storage.get_available_name(self, name)
+
+
+class PooledFile(File):
+    """A data object opened with a session of the pool. The file is read from iRODS as it is
+    read, and the session goes back to the pool when the file is closed."""
+
+    def __init__(self, file, name, pool, session):
+        super(PooledFile, self).__init__(file, name)
+        self._pool = pool
+        self._session = session
+
+    def close(self):
+        if self._session is None:
+            return
+        session, self._session = self._session, None
+        broken = True
+        try:
+            super(PooledFile, self).close()
+            broken = False
+        finally:
+            self._pool.release(session, broken=broken)
+
+
+class PooledMyhpomStorage(MyhpomStorage):
+    """
+    MyhpomStorage through the pooled iRODS protocol client of myhpom.irods_pool, rather than
+    an icommand process per call. Set DEFAULT_FILE_STORAGE to
+    'myhpom.storage.PooledMyhpomStorage' to use it.
+
+    If python-irodsclient is not installed, every method falls back to the icommands of
+    MyhpomStorage. Missing files raise IOError (ENOENT).
+
+    In addition to the Storage API, sizes(), file_info() and getAVUs() fetch the
+    metadata of many files, or all the metadata of a file, in one call.
+
+    Files are opened for reading only, and hold a session of the pool until they are closed.
+    """
+
+    def __init__(self, option=None, pool=None):
+        super(PooledMyhpomStorage, self).__init__(option)
+        self._pool = pool
+
+    @property
+    def pool(self):
+        return self._pool or get_pool()
+
+    def irods_path(self, name):
+        """The absolute iRODS path of a storage name (relative names are in IRODS_CWD)."""
+        return posixpath.join(settings.IRODS_CWD, name)
+
+    def _get(self, session, name):
+        """Return the data object or collection at name, or None if there isn't one."""
+        path = self.irods_path(name)
+        try:
+            return session.data_objects.get(path)
+        except DataObjectDoesNotExist:
+            pass
+        try:
+            return session.collections.get(path)
+        except CollectionDoesNotExist:
+            return None
+
+    def _get_data_object(self, session, name):
+        try:
+            return session.data_objects.get(self.irods_path(name))
+        except DataObjectDoesNotExist:
+            raise IOError(errno.ENOENT, 'No such data object', name)
+
+    def exists(self, name):
+        if self.pool is None:
+            return super(PooledMyhpomStorage, self).exists(name)
+        with self.pool.session() as session:
+            return self._get(session, name) is not None
+
+    def size(self, name):
+        if self.pool is None:
+            return super(PooledMyhpomStorage, self).size(name)
+        with self.pool.session() as session:
+            return self._get_data_object(session, name).size
+
+    def sizes(self, names):
+        """Return a dictionary of the sizes of the data objects with the given names.
+        Names that don't exist are left out. Data objects in the same collection are listed
+        in one call.
+        """
+        if self.pool is None:
+            return {name: self.size(name) for name in names if self.exists(name)}
+        by_collection = defaultdict(list)
+        for name in names:
+            by_collection[posixpath.dirname(self.irods_path(name))].append(name)
+        sizes = {}
+        with self.pool.session() as session:
+            for path, collection_names in by_collection.items():
+                try:
+                    collection = session.collections.get(path)
+                except CollectionDoesNotExist:
+                    continue
+                collection_sizes = {obj.name: obj.size for obj in collection.data_objects}
+                for name in collection_names:
+                    if posixpath.basename(name) in collection_sizes:
+                        sizes[name] = collection_sizes[posixpath.basename(name)]
+        return sizes
+
+    def file_info(self, name):
+        """Return the size, modification time and checksum (None if not computed) of a
+        data object."""
+        if self.pool is None:
+            return {'size': self.size(name), 'modified': None, 'checksum': None}
+        with self.pool.session() as session:
+            obj = self._get_data_object(session, name)
+            return {
+                'size': obj.size,
+                'modified': obj.modify_time.strftime('%Y-%m-%d.%H:%M'),
+                'checksum': obj.checksum or None,
+            }
+
+    def listdir(self, path):
+        if self.pool is None:
+            return super(PooledMyhpomStorage, self).listdir(path)
+        with self.pool.session() as session:
+            try:
+                collection = session.collections.get(self.irods_path(path))
+            except CollectionDoesNotExist:
+                raise IOError(errno.ENOENT, 'No such collection', path)
+            return (
+                [sub.name for sub in collection.subcollections],
+                [obj.name for obj in collection.data_objects],
+            )
+
+    def delete(self, name):
+        if self.pool is None:
+            return super(PooledMyhpomStorage, self).delete(name)
+        path = self.irods_path(name)
+        with self.pool.session() as session:
+            try:
+                session.data_objects.unlink(path, force=True)
+            except DataObjectDoesNotExist:
+                try:
+                    session.collections.remove(path, recurse=True, force=True)
+                except CollectionDoesNotExist:
+                    pass
+
+    def _open(self, name, mode='rb'):
+        if self.pool is None:
+            return super(PooledMyhpomStorage, self)._open(name, mode)
+        pool = self.pool
+        session = pool.acquire()
+        try:
+            irods_file = self._get_data_object(session, name).open('r')
+        except CONNECTION_ERRORS:
+            pool.release(session, broken=True)
+            raise
+        except BaseException:
+            pool.release(session)
+            raise
+        return PooledFile(irods_file, name, pool, session)
+
+    def _save(self, name, content):
+        if self.pool is None:
+            return super(PooledMyhpomStorage, self)._save(name, content)
+        path = self.irods_path(name)
+        with self.pool.session() as session:
+            self._create_collection(session, posixpath.dirname(path))
+            try:
+                session.data_objects.get(path)
+            except DataObjectDoesNotExist:
+                session.data_objects.create(path)
+            with session.data_objects.open(path, 'w') as irods_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    irods_file.write(chunk)
+        return name
+
+    def _create_collection(self, session, path):
+        try:
+            session.collections.get(path)
+        except CollectionDoesNotExist:
+            self._create_collection(session, posixpath.dirname(path))
+            session.collections.create(path)
+
+    def getAVU(self, name, attName):
+        if self.pool is None:
+            return super(PooledMyhpomStorage, self).getAVU(name, attName)
+        return self.getAVUs(name).get(attName)
+
+    def getAVUs(self, name):
+        """Return a dictionary of all the attribute values of a data object or collection."""
+        if self.pool is None:
+            return self._imeta_avus(name)
+        with self.pool.session() as session:
+            obj = self._get(session, name)
+            if obj is None:
+                raise IOError(errno.ENOENT, 'No such data object or collection', name)
+            return {avu.name: avu.value for avu in obj.metadata.items()}
+
+    def _imeta_avus(self, name):
+        """getAVUs with `imeta ls`, which prints the AVUs of a data object (-d) or a collection
+        (-C) as:
+
+          AVUs defined for dataObj a.txt:
+          attribute: isPublic
+          value: True
+          units:
+          ----
+          attribute: ...
+        """
+        try:
+            stdout = self.session.run('imeta', None, 'ls', '-d', name)[0]
+        except SessionException:
+            stdout = self.session.run('imeta', None, 'ls', '-C', name)[0]
+        avus = {}
+        attribute = None
+        for line in stdout.splitlines():
+            if line.startswith('attribute:'):
+                attribute = line.split(':', 1)[1].strip()
+            elif line.startswith('value:') and attribute is not None:
+                avus[attribute] = line.split(':', 1)[1].strip()
+                attribute = None
+        return avus
+
+    def setAVU(self, name, attName, attVal, attUnit=None):
+        if self.pool is None:
+            return super(PooledMyhpomStorage, self).setAVU(name, attName, attVal, attUnit)
+        with self.pool.session() as session:
+            obj = self._get(session, name)
+            if obj is None:
+                raise IOError(errno.ENOENT, 'No such data object or collection', name)
+            for avu in obj.metadata.get_all(attName):
+                obj.metadata.remove(avu)
+            obj.metadata.add(attName, str(attVal), attUnit)
@@ -1,15 +1,22 @@
 import json
+import logging
+from multiprocessing.pool import ThreadPool
+
 import requests
+from celery.schedules import crontab
 from django.core.mail import send_mail
 from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.template.loader import get_template
 from django.template import Context
 from celery import shared_task
-from celery.task import Task
+from celery.task import Task, periodic_task
 from celery.signals import task_failure
 from myhpom.models.document import DocumentUrl
-from myhpom.models import CloudFactoryDocumentRun
+from myhpom.models import AdvanceDirective, CloudFactoryDocumentRun
+from myhpom import cloudfactory
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
@@ -46,7 +53,7 @@ class CloudFactorySubmitDocumentRun(Task):
         cf_run.save()
 
         try:
-            response = requests.post(settings.CLOUDFACTORY_API_URL + '/runs', json=cf_run.post_data)
+            response = cloudfactory.post('/runs', json=cf_run.post_data)
         except requests.RequestException:
             cf_run.status = CloudFactoryDocumentRun.STATUS_REQ_ERROR
             cf_run.save()
@@ -97,26 +104,101 @@ class CloudFactoryUpdateDocumentRun(Task):
             CloudFactoryDocumentRun.STATUS_ABORTED,  # we previously aborted; did it take?
         ]:
             try:
-                run_url = "%s/runs/%s" % (settings.CLOUDFACTORY_API_URL, cf_run.run_id)
-                response = requests.get(run_url)
+                response = cloudfactory.get('/runs/%s' % cf_run.run_id)
             except requests.RequestException:
                 cf_run.status = CloudFactoryDocumentRun.STATUS_REQ_ERROR
                 cf_run.save()
                 raise
 
-            if response.status_code == 404:
-                cf_run.status = CloudFactoryDocumentRun.STATUS_NOTFOUND
-                cf_run.response_content = response.content  # not json, shouldn't raise Exception.
-                cf_run.save()
-            elif response.status_code == 200:
-                cf_run.save_response_data(response.content)
-            else:
-                cf_run.status = CloudFactoryDocumentRun.STATUS_ERROR
-                cf_run.save()
-                raise ValueError(
-                    """URL: %s\nResponse status: %d\nResponse Data: %s"""
-                    % (response.url, response.status_code, response.content)
-                )
+            update_document_run_from_response(cf_run, response)
+
+
+def update_document_run_from_response(cf_run, response):
+    """Update a CloudFactoryDocumentRun from the response to GET /runs/<run_id>.
+
+    * 404 => STATUS_NOTFOUND
+    * 200 => updated from the response content (ValueError if it is not a valid run)
+    * otherwise => STATUS_ERROR and ValueError
+    """
+    if response.status_code == 404:
+        cf_run.status = CloudFactoryDocumentRun.STATUS_NOTFOUND
+        cf_run.response_content = response.content  # not json, shouldn't raise Exception.
+        cf_run.save()
+    elif response.status_code == 200:
+        cf_run.save_response_data(response.content)
+    else:
+        cf_run.status = CloudFactoryDocumentRun.STATUS_ERROR
+        cf_run.save()
+        raise ValueError(
+            """URL: %s\nResponse status: %d\nResponse Data: %s"""
+            % (response.url, response.status_code, response.content)
+        )
+
+
+def reconcile_document_runs(cf_runs, parallelism=None):
+    """Refresh many CloudFactoryDocumentRuns from CloudFactory concurrently.
+
+    ## Parameters
+    * cf_runs = an iterable (or QuerySet) of CloudFactoryDocumentRun objects
+    * parallelism = the number of concurrent requests to CloudFactory
+        (default: settings.CLOUDFACTORY_MAX_CONNECTIONS, the size of the connection pool)
+
+    ## Process
+    * The runs are fetched from CloudFactory by a pool of threads sharing the pooled session;
+      the responses are applied to the database in the calling thread as they arrive.
+    * Runs that were Processing and are now Processed get the review completed email, as
+      the CloudFactory callback for them may never have arrived.
+    * Errors are logged and counted rather than raised, so that one bad run doesn't stop
+      the batch.
+
+    Returns a dictionary of counts: {'updated': n, 'processed': n, 'errors': n}
+    """
+    parallelism = parallelism or cloudfactory.max_connections()
+    counts = {'updated': 0, 'processed': 0, 'errors': 0}
+    cf_runs = list(cf_runs)  # only the calling thread uses the database connection
+
+    def fetch(cf_run):
+        try:
+            return cf_run, cloudfactory.get('/runs/%s' % cf_run.run_id), None
+        except requests.RequestException as e:
+            return cf_run, None, e
+
+    pool = ThreadPool(parallelism)
+    try:
+        for cf_run, response, error in pool.imap_unordered(fetch, cf_runs, chunksize=16):
+            if error is not None:
+                logger.warning("CloudFactory run %s: %s", cf_run.run_id, error)
+                counts['errors'] += 1
+                continue
+            previous_status = cf_run.status
+            try:
+                update_document_run_from_response(cf_run, response)
+            except ValueError as e:
+                logger.warning("CloudFactory run %s: %s", cf_run.run_id, e)
+                counts['errors'] += 1
+                continue
+            counts['updated'] += 1
+            if (previous_status == CloudFactoryDocumentRun.STATUS_PROCESSING
+                    and cf_run.status == CloudFactoryDocumentRun.STATUS_PROCESSED):
+                counts['processed'] += 1
+                if cf_run.document_url_id and cf_run.document_host:
+                    EmailUserDocumentReviewCompleted.delay(
+                        cf_run.id, 'https', cf_run.document_host)
+    finally:
+        pool.close()
+        pool.join()
+    return counts
+
+
+@periodic_task(ignore_result=True, run_every=crontab(minute='*/15'))
+def reconcile_processing_document_runs():
+    """Refresh all the runs that are still Processing at CloudFactory."""
+    cf_runs = CloudFactoryDocumentRun.objects \
+        .filter(status=CloudFactoryDocumentRun.STATUS_PROCESSING) \
+        .exclude(run_id=None)
+    counts = reconcile_document_runs(cf_runs)
+    logger.info("Reconciled CloudFactory runs: %s", counts)
+    return counts
 
 
 @shared_task
@@ -146,9 +228,11 @@ class CloudFactoryAbortDocumentRun(Task):
             CloudFactoryDocumentRun.STATUS_PROCESSING,  # still going last we checked
             CloudFactoryDocumentRun.STATUS_REQ_ERROR,  # didn't work last time; was it created?
         ]:
-            abort_url = "%s/runs/%s/abort" % (settings.CLOUDFACTORY_API_URL, cf_run.run_id)
-            response = requests.post(abort_url)  # yes, CF wants a POST without a body for this.
+            # yes, CF wants a POST without a body for this.
+            response = cloudfactory.post('/runs/%s/abort' % cf_run.run_id)
 
+            # (the status is updated without saving the run, so the verification state of the
+            # AdvanceDirective has to be updated explicitly)
             if response.status_code == 404:
                 CloudFactoryDocumentRun.objects.filter(pk=cf_run_id) \
                     .update(status=CloudFactoryDocumentRun.STATUS_NOTFOUND)
@@ -163,6 +247,10 @@ class CloudFactoryAbortDocumentRun(Task):
             else:
                 CloudFactoryDocumentRun.objects.filter(pk=cf_run_id) \
                     .update(status=CloudFactoryDocumentRun.STATUS_ERROR)
+            cf_run.refresh_from_db()
+            cf_run.update_advancedirective_verification_state()
+
+            if cf_run.status == CloudFactoryDocumentRun.STATUS_ERROR:
                 raise ValueError(
                     """URL: %s\nResponse status: %d\nResponse Content:\n%s"""
                     % (response.url, response.status_code, response.content)
@@ -188,6 +276,29 @@ class EmailUserDocumentReviewCompleted(Task):
             send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
 
 
+@shared_task
+class RenderAdvanceDirectiveImages(Task):
+    def run(self, advancedirective_id, pages=False):
+        """Render and store the thumbnail (and optionally the page images) of an AD.
+
+        ## Use Cases
+        * queued by the upload view once the document has been stored.
+
+        ## Parameters
+        * advancedirective_id = the id of the AdvanceDirective
+        * pages = True to also render an image of every page
+
+        Images are stored under the hash of the document content, so re-running the task
+        for an unchanged document does not render again. If the AD has been deleted by the
+        time the task runs, there is nothing to do.
+        """
+        try:
+            directive = AdvanceDirective.objects.get(id=advancedirective_id)
+        except AdvanceDirective.DoesNotExist:
+            return False
+        return directive.update_rendered_images(pages=pages)
+
+
 # == SIGNALS ==
 
 
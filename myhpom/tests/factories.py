@@ -52,14 +52,12 @@ class AdvanceDirectiveFactory(factory.django.DjangoModelFactory):
 
     @classmethod
     def _create(cls, model_class, *args, **kwargs):
-        # In order to call render_thumbnail_data() we must have access to the
+        # In order to call update_rendered_images() we must have access to the
         # instance:
         obj = model_class(*args, **kwargs)
         if obj.document:
-            obj.thumbnail = SimpleUploadedFile(
-                os.path.splitext(os.path.basename(PDF_FILENAME))[0] + '.jpg',
-                obj.render_thumbnail_data())
             obj.save()
+            obj.update_rendered_images()
         return obj
 
 
@@ -0,0 +1,151 @@
+"""
+A local fake of the CloudFactory runs API, served over HTTP on localhost.
+
+Unlike requests_mock, requests to the fake go through real sockets, so the connection pool,
+keep-alive and concurrency of myhpom.cloudfactory are exercised. Use it as a context manager
+and point CLOUDFACTORY_API_URL at its url:
+
+    with FakeCloudFactory() as cf, override_settings(CLOUDFACTORY_API_URL=cf.url):
+        cf.add_run('RUN_ID')
+        ...
+
+Supported endpoints:
+* POST /runs => 201, a new run in the Processing status
+* GET /runs/<id> => 200 with the run, or 404
+* POST /runs/<id>/abort => 202 if Processing (the run becomes Aborted), 405 if not, or 404
+"""
+
+import json
+import threading
+import uuid
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from datetime import datetime
+
+PASSING_OUTPUT = {
+    'owner_name_matches': 'true',
+    'witness_signature_1': 'true',
+    'witness_signature_2': 'true',
+    'notarized': 'not applicable',
+    'signed_by_owner': 'true',
+}
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeCloudFactoryHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, format, *args):
+        pass  # keep the test output clean
+
+    def send_json(self, status_code, data):
+        body = json.dumps(data)
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        fake = self.server.fake
+        fake.wait()
+        parts = self.path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'runs':
+            run = fake.get_run(parts[1])
+            if run is not None:
+                return self.send_json(200, run)
+        self.send_json(404, {})
+
+    def do_POST(self):
+        fake = self.server.fake
+        fake.wait()
+        length = int(self.headers.getheader('Content-Length') or 0)
+        body = self.rfile.read(length) if length else ''
+        parts = self.path.strip('/').split('/')
+        if parts == ['runs']:
+            data = json.loads(body or '{}')
+            run = fake.add_run(uuid.uuid4().hex[:16], units=data.get('units', []))
+            return self.send_json(201, run)
+        if len(parts) == 3 and parts[0] == 'runs' and parts[2] == 'abort':
+            status_code = fake.abort_run(parts[1])
+            return self.send_json(status_code, {})
+        self.send_json(404, {})
+
+
+class FakeCloudFactory(object):
+    """A CloudFactory runs API on localhost, with an optional latency per request."""
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.runs = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def start(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCloudFactoryHandler)
+        self.server.fake = self
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def wait(self):
+        with self.lock:
+            self.requests += 1
+        if self.latency:
+            threading.Event().wait(self.latency)
+
+    def add_run(self, run_id, units=None):
+        run = {
+            'id': run_id,
+            'line_id': 'FAKE',
+            'status': 'Processing',
+            'created_at': datetime.utcnow().isoformat() + 'Z',
+            'units': units or [],
+        }
+        with self.lock:
+            self.runs[run_id] = run
+        return run
+
+    def get_run(self, run_id):
+        with self.lock:
+            return self.runs.get(run_id)
+
+    def process_run(self, run_id, output=None):
+        """Finish processing the run with the given output (default: a passing review)."""
+        with self.lock:
+            run = self.runs[run_id]
+            run['status'] = 'Processed'
+            run['processed_at'] = datetime.utcnow().isoformat() + 'Z'
+            run['units'] = [{'output': output or PASSING_OUTPUT}]
+
+    def abort_run(self, run_id):
+        with self.lock:
+            run = self.runs.get(run_id)
+            if run is None:
+                return 404
+            if run['status'] != 'Processing':
+                return 405
+            run['status'] = 'Aborted'
+            return 202
@@ -0,0 +1,205 @@
+"""
+An in-memory fake of an iRODS zone, with sessions implementing the part of the
+python-irodsclient API used by myhpom.storage.PooledMyhpomStorage.
+
+    fake = FakeIrods('/fakeZone/home/rods')
+    pool = IrodsSessionPool(fake.session, size=2)
+    storage = PooledMyhpomStorage(pool=pool)
+
+Every call to the zone waits for the configured latency, like a round trip to the server,
+and is counted in fake.calls; fake.sessions counts the sessions (connections) opened.
+"""
+
+import posixpath
+import threading
+from datetime import datetime
+from io import BytesIO
+
+from myhpom.irods_pool import CollectionDoesNotExist, DataObjectDoesNotExist
+
+
+class FakeMeta(object):
+    def __init__(self, name, value, units=None):
+        self.name = name
+        self.value = value
+        self.units = units
+
+
+class FakeMetadata(object):
+    def __init__(self, fake):
+        self.fake = fake
+        self.avus = []
+
+    def items(self):
+        self.fake.wait()
+        return list(self.avus)
+
+    def get_all(self, name):
+        self.fake.wait()
+        return [avu for avu in self.avus if avu.name == name]
+
+    def add(self, name, value, units=None):
+        self.fake.wait()
+        self.avus.append(FakeMeta(name, value, units))
+
+    def remove(self, avu):
+        self.fake.wait()
+        self.avus.remove(avu)
+
+
+class FakeDataObject(object):
+    def __init__(self, fake, path):
+        self.fake = fake
+        self.path = path
+        self.name = posixpath.basename(path)
+        self.content = b''
+        self.checksum = None
+        self.modify_time = datetime.utcnow()
+        self.metadata = FakeMetadata(fake)
+
+    @property
+    def size(self):
+        return len(self.content)
+
+    def open(self, mode):
+        return FakeDataObjectFile(self, mode)
+
+
+class FakeDataObjectFile(BytesIO):
+    def __init__(self, obj, mode):
+        BytesIO.__init__(self, obj.content if mode == 'r' else b'')
+        self.obj = obj
+        self.mode = mode
+
+    def close(self):
+        if self.mode == 'w' and not self.closed:
+            self.obj.content = self.getvalue()
+            self.obj.modify_time = datetime.utcnow()
+        BytesIO.close(self)
+
+
+class FakeCollection(object):
+    def __init__(self, fake, path):
+        self.fake = fake
+        self.path = path
+        self.name = posixpath.basename(path)
+        self.metadata = FakeMetadata(fake)
+
+    @property
+    def subcollections(self):
+        return [c for p, c in sorted(self.fake.collections.items())
+                if posixpath.dirname(p) == self.path and p != self.path]
+
+    @property
+    def data_objects(self):
+        return [o for p, o in sorted(self.fake.data_objects.items())
+                if posixpath.dirname(p) == self.path]
+
+
+class FakeDataObjectManager(object):
+    def __init__(self, fake):
+        self.fake = fake
+
+    def get(self, path):
+        self.fake.wait()
+        with self.fake.lock:
+            if path not in self.fake.data_objects:
+                raise DataObjectDoesNotExist(path)
+            return self.fake.data_objects[path]
+
+    def create(self, path):
+        self.fake.wait()
+        with self.fake.lock:
+            if posixpath.dirname(path) not in self.fake.collections:
+                raise CollectionDoesNotExist(posixpath.dirname(path))
+            obj = self.fake.data_objects[path] = FakeDataObject(self.fake, path)
+            return obj
+
+    def open(self, path, mode):
+        return self.get(path).open(mode)
+
+    def unlink(self, path, force=False):
+        self.fake.wait()
+        with self.fake.lock:
+            if self.fake.data_objects.pop(path, None) is None:
+                raise DataObjectDoesNotExist(path)
+
+
+class FakeCollectionManager(object):
+    def __init__(self, fake):
+        self.fake = fake
+
+    def get(self, path):
+        self.fake.wait()
+        with self.fake.lock:
+            if path not in self.fake.collections:
+                raise CollectionDoesNotExist(path)
+            return self.fake.collections[path]
+
+    def create(self, path):
+        self.fake.wait()
+        with self.fake.lock:
+            if posixpath.dirname(path) not in self.fake.collections:
+                raise CollectionDoesNotExist(posixpath.dirname(path))
+            return self.fake.collections.setdefault(path, FakeCollection(self.fake, path))
+
+    def remove(self, path, recurse=False, force=False):
+        self.fake.wait()
+        with self.fake.lock:
+            if path not in self.fake.collections:
+                raise CollectionDoesNotExist(path)
+            for store in (self.fake.collections, self.fake.data_objects):
+                for p in list(store):
+                    if p == path or p.startswith(path + '/'):
+                        del store[p]
+
+
+class FakeIrodsSession(object):
+    def __init__(self, fake):
+        self.fake = fake
+        self.data_objects = FakeDataObjectManager(fake)
+        self.collections = FakeCollectionManager(fake)
+        self.closed = False
+
+    def cleanup(self):
+        self.closed = True
+
+
+class FakeIrods(object):
+    """An iRODS zone in memory, containing the collection `home` and its parents."""
+
+    def __init__(self, home, latency=0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.sessions = 0
+        self.data_objects = {}
+        self.collections = {}
+        path = home
+        while path != '/':
+            self.collections[path] = FakeCollection(self, path)
+            path = posixpath.dirname(path)
+        self.collections['/'] = FakeCollection(self, '/')
+
+    def wait(self):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            threading.Event().wait(self.latency)
+
+    def session(self):
+        """Connect a new session (the factory of an IrodsSessionPool)."""
+        with self.lock:
+            self.sessions += 1
+        return FakeIrodsSession(self)
+
+    def add_file(self, path, content=b'', checksum=None):
+        """Create a data object (and its collections) directly in the zone."""
+        parent = posixpath.dirname(path)
+        while parent not in self.collections:
+            self.collections[parent] = FakeCollection(self, parent)
+            parent = posixpath.dirname(parent)
+        obj = self.data_objects[path] = FakeDataObject(self, path)
+        obj.content = content
+        obj.checksum = checksum
+        return obj
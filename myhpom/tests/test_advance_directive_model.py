@@ -1,10 +1,13 @@
 import json
 import os
-from django.test import TestCase
-from mock import MagicMock
+import shutil
+import tempfile
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from mock import MagicMock, patch
 
 from myhpom.tests.factories import AdvanceDirectiveFactory, CloudFactoryDocumentRunFactory
-from myhpom.models import CloudFactoryDocumentRun
+from myhpom.models import AdvanceDirective, CloudFactoryDocumentRun
 from myhpom.models.document import remove_documents_on_delete
 
 SUCCESS_DATA = open(os.path.join(
@@ -33,6 +36,64 @@ class AdvanceDirectiveTest(TestCase):
         remove_documents_on_delete(None, directive, 'default')
         self.assertFalse(directive.document.storage.delete.called)
 
+    def test_update_rendered_images(self):
+        # The factory renders the thumbnail, stored under the hash of the document content.
+        directive = AdvanceDirectiveFactory()
+        storage = directive.thumbnail.storage
+        self.assertEqual(64, len(directive.content_hash))
+        self.assertEqual(
+            AdvanceDirective.thumbnail_name(directive.content_hash), directive.thumbnail.name)
+        self.assertTrue(storage.exists(directive.thumbnail.name))
+        self.assertEqual([], directive.page_image_names)
+
+        # When the content hasn't changed, nothing is rendered again
+        with patch.object(AdvanceDirective, 'render_images') as render_images:
+            self.assertFalse(directive.update_rendered_images())
+            self.assertFalse(render_images.called)
+
+        # Page images are rendered on request, and the scratch directory is cleaned up
+        scratch_dir = tempfile.mkdtemp()
+        try:
+            with override_settings(AD_RENDER_SCRATCH_DIR=scratch_dir):
+                self.assertTrue(directive.update_rendered_images(pages=True))
+            self.assertEqual([], os.listdir(scratch_dir))
+        finally:
+            shutil.rmtree(scratch_dir)
+        directive.refresh_from_db()
+        self.assertTrue(directive.page_count >= 1)
+        for name in directive.page_image_names:
+            self.assertTrue(storage.exists(name))
+
+        # Another directive with the same document shares the rendered images
+        other = AdvanceDirectiveFactory()
+        self.assertEqual(directive.thumbnail.name, other.thumbnail.name)
+        other.delete()
+        self.assertTrue(storage.exists(directive.thumbnail.name))
+        directive.delete()
+        self.assertFalse(storage.exists(directive.thumbnail.name))
+
+    def test_update_rendered_images_of_new_content(self):
+        # The images of the previous content are deleted, unless another directive shares them
+        directive = AdvanceDirectiveFactory()
+        storage = directive.thumbnail.storage
+        old_hash = 'a' * 64
+        for other_directive in [None, AdvanceDirectiveFactory()]:
+            storage.save(AdvanceDirective.thumbnail_name(old_hash), ContentFile(b'jpeg'))
+            if other_directive is not None:
+                AdvanceDirective.objects.filter(pk=other_directive.pk) \
+                    .update(content_hash=old_hash)
+            directive.content_hash = old_hash
+            directive.update_rendered_images()
+            self.assertEqual(
+                AdvanceDirective.thumbnail_name(directive.content_hash), directive.thumbnail.name)
+            self.assertEqual(other_directive is not None,
+                             storage.exists(AdvanceDirective.thumbnail_name(old_hash)))
+
+        # A document from which nothing is rendered is an error
+        storage.delete(directive.thumbnail.name)
+        with patch.object(AdvanceDirective, 'render_images', return_value=[]):
+            self.assertRaises(ValueError, directive.update_rendered_images)
+
     def test_verification_passed(self):
         # If the status is equal to a successful run, and all the outputs are
         # successful, then verification_passed will return True
@@ -59,6 +120,28 @@ class AdvanceDirectiveTest(TestCase):
         run.save_response_data(json.dumps(failed_run))
         self.assertFalse(ad.verification_passed)
 
+    def test_verification_state_without_queries(self):
+        # The verification state is stored on the AD when a run is saved, so reading it
+        # needs no queries.
+        run = CloudFactoryDocumentRunFactory()
+        run.save_response_data(SUCCESS_DATA)
+        ad = AdvanceDirective.objects.get(pk=run.document_url.advancedirective.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(ad.verification_passed)
+            self.assertFalse(ad.verification_in_progress)
+            self.assertFalse(ad.verification_failed)
+            self.assertEqual('true', ad.verification_result['owner_name_matches'])
+
+        # Status changes that don't save the run are reflected too (abort task)
+        CloudFactoryDocumentRun.objects.filter(pk=run.pk) \
+            .update(status=CloudFactoryDocumentRun.STATUS_ABORTED)
+        run.refresh_from_db()
+        run.update_advancedirective_verification_state()
+        ad.refresh_from_db()
+        self.assertFalse(ad.verification_passed)
+        self.assertTrue(ad.verification_failed)
+        self.assertIsNone(ad.verification_result)
+
     def test_verification_in_progress(self):
         # When there are no runs associated with an AD, then it isn't in
         # progress
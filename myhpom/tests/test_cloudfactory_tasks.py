@@ -5,12 +5,16 @@ import requests_mock
 from django.test import TestCase, override_settings
 from django.conf import settings
 from django.utils.dateparse import parse_datetime
-from myhpom.tests.factories import AdvanceDirectiveFactory
+from mock import patch
+from myhpom import cloudfactory
+from myhpom.tests.factories import AdvanceDirectiveFactory, CloudFactoryDocumentRunFactory
+from myhpom.tests.fake_cloudfactory import FakeCloudFactory
 from myhpom.models import DocumentUrl, CloudFactoryDocumentRun
 from myhpom.tasks import (
     CloudFactorySubmitDocumentRun,
     CloudFactoryAbortDocumentRun,
     CloudFactoryUpdateDocumentRun,
+    reconcile_processing_document_runs,
 )
 
 FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
@@ -343,3 +347,70 @@ class CloudFactoryAbortDocumentRunTestCase(TestCase):
             cf_run.refresh_from_db()
             self.assertEqual(cf_run.status, initial_status)
             cf_run.delete()
+
+
+@override_settings(CLOUDFACTORY_RETRIES=0)
+class FakeCloudFactoryTestCase(TestCase):
+    """
+    Against a local fake CloudFactory server (real HTTP, through the pooled session):
+    * a run can be submitted and aborted.
+    * reconciling updates all Processing runs: processed runs are processed (and the user is
+      emailed), runs still in progress are unchanged, runs unknown to CF are not found.
+    """
+
+    def setUp(self):
+        cloudfactory.reset_session()
+        self.fake = FakeCloudFactory().start()
+        self.settings_override = override_settings(CLOUDFACTORY_API_URL=self.fake.url)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.fake.stop()
+        cloudfactory.reset_session()
+
+    def test_submit_and_abort(self):
+        document_url = DocumentUrl.objects.create(advancedirective=AdvanceDirectiveFactory())
+        cf_run = CloudFactoryDocumentRun.objects.get(
+            id=CloudFactorySubmitDocumentRun(document_url.id, 'testserver'))
+        self.assertEqual(cf_run.status, CloudFactoryDocumentRun.STATUS_PROCESSING)
+        self.assertIsNotNone(self.fake.get_run(cf_run.run_id))
+
+        CloudFactoryAbortDocumentRun(cf_run.id)
+        cf_run.refresh_from_db()
+        self.assertEqual(cf_run.status, CloudFactoryDocumentRun.STATUS_ABORTED)
+
+    @patch('myhpom.tasks.EmailUserDocumentReviewCompleted')
+    def test_reconcile_processing_runs(self, email_patch):
+        processing = CloudFactoryDocumentRun.STATUS_PROCESSING
+        runs = [CloudFactoryDocumentRun.objects.create(status=processing, run_id='RUN%02d' % i)
+                for i in range(20)]
+        for cf_run in runs:
+            self.fake.add_run(cf_run.run_id)
+        for cf_run in runs[:10]:
+            self.fake.process_run(cf_run.run_id)
+        emailed = CloudFactoryDocumentRunFactory(status=processing, document_host='testserver')
+        self.fake.add_run(emailed.run_id)
+        self.fake.process_run(emailed.run_id)
+        unknown = CloudFactoryDocumentRun.objects.create(status=processing, run_id='UNKNOWN')
+        finished = CloudFactoryDocumentRun.objects.create(
+            status=CloudFactoryDocumentRun.STATUS_PROCESSED, run_id='FINISHED')
+
+        counts = reconcile_processing_document_runs()
+        self.assertEqual(counts, {'updated': 22, 'processed': 11, 'errors': 0})
+        self.assertEqual(22, self.fake.requests)  # the finished run isn't requested
+
+        for cf_run in runs[:10] + [emailed]:
+            cf_run.refresh_from_db()
+            self.assertEqual(cf_run.status, CloudFactoryDocumentRun.STATUS_PROCESSED)
+            self.assertTrue(cf_run.passed())
+        for cf_run in runs[10:]:
+            cf_run.refresh_from_db()
+            self.assertEqual(cf_run.status, processing)
+        unknown.refresh_from_db()
+        self.assertEqual(unknown.status, CloudFactoryDocumentRun.STATUS_NOTFOUND)
+        finished.refresh_from_db()
+        self.assertEqual(finished.status, CloudFactoryDocumentRun.STATUS_PROCESSED)
+
+        # only the run with a document is emailed about
+        email_patch.delay.assert_called_once_with(emailed.id, 'https', 'testserver')
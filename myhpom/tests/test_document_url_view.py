@@ -53,6 +53,23 @@ class DocumentUrlViewTestCase(TestCase):
         response_content = b''.join(response.streaming_content)
         self.assertEqual(document_content, response_content)
 
+    def test_document_url_range_and_etag(self):
+        """
+        * a Range request returns 206 & that part of the document
+        * a request with a matching If-None-Match returns 304
+        """
+        document_content = self.advancedirective.document.file.read()
+        doc_url = DocumentUrl.objects.create(advancedirective=self.advancedirective)
+
+        response = self.client.get(doc_url.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(
+            'bytes 0-9/%d' % len(document_content), response['Content-Range'])
+        self.assertEqual(document_content[:10], b''.join(response.streaming_content))
+
+        response = self.client.get(doc_url.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(304, response.status_code)
+
     def test_document_url_404(self):
         """
         * accessing a DocumentUrl with past expiration returns 404
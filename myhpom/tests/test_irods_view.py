@@ -1,5 +1,8 @@
+from StringIO import StringIO
+
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils.timezone import now
 from mock import MagicMock, PropertyMock, patch
 
@@ -22,7 +25,7 @@ def run_safe_side_effect(*args, **kwargs):
     # Session.run_safe() returns a process
     if args[0] == 'iget':
         proc_mock = MagicMock()
-        type(proc_mock).stdout = PropertyMock(return_value='content')
+        type(proc_mock).stdout = PropertyMock(return_value=StringIO('content'))
         return proc_mock
 
 
@@ -30,6 +33,9 @@ def run_safe_side_effect(*args, **kwargs):
 class IrodsDownloadTest(TestCase):
     url = reverse('myhpom:irods_download', kwargs={'path': 'a_path'})
 
+    def setUp(self):
+        cache.clear()  # file info is cached
+
     def test_non_existant(self, session_mock):
         # If the path does not exist in irods, return an error
         session_mock.run.side_effect = SessionException(1, '', '')
@@ -85,3 +91,86 @@ class IrodsDownloadTest(TestCase):
         advancedirective.save()
         response = self.client.get(self.url)
         self.assertEqual(404, response.status_code)
+
+    def test_rendered_images(self, session_mock):
+        # Rendered images are shared by the ADs with the same content, and only their owners
+        # can download them.
+        session_mock.run.side_effect = run_side_effect
+        session_mock.run_safe.side_effect = run_safe_side_effect
+        user = UserFactory()
+        user.set_password('password')
+        user.save()
+        AdvanceDirective.objects.create(
+            user=user, valid_date=now(), document='a_path', share_with_ehs=False,
+            content_hash='abc123')
+        url = reverse('myhpom:irods_download', kwargs={
+            'path': AdvanceDirective.thumbnail_name('abc123')})
+
+        response = self.client.get(url)
+        self.assertEqual(404, response.status_code)
+
+        another_user = UserFactory()
+        another_user.set_password('password')
+        another_user.save()
+        self.assertTrue(self.client.login(username=another_user.email, password='password'))
+        response = self.client.get(url)
+        self.assertEqual(404, response.status_code)
+
+        self.assertTrue(self.client.login(username=user.email, password='password'))
+        response = self.client.get(url)
+        self.assertEqual(''.join(response.streaming_content), 'content')
+
+    def test_range_and_etag(self, session_mock):
+        session_mock.run.side_effect = run_side_effect
+        session_mock.run_safe.side_effect = run_safe_side_effect
+
+        # The file info is looked up once, and the response is validated by an ETag
+        response = self.client.get(self.url)
+        self.assertEqual('bytes', response['Accept-Ranges'])
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(1, session_mock.run.call_count)
+        self.assertEqual(1, session_mock.run_safe.call_count)  # not called for 304
+
+        # A byte range is served as partial content
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-4')
+        self.assertEqual(206, response.status_code)
+        self.assertEqual('bytes 2-4/7', response['Content-Range'])
+        self.assertEqual('nte', ''.join(response.streaming_content))
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual('ent', ''.join(response.streaming_content))
+        response = self.client.get(self.url, HTTP_RANGE='bytes=7-')
+        self.assertEqual(416, response.status_code)
+
+        # A range for another version of the file is ignored (weak ETags can't validate it)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('content', ''.join(response.streaming_content))
+
+    def test_checksum_etag(self, session_mock):
+        # The checksum of the file is its ETag, when it has been computed
+        session_mock.run.return_value = (
+            'wwwHydroProx      0 hydroshareReplResc            7 2018-08-06.18:05 & a_path\n'
+            '    sha2:Y29udGVudA==    generic    /vault/home/a_path', '')
+        session_mock.run_safe.side_effect = run_safe_side_effect
+        response = self.client.get(self.url)
+        self.assertEqual('"sha2:Y29udGVudA=="', response['ETag'])
+
+        # Without a checksum, the physical path (here with a space) is not mistaken for one
+        cache.clear()
+        session_mock.run.return_value = (
+            'wwwHydroProx      0 hydroshareReplResc            7 2018-08-06.18:05 & a_path\n'
+            '    generic    /vault/home/my file', '')
+        response = self.client.get(self.url)
+        self.assertEqual('W/"7-2018-08-06.18:05"', response['ETag'])
+
+    @override_settings(DOWNLOAD_OFFLOAD='X-Accel-Redirect', DOWNLOAD_OFFLOAD_LOCATION='/protected/')
+    def test_offload(self, session_mock):
+        # iRODS data objects are not files of the front-end server: they are not offloaded
+        session_mock.run.side_effect = run_side_effect
+        session_mock.run_safe.side_effect = run_safe_side_effect
+        response = self.client.get(self.url)
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('X-Accel-Redirect', response)
+        self.assertEqual(''.join(response.streaming_content), 'content')
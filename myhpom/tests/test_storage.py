@@ -1,7 +1,16 @@
+import socket
+import threading
+
+from django.core.files.base import ContentFile
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from mock import MagicMock, patch
+
+from django_irods.icommands import SessionException
 
-from myhpom.storage import MyhpomStorage
+from myhpom.irods_pool import IrodsSessionPool
+from myhpom.storage import MyhpomStorage, PooledMyhpomStorage
+from myhpom.tests.fake_irods import FakeIrods
 
 
 class MyhpomStorageTest(TestCase):
@@ -14,3 +23,122 @@ class MyhpomStorageTest(TestCase):
             reverse('myhpom:irods_download', kwargs={'path': 'path'}),
             self.storage.url('path')
         )
+
+
+@override_settings(IRODS_CWD='/fakeZone/home/rods')
+class PooledMyhpomStorageTest(TestCase):
+    def setUp(self):
+        self.fake = FakeIrods('/fakeZone/home/rods')
+        self.pool = IrodsSessionPool(self.fake.session, size=2)
+        self.storage = PooledMyhpomStorage(pool=self.pool)
+
+    def test_storage_api(self):
+        name = self.storage.save('myhpom/ad/a.pdf', ContentFile(b'%PDF-1.4'))
+        self.assertEqual('myhpom/ad/a.pdf', name)
+        self.assertTrue(self.storage.exists('myhpom/ad/a.pdf'))
+        self.assertTrue(self.storage.exists('myhpom/ad'))
+        self.assertFalse(self.storage.exists('myhpom/ad/b.pdf'))
+        self.assertEqual(8, self.storage.size('myhpom/ad/a.pdf'))
+        self.assertEqual(b'%PDF-1.4', self.storage.open('myhpom/ad/a.pdf').read())
+        self.assertEqual(([], ['a.pdf']), self.storage.listdir('myhpom/ad'))
+        self.assertEqual((['ad'], []), self.storage.listdir('myhpom'))
+        # names are made available in the same way as by MyhpomStorage
+        self.assertNotEqual('myhpom/ad/a.pdf', self.storage.get_available_name('myhpom/ad/a.pdf'))
+
+        self.storage.delete('myhpom/ad/a.pdf')
+        self.assertFalse(self.storage.exists('myhpom/ad/a.pdf'))
+        with self.assertRaises(IOError):
+            self.storage.size('myhpom/ad/a.pdf')
+
+    def test_open_streams_from_session(self):
+        self.fake.add_file('/fakeZone/home/rods/res/a.txt', b'content')
+        # the file holds its session until it is closed, then the session is reused
+        f = self.storage.open('res/a.txt')
+        f.seek(3)
+        self.assertEqual(b'tent', f.read())
+        with self.pool.session() as other_session:
+            pass
+        f.close()
+        f.close()
+        self.assertEqual(2, self.fake.sessions)
+        with self.pool.session() as session:
+            self.assertIsNot(other_session, session)
+        # a missing file gives the session back
+        with self.assertRaises(IOError):
+            self.storage.open('res/b.txt')
+        self.assertEqual(2, self.fake.sessions)
+
+    def test_batched_metadata(self):
+        self.fake.add_file('/fakeZone/home/rods/res/data/a.txt', b'a')
+        self.fake.add_file('/fakeZone/home/rods/res/data/b.txt', b'bb')
+        self.fake.add_file('/fakeZone/home/rods/res/c.txt', b'ccc', checksum='sha2:abc')
+
+        calls = self.fake.calls
+        self.assertEqual(
+            {'res/data/a.txt': 1, 'res/data/b.txt': 2, 'res/c.txt': 3},
+            self.storage.sizes(['res/data/a.txt', 'res/data/b.txt', 'res/c.txt', 'res/d.txt']))
+        self.assertEqual(2, self.fake.calls - calls)  # one call per collection
+
+        info = self.storage.file_info('res/c.txt')
+        self.assertEqual(3, info['size'])
+        self.assertEqual('sha2:abc', info['checksum'])
+
+        self.storage.setAVU('res', 'isPublic', True)
+        self.storage.setAVU('res', 'bag_modified', 'false')
+        self.storage.setAVU('res', 'bag_modified', 'true')
+        self.assertEqual('True', self.storage.getAVU('res', 'isPublic'))
+        self.assertIsNone(self.storage.getAVU('res', 'missing'))
+        self.assertEqual({'isPublic': 'True', 'bag_modified': 'true'}, self.storage.getAVUs('res'))
+
+    def test_sessions_are_reused(self):
+        self.fake.add_file('/fakeZone/home/rods/a.txt', b'a')
+        for i in range(10):
+            self.storage.exists('a.txt')
+            self.storage.size('a.txt')
+        self.assertEqual(1, self.fake.sessions)
+
+    def test_pool_is_bounded(self):
+        self.fake.latency = 0.01
+        self.fake.add_file('/fakeZone/home/rods/a.txt', b'a')
+        threads = [threading.Thread(target=self.storage.size, args=('a.txt',))
+                   for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(2, self.fake.sessions)
+
+    def test_broken_sessions_are_discarded(self):
+        with self.assertRaises(socket.error):
+            with self.pool.session() as session:
+                raise socket.error('connection reset')
+        self.assertTrue(session.closed)
+        with self.pool.session() as new_session:
+            self.assertIsNot(session, new_session)
+        # other errors leave the session in the pool
+        with self.assertRaises(IOError):
+            self.storage.size('missing.txt')
+        with self.pool.session() as same_session:
+            self.assertIs(new_session, same_session)
+
+    def test_fallback_to_icommands(self):
+        # without python-irodsclient, the methods of MyhpomStorage are used
+        storage = PooledMyhpomStorage()
+        with patch('myhpom.storage.get_pool', return_value=None), \
+                patch.object(MyhpomStorage, 'exists', return_value=True) as exists:
+            self.assertTrue(storage.exists('a.txt'))
+        exists.assert_called_once_with('a.txt')
+
+    def test_avus_fallback_to_imeta(self):
+        storage = PooledMyhpomStorage()
+        session = storage.session = MagicMock()
+        session.run.side_effect = [
+            SessionException(1, '', 'not a data object'),
+            ('AVUs defined for collection res:\n'
+             'attribute: isPublic\nvalue: True\nunits: \n----\n'
+             'attribute: bag_modified\nvalue: true\nunits: \n', ''),
+        ]
+        with patch('myhpom.storage.get_pool', return_value=None):
+            self.assertEqual({'isPublic': 'True', 'bag_modified': 'true'},
+                             storage.getAVUs('res'))
+        session.run.assert_called_with('imeta', None, 'ls', '-C', 'res')
@@ -45,6 +45,7 @@ class UploadRequirementsFormTestCase(TestCase):
         invalid_files_list = [
             {'document': SimpleUploadedFile("afile.txt", "not-binary-pdf-data")},
             {'document': SimpleUploadedFile("afile.pdf", "also-not-binary-pdf-data")},
+            {'document': SimpleUploadedFile("afile.pdf", "%PDF-1.4\ncorrupt-pdf-data")},
         ]
         for invalid_files in invalid_files_list:
             form = UploadRequirementsForm(data=valid_data, files=invalid_files)
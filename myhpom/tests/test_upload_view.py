@@ -110,8 +110,9 @@ class DirectiveUploadRequirementsTestCase(GETMixin, TestCase):
         with open(PDF_FILENAME, 'rb') as f:
             self.pdfdata = f.read()
 
+    @patch('myhpom.views.upload.RenderAdvanceDirectiveImages')
     @patch('myhpom.views.upload.CloudFactorySubmitDocumentRun')
-    def test_POST_valid_date_for_unsupported_state(self, task_patch):
+    def test_POST_valid_date_for_unsupported_state(self, task_patch, render_patch):
         user = self._setup_user_and_login()
         document = SimpleUploadedFile(os.path.basename(PDF_FILENAME), self.pdfdata)
         post_data = {'valid_date': '2018-01-01', 'document': document}
@@ -131,6 +132,8 @@ class DirectiveUploadRequirementsTestCase(GETMixin, TestCase):
         self.assertEqual(1, user.advancedirective.documenturl_set.count())
         task_patch.delay.assert_called_once_with(
             user.advancedirective.documenturl_set.first().pk, 'testserver')
+        # and the thumbnail is rendered asynchronously.
+        render_patch.delay.assert_called_once_with(user.advancedirective.pk)
 
         # Subsequent posts do not cause more tasks/documents to be created
         response = self.client.post(
@@ -145,8 +148,9 @@ class DirectiveUploadRequirementsTestCase(GETMixin, TestCase):
         task_patch.delay.assert_called_once_with(
             user.advancedirective.documenturl_set.first().pk, 'testserver')
 
+    @patch('myhpom.views.upload.RenderAdvanceDirectiveImages')
     @patch('myhpom.views.upload.CloudFactorySubmitDocumentRun')
-    def test_POST_valid_date_for_supported_state(self, task_patch):
+    def test_POST_valid_date_for_supported_state(self, task_patch, render_patch):
         user = self._setup_user_and_login()
         user.userdetails.state.advance_directive_template = SimpleUploadedFile('ad.pdf', '')
         user.userdetails.state.save()
@@ -211,8 +215,9 @@ class DirectiveUploadRequirementsTestCase(GETMixin, TestCase):
         self.assertFalse(hasattr(user, 'advancedirective'))
         self.assertFalse(task_patch.delay.called)
 
+    @patch('myhpom.views.upload.RenderAdvanceDirectiveImages')
     @patch('myhpom.views.upload.CloudFactorySubmitDocumentRun')
-    def test_POST_duplicate_filenames(self, task_patch):
+    def test_POST_duplicate_filenames(self, task_patch, render_patch):
         """
         Confirm that files are (as expected, not necessarily as desired)
         renamed to avoid name collisions on the filesystem but are available by
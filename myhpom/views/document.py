@@ -1,15 +1,16 @@
 import base64
+import hashlib
 import json
 import mimetypes
 
 from django.conf import settings
-from django.http import (
-    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden)
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
 from django.utils.timezone import now
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST
 
 from ipware import get_client_ip
+from myhpom.downloads import cached_file_info, download_response, is_local_storage
 from myhpom.models import CloudFactoryDocumentRun, DocumentUrl
 from myhpom.tasks import EmailUserDocumentReviewCompleted
 
@@ -34,18 +35,33 @@ def document_url(request, key):
         raise Http404()
 
     # -- it's also possible that the document file was removed for some reason.
+    document = doc_url.advancedirective.document
     try:
-        document_file = doc_url.advancedirective.document.file
+        info = cached_file_info(
+            'storage:' + document.name, lambda: {'size': document.storage.size(document.name)})
     except:
         raise Http404()
 
-    # If we've gotten this far, the doc_url is valid, so send the document
-    response = FileResponse(
-        document_file,
-        content_type=(mimetypes.guess_type(doc_url.filename)[0] or 'application-x/octet-stream'),
+    # If we've gotten this far, the doc_url is valid, so send the document. Stored document
+    # names are unique and their content never changes, so the name identifies the content
+    # when the content hash is not known.
+    if doc_url.advancedirective.content_hash:
+        etag = '"%s"' % doc_url.advancedirective.content_hash
+    else:
+        etag = 'W/"%s"' % hashlib.sha1(document.name.encode('utf-8')).hexdigest()
+
+    def open_file():
+        return document.storage.open(document.name, 'rb')
+
+    return download_response(
+        request,
+        open_file,
+        info['size'],
+        mimetypes.guess_type(doc_url.filename)[0] or 'application-x/octet-stream',
+        doc_url.filename,
+        etag=etag,
+        storage_name=document.name if is_local_storage(document.storage) else None,
     )
-    response['Content-Disposition'] = 'inline; filename="%s"' % doc_url.filename
-    return response
 
 
 def check_basic_auth(request, expected_auth_string):
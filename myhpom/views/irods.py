@@ -1,12 +1,41 @@
 import mimetypes
+import re
 
-from django.http import FileResponse
+from django.core.files.storage import default_storage
 from django.views.decorators.http import require_GET
 from django.http import HttpResponseNotFound
 
 from django_irods.icommands import GLOBAL_SESSION, SessionException
 
+from myhpom.downloads import cached_file_info, download_response
 from myhpom.models import AdvanceDirective
+from myhpom.models.document import RENDERED_IMAGES_PATH
+
+# `ils -L` prints the checksum of a data object, if it has been computed, at the start of the
+# line following the object line: a SHA-256 prefixed with sha2: or an MD5 in hex.
+CHECKSUM_RE = re.compile(r'^(sha2:\S+|[0-9a-fA-F]{32})$')
+
+
+def irods_file_info(path):
+    """ Return the size, modification time and checksum (None if not computed) of an iRODS
+    data object, from a single `ils -L`, e.g.:
+
+      rods              0 demoResc         1234 2018-08-06.18:05 & file.txt
+        sha2:Zm9vYmFy...    generic    /var/lib/irods/Vault/home/rods/file.txt
+
+    When the default storage has a pooled iRODS client (PooledMyhpomStorage), it is used
+    instead of running `ils`.
+
+    Raises SessionException (IOError with the pooled client) if the path does not exist.
+    """
+    if getattr(default_storage, 'pool', None) is not None:
+        return default_storage.file_info(path)
+    lines = GLOBAL_SESSION.run('ils', None, '-L', path)[0].splitlines()
+    fields = lines[0].split()
+    checksum = None
+    if len(lines) > 1 and lines[1].split() and CHECKSUM_RE.match(lines[1].split()[0]):
+        checksum = lines[1].split()[0]
+    return {'size': int(fields[3]), 'modified': fields[4], 'checksum': checksum}
 
 
 @require_GET
@@ -21,32 +50,55 @@ def irods_download(request, path):
     IRODS_GLOBAL_SESSION=True and USE_IRODS=True. (The django_irods application
     supports non-global sessions, but hydroshare itself was configured in
     staging/production without it.)
+
+    Range requests and conditional GETs are supported (see myhpom.downloads). The size and
+    checksum of the file are cached, so repeated and resumed downloads only run `iget`.
+    The file is always sent by this view, even when DOWNLOAD_OFFLOAD is set.
     """
-    # Retrieve file size to set up Content-Length header
     file_name = path.split('/')[-1]
 
-    try:
-        path_info = GLOBAL_SESSION.run('ils', None, '-l', path)[0].split()
-    except SessionException as se:
-        return HttpResponseNotFound()
-
     # If the path is also an AD, make sure it is owned by the user:
     ad = AdvanceDirective.objects.filter(document=path).first()
     if ad and (request.user is None or ad.user != request.user):
         return HttpResponseNotFound()
 
+    # Rendered images of ADs are keyed by the content hash of the AD, and shared by the ADs
+    # with the same content: the user must own one of them.
+    if path.startswith(RENDERED_IMAGES_PATH + '/'):
+        content_hash = path[len(RENDERED_IMAGES_PATH) + 1:].split('/')[0]
+        if request.user is None or not request.user.is_authenticated() or \
+                not AdvanceDirective.objects.filter(
+                    user=request.user, content_hash=content_hash).exists():
+            return HttpResponseNotFound()
+
+    try:
+        info = cached_file_info('irods:' + path, lambda: irods_file_info(path))
+    except (SessionException, IOError):
+        return HttpResponseNotFound()
+
     if ad:
         file_name = ad.original_filename
 
+    # The ETag is the content hash of an AD, or the iRODS checksum when there is one.
+    # Otherwise the size and modification time identify the version of the file.
+    if ad and ad.content_hash:
+        etag = '"%s"' % ad.content_hash
+    elif info['checksum']:
+        etag = '"%s"' % info['checksum']
+    else:
+        etag = 'W/"%d-%s"' % (info['size'], info['modified'])
+
     # obtain mime_type to set content_type
     mtype = 'application-x/octet-stream'
     mime_type = mimetypes.guess_type(path)
     if mime_type[0] is not None:
         mtype = mime_type[0]
 
-    # Get the file from irods, and return via stdout
-    proc = GLOBAL_SESSION.run_safe('iget', None, path, '-')
-    response = FileResponse(proc.stdout, content_type=mtype)
-    response['Content-Disposition'] = 'inline; filename="{name}"'.format(name=file_name)
-    response['Content-Length'] = int(path_info[3])
-    return response
+    # Get the file from irods, and return via stdout (or through the pooled client)
+    def open_file():
+        if getattr(default_storage, 'pool', None) is not None:
+            return default_storage.open(path)
+        return GLOBAL_SESSION.run_safe('iget', None, path, '-').stdout
+
+    # iRODS data objects are not files of the front-end server: they are never offloaded.
+    return download_response(request, open_file, info['size'], mtype, file_name, etag=etag)
@@ -8,7 +8,7 @@ from django.utils.timezone import now
 from myhpom.decorators import require_ajax_login
 from myhpom.forms.upload_requirements import SharingForm, UploadRequirementsForm
 from myhpom.models import AdvanceDirective, StateRequirement, DocumentUrl, CloudFactoryDocumentRun
-from myhpom.tasks import CloudFactorySubmitDocumentRun
+from myhpom.tasks import CloudFactorySubmitDocumentRun, RenderAdvanceDirectiveImages
 
 
 @require_GET
@@ -44,6 +44,7 @@ def upload_requirements(request):
         form = UploadRequirementsForm(request.POST, request.FILES, instance=directive)
         if form.is_valid():
             form.save()
+            RenderAdvanceDirectiveImages.delay(form.instance.pk)
 
             # start the verification process for the AD:
             document_url = DocumentUrl.objects.create(advancedirective=form.instance)